@@ -0,0 +1,199 @@
+"""
+SafeGuard Family - Deadline Tracking and Alert Fan-out
+Detects devices whose heartbeats stopped (extension removed or disabled)
+without ever scanning the device table.
+
+  • DeadlineWheel: hashed timer wheel; every heartbeat reschedules the
+    device's expiry in O(1), expiries are handed to a callback in batches
+  • AlertBroker: per-parent subscriber queues used to push alerts to open
+    dashboards (Server-Sent Events)
+"""
+
+import math
+import queue
+import threading
+import time
+
+
+# ════════════════════════════════
+# TIMER WHEEL
+# ════════════════════════════════
+
+class DeadlineWheel:
+    """
+    Hashed timer wheel keyed by device id
+
+    The wheel has one slot per `resolution` seconds of `timeout`, so every
+    scheduled key sits in exactly one slot and one dict entry: memory is
+    O(keys), bounded by `max_entries`, and never grows with heartbeat rate.
+    schedule() moves a key between two slots; advance() only visits the
+    slots whose time has come.
+    """
+
+    def __init__(self, timeout, resolution=1.0, max_entries=1_000_000):
+        self.timeout = timeout
+        self.resolution = resolution
+        self.max_entries = max_entries
+        self.slot_count = int(math.ceil(timeout / resolution)) + 1
+        self._slots = [set() for _ in range(self.slot_count)]
+        self._deadline = {}    # key -> expiry tick
+        self._lock = threading.Lock()
+        self._tick = self._to_tick(time.time())
+        self._ticker = None
+        self._stop = threading.Event()
+        self.expired = 0
+        self.rejected = 0
+
+    def _to_tick(self, when):
+        return int(when // self.resolution)
+
+    def __len__(self):
+        return len(self._deadline)
+
+    def __contains__(self, key):
+        return key in self._deadline
+
+    # ════════════════════════════════
+    # SCHEDULING
+    # ════════════════════════════════
+
+    def schedule(self, key, last_seen=None):
+        """
+        (Re)arm `key` to expire `timeout` seconds after `last_seen` (epoch seconds)
+        Returns False when the wheel is full and the key is new
+        """
+        last_seen = time.time() if last_seen is None else last_seen
+        tick = self._to_tick(last_seen + self.timeout)
+        with self._lock:
+            previous = self._deadline.get(key)
+            if previous is None:
+                if len(self._deadline) >= self.max_entries:
+                    self.rejected += 1
+                    return False
+            elif previous == tick:
+                return True
+            else:
+                self._slots[previous % self.slot_count].discard(key)
+            # Never schedule into a slot the wheel has already passed
+            tick = max(tick, self._tick + 1)
+            self._deadline[key] = tick
+            self._slots[tick % self.slot_count].add(key)
+        return True
+
+    def cancel(self, key):
+        """Stop tracking `key` (device deleted or banned)"""
+        with self._lock:
+            tick = self._deadline.pop(key, None)
+            if tick is not None:
+                self._slots[tick % self.slot_count].discard(key)
+
+    def deadline(self, key):
+        """Expiry of `key` as epoch seconds, or None when not tracked"""
+        tick = self._deadline.get(key)
+        return tick * self.resolution if tick is not None else None
+
+    # ════════════════════════════════
+    # EXPIRY
+    # ════════════════════════════════
+
+    def advance(self, now=None):
+        """
+        Move the wheel to `now` and return every key whose deadline passed
+        Expired keys are removed; the next heartbeat re-arms them
+        """
+        now_tick = self._to_tick(time.time() if now is None else now)
+        expired = []
+        with self._lock:
+            # After a long pause one full turn visits every slot
+            steps = min(now_tick - self._tick, self.slot_count)
+            for step in range(1, steps + 1):
+                slot = self._slots[(self._tick + step) % self.slot_count]
+                due = [key for key in slot if self._deadline[key] <= now_tick]
+                for key in due:
+                    slot.discard(key)
+                    del self._deadline[key]
+                expired.extend(due)
+            self._tick = max(self._tick, now_tick)
+        self.expired += len(expired)
+        return expired
+
+    def start(self, on_expire):
+        """
+        Call on_expire(keys) from a daemon thread whenever keys expire
+        Returns True only for the call that started the thread
+        """
+        with self._lock:
+            if self._ticker is not None:
+                return False
+            self._ticker = threading.Thread(
+                target=self._tick_loop, args=(on_expire,),
+                name="deadline-wheel", daemon=True
+            )
+            self._ticker.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def _tick_loop(self, on_expire):
+        while not self._stop.wait(self.resolution):
+            expired = self.advance()
+            if not expired:
+                continue
+            try:
+                on_expire(expired)
+            except Exception as e:
+                print(f"⚠️  Deadline expiry error: {e}")
+
+
+# ════════════════════════════════
+# ALERT FAN-OUT
+# ════════════════════════════════
+
+class AlertBroker:
+    """
+    Pushes alert events to every open subscription of a parent
+
+    Each subscriber gets a bounded queue; a slow or stalled client drops
+    events instead of holding memory (alerts are also stored in the
+    database and can be listed later).
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = {}   # parent_id -> set of queues
+        self.dropped = 0
+
+    def subscribe(self, parent_id):
+        subscription = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(parent_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, parent_id, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(parent_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[parent_id]
+
+    def publish(self, parent_id, event):
+        """Queue `event` for every subscription of `parent_id`; returns how many got it"""
+        with self._lock:
+            subscriptions = list(self._subscribers.get(parent_id, ()))
+        delivered = 0
+        for subscription in subscriptions:
+            try:
+                subscription.put_nowait(event)
+                delivered += 1
+            except queue.Full:
+                self.dropped += 1
+        return delivered
+
+    def subscriber_count(self, parent_id=None):
+        with self._lock:
+            if parent_id is not None:
+                return len(self._subscribers.get(parent_id, ()))
+            return sum(len(s) for s in self._subscribers.values())
@@ -4,14 +4,40 @@ SafeGuard Family - Enhanced Backend with Full Parent Controls
 Includes extension protection, data sync, and admin features
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, abort, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
+import atexit
+import hmac
+import json
+import queue
+import sys
+import threading
+import time
 import uuid
 import os
 
+from db_utils import (
+    NDJSON_MEDIA_TYPE, bucket_label, clamp_page_size, decode_cursor, encode_cursor, ensure_columns, ensure_indexes,
+    iter_keyset, ndjson_lines, paginate, parse_group_by, usage_dimension
+)
+from presence import PresenceTracker, batch_params, bulk_heartbeat_update
+from alerts import AlertBroker, DeadlineWheel
+from db_engine import configure_engine, describe as describe_engine, engine_options
+from esp32_dispatcher import dispatcher_from_env
+from profiling import init_flask_profiling, profiler_from_env
+from query_stats import QueryMonitor, SlowQueryLog, init_flask_query_stats
+from response_encoding import init_flask_responses
+from static_assets import StaticAssets, flask_response
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsRegistry, init_flask_metrics, pool_gauge
+from partitions import PartitionedLogs
+from archive import ColdArchive
+from interning import InternedStrings, column_keys
+from compact_ids import CompactId, uuid7
+from compact_ids import upgrade as upgrade_compact_ids
+
 # Initialize Flask
 app_dir = os.path.dirname(os.path.abspath(__file__))
 dashboard_dir = os.path.join(app_dir, 'backend', 'safeguard_server', 'chrome-extension')
@@ -27,17 +53,35 @@ if not database_url:
 app = Flask(
     __name__,
     instance_path=instance_dir,
-    static_folder=dashboard_dir,
-    static_url_path='/assets'
+    static_folder=None  # /assets is served from memory by static_files below
 )
 app.config['SECRET_KEY'] = 'safeguard-family-secret-2026'
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Pool sizing, timeouts and SQLite pragmas: DB_PROFILE=server (default), serverless or library
+DB_PROFILE = os.environ.get('DB_PROFILE', 'server').strip().lower()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database_url, DB_PROFILE)
 app.config['JSON_SORT_KEYS'] = False
 
+# jsonify() through orjson when installed; large bodies gzip/brotli compressed when the client accepts it
+init_flask_responses(
+    app,
+    int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', 1024)),
+    compression=os.environ.get('RESPONSE_COMPRESSION', 'true').lower() == 'true'
+)
+
+# Dashboard pages and /assets from memory: precompressed, strong ETags, content-hashed
+# asset URLs cached for a year; a background thread re-reads files when they change
+static_files = StaticAssets(dashboard_dir, reload_seconds=float(os.environ.get('STATIC_RELOAD_SECONDS', 2)))
+
 db = SQLAlchemy(app)
+with app.app_context():
+    configure_engine(db.engine, DB_PROFILE)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+# Dictionary tables for the domains and URLs repeated across log rows
+interned = InternedStrings(db.metadata)
+
 # ═══════════════════════════════════════════════════════════════
 # DATABASE MODELS
 # ═══════════════════════════════════════════════════════════════
@@ -82,7 +126,8 @@ class Child(db.Model):
     history_logs = db.relationship('HistoryLog', backref='child', lazy=True, cascade='all, delete-orphan')
     time_rules = db.relationship('SiteTimeRule', backref='child', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
+    def to_dict(self, device_count=None):
+        # Pass device_count when it was already aggregated to avoid loading self.devices
         return {
             'id': self.id,
             'parent_id': self.parent_id,
@@ -90,7 +135,7 @@ class Child(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'is_banned': self.is_banned,
             'ban_reason': self.ban_reason,
-            'device_count': len(self.devices)
+            'device_count': len(self.devices) if device_count is None else device_count
         }
 
 
@@ -99,11 +144,13 @@ class Device(db.Model):
     child_id = db.Column(db.String(50), db.ForeignKey('child.id'), nullable=False)
     device_name = db.Column(db.String(120), nullable=False)
     device_type = db.Column(db.String(50), default='Chrome')
-    last_sync = db.Column(db.DateTime, default=datetime.utcnow)
+    last_sync = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
     is_banned = db.Column(db.Boolean, default=False)
     ip_address = db.Column(db.String(50))
+    # Set by the worker that raised the extension_removed alert, cleared by the next heartbeat
+    alerted_at = db.Column(db.DateTime)
     
     block_logs = db.relationship('BlockLog', backref='device', lazy=True)
     history_logs = db.relationship('HistoryLog', backref='device', lazy=True)
@@ -123,11 +170,17 @@ class Device(db.Model):
 
 
 class BlockLog(db.Model):
-    id = db.Column(db.String(50), primary_key=True)
+    __table_args__ = (
+        db.Index('ix_block_log_child_blocked_at', 'child_id', 'blocked_at', 'id'),
+    )
+    
+    id = db.Column(CompactId, primary_key=True, default=uuid7)
     child_id = db.Column(db.String(50), db.ForeignKey('child.id'), nullable=False)
     device_id = db.Column(db.String(100), db.ForeignKey('device.id'), nullable=False)
-    url = db.Column(db.String(500), nullable=False)
-    domain = db.Column(db.String(120), nullable=False)
+    url_id = interned.urls.id_column()
+    url = interned.urls.lookup(url_id)
+    domain_id = interned.domains.id_column()
+    domain = interned.domains.lookup(domain_id)
     category = db.Column(db.String(50), nullable=False)
     blocked_at = db.Column(db.DateTime, default=datetime.utcnow)
     ip_address = db.Column(db.String(50))
@@ -144,14 +197,46 @@ class BlockLog(db.Model):
             'blocked_at': self.blocked_at.isoformat() if self.blocked_at else None,
             'ip_address': self.ip_address
         }
+    
+    @classmethod
+    def listing_query(cls, source=None):
+        """
+        Column-only query with the device name joined in (no ORM objects, no lazy loads)
+        `source` is the entity to read from, see log_partitions.source()
+        """
+        source = source or cls
+        return db.session.query(*[getattr(source, key) for key in column_keys(cls)], Device.device_name).outerjoin(
+            Device, source.device_id == Device.id
+        )
+    
+    @staticmethod
+    def row_to_dict(row):
+        """Serialize a row from listing_query(), same shape as to_dict()"""
+        return {
+            'id': row.id,
+            'child_id': row.child_id,
+            'device_id': row.device_id,
+            'device_name': row.device_name or 'Unknown',
+            'url': row.url,
+            'domain': row.domain,
+            'category': row.category,
+            'blocked_at': row.blocked_at.isoformat() if row.blocked_at else None,
+            'ip_address': row.ip_address
+        }
 
 
 class HistoryLog(db.Model):
-    id = db.Column(db.String(50), primary_key=True)
+    __table_args__ = (
+        db.Index('ix_history_log_child_visited_at', 'child_id', 'visited_at', 'id'),
+    )
+    
+    id = db.Column(CompactId, primary_key=True, default=uuid7)
     child_id = db.Column(db.String(50), db.ForeignKey('child.id'), nullable=False)
     device_id = db.Column(db.String(100), db.ForeignKey('device.id'), nullable=False)
-    url = db.Column(db.String(500), nullable=False)
-    domain = db.Column(db.String(120), nullable=False)
+    url_id = interned.urls.id_column()
+    url = interned.urls.lookup(url_id)
+    domain_id = interned.domains.id_column()
+    domain = interned.domains.lookup(domain_id)
     page_title = db.Column(db.String(255))
     visited_at = db.Column(db.DateTime, default=datetime.utcnow)
     duration = db.Column(db.Integer, default=0)  # in seconds
@@ -170,6 +255,39 @@ class HistoryLog(db.Model):
             'duration': self.duration,
             'ip_address': self.ip_address
         }
+    
+    @classmethod
+    def listing_query(cls, source=None):
+        """
+        Column-only query with the device name joined in (no ORM objects, no lazy loads)
+        `source` is the entity to read from, see log_partitions.source()
+        """
+        source = source or cls
+        return db.session.query(*[getattr(source, key) for key in column_keys(cls)], Device.device_name).outerjoin(
+            Device, source.device_id == Device.id
+        )
+    
+    @staticmethod
+    def row_to_dict(row):
+        """Serialize a row from listing_query(), same shape as to_dict()"""
+        return {
+            'id': row.id,
+            'child_id': row.child_id,
+            'device_id': row.device_id,
+            'device_name': row.device_name or 'Unknown',
+            'url': row.url,
+            'domain': row.domain,
+            'page_title': row.page_title,
+            'visited_at': row.visited_at.isoformat() if row.visited_at else None,
+            'duration': row.duration,
+            'ip_address': row.ip_address
+        }
+
+
+interned.add(BlockLog, 'url', interned.urls)
+interned.add(BlockLog, 'domain', interned.domains)
+interned.add(HistoryLog, 'url', interned.urls)
+interned.add(HistoryLog, 'domain', interned.domains)
 
 
 class ParentSession(db.Model):
@@ -242,6 +360,339 @@ class SiteTimeRule(db.Model):
         }
 
 
+class DeviceAlert(db.Model):
+    __table_args__ = (
+        db.Index('ix_device_alert_parent_created_at', 'parent_id', 'created_at'),
+    )
+
+    id = db.Column(db.String(50), primary_key=True)
+    parent_id = db.Column(db.String(50), db.ForeignKey('parent.id'), nullable=False)
+    child_id = db.Column(db.String(50), db.ForeignKey('child.id'), nullable=False)
+    device_id = db.Column(db.String(100), db.ForeignKey('device.id'), nullable=False)
+    alert_type = db.Column(db.String(50), default='extension_removed')
+    message = db.Column(db.String(255))
+    last_seen = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    acknowledged_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'child_id': self.child_id,
+            'device_id': self.device_id,
+            'alert_type': self.alert_type,
+            'message': self.message,
+            'last_seen': self.last_seen.isoformat() if self.last_seen else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'acknowledged_at': self.acknowledged_at.isoformat() if self.acknowledged_at else None
+        }
+
+
+# ═══════════════════════════════════════════════════════════════
+# DEVICE PRESENCE
+# ═══════════════════════════════════════════════════════════════
+
+# Heartbeats are kept in memory and written to Device.last_sync in bulk;
+# a device heard from again can raise a new alert later (alerted_at cleared)
+presence = PresenceTracker(flush_interval=int(os.environ.get('HEARTBEAT_FLUSH_SECONDS', 60)))
+
+_heartbeat_update = bulk_heartbeat_update(
+    Device.__table__, Device.__table__.c.id, Device.__table__.c.last_sync,
+    extra_values={'alerted_at': None}
+)
+
+
+def flush_heartbeats():
+    """Write pending heartbeats to the device table in one bulk UPDATE"""
+    def write_batch(batch):
+        with app.app_context():
+            db.session.execute(_heartbeat_update, batch_params(batch))
+            db.session.commit()
+
+    return presence.flush(write_batch)
+
+
+@atexit.register
+def flush_heartbeats_on_exit():
+    try:
+        flush_heartbeats()
+    except Exception as e:
+        print(f"Final heartbeat flush error: {str(e)}")
+
+
+# ═══════════════════════════════════════════════════════════════
+# EXTENSION REMOVAL ALERTS
+# ═══════════════════════════════════════════════════════════════
+
+# A device that misses heartbeats for this long raises an alert
+EXTENSION_ALERT_MINUTES = int(os.environ.get('EXTENSION_ALERT_MINUTES', 10))
+
+# sweep_extension_alerts() looks this far back past the alert window, so
+# devices that went quiet long before the sweep first ran stay silent
+EXTENSION_ALERT_SWEEP_HOURS = int(os.environ.get('EXTENSION_ALERT_SWEEP_HOURS', 24))
+
+# Open /api/alerts/stream connections: each holds a worker thread, so they
+# are capped per worker and closed after ALERT_STREAM_SECONDS (EventSource
+# reconnects on its own and resumes from the last alert it received)
+ALERT_STREAM_MAX = int(os.environ.get('ALERT_STREAM_MAX', 16))
+ALERT_STREAM_SECONDS = int(os.environ.get('ALERT_STREAM_SECONDS', 60))
+ALERT_STREAM_POLL_SECONDS = float(os.environ.get('ALERT_STREAM_POLL_SECONDS', 5))
+
+device_deadlines = DeadlineWheel(timeout=EXTENSION_ALERT_MINUTES * 60, resolution=1.0)
+alert_broker = AlertBroker()
+
+# Parent-side ESP32 buzzer (None unless ESP32_ENABLED=true)
+esp32_alerts = dispatcher_from_env()
+
+
+def arm_device_deadlines():
+    """Schedule devices heard from within the alert window (indexed on last_sync)"""
+    cutoff = datetime.utcnow() - timedelta(minutes=EXTENSION_ALERT_MINUTES)
+    with app.app_context():
+        rows = db.session.query(Device.id, Device.last_sync).filter(
+            Device.last_sync >= cutoff,
+            Device.is_active == True
+        ).all()
+    for device_id, last_sync in rows:
+        device_deadlines.schedule(device_id, (last_sync - datetime(1970, 1, 1)).total_seconds())
+    return len(rows)
+
+
+def start_extension_watch():
+    """
+    Start the deadline ticker once per worker
+    Not on the serverless profile, where threads stop between requests:
+    there a scheduler runs sweep_extension_alerts() (python app.py sweep-alerts
+    or POST /api/admin/alerts/sweep) instead
+    """
+    if DB_PROFILE == 'serverless':
+        return
+    if device_deadlines.start(raise_extension_alerts):
+        arm_device_deadlines()
+
+
+def claim_device_alert(device_id, cutoff, now):
+    """
+    Mark a silent device as alerted unless a worker already did
+    One conditional UPDATE: true for exactly one caller per silence, even
+    with every worker's wheel expiring the same device
+    """
+    claimed = db.session.execute(
+        db.update(Device).where(
+            Device.id == device_id,
+            db.or_(Device.last_sync == None, Device.last_sync < cutoff),
+            Device.alerted_at == None,
+            Device.is_active == True,
+            Device.is_banned == False
+        ).values(alerted_at=now).execution_options(synchronize_session=False)
+    )
+    return claimed.rowcount == 1
+
+
+def raise_extension_alerts(device_ids):
+    """
+    Store and push an alert for every expired device
+    Devices this worker or another one (newer last_sync) heard from in time
+    are re-armed; the others are claimed first, so an alert is stored once
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(minutes=EXTENSION_ALERT_MINUTES)
+    alerts = []
+
+    with app.app_context():
+        for start in range(0, len(device_ids), 500):
+            chunk = device_ids[start:start + 500]
+            rows = db.session.query(
+                Device.id, Device.child_id, Device.device_name, Device.last_sync, Child.parent_id, Child.name
+            ).join(Child, Child.id == Device.child_id).filter(Device.id.in_(chunk)).all()
+
+            for device_id, child_id, device_name, last_sync, parent_id, child_name in rows:
+                last_seen = max(filter(None, [last_sync, presence.last_seen(device_id)]), default=None)
+                if last_seen and last_seen > cutoff:
+                    device_deadlines.schedule(device_id, (last_seen - datetime(1970, 1, 1)).total_seconds())
+                    continue
+                if not claim_device_alert(device_id, cutoff, now):
+                    continue
+
+                alert = DeviceAlert(
+                    id=generate_id(),
+                    parent_id=parent_id,
+                    child_id=child_id,
+                    device_id=device_id,
+                    alert_type='extension_removed',
+                    message=f'{device_name} stopped reporting for {EXTENSION_ALERT_MINUTES} minutes',
+                    last_seen=last_seen,
+                    created_at=now
+                )
+                db.session.add(alert)
+                alerts.append((alert, child_name))
+
+            # Claims are held (row locks) only until the end of each chunk
+            db.session.commit()
+
+        for alert, child_name in alerts:
+            # Wakes this worker's open streams; the others find it on their next poll
+            alert_broker.publish(alert.parent_id, alert.to_dict())
+            if esp32_alerts:
+                esp32_alerts.submit('Other', child_name, alert_type=alert.alert_type, severity='HIGH')
+
+    return len(alerts)
+
+
+def sweep_extension_alerts():
+    """
+    Alert every device silent past the window, from the database alone
+    For deployments without the ticker thread (serverless) or as a periodic
+    safety net; claims keep it from repeating the ticker's alerts
+    """
+    cutoff = datetime.utcnow() - timedelta(minutes=EXTENSION_ALERT_MINUTES)
+    with app.app_context():
+        device_ids = [device_id for (device_id,) in db.session.query(Device.id).filter(
+            Device.last_sync < cutoff,
+            Device.last_sync >= cutoff - timedelta(hours=EXTENSION_ALERT_SWEEP_HOURS),
+            Device.alerted_at == None,
+            Device.is_active == True
+        )]
+    return raise_extension_alerts(device_ids) if device_ids else 0
+
+
+def alerts_after(parent_id, position, limit=100):
+    """A parent's alerts created after `position` (created_at, id), oldest first"""
+    created_at, alert_id = position
+    return DeviceAlert.query.filter(
+        DeviceAlert.parent_id == parent_id,
+        db.or_(
+            DeviceAlert.created_at > created_at,
+            db.and_(DeviceAlert.created_at == created_at, DeviceAlert.id > alert_id)
+        )
+    ).order_by(DeviceAlert.created_at, DeviceAlert.id).limit(limit).all()
+
+
+# ═══════════════════════════════════════════════════════════════
+# METRICS
+# ═══════════════════════════════════════════════════════════════
+
+# Prometheus metrics served at /metrics (per worker process)
+metrics = MetricsRegistry()
+init_flask_metrics(app, metrics)
+
+
+def _engine():
+    with app.app_context():
+        return db.engine
+
+
+def ingest_queue_depths():
+    return {
+        ('heartbeats',): presence.pending_count,
+        ('esp32_alerts',): esp32_alerts.queue_depth if esp32_alerts else 0
+    }
+
+
+metrics.gauge('db_pool_connections', 'Database pool connections by state', ('state',), callback=pool_gauge(_engine))
+metrics.gauge('ingest_queue_depth', 'Items buffered in memory waiting to be written or sent', ('queue',), callback=ingest_queue_depths)
+metrics.gauge('device_deadlines_armed', 'Devices watched for extension removal', callback=lambda: len(device_deadlines))
+metrics.gauge('alert_stream_subscribers', 'Open /api/alerts/stream connections', callback=alert_broker.subscriber_count)
+
+# Per-request query counts (X-DB-* headers in debug mode) and the slow-query log
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+slow_queries = SlowQueryLog(threshold_ms=SLOW_QUERY_MS, size=int(os.environ.get('SLOW_QUERY_LOG_SIZE', 100)))
+query_monitor = QueryMonitor(slow_queries, metrics)
+with app.app_context():
+    query_monitor.instrument(db.engine)
+init_flask_query_stats(app, query_monitor)
+
+# Sampling profiler for picked requests (None unless PROFILE_ENABLED=true)
+profiler = profiler_from_env()
+if profiler:
+    init_flask_profiling(app, profiler)
+
+
+# ═══════════════════════════════════════════════════════════════
+# LOG PARTITIONS
+# ═══════════════════════════════════════════════════════════════
+
+# LOG_PARTITIONING=monthly splits the log tables by month (see partitions.py);
+# LOG_RETENTION_MONTHS is the number of months kept before the current one (0 keeps everything)
+LOG_PARTITIONING = os.environ.get('LOG_PARTITIONING', 'off').strip().lower()
+PARTITION_MAINTENANCE_SECONDS = int(os.environ.get('PARTITION_MAINTENANCE_SECONDS', 3600))
+
+log_partitions = PartitionedLogs(
+    LOG_PARTITIONING == 'monthly', int(os.environ.get('LOG_RETENTION_MONTHS', 0)), bind=_engine
+)
+log_partitions.add(HistoryLog, 'visited_at')
+log_partitions.add(BlockLog, 'blocked_at')
+
+_partition_maintenance = None
+_partition_maintenance_lock = threading.Lock()
+
+
+def maintain_partitions_forever():
+    while True:
+        try:
+            log_partitions.maintain()
+        except Exception as e:
+            print(f"Partition maintenance error: {str(e)}")
+        time.sleep(PARTITION_MAINTENANCE_SECONDS)
+
+
+def start_partition_maintenance():
+    """Create upcoming months and apply retention on a daemon thread, once per worker"""
+    global _partition_maintenance
+    if not log_partitions.enabled or _partition_maintenance is not None:
+        return
+    with _partition_maintenance_lock:
+        if _partition_maintenance is None:
+            _partition_maintenance = threading.Thread(
+                target=maintain_partitions_forever, name='log-partitions', daemon=True
+            )
+            _partition_maintenance.start()
+
+
+# ═══════════════════════════════════════════════════════════════
+# COLD LOG ARCHIVE
+# ═══════════════════════════════════════════════════════════════
+
+# ARCHIVE_AFTER_DAYS > 0 moves older logs into compressed segment files
+# under ARCHIVE_DIR (see archive.py); reads past the cutoff merge them back in
+cold_archive = ColdArchive(
+    os.environ.get('ARCHIVE_DIR', os.path.join(instance_dir, 'archive')),
+    int(os.environ.get('ARCHIVE_AFTER_DAYS', 0)),
+    int(os.environ.get('ARCHIVE_RETENTION_DAYS', 365)),
+    metadata=db.metadata,
+    bind=_engine
+)
+cold_archive.add(HistoryLog, 'visited_at')
+cold_archive.add(BlockLog, 'blocked_at')
+ARCHIVE_INTERVAL_SECONDS = int(os.environ.get('ARCHIVE_INTERVAL_SECONDS', 86400))
+
+
+def archive_logs():
+    for table, stats in cold_archive.run(partitions=log_partitions).items():
+        if stats['rows']:
+            ratio = stats['raw_bytes'] / max(stats['stored_bytes'], 1)
+            print(f"🧊 Archived {stats['rows']} {table} rows into {stats['segments']} segments ({ratio:.1f}x smaller)")
+
+
+def archived_listing(model, child_id, since):
+    """paginate(older=...) continuation over archived rows, with device names like listing_query()"""
+    older = cold_archive.older(model, child_id, since)
+    if older is None:
+        return None
+
+    def fetch(position, count):
+        rows = older(position, count)
+        device_ids = {row.device_id for row in rows}
+        names = dict(db.session.query(Device.id, Device.device_name).filter(Device.id.in_(device_ids))) if device_ids else {}
+        for row in rows:
+            row.device_name = names.get(row.device_id)
+        return rows
+
+    return fetch
+
+
 # ═══════════════════════════════════════════════════════════════
 # HELPER FUNCTIONS
 # ═══════════════════════════════════════════════════════════════
@@ -268,6 +719,89 @@ def parse_iso_datetime(value):
     except Exception:
         return None
 
+def aggregate_history_usage(child_id, cutoff_date, group_by=None):
+    """Per-domain usage totals (and optional hour/day/domain breakdown) computed in SQL"""
+    logs = log_partitions.source(HistoryLog, cutoff_date)
+    domains = interned.domains.table
+    domain_expr = db.func.lower(domains.c.value)
+    window = (
+        logs.child_id == child_id,
+        logs.visited_at >= cutoff_date,
+        logs.duration > 0
+    )
+    dialect_name = db.session.get_bind().dialect.name
+
+    def usage_query(dimensions):
+        # Grouped on domain_id first and the domains table joined once per group (log.domain
+        # is a subquery per row); ids whose values lower alike are summed again outside
+        buckets = [usage_dimension(d, logs.visited_at, domain_expr, dialect_name) for d in dimensions if d != 'domain']
+        grouped = db.session.query(
+            *buckets, logs.domain_id.label('domain_id'),
+            db.func.sum(logs.duration).label('seconds'),
+            db.func.count().label('visits')
+        ).filter(*window).group_by(*buckets, logs.domain_id).subquery()
+        dims = [domain_expr.label('domain') if d == 'domain' else grouped.c[d] for d in dimensions]
+        query = db.session.query(
+            *dims, db.func.sum(grouped.c.seconds).label('seconds'), db.func.sum(grouped.c.visits)
+        ).select_from(grouped).join(domains, domains.c.id == grouped.c.domain_id).filter(
+            domains.c.value != ''
+        ).group_by(*dims)
+        return query, dims
+
+    query, _ = usage_query(['domain'])
+    rows = [(domain, seconds) for domain, seconds, _ in query.order_by(db.desc('seconds')).all()]
+
+    totals = {domain: int(seconds) for domain, seconds in rows}
+
+    # Windows reaching past ARCHIVE_AFTER_DAYS also read the archived segments
+    archived = [
+        log for log in cold_archive.scan(HistoryLog, child_id, cutoff_date, columns=('domain', 'duration', 'visited_at'))
+        if (log['duration'] or 0) > 0 and log['domain']
+    ]
+    if archived:
+        for log in archived:
+            domain = log['domain'].lower()
+            totals[domain] = totals.get(domain, 0) + log['duration']
+        totals = dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+    total_seconds = sum(totals.values())
+
+    result = {
+        'total_seconds': total_seconds,
+        'total_minutes': round(total_seconds / 60, 2),
+        'usage': [
+            {
+                'domain': domain,
+                'seconds': seconds,
+                'minutes': round(seconds / 60, 2)
+            }
+            for domain, seconds in totals.items()
+        ],
+        'usage_map': totals
+    }
+
+    if group_by:
+        query, dims = usage_query(group_by)
+        breakdown = query.order_by(*dims).all()
+
+        if archived:
+            cells = {tuple(row[:-2]): [int(row[-2]), row[-1]] for row in breakdown}
+            for log in archived:
+                key = tuple(
+                    log['domain'].lower() if d == 'domain' else bucket_label(log['visited_at'], d) for d in group_by
+                )
+                cell = cells.setdefault(key, [0, 0])
+                cell[0] += log['duration']
+                cell[1] += 1
+            breakdown = [(*key, *cell) for key, cell in sorted(cells.items())]
+
+        result['breakdown'] = {
+            'group_by': group_by,
+            'columns': group_by + ['seconds', 'visits'],
+            'rows': [[*row[:-2], int(row[-2]), int(row[-1])] for row in breakdown]
+        }
+
+    return result
+
 # ═══════════════════════════════════════════════════════════════
 # API ROUTES - AUTHENTICATION
 # ═══════════════════════════════════════════════════════════════
@@ -281,35 +815,82 @@ def health():
         'timestamp': datetime.utcnow().isoformat()
     }), 200
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint (text exposition format)"""
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+def check_admin_token():
+    """404 while ADMIN_TOKEN is unset, 403 unless X-Admin-Token matches"""
+    if not ADMIN_TOKEN:
+        abort(404)
+    # As bytes: compare_digest raises TypeError for str holding non-ASCII characters
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), ADMIN_TOKEN.encode()):
+        abort(403)
+
+@app.route('/api/admin/slow-queries', methods=['GET'])
+def slow_query_log():
+    """Most recent statements slower than SLOW_QUERY_MS (X-Admin-Token required)"""
+    check_admin_token()
+    return jsonify({
+        'success': True,
+        'threshold_ms': slow_queries.threshold_ms,
+        'total': slow_queries.total,
+        'slow_queries': slow_queries.entries()
+    }), 200
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def profile_summary():
+    """Profiled requests and samples per route since the last dump"""
+    check_admin_token()
+    if not profiler:
+        abort(404)
+    return jsonify({'success': True, **profiler.summary()}), 200
+
+@app.route('/api/admin/profiles/dump', methods=['POST'])
+def dump_profiles():
+    """Write collapsed stacks per route to PROFILE_DIR (flamegraph.pl / speedscope input)"""
+    check_admin_token()
+    if not profiler:
+        abort(404)
+    reset = request.args.get('reset', 'true').lower() != 'false'
+    return jsonify({'success': True, 'files': profiler.dump(reset)}), 200
+
+@app.route('/api/admin/alerts/sweep', methods=['POST'])
+def sweep_alerts():
+    """Raise extension alerts from last_sync alone, for schedulers on the serverless profile"""
+    check_admin_token()
+    return jsonify({'success': True, 'alerts': sweep_extension_alerts()}), 200
+
 @app.route('/', methods=['GET'])
 def index():
     """Serve web login page on root"""
-    return send_from_directory(dashboard_dir, 'web-login.html')
+    return flask_response(static_files, 'web-login.html')
 
 @app.route('/web-dashboard.html', methods=['GET'])
 def web_dashboard():
     """Serve web dashboard"""
-    return send_from_directory(dashboard_dir, 'web-dashboard.html')
+    return flask_response(static_files, 'web-dashboard.html')
 
 @app.route('/dashboard', methods=['GET'])
 def dashboard_page():
     """Serve web dashboard (alternative route)"""
-    return send_from_directory(dashboard_dir, 'web-dashboard.html')
+    return flask_response(static_files, 'web-dashboard.html')
 
 @app.route('/register.html', methods=['GET'])
 def register_page():
     """Serve registration page"""
-    return send_from_directory(dashboard_dir, 'register.html')
+    return flask_response(static_files, 'register.html')
 
 @app.route('/web-login.html', methods=['GET'])
 def login_page():
     """Serve login page"""
-    return send_from_directory(dashboard_dir, 'web-login.html')
+    return flask_response(static_files, 'web-login.html')
 
 @app.route('/assets/<path:filename>', methods=['GET'])
 def dashboard_assets(filename):
-    """Serve dashboard static assets"""
-    return send_from_directory(dashboard_dir, filename)
+    """Serve dashboard static assets (content-hashed names are cached for a year)"""
+    return flask_response(static_files, filename)
 
 @app.route('/api', methods=['GET'])
 def api_root():
@@ -320,7 +901,8 @@ def api_root():
         'endpoints': {
             'auth': '/api/auth/register, /api/auth/login, /api/auth/logout, /api/auth/verify',
             'children': '/api/children',
-            'devices': '/api/devices',
+            'devices': '/api/devices, /api/devices/offline',
+            'alerts': '/api/alerts, /api/alerts/stream',
             'blocklist': '/api/blocklist',
             'allowlist': '/api/allowlist',
             'logs': '/api/logs/history, /api/logs/blocked, /api/logs/block',
@@ -345,7 +927,7 @@ def not_found(error):
         }), 404
     else:
         # Redirect unknown pages to login
-        return send_from_directory(dashboard_dir, 'web-login.html')
+        return flask_response(static_files, 'web-login.html')
 
 @app.errorhandler(500)
 def server_error(error):
@@ -390,7 +972,7 @@ def bad_request(error):
 @app.route('/dashboard', methods=['GET'])
 def dashboard():
     """Serve parent dashboard"""
-    return send_from_directory(dashboard_dir, 'dashboard.html')
+    return flask_response(static_files, 'dashboard.html')
 
 @app.route('/api/auth/register', methods=['POST'])
 def register():
@@ -515,7 +1097,7 @@ def verify():
         return jsonify({
             'success': True,
             'parent': parent.to_dict(),
-            'child_count': len(parent.children)
+            'child_count': Child.query.filter_by(parent_id=parent_id).count()
         }), 200
         
     except Exception as e:
@@ -536,11 +1118,14 @@ def get_children():
         if not parent_id:
             return jsonify({'error': 'Unauthorized', 'code': 'INVALID_TOKEN'}), 401
         
-        children = Child.query.filter_by(parent_id=parent_id).all()
+        # One query: children with their device counts aggregated in SQL
+        children = db.session.query(Child, db.func.count(Device.id)).outerjoin(
+            Device, Device.child_id == Child.id
+        ).filter(Child.parent_id == parent_id).group_by(Child.id).all()
         
         return jsonify({
             'success': True,
-            'children': [child.to_dict() for child in children],
+            'children': [child.to_dict(device_count=device_count) for child, device_count in children],
             'count': len(children)
         }), 200
         
@@ -600,13 +1185,15 @@ def get_child(child_id):
         if not child or child.parent_id != parent_id:
             return jsonify({'error': 'Child not found', 'code': 'NOT_FOUND'}), 404
         
+        devices = child.devices
+        
         return jsonify({
             'success': True,
-            'child': child.to_dict(),
-            'devices': [d.to_dict() for d in child.devices],
-            'device_count': len(child.devices),
-            'total_blocks': len(child.block_logs),
-            'total_visits': len(child.history_logs)
+            'child': child.to_dict(device_count=len(devices)),
+            'devices': [d.to_dict() for d in devices],
+            'device_count': len(devices),
+            'total_blocks': BlockLog.query.filter_by(child_id=child_id).count(),
+            'total_visits': HistoryLog.query.filter_by(child_id=child_id).count()
         }), 200
         
     except Exception as e:
@@ -652,9 +1239,13 @@ def register_device():
             db.session.add(device)
         else:
             device.last_sync = datetime.utcnow()
+            device.alerted_at = None
             device.device_name = device_name
         
         db.session.commit()
+        presence.mark_known(device.id)
+        device_deadlines.schedule(device.id)
+        start_extension_watch()
         
         return jsonify({
             'success': True,
@@ -674,27 +1265,178 @@ def register_device():
 def device_heartbeat(device_id):
     """Update device last_sync timestamp (heartbeat to detect extension removal)"""
     try:
-        device = Device.query.get(device_id)
-        if not device:
-            return jsonify({'error': 'Device not found', 'code': 'DEVICE_NOT_FOUND'}), 404
+        # Only the first heartbeat per worker checks the device exists
+        if not presence.is_known(device_id):
+            if not db.session.query(Device.id).filter_by(id=device_id).first():
+                return jsonify({'error': 'Device not found', 'code': 'DEVICE_NOT_FOUND'}), 404
+            presence.mark_known(device_id)
         
-        # Update last sync time
-        device.last_sync = datetime.utcnow()
-        db.session.commit()
+        # Record in memory; the background flusher bulk-updates last_sync
+        seen = presence.touch(device_id)
+        presence.start_background_flusher(flush_heartbeats)
+        
+        # Push this device's removal deadline back; O(1), no database access
+        device_deadlines.schedule(device_id, seen)
+        start_extension_watch()
         
         return jsonify({
             'success': True,
             'message': 'Heartbeat received',
-            'device_id': device.id,
-            'last_sync': device.last_sync.isoformat()
+            'device_id': device_id,
+            'last_sync': datetime.utcfromtimestamp(seen).isoformat()
         }), 200
         
     except Exception as e:
-        db.session.rollback()
         print(f"Device heartbeat error: {str(e)}")
         return jsonify({'error': str(e), 'code': 'SERVER_ERROR'}), 500
 
 
+@app.route('/api/devices/offline', methods=['GET'])
+def get_offline_devices():
+    """List the parent's devices that have not sent a heartbeat for ?minutes= (default 10)"""
+    try:
+        token = request.headers.get('Authorization', '').replace('Bearer ', '')
+        parent_id = verify_token(token)
+        if not parent_id:
+            return jsonify({'error': 'Unauthorized', 'code': 'INVALID_TOKEN'}), 401
+        
+        minutes = request.args.get('minutes', 10, type=int)
+        cutoff = datetime.utcnow() - timedelta(minutes=minutes)
+        
+        # Indexed range scan on last_sync, then drop devices with a newer in-memory heartbeat
+        devices = Device.query.join(Child, Child.id == Device.child_id).filter(
+            Child.parent_id == parent_id,
+            Device.is_active == True,
+            Device.last_sync < cutoff
+        ).all()
+        alive = presence.recently_seen([d.id for d in devices], cutoff)
+        offline = [d for d in devices if d.id not in alive]
+        
+        return jsonify({
+            'success': True,
+            'minutes': minutes,
+            'devices': [d.to_dict() for d in offline],
+            'count': len(offline)
+        }), 200
+        
+    except Exception as e:
+        print(f"Get offline devices error: {str(e)}")
+        return jsonify({'error': str(e), 'code': 'SERVER_ERROR'}), 500
+
+
+# ═══════════════════════════════════════════════════════════════
+# API ROUTES - ALERTS
+# ═══════════════════════════════════════════════════════════════
+
+@app.route('/api/alerts', methods=['GET'])
+def get_alerts():
+    """List the parent's device alerts, newest first (?unacknowledged=1 for open ones)"""
+    try:
+        token = request.headers.get('Authorization', '').replace('Bearer ', '')
+        parent_id = verify_token(token)
+        if not parent_id:
+            return jsonify({'error': 'Unauthorized', 'code': 'INVALID_TOKEN'}), 401
+        
+        limit = clamp_page_size(request.args.get('limit'), default=50)
+        query = DeviceAlert.query.filter_by(parent_id=parent_id)
+        if request.args.get('unacknowledged') in ('1', 'true'):
+            query = query.filter(DeviceAlert.acknowledged_at == None)
+        alerts = query.order_by(DeviceAlert.created_at.desc()).limit(limit).all()
+        
+        return jsonify({
+            'success': True,
+            'alerts': [a.to_dict() for a in alerts],
+            'count': len(alerts)
+        }), 200
+        
+    except Exception as e:
+        print(f"Get alerts error: {str(e)}")
+        return jsonify({'error': str(e), 'code': 'SERVER_ERROR'}), 500
+
+
+@app.route('/api/alerts/<alert_id>/ack', methods=['POST'])
+def acknowledge_alert(alert_id):
+    """Mark an alert as seen by the parent"""
+    try:
+        token = request.headers.get('Authorization', '').replace('Bearer ', '')
+        parent_id = verify_token(token)
+        if not parent_id:
+            return jsonify({'error': 'Unauthorized', 'code': 'INVALID_TOKEN'}), 401
+        
+        alert = DeviceAlert.query.filter_by(id=alert_id, parent_id=parent_id).first()
+        if not alert:
+            return jsonify({'error': 'Alert not found', 'code': 'ALERT_NOT_FOUND'}), 404
+        
+        if not alert.acknowledged_at:
+            alert.acknowledged_at = datetime.utcnow()
+            db.session.commit()
+        
+        return jsonify({'success': True, 'alert': alert.to_dict()}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"Acknowledge alert error: {str(e)}")
+        return jsonify({'error': str(e), 'code': 'SERVER_ERROR'}), 500
+
+
+@app.route('/api/alerts/stream', methods=['GET'])
+def stream_alerts():
+    """
+    Server-Sent Events stream of new alerts for the parent
+    EventSource cannot send headers, so ?token= is accepted as well
+
+    Alerts are read from the database, so a stream gets the alerts raised by
+    every worker; the worker that raised one wakes its own streams at once,
+    the others poll every ALERT_STREAM_POLL_SECONDS. Each event id is a
+    cursor: a reconnecting EventSource sends it back as Last-Event-ID and
+    resumes after the last alert it received.
+    """
+    token = request.headers.get('Authorization', '').replace('Bearer ', '') or request.args.get('token', '')
+    parent_id = verify_token(token)
+    if not parent_id:
+        return jsonify({'error': 'Unauthorized', 'code': 'INVALID_TOKEN'}), 401
+    
+    # Every open stream holds one of this worker's threads
+    if alert_broker.subscriber_count() >= ALERT_STREAM_MAX:
+        response = jsonify({'error': 'Too many open alert streams', 'code': 'STREAMS_EXHAUSTED'})
+        response.headers['Retry-After'] = str(ALERT_STREAM_SECONDS)
+        return response, 503
+    
+    try:
+        position = decode_cursor(request.headers.get('Last-Event-ID'))
+    except ValueError:
+        position = None
+    position = position or (datetime.utcnow(), '')
+    
+    start_extension_watch()
+    subscription = alert_broker.subscribe(parent_id)
+    
+    def events():
+        nonlocal position
+        closes_at = time.monotonic() + ALERT_STREAM_SECONDS
+        try:
+            yield f'retry: {int(ALERT_STREAM_POLL_SECONDS * 1000)}\n: connected\n\n'
+            while time.monotonic() < closes_at:
+                # A short app context per poll: no connection is held while waiting
+                with app.app_context():
+                    alerts = [((a.created_at, a.id), a.to_dict()) for a in alerts_after(parent_id, position)]
+                for position, alert in alerts:
+                    yield f"id: {encode_cursor(*position)}\nevent: alert\ndata: {json.dumps(alert)}\n\n"
+                if not alerts:
+                    yield ': keep-alive\n\n'
+                try:
+                    subscription.get(timeout=ALERT_STREAM_POLL_SECONDS)
+                except queue.Empty:
+                    pass
+        finally:
+            alert_broker.unsubscribe(parent_id, subscription)
+    
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
 # ═══════════════════════════════════════════════════════════════
 # API ROUTES - LOGS
 # ═══════════════════════════════════════════════════════════════
@@ -714,7 +1456,7 @@ def log_block():
         if not child_id or not device_id:
             return jsonify({'error': 'Child ID and Device ID required', 'code': 'MISSING_FIELDS'}), 400
         
-        log_id = generate_id()
+        log_id = uuid7()
         log = BlockLog(
             id=log_id,
             child_id=child_id,
@@ -727,6 +1469,13 @@ def log_block():
         
         db.session.add(log)
         db.session.commit()
+        start_partition_maintenance()
+        cold_archive.start_background(ARCHIVE_INTERVAL_SECONDS, archive_logs)
+        
+        # Queued and coalesced; never waits on the ESP32
+        if esp32_alerts:
+            child = db.session.get(Child, child_id)
+            esp32_alerts.submit(category, child.name if child else None)
         
         return jsonify({
             'success': True,
@@ -756,7 +1505,7 @@ def log_history():
         if not child_id or not device_id:
             return jsonify({'error': 'Child ID and Device ID required', 'code': 'MISSING_FIELDS'}), 400
         
-        log_id = generate_id()
+        log_id = uuid7()
         log = HistoryLog(
             id=log_id,
             child_id=child_id,
@@ -770,6 +1519,8 @@ def log_history():
         
         db.session.add(log)
         db.session.commit()
+        start_partition_maintenance()
+        cold_archive.start_background(ARCHIVE_INTERVAL_SECONDS, archive_logs)
         
         return jsonify({
             'success': True,
@@ -799,15 +1550,46 @@ def get_history(child_id):
         days = request.args.get('days', 30, type=int)
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
-        logs = HistoryLog.query.filter(
-            HistoryLog.child_id == child_id,
-            HistoryLog.visited_at >= cutoff_date
-        ).order_by(HistoryLog.visited_at.desc()).all()
+        # Only the log partitions inside the window are read
+        source = log_partitions.source(HistoryLog, cutoff_date)
+        query = HistoryLog.listing_query(source).filter(
+            source.child_id == child_id,
+            source.visited_at >= cutoff_date
+        )
+        count_query = db.session.query(source.id).filter(
+            source.child_id == child_id,
+            source.visited_at >= cutoff_date
+        )
+        
+        # Full export: stream every row as NDJSON in keyset batches
+        if request.args.get('format') == 'ndjson':
+            rows = iter_keyset(
+                query, source.visited_at, source.id, older=archived_listing(HistoryLog, child_id, cutoff_date)
+            )
+            return Response(
+                stream_with_context(ndjson_lines(rows, HistoryLog.row_to_dict)),
+                mimetype=NDJSON_MEDIA_TYPE
+            )
+        
+        cursor = request.args.get('cursor')
+        try:
+            logs, next_cursor = paginate(
+                query, source.visited_at, source.id,
+                cursor=cursor,
+                limit=clamp_page_size(request.args.get('limit')),
+                older=archived_listing(HistoryLog, child_id, cutoff_date)
+            )
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor', 'code': 'INVALID_CURSOR'}), 400
         
         return jsonify({
             'success': True,
-            'history': [log.to_dict() for log in logs],
-            'count': len(logs)
+            'history': [HistoryLog.row_to_dict(row) for row in logs],
+            'count': len(logs),
+            # Counted on the first page only: later pages would rescan the window
+            'total': None if cursor else count_query.count() + cold_archive.count(HistoryLog, child_id, cutoff_date),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
         }), 200
         
     except Exception as e:
@@ -831,15 +1613,46 @@ def get_blocked_logs(child_id):
         days = request.args.get('days', 30, type=int)
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
-        logs = BlockLog.query.filter(
-            BlockLog.child_id == child_id,
-            BlockLog.blocked_at >= cutoff_date
-        ).order_by(BlockLog.blocked_at.desc()).all()
+        # Only the log partitions inside the window are read
+        source = log_partitions.source(BlockLog, cutoff_date)
+        query = BlockLog.listing_query(source).filter(
+            source.child_id == child_id,
+            source.blocked_at >= cutoff_date
+        )
+        count_query = db.session.query(source.id).filter(
+            source.child_id == child_id,
+            source.blocked_at >= cutoff_date
+        )
+        
+        # Full export: stream every row as NDJSON in keyset batches
+        if request.args.get('format') == 'ndjson':
+            rows = iter_keyset(
+                query, source.blocked_at, source.id, older=archived_listing(BlockLog, child_id, cutoff_date)
+            )
+            return Response(
+                stream_with_context(ndjson_lines(rows, BlockLog.row_to_dict)),
+                mimetype=NDJSON_MEDIA_TYPE
+            )
+        
+        cursor = request.args.get('cursor')
+        try:
+            logs, next_cursor = paginate(
+                query, source.blocked_at, source.id,
+                cursor=cursor,
+                limit=clamp_page_size(request.args.get('limit')),
+                older=archived_listing(BlockLog, child_id, cutoff_date)
+            )
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor', 'code': 'INVALID_CURSOR'}), 400
         
         return jsonify({
             'success': True,
-            'blocked': [log.to_dict() for log in logs],
-            'count': len(logs)
+            'blocked': [BlockLog.row_to_dict(row) for row in logs],
+            'count': len(logs),
+            # Counted on the first page only: later pages would rescan the window
+            'total': None if cursor else count_query.count() + cold_archive.count(BlockLog, child_id, cutoff_date),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
         }), 200
         
     except Exception as e:
@@ -863,39 +1676,17 @@ def get_usage(child_id):
         days = request.args.get('days', 1, type=int)
         cutoff_date = datetime.utcnow() - timedelta(days=days)
 
-        logs = HistoryLog.query.filter(
-            HistoryLog.child_id == child_id,
-            HistoryLog.visited_at >= cutoff_date
-        ).all()
+        try:
+            dimensions = parse_group_by(request.args.get('group_by'))
+        except ValueError as e:
+            return jsonify({'error': str(e), 'code': 'INVALID_GROUP_BY'}), 400
 
-        totals = {}
-        total_seconds = 0
-        for log in logs:
-            duration = int(log.duration or 0)
-            if duration <= 0:
-                continue
-            domain = (log.domain or '').lower()
-            if not domain:
-                continue
-            totals[domain] = totals.get(domain, 0) + duration
-            total_seconds += duration
-
-        usage_list = [
-            {
-                'domain': domain,
-                'seconds': seconds,
-                'minutes': round(seconds / 60, 2)
-            }
-            for domain, seconds in sorted(totals.items(), key=lambda item: item[1], reverse=True)
-        ]
+        usage = aggregate_history_usage(child_id, cutoff_date, dimensions)
 
         return jsonify({
             'success': True,
             'days': days,
-            'total_seconds': total_seconds,
-            'total_minutes': round(total_seconds / 60, 2),
-            'usage': usage_list,
-            'usage_map': totals
+            **usage
         }), 200
 
     except Exception as e:
@@ -1145,8 +1936,38 @@ def remove_from_blocklist(domain_id):
 
 if __name__ == '__main__':
     with app.app_context():
+        log_partitions.prepare()
         db.create_all()
+        for table, columns in interned.upgrade(db.engine, log_partitions).items():
+            print(f"✅ {table}: {', '.join(columns)} moved to dictionary tables")
+        for table, rows in upgrade_compact_ids(db.engine, [HistoryLog, BlockLog], log_partitions).items():
+            print(f"✅ {table}: ids converted to compact form ({rows})")
+        for table, columns in ensure_columns(db.metadata, db.engine, skip=log_partitions.partitioned_tables()).items():
+            print(f"✅ {table}: added {', '.join(columns)}")
+        ensure_indexes(db.metadata, db.engine, skip=log_partitions.partitioned_tables())
         print("✅ Database tables created")
+        # One-off conversion of existing log tables: LOG_PARTITIONING=monthly python app.py partition
+        if len(sys.argv) > 1 and sys.argv[1] == 'partition':
+            if not log_partitions.enabled:
+                print("⚠️  Set LOG_PARTITIONING=monthly to partition the log tables")
+                sys.exit(1)
+            for table, months in log_partitions.convert().items():
+                print(f"✅ {table}: {months} monthly partitions" if months else f"✅ {table}: already partitioned")
+            log_partitions.maintain()
+            sys.exit(0)
+        # Run the log archiver once: ARCHIVE_AFTER_DAYS=30 python app.py archive
+        if len(sys.argv) > 1 and sys.argv[1] == 'archive':
+            if not cold_archive.enabled:
+                print("⚠️  Set ARCHIVE_AFTER_DAYS to archive old logs")
+                sys.exit(1)
+            archive_logs()
+            print(f"✅ Archive: {json.dumps(cold_archive.stats(), default=str)}")
+            sys.exit(0)
+        # Raise extension alerts once, for a scheduler: python app.py sweep-alerts
+        if len(sys.argv) > 1 and sys.argv[1] == 'sweep-alerts':
+            print(f"✅ Extension alerts raised: {sweep_extension_alerts()}")
+            sys.exit(0)
+        print(f"🗄️  Database: {describe_engine(db.engine, DB_PROFILE)}")
     
     print("\n" + "="*70)
     print("🚀 SafeGuard Backend Server Starting...")
@@ -0,0 +1,664 @@
+"""
+SafeGuard Family - Cold Log Archive
+Moves log rows older than ARCHIVE_AFTER_DAYS out of the hot tables
+(ActivityLog, HiddenComment in backend_final.py; HistoryLog, BlockLog in
+app.py) into compressed, column-oriented segment files, and reads them back
+when a request reaches past the archive cutoff.
+
+  • One segment per table and month per archiver run:
+        <ARCHIVE_DIR>/<table>/<YYYYMM>-<run ms>.seg
+  • Rows are sorted by (child_id, timestamp, id) and cut into row groups;
+    inside a group each column is encoded on its own (timestamps as
+    delta-coded int64, numbers as int64/float64 arrays, text as JSON) and
+    zlib-compressed
+  • The footer keeps the segment's min/max timestamp, each row group's
+    min/max timestamp and byte ranges, and a child_id -> row range index,
+    so a read for one child decodes only that child's row groups and only
+    the columns it asks for
+  • Segments are memory-mapped; a read slices the map instead of reading
+    the file
+
+The archiver writes a segment, then deletes the archived window from the
+hot table and records the segment in archive_segments in one transaction.
+Readers only open cataloged segments, so a failed commit leaves the rows hot
+and the file unread (and removed): rows are never counted twice and never
+lost.
+
+Deleting a child tombstones it in archive_tombstones, in the deleting
+transaction: reads skip its archived rows at once and the next archiver run
+rewrites the segments without them.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, MetaData, String, Table, and_, func, insert, select, tuple_
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process archiver lock
+    fcntl = None
+
+MAGIC = b"SGARCH1\n"
+TRAILER = struct.Struct("<Q")
+
+# Rows per row group; a child's read decodes whole groups
+ROW_GROUP_ROWS = 1024
+
+COMPRESSION_LEVEL = 6
+
+# Seconds a worker trusts its list of segments before listing the directory again
+CATALOG_TTL_SECONDS = 60
+
+# Rows fetched per round trip while archiving
+ARCHIVE_FETCH_ROWS = 5000
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def _column_kind(column):
+    if isinstance(column.type, DateTime):
+        return "datetime"
+    if isinstance(column.type, Boolean):
+        return "bool"
+    if isinstance(column.type, Integer):
+        return "int"
+    if isinstance(column.type, Float):
+        return "float"
+    return "str"
+
+
+def _to_micros(value):
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _from_micros(value):
+    return EPOCH + timedelta(microseconds=value)
+
+
+def encode_column(kind, values):
+    """Compressed bytes for one column of one row group"""
+    present = [v for v in values if v is not None]
+    head = b"\x00" if len(present) == len(values) else b"\x01" + bytes(v is None for v in values)
+    if kind == "datetime":
+        micros = [_to_micros(v) for v in present]
+        body = array("q", [b - a for a, b in zip([0] + micros, micros)]).tobytes()
+    elif kind == "int":
+        body = array("q", [int(v) for v in present]).tobytes()
+    elif kind == "float":
+        body = array("d", present).tobytes()
+    elif kind == "bool":
+        body = bytes(1 if v else 0 for v in present)
+    else:
+        body = json.dumps([str(v) for v in present], ensure_ascii=False, separators=(",", ":")).encode()
+    return zlib.compress(head + body, COMPRESSION_LEVEL)
+
+
+def decode_column(kind, data, rows, byteorder=sys.byteorder):
+    raw = zlib.decompress(data)
+    if raw[0]:
+        nulls, body = raw[1:rows + 1], raw[rows + 1:]
+    else:
+        nulls, body = None, raw[1:]
+    if kind in ("datetime", "int", "float"):
+        values = array("d" if kind == "float" else "q")
+        values.frombytes(body)
+        if byteorder != sys.byteorder:
+            values.byteswap()
+        values = values.tolist()
+        if kind == "datetime":
+            total = 0
+            for i, delta in enumerate(values):
+                total += delta
+                values[i] = _from_micros(total)
+    elif kind == "bool":
+        values = [b == 1 for b in body]
+    else:
+        values = json.loads(body)
+    if nulls is None:
+        return values
+    present = iter(values)
+    return [None if null else next(present) for null in nulls]
+
+
+# ════════════════════════════════
+# SEGMENT FILES
+# ════════════════════════════════
+
+class SegmentWriter:
+    """
+    Streams rows sorted by (child, timestamp, id) into one segment file
+    Rows are tuples in `columns` order without the child column
+    """
+
+    def __init__(self, path, table, columns, ts_column, child_column):
+        self.path = path
+        self.table = table
+        self.columns = columns          # [(name, kind)] stored per row
+        self.ts_index = [name for name, _ in columns].index(ts_column)
+        self.ts_column = ts_column
+        self.child_column = child_column
+        self.children = {}              # child_id -> [first row, end row)
+        self.groups = []
+        self.rows = 0
+        self.raw_bytes = 0              # the same rows as JSON text, for the compression ratio
+        self._pending = []
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+
+    def append(self, child_id, row):
+        span = self.children.get(child_id)
+        if span is None:
+            self.children[child_id] = [self.rows, self.rows + 1]
+        else:
+            span[1] = self.rows + 1
+        self._pending.append(row)
+        self.rows += 1
+        self.raw_bytes += len(json.dumps([child_id, *row], default=str))
+        if len(self._pending) >= ROW_GROUP_ROWS:
+            self._flush_group()
+
+    def _flush_group(self):
+        if not self._pending:
+            return
+        stamps = [row[self.ts_index] for row in self._pending]
+        group = {
+            "rows": len(self._pending),
+            "min_ts": min(stamps).isoformat(),
+            "max_ts": max(stamps).isoformat(),
+            "columns": {}
+        }
+        for index, (name, kind) in enumerate(self.columns):
+            data = encode_column(kind, [row[index] for row in self._pending])
+            group["columns"][name] = [self._file.tell(), len(data)]
+            self._file.write(data)
+        self.groups.append(group)
+        self._pending = []
+
+    def close(self):
+        """Write the footer; returns the file size in bytes"""
+        self._flush_group()
+        footer = zlib.compress(json.dumps({
+            "table": self.table,
+            "columns": self.columns,
+            "ts_column": self.ts_column,
+            "child_column": self.child_column,
+            "rows": self.rows,
+            "min_ts": min(g["min_ts"] for g in self.groups) if self.groups else None,
+            "max_ts": max(g["max_ts"] for g in self.groups) if self.groups else None,
+            "byteorder": sys.byteorder,
+            "groups": self.groups,
+            "children": self.children
+        }, separators=(",", ":")).encode(), COMPRESSION_LEVEL)
+        self._file.write(footer)
+        self._file.write(TRAILER.pack(len(footer)))
+        self._file.write(MAGIC)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        size = self._file.tell()
+        self._file.close()
+        return size
+
+
+class Segment:
+    """A memory-mapped segment file and its footer"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        tail = len(self._map) - len(MAGIC)
+        if self._map[:len(MAGIC)] != MAGIC or self._map[tail:] != MAGIC:
+            raise ValueError(f"{path} is not an archive segment")
+        (footer_size,) = TRAILER.unpack(self._map[tail - TRAILER.size:tail])
+        start = tail - TRAILER.size - footer_size
+        footer = json.loads(zlib.decompress(self._map[start:tail - TRAILER.size]))
+        self.size = len(self._map)
+        self.rows = footer["rows"]
+        self.columns = dict(footer["columns"])
+        self.ts_column = footer["ts_column"]
+        self.child_column = footer["child_column"]
+        self.min_ts = datetime.fromisoformat(footer["min_ts"]) if footer["min_ts"] else None
+        self.max_ts = datetime.fromisoformat(footer["max_ts"]) if footer["max_ts"] else None
+        self.byteorder = footer["byteorder"]
+        self.children = footer["children"]
+        self.groups = footer["groups"]
+        # First row of each group, to map a child's row range onto groups
+        self._starts = []
+        row = 0
+        for group in self.groups:
+            self._starts.append(row)
+            row += group["rows"]
+
+    def close(self):
+        self._map.close()
+
+    def overlaps(self, since=None, until=None):
+        if self.min_ts is None:
+            return False
+        return (since is None or self.max_ts >= since) and (until is None or self.min_ts < until)
+
+    def _decode(self, group_index, name):
+        offset, length = self.groups[group_index]["columns"][name]
+        return decode_column(
+            self.columns[name], self._map[offset:offset + length],
+            self.groups[group_index]["rows"], self.byteorder
+        )
+
+    def child_rows(self, child_id, columns, since=None, until=None):
+        """
+        A child's rows with `since <= timestamp < until`, oldest first, as
+        dicts of `columns` (the child column is filled in from the index)
+        """
+        span = self.children.get(child_id)
+        if span is None or not self.overlaps(since, until):
+            return []
+        first, end = span
+        wanted = [c for c in columns if c != self.child_column]
+        rows = []
+        for index, group in enumerate(self.groups):
+            group_start = self._starts[index]
+            group_end = group_start + group["rows"]
+            if group_end <= first or group_start >= end:
+                continue
+            if (since and group["max_ts"] < since.isoformat()) or (until and group["min_ts"] >= until.isoformat()):
+                continue
+            lo, hi = max(first, group_start) - group_start, min(end, group_end) - group_start
+            stamps = self._decode(index, self.ts_column)[lo:hi]
+            keep = [
+                i for i, ts in enumerate(stamps)
+                if (since is None or ts >= since) and (until is None or ts < until)
+            ]
+            if not keep:
+                continue
+            decoded = {
+                name: stamps if name == self.ts_column else self._decode(index, name)[lo:hi]
+                for name in wanted
+            }
+            for i in keep:
+                row = {name: values[i] for name, values in decoded.items()}
+                if self.child_column in columns:
+                    row[self.child_column] = child_id
+                rows.append(row)
+        return rows
+
+
+# ════════════════════════════════
+# ARCHIVE
+# ════════════════════════════════
+
+def catalog_tables(metadata):
+    """The archive's catalog on `metadata`: (readable segments, forgotten children)"""
+    if "archive_segments" in metadata.tables:
+        return metadata.tables["archive_segments"], metadata.tables["archive_tombstones"]
+    segments = Table(
+        "archive_segments", metadata,
+        Column("table_name", String(100), primary_key=True),
+        Column("name", String(100), primary_key=True),      # file name under <ARCHIVE_DIR>/<table>/
+        Column("rows", Integer, nullable=False),
+        Column("created_at", DateTime, nullable=False)
+    )
+    tombstones = Table(
+        "archive_tombstones", metadata,
+        Column("child_id", String(100), primary_key=True),
+        Column("forgotten_at", DateTime, nullable=False)
+    )
+    return segments, tombstones
+
+
+class ArchivedTable:
+    """One model's archived segments"""
+
+    def __init__(self, model, ts_column, child_column="child_id"):
+        self.model = model
+        self.table = model.__table__
+        self.name = self.table.name
+        self.ts_column = ts_column
+        self.child_column = child_column
+        self.id_column = self.table.primary_key.columns.values()[0].name
+        # Mapped attributes, with interned strings (see interning.py) stored as the strings themselves
+        self.expressions = {
+            attr.key: attr.expression for attr in model.__mapper__.column_attrs
+            if not getattr(attr.expression, "info", {}).get("interned")
+        }
+        self.columns = list(self.expressions)
+        self.segments = {}          # path -> Segment
+        self.forgotten = set()      # tombstoned child ids
+        self.newest = None          # latest archived timestamp
+        self._listed_at = 0.0
+
+
+class ColdArchive:
+    """
+    Segment catalog and archiver for the log tables of one server
+    Disabled (after_days=0), nothing is archived and reads find no segments
+
+    The catalog tables are added to `metadata` (the server's, so create_all
+    makes them); `bind` is the engine, or a callable returning it
+    """
+
+    def __init__(self, directory, after_days=0, retention_days=365, metadata=None, bind=None):
+        self.directory = directory
+        self.after_days = after_days
+        self.retention_days = retention_days
+        self.enabled = after_days > 0
+        self.segments_table, self.tombstones_table = catalog_tables(metadata if metadata is not None else MetaData())
+        self._bind = bind
+        self.tables = {}            # model -> ArchivedTable
+        self._lock = threading.Lock()
+        self._worker = None
+        self._stop = threading.Event()
+
+    def add(self, model, ts_column, child_column="child_id"):
+        self.tables[model] = ArchivedTable(model, ts_column, child_column)
+        return self.tables[model]
+
+    def bind(self):
+        return self._bind() if callable(self._bind) else self._bind
+
+    # ════════════════════════════════
+    # CATALOG
+    # ════════════════════════════════
+
+    def _catalog(self, model, refresh=False):
+        archived = self.tables[model]
+        with self._lock:
+            if refresh or time.monotonic() - archived._listed_at > CATALOG_TTL_SECONDS:
+                with self.bind().connect() as conn:
+                    names = conn.execute(
+                        select(self.segments_table.c.name).where(self.segments_table.c.table_name == archived.name)
+                    ).scalars().all()
+                    archived.forgotten = set(conn.execute(select(self.tombstones_table.c.child_id)).scalars())
+                folder = os.path.join(self.directory, archived.name)
+                paths = {os.path.join(folder, name) for name in names}
+                for path in set(archived.segments) - paths:
+                    archived.segments.pop(path).close()
+                for path in sorted(paths - set(archived.segments)):
+                    try:
+                        archived.segments[path] = Segment(path)
+                    except FileNotFoundError:
+                        pass        # expired by another worker since the catalog was read
+                archived.newest = max((s.max_ts for s in archived.segments.values() if s.max_ts), default=None)
+                archived._listed_at = time.monotonic()
+            return archived, list(archived.segments.values())
+
+    def spans(self, model, since=None):
+        """True when rows timestamped since `since` may be archived"""
+        if not self.enabled or model not in self.tables:
+            return False
+        archived, _ = self._catalog(model)
+        return archived.newest is not None and (since is None or since <= archived.newest)
+
+    def _readable(self, model, child_id, since=None):
+        """(archived table, segments) holding a child's rows since `since`, or None"""
+        if not self.spans(model, since):
+            return None
+        archived, segments = self._catalog(model)
+        if child_id in archived.forgotten:
+            return None
+        return archived, segments
+
+    def scan(self, model, child_id, since=None, until=None, columns=None):
+        """Archived rows of a child in [since, until) as dicts, in no particular order"""
+        readable = self._readable(model, child_id, since)
+        if readable is None:
+            return
+        archived, segments = readable
+        columns = columns or archived.columns
+        for segment in segments:
+            yield from segment.child_rows(child_id, columns, since, until)
+
+    def count(self, model, child_id, since=None):
+        readable = self._readable(model, child_id, since)
+        if readable is None:
+            return 0
+        archived, segments = readable
+        return sum(len(s.child_rows(child_id, (archived.ts_column,), since)) for s in segments)
+
+    def rows(self, model, child_id, since=None, after=None, limit=None):
+        """
+        Archived rows of a child newest first, as objects with the model's
+        attribute names; `after` is a keyset position (timestamp, id) to
+        continue from
+        """
+        readable = self._readable(model, child_id, since)
+        if readable is None:
+            return []
+        archived, segments = readable
+        ts_name, id_name = archived.ts_column, archived.id_column
+        until = None
+        if after is not None:
+            until = after[0] + timedelta(microseconds=1)
+        collected = []
+        # Newest segments first; stop once the rows found are newer than everything left
+        for segment in sorted(segments, key=lambda s: s.max_ts or EPOCH, reverse=True):
+            if limit is not None and len(collected) >= limit and segment.max_ts < collected[limit - 1][ts_name]:
+                break
+            for row in segment.child_rows(child_id, archived.columns, since, until):
+                if after is not None and (row[ts_name], row[id_name]) >= (after[0], after[1]):
+                    continue
+                collected.append(row)
+            collected.sort(key=lambda r: (r[ts_name], r[id_name]), reverse=True)
+        if limit is not None:
+            collected = collected[:limit]
+        return [SimpleNamespace(**row) for row in collected]
+
+    def older(self, model, child_id, since=None):
+        """Continuation for db_utils.paginate(older=...): archived rows past the hot ones"""
+        if self._readable(model, child_id, since) is None:
+            return None
+        return lambda position, count: self.rows(model, child_id, since, position, count)
+
+    def forget(self, conn, child_id):
+        """
+        Tombstone a deleted child in the caller's transaction: reads skip its
+        archived rows from now on, the next run cuts them out of the segments
+        """
+        conn.execute(insert(self.tombstones_table).values(child_id=child_id, forgotten_at=datetime.utcnow()))
+        with self._lock:
+            for archived in self.tables.values():
+                archived.forgotten.add(child_id)
+
+    # ════════════════════════════════
+    # ARCHIVER
+    # ════════════════════════════════
+
+    def run(self, bind=None, partitions=None, now=None):
+        """
+        Archive rows older than after_days, cut forgotten children out of the
+        segments and expire old ones
+        Returns {table: {"rows", "segments", "raw_bytes", "stored_bytes"}}
+        """
+        if not self.enabled:
+            return {}
+        bind = bind or self.bind()
+        self.segments_table.metadata.create_all(bind, tables=[self.segments_table, self.tombstones_table])
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=self.after_days)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "w") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return {}       # another worker is archiving
+            report = {}
+            for model in self.tables:
+                report[self.tables[model].name] = self._archive_table(bind, model, cutoff, partitions)
+                self._purge(bind, model)
+                self._expire(bind, model, now)
+        return report
+
+    def _segment_path(self, archived, month):
+        folder = os.path.join(self.directory, archived.name)
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, f"{month:%Y%m}-{int(time.time() * 1000)}.seg")
+
+    def _add_to_catalog(self, conn, archived, path, rows):
+        conn.execute(insert(self.segments_table).values(
+            table_name=archived.name, name=os.path.basename(path), rows=rows, created_at=datetime.utcnow()
+        ))
+
+    def _drop_from_catalog(self, conn, archived, paths):
+        keys = [(archived.name, os.path.basename(path)) for path in paths]
+        catalog = self.segments_table
+        conn.execute(catalog.delete().where(tuple_(catalog.c.table_name, catalog.c.name).in_(keys)))
+
+    def _archive_table(self, bind, model, cutoff, partitions):
+        archived = self.tables[model]
+        table = archived.table
+        ts = table.c[archived.ts_column]
+        stats = {"rows": 0, "segments": 0, "raw_bytes": 0, "stored_bytes": 0}
+        with bind.connect() as conn:
+            oldest = conn.execute(select(func.min(ts)).where(ts < cutoff)).scalar()
+        if oldest is None:
+            return stats
+
+        stored = [(name, _column_kind(archived.expressions[name])) for name in archived.columns if name != archived.child_column]
+        month = datetime(oldest.year, oldest.month, 1)
+        while month < cutoff:
+            next_month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+            low, high = month, min(next_month, cutoff)
+            month = next_month
+            window = and_(ts >= low, ts < high)
+
+            final = self._segment_path(archived, low)
+            temporary = final + ".tmp"
+            writer = SegmentWriter(temporary, archived.name, stored, archived.ts_column, archived.child_column)
+            try:
+                query = select(table.c[archived.child_column], *[archived.expressions[name] for name, _ in stored]).where(
+                    window
+                ).order_by(table.c[archived.child_column], ts, table.c[archived.id_column])
+                with bind.connect() as conn:
+                    result = conn.execution_options(stream_results=True).execute(query)
+                    for batch in result.partitions(ARCHIVE_FETCH_ROWS):
+                        for row in batch:
+                            writer.append(row[0], tuple(row[1:]))
+                size = writer.close()
+                if not writer.rows:
+                    os.remove(temporary)
+                    continue
+
+                targets = partitions.tables_for(model, low, high) if partitions else [table]
+                with bind.begin() as conn:
+                    # Rows that arrived for this window while the segment was written stay hot
+                    # for the next run; the delete must match the segment exactly
+                    if conn.execute(select(func.count()).select_from(table).where(window)).scalar() != writer.rows:
+                        raise RuntimeError("rows changed while archiving")
+                    for target in targets:
+                        conn.execute(target.delete().where(and_(
+                            target.c[archived.ts_column] >= low, target.c[archived.ts_column] < high
+                        )))
+                    # Readers only open cataloged segments: until this commits, the file is ignored
+                    self._add_to_catalog(conn, archived, final, writer.rows)
+                    os.replace(temporary, final)
+            except Exception as e:
+                for path in (temporary, final):
+                    if os.path.exists(path):
+                        os.remove(path)
+                print(f"⚠️  Archiving {archived.name} {low:%Y-%m} failed: {e}")
+                continue
+
+            stats["rows"] += writer.rows
+            stats["segments"] += 1
+            stats["raw_bytes"] += writer.raw_bytes
+            stats["stored_bytes"] += size
+        if stats["rows"]:
+            self._catalog(model, refresh=True)
+        return stats
+
+    def _purge(self, bind, model):
+        """Rewrite the segments holding rows of forgotten children without them"""
+        archived, segments = self._catalog(model, refresh=True)
+        changed = False
+        for segment in segments:
+            doomed = archived.forgotten & set(segment.children)
+            if not doomed:
+                continue
+            kept = [child for child in segment.children if child not in doomed]
+            final = temporary = None
+            try:
+                if kept:
+                    stored = list(segment.columns.items())
+                    final = self._segment_path(archived, datetime.strptime(os.path.basename(segment.path)[:6], "%Y%m"))
+                    temporary = final + ".tmp"
+                    writer = SegmentWriter(temporary, archived.name, stored, segment.ts_column, segment.child_column)
+                    for child in kept:
+                        for row in segment.child_rows(child, [name for name, _ in stored]):
+                            writer.append(child, tuple(row[name] for name, _ in stored))
+                    writer.close()
+                with bind.begin() as conn:
+                    self._drop_from_catalog(conn, archived, [segment.path])
+                    if kept:
+                        self._add_to_catalog(conn, archived, final, writer.rows)
+                        os.replace(temporary, final)
+            except Exception as e:
+                for path in (temporary, final):
+                    if path and os.path.exists(path):
+                        os.remove(path)
+                print(f"⚠️  Removing forgotten children from {segment.path} failed: {e}")
+                continue
+            os.remove(segment.path)
+            changed = True
+        if changed:
+            self._catalog(model, refresh=True)
+
+    def _expire(self, bind, model, now):
+        """Delete segments whose newest row is older than retention_days (0 keeps everything)"""
+        if self.retention_days <= 0:
+            return
+        cutoff = now - timedelta(days=self.retention_days)
+        archived, segments = self._catalog(model, refresh=True)
+        expired = [s.path for s in segments if s.max_ts and s.max_ts < cutoff]
+        if not expired:
+            return
+        with bind.begin() as conn:
+            self._drop_from_catalog(conn, archived, expired)
+        for path in expired:
+            os.remove(path)
+        self._catalog(model, refresh=True)
+
+    def stats(self):
+        """Rows, bytes and time range of the archive per table"""
+        result = {}
+        for model, archived in self.tables.items():
+            _, segments = self._catalog(model)
+            result[archived.name] = {
+                "segments": len(segments),
+                "rows": sum(s.rows for s in segments),
+                "bytes": sum(s.size for s in segments),
+                "oldest": min((s.min_ts for s in segments if s.min_ts), default=None),
+                "newest": archived.newest
+            }
+        return result
+
+    def start_background(self, interval, job):
+        """
+        Call job() every `interval` seconds from a daemon thread
+        Safe to call more than once; only one thread is started
+        """
+        with self._lock:
+            if self._worker is not None or not self.enabled:
+                return
+            self._worker = threading.Thread(
+                target=self._loop, args=(interval, job), name="log-archiver", daemon=True
+            )
+            self._worker.start()
+
+    def _loop(self, interval, job):
+        while not self._stop.is_set():
+            try:
+                job()
+            except Exception as e:
+                print(f"⚠️  Log archiver error: {e}")
+            self._stop.wait(interval)
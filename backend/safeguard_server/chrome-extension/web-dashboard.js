@@ -43,6 +43,9 @@ document.addEventListener('DOMContentLoaded', async () => {
   // Load children and select first one
   await loadChildren();
   await refreshAll();
+
+  // Device alerts (extension removed) are pushed by the server
+  subscribeAlerts();
 });
 
 // ═══════════════════════════════════════════════════════════════
@@ -72,6 +75,32 @@ async function apiCall(method, endpoint, data = null) {
   return result;
 }
 
+// ═══════════════════════════════════════════════════════════════
+// DEVICE ALERTS
+// ═══════════════════════════════════════════════════════════════
+
+function subscribeAlerts() {
+  if (!window.EventSource) return;
+
+  const source = new EventSource(API_URL + '/alerts/stream?token=' + encodeURIComponent(authToken));
+  source.addEventListener('alert', async (event) => {
+    const deviceAlert = JSON.parse(event.data);
+    alert('⚠️ ' + deviceAlert.message);
+    try {
+      await apiCall('POST', '/alerts/' + deviceAlert.id + '/ack');
+    } catch (error) {
+      console.error('Alert ack error:', error);
+    }
+  });
+  // Streams end every minute and reconnect by themselves; a refused stream
+  // (server busy) closes for good, so subscribe again later
+  source.onerror = () => {
+    if (source.readyState === EventSource.CLOSED) {
+      setTimeout(subscribeAlerts, 30000);
+    }
+  };
+}
+
 // ═══════════════════════════════════════════════════════════════
 // NAVIGATION & ACTIONS
 // ═══════════════════════════════════════════════════════════════
@@ -207,8 +236,8 @@ async function loadStats() {
     const blocked = blockedRes.blocked || [];
     const child = childRes.child || {};
 
-    document.getElementById('totalVisits').textContent = history.length;
-    document.getElementById('totalBlocked').textContent = blocked.length;
+    document.getElementById('totalVisits').textContent = historyRes.total ?? history.length;
+    document.getElementById('totalBlocked').textContent = blockedRes.total ?? blocked.length;
     document.getElementById('totalDevices').textContent = child.device_count || 0;
 
     // Blocked today
@@ -22,12 +22,12 @@ Last Updated: February 8, 2026
 # IMPORT ALL REQUIRED LIBRARIES
 # ════════════════════════════════
 from fastapi import FastAPI, Request, HTTPException, Depends, BackgroundTasks
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse, Response
 from fastapi.security import HTTPBearer
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, Column, String, DateTime, Integer, Text, ForeignKey, Float, Boolean
+from sqlalchemy import create_engine, inspect, Column, String, DateTime, Integer, Text, ForeignKey, Float, Boolean, Index, UniqueConstraint, and_, desc, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from pydantic import BaseModel
@@ -36,12 +36,40 @@ from pathlib import Path
 import os
 import uuid
 import json
+import sys
 import jwt
-import yt_dlp
 import asyncio
-from groq import Groq
+import threading
+import time
 from typing import Optional, List
 import hashlib
+import hmac
+
+from db_utils import (
+    NDJSON_MEDIA_TYPE, bucket_label, clamp_page_size, ensure_columns, ensure_indexes, iter_keyset, ndjson_lines, newest_per_group,
+    paginate, parse_group_by, upsert_increment, usage_dimension
+)
+from db_engine import configure_engine, describe as describe_engine, engine_options
+from partitions import PartitionedLogs
+from archive import ColdArchive
+from interning import InternedStrings
+from compact_ids import CompactId, uuid7
+from compact_ids import upgrade as upgrade_compact_ids
+from usage_accounting import UsageAccountant, domain_suffixes, local_day, normalize_domain
+from dashboard_cache import DashboardCache
+import policy_revisions
+from single_flight import SingleFlight
+from presence import PresenceTracker, batch_params, bulk_heartbeat_update
+from esp32_dispatcher import dispatcher_from_env
+from profiling import ProfilingMiddleware, profiler_from_env
+from query_stats import QueryMonitor, QueryStatsMiddleware, SlowQueryLog
+from static_assets import StaticAssets, asgi_response
+from response_encoding import JSON_MEDIA_TYPE, dumps, etag_matches, init_fastapi_responses
+from metrics import MEDIA_TYPE as METRICS_MEDIA_TYPE, SLOW_BUCKETS, MetricsRegistry, PrometheusMiddleware, pool_gauge
+
+# NOTE: yt_dlp and groq are heavy imports (~0.7s together) and are only
+# needed by a few endpoints. They are loaded on first use through
+# load_yt_dlp() / get_groq_client() so that a cold start stays fast.
 
 # Load environment variables from .env file
 load_dotenv()
@@ -61,6 +89,19 @@ JWT_EXPIRATION_HOURS = 24  # Tokens expire after 24 hours
 
 # Database Configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./video_downloader.db")
+DB_PROFILE = os.getenv("DB_PROFILE", "server").strip().lower()  # Engine tuning: server, serverless or library (see db_engine.py)
+
+# Log Table Partitioning (see partitions.py)
+LOG_PARTITIONING = os.getenv("LOG_PARTITIONING", "off").strip().lower()  # "monthly" splits the log tables by month
+LOG_RETENTION_MONTHS = int(os.getenv("LOG_RETENTION_MONTHS", "0"))  # Months kept before the current one, older ones are dropped; 0 keeps everything
+PARTITION_MAINTENANCE_SECONDS = int(os.getenv("PARTITION_MAINTENANCE_SECONDS", "3600"))  # Create upcoming months / apply retention
+
+# Cold Log Archive (see archive.py)
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "0"))  # Move older logs to segment files; 0 disables archiving
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")  # Segment files, one folder per table
+ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "365"))  # Delete segments older than this; 0 keeps them
+ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ARCHIVE_INTERVAL_SECONDS", "86400"))  # How often the archiver runs
+COMMENT_SWEEP_SECONDS = int(os.getenv("COMMENT_SWEEP_SECONDS", "3600"))  # How often unreferenced comment bodies are deleted
 
 # Groq API Configuration for AI features
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
@@ -74,19 +115,54 @@ TOXIC_KEYWORDS = [
     "explicit", "inappropriate", "dangerous", "illegal"
 ]
 
-# Get or create Videos folder for downloads
+# Videos folder for downloads (created at startup, not at import time)
 VIDEOS_FOLDER = Path("Videos")
-VIDEOS_FOLDER.mkdir(exist_ok=True)
+
+# Startup Mode
+#   "full" - create tables on import and generate pending profiles before serving
+#   "fast" - serve immediately; schema is managed with `python backend_final.py migrate`
+#            and heavy modules / pending profiles are warmed up after readiness
+STARTUP_MODE = os.getenv("STARTUP_MODE", "full").strip().lower()
+WARMUP_DELAY_SECONDS = float(os.getenv("WARMUP_DELAY_SECONDS", "2"))  # "fast" mode only
+
+# Health & Stats Configuration
+STATS_RECONCILE_SECONDS = int(os.getenv("STATS_RECONCILE_SECONDS", "300"))  # Re-count counters from DB
+STATS_CACHE_TTL_SECONDS = int(os.getenv("STATS_CACHE_TTL_SECONDS", "10"))  # /health/stats result cache
+
+# Parent Dashboard Configuration
+DASHBOARD_CACHE_TTL_SECONDS = int(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "60"))  # Per-parent /api/dashboard cache, dropped on writes; 0 disables
+DASHBOARD_RECENT_ITEMS = int(os.getenv("DASHBOARD_RECENT_ITEMS", "5"))  # Recent videos / hidden comments per child
+
+# Web Dashboard Configuration
+WEB_DASHBOARD_FILE = os.getenv("WEB_DASHBOARD_FILE", "web-dashboard.html")  # Served at / from memory, precompressed
+STATIC_RELOAD_SECONDS = float(os.getenv("STATIC_RELOAD_SECONDS", "2"))  # Check the file for changes this often; 0 never reloads
+
+# Request Coalescing Configuration
+SINGLE_FLIGHT_TTL_SECONDS = float(os.getenv("SINGLE_FLIGHT_TTL_SECONDS", "0"))  # Also serve finished usage/report/profile results this long; 0 only joins in-flight ones
+
+# Device Presence Configuration
+HEARTBEAT_FLUSH_SECONDS = int(os.getenv("HEARTBEAT_FLUSH_SECONDS", "60"))  # Bulk write of last_heartbeat
+
+# Usage Accounting Configuration
+USAGE_FLUSH_SECONDS = int(os.getenv("USAGE_FLUSH_SECONDS", "30"))  # Persist counters + run due daily resets
+USAGE_RESYNC_SECONDS = int(os.getenv("USAGE_RESYNC_SECONDS", "30"))  # Reload a child's counters other workers persisted; 0 with a single worker
+
+# Diagnostics Configuration
+DEBUG = os.getenv("DEBUG", "false").lower() == "true"  # Adds X-DB-Query-Count / X-DB-Time-Ms headers
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))  # Log statements slower than this
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))  # Slow queries kept for /api/admin/slow-queries
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # X-Admin-Token for /api/admin/*; admin endpoints are off when empty
+
+# Response Encoding Configuration
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "true").lower() == "true"  # gzip/brotli when the client accepts it
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))  # Smaller bodies are sent as they are
 
 # ════════════════════════════════
 # DATABASE SETUP
 # ════════════════════════════════
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# Create SQLAlchemy engine (pool sizing, timeouts and SQLite pragmas from DB_PROFILE)
+engine = configure_engine(create_engine(DATABASE_URL, **engine_options(DATABASE_URL, DB_PROFILE)), DB_PROFILE)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -94,6 +170,17 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Base class for all database models
 Base = declarative_base()
 
+# Dictionary tables for the domains and URLs repeated across log rows
+interned = InternedStrings(Base.metadata)
+
+# Hidden comment bodies stored once with the verdict they were hidden for
+comment_bodies = interned.content(
+    "comment_bodies",
+    Column("text", Text, nullable=False),
+    Column("reason", String, nullable=True),
+    Column("severity", Integer, default=1)
+)
+
 # ════════════════════════════════
 # DATABASE MODELS (TABLES)
 # ════════════════════════════════
@@ -243,13 +330,17 @@ class ActivityLog(Base):
     Helps parents monitor usage patterns
     """
     __tablename__ = "activity_logs"
+    __table_args__ = (
+        Index("ix_activity_logs_child_recorded_at", "child_id", "recorded_at"),
+    )
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(CompactId, primary_key=True, default=uuid7)
     child_id = Column(String, ForeignKey("children.id"), nullable=False)
     
     # Activity Details
     activity_type = Column(String, nullable=False)  # "video_watched", "comment_viewed", etc
-    domain = Column(String, nullable=False)  # "facebook.com", "youtube.com"
+    domain_id = interned.domains.id_column()
+    domain = interned.domains.lookup(domain_id)  # "facebook.com", "youtube.com"
     title = Column(String, nullable=True)  # Activity title
     duration_seconds = Column(Integer, default=0)  # How long the activity lasted
     
@@ -304,14 +395,20 @@ class HiddenComment(Base):
     Tracks toxic comments hidden by the filter
     """
     __tablename__ = "hidden_comments"
+    __table_args__ = (
+        Index("ix_hidden_comments_child_hidden_at", "child_id", "hidden_at", "id"),
+        Index("ix_hidden_comments_body_id", "body_id"),
+    )
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(CompactId, primary_key=True, default=uuid7)
     child_id = Column(String, ForeignKey("children.id"), nullable=False)
-    post_url = Column(String, nullable=False)  # URL of the post
+    post_url_id = interned.urls.id_column()
+    post_url = interned.urls.lookup(post_url_id)  # URL of the post
     post_title = Column(String, nullable=True)  # Title/snippet of the post
-    comment_text = Column(Text, nullable=False)  # The hidden comment text
-    reason = Column(String, nullable=True)  # Why it was hidden
-    severity = Column(Integer, default=1)  # 0-2 severity level
+    body_id = comment_bodies.id_column()
+    comment_text = comment_bodies.lookup(body_id, "text")  # The hidden comment text
+    reason = comment_bodies.lookup(body_id, "reason")  # Why it was hidden
+    severity = comment_bodies.lookup(body_id, "severity")  # 0-2 severity level
     domain = Column(String, default="facebook.com")  # Platform domain
     hidden_at = Column(DateTime, default=datetime.utcnow)
     
@@ -350,7 +447,7 @@ class Device(Base):
     child_id = Column(String, ForeignKey("children.id"), nullable=False)
     device_id = Column(String, unique=True, nullable=False)  # Unique device identifier
     device_name = Column(String, nullable=True)
-    last_heartbeat = Column(DateTime, default=datetime.utcnow)
+    last_heartbeat = Column(DateTime, default=datetime.utcnow, index=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -376,6 +473,36 @@ class TimeLimit(Base):
     child = relationship("Child")
 
 
+class UsageCounter(Base):
+    """
+    Usage Counter Model
+    Seconds used per child, domain and local day (fed by the usage accounting engine)
+    """
+    __tablename__ = "usage_counters"
+    __table_args__ = (
+        UniqueConstraint("child_id", "day", "domain", name="uq_usage_counters_child_day_domain"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    child_id = Column(String, ForeignKey("children.id"), nullable=False)
+    day = Column(String(10), nullable=False)  # Child's local day, "YYYY-MM-DD"
+    domain = Column(String, nullable=False)
+    seconds = Column(Integer, default=0)
+    utc_offset_minutes = Column(Integer, default=0)  # Child's local time minus UTC that day
+
+
+class PolicyRevision(Base):
+    """
+    Policy Revision Model
+    Write counter per child and polled resource, the ETag of its GET (see policy_revisions.py)
+    """
+    __tablename__ = "policy_revisions"
+    
+    child_id = Column(String, ForeignKey("children.id"), primary_key=True)
+    resource = Column(String(16), primary_key=True)  # blocklist, allowlist, limits, reports
+    revision = Column(Integer, nullable=False, default=0)
+
+
 class UserBehaviorProfile(Base):
     """
     User Behavior Profile Model
@@ -413,6 +540,9 @@ class TrackedVideo(Base):
     Individual videos watched by user for behavior analysis
     """
     __tablename__ = "tracked_videos"
+    __table_args__ = (
+        Index("ix_tracked_videos_child_watched_at", "child_id", "watched_at"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     child_id = Column(String, ForeignKey("children.id"), nullable=False)
@@ -433,8 +563,40 @@ class TrackedVideo(Base):
     child = relationship("Child")
 
 
-# Create all tables in database
-Base.metadata.create_all(bind=engine)
+interned.add(ActivityLog, "domain", interned.domains)
+interned.add(HiddenComment, "post_url", interned.urls)
+interned.add(HiddenComment, ("comment_text", "reason", "severity"), comment_bodies, id_attribute="body_id")
+
+# Append-only log tables, split by month when LOG_PARTITIONING=monthly
+log_partitions = PartitionedLogs(LOG_PARTITIONING == "monthly", LOG_RETENTION_MONTHS, engine)
+log_partitions.add(ActivityLog, "recorded_at")
+log_partitions.add(HiddenComment, "hidden_at")
+log_partitions.add(TrackedVideo, "watched_at")
+
+# Logs older than ARCHIVE_AFTER_DAYS live in compressed segment files
+cold_archive = ColdArchive(ARCHIVE_DIR, ARCHIVE_AFTER_DAYS, ARCHIVE_RETENTION_DAYS, Base.metadata, engine)
+cold_archive.add(ActivityLog, "recorded_at")
+cold_archive.add(HiddenComment, "hidden_at")
+
+
+def init_db():
+    """
+    Create all tables in database
+    Runs on import in "full" startup mode, otherwise via `python backend_final.py migrate`
+    """
+    log_partitions.prepare()
+    Base.metadata.create_all(bind=engine)
+    for table, columns in interned.upgrade(engine, log_partitions).items():
+        print(f"✅ {table}: {', '.join(columns)} moved to dictionary tables")
+    for table, rows in upgrade_compact_ids(engine, [ActivityLog, HiddenComment], log_partitions).items():
+        print(f"✅ {table}: ids converted to compact form ({rows})")
+    for table, columns in ensure_columns(Base.metadata, engine, skip=log_partitions.partitioned_tables()).items():
+        print(f"✅ {table}: added {', '.join(columns)}")
+    ensure_indexes(Base.metadata, engine, skip=log_partitions.partitioned_tables())
+
+
+if STARTUP_MODE != "fast":
+    init_db()
 
 # ════════════════════════════════
 # PYDANTIC MODELS (Request/Response)
@@ -543,6 +705,36 @@ def get_db():
         db.close()
 
 
+# ════════════════════════════════
+# LAZY HEAVY IMPORTS
+# ════════════════════════════════
+
+_groq_client = None
+
+
+def load_yt_dlp():
+    """
+    Import yt-dlp on first use
+    Keeps it out of the import path of the server
+    """
+    import yt_dlp
+    return yt_dlp
+
+
+def get_groq_client():
+    """
+    Return a shared Groq client, importing groq on first use
+    Returns None when no API key is configured
+    """
+    global _groq_client
+    if not GROQ_API_KEY:
+        return None
+    if _groq_client is None:
+        from groq import Groq
+        _groq_client = Groq(api_key=GROQ_API_KEY)
+    return _groq_client
+
+
 # ════════════════════════════════
 # UTILITY FUNCTIONS
 # ════════════════════════════════
@@ -637,6 +829,309 @@ def analyze_content_for_warnings(transcription: str, title: str) -> tuple[str, O
     return rating, json.dumps(flags) if flags else None
 
 
+# ════════════════════════════════
+# TRACKING STATS COUNTERS
+# ════════════════════════════════
+
+class TrackingStats:
+    """
+    In-memory behavior tracking counters
+    Updated on insert and periodically reconciled from the database,
+    so /health can report them without running COUNT(*) queries
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total_users_tracked = 0
+        self.total_videos_tracked = 0
+        self.profiles_generated = 0
+        self.reconciled_at = None
+    
+    def record_profile_created(self):
+        with self._lock:
+            self.total_users_tracked += 1
+    
+    def record_video_tracked(self):
+        with self._lock:
+            self.total_videos_tracked += 1
+    
+    def record_profile_ready(self):
+        with self._lock:
+            self.profiles_generated += 1
+    
+    def count_from_db(self, db) -> dict:
+        """Run the full COUNT(*) queries (expensive on large tables)"""
+        return {
+            "total_users_tracked": db.query(UserBehaviorProfile).count(),
+            "total_videos_tracked": db.query(TrackedVideo).count(),
+            "profiles_generated": db.query(UserBehaviorProfile).filter(
+                UserBehaviorProfile.days_tracked >= 7
+            ).count()
+        }
+    
+    def reconcile(self, counts: dict):
+        """Replace counters with authoritative values from the database"""
+        with self._lock:
+            self.total_users_tracked = counts["total_users_tracked"]
+            self.total_videos_tracked = counts["total_videos_tracked"]
+            self.profiles_generated = counts["profiles_generated"]
+            self.reconciled_at = datetime.utcnow()
+    
+    def reconcile_from_db(self):
+        """Open a session and reconcile; safe to call from a worker thread"""
+        db = SessionLocal()
+        try:
+            self.reconcile(self.count_from_db(db))
+        except Exception as e:
+            print(f"⚠️  Error reconciling tracking stats: {e}")
+        finally:
+            db.close()
+    
+    def snapshot(self) -> dict:
+        return {
+            "total_users_tracked": self.total_users_tracked,
+            "total_videos_tracked": self.total_videos_tracked,
+            "profiles_generated": self.profiles_generated
+        }
+
+
+tracking_stats = TrackingStats()
+
+# Last /api/dashboard response per parent, dropped by writes to the parent or its children
+dashboard_cache = DashboardCache(ttl=DASHBOARD_CACHE_TTL_SECONDS)
+
+
+def child_parents(child_ids, db=None):
+    """child_id -> parent_id, for dashboard cache invalidation of children it has not mapped"""
+    session = db or SessionLocal()
+    try:
+        return dict(session.query(Child.id, Child.parent_id).filter(Child.id.in_(list(child_ids))).all())
+    finally:
+        if db is None:
+            session.close()
+
+
+# The web dashboard page, held in memory with gzip/brotli copies and a strong ETag
+web_pages = StaticAssets(
+    os.path.dirname(os.path.abspath(WEB_DASHBOARD_FILE)),
+    files=[os.path.basename(WEB_DASHBOARD_FILE)],
+    reload_seconds=STATIC_RELOAD_SECONDS
+)
+
+
+# ════════════════════════════════
+# DEVICE PRESENCE
+# ════════════════════════════════
+
+# Last heartbeat per device, written to Device.last_heartbeat in bulk
+presence = PresenceTracker(flush_interval=HEARTBEAT_FLUSH_SECONDS)
+
+_heartbeat_update = bulk_heartbeat_update(
+    Device.__table__,
+    Device.__table__.c.device_id,
+    Device.__table__.c.last_heartbeat,
+    extra_values={"is_active": True}
+)
+
+
+def flush_heartbeats():
+    """Write pending heartbeats to the devices table in one bulk UPDATE"""
+    def write_batch(batch):
+        db = SessionLocal()
+        try:
+            db.execute(_heartbeat_update, batch_params(batch))
+            db.commit()
+        finally:
+            db.close()
+    
+    return presence.flush(write_batch)
+
+
+def find_offline_devices(db, minutes: int, parent_id: Optional[str] = None) -> List[Device]:
+    """
+    Devices whose last heartbeat is older than `minutes`
+    Uses the last_heartbeat index, then drops devices with a newer heartbeat still in memory
+    """
+    cutoff = datetime.utcnow() - timedelta(minutes=minutes)
+    query = db.query(Device).filter(
+        Device.is_active == True,
+        Device.last_heartbeat < cutoff
+    )
+    if parent_id:
+        query = query.join(Child, Child.id == Device.child_id).filter(Child.parent_id == parent_id)
+    
+    devices = query.all()
+    alive = presence.recently_seen([d.device_id for d in devices], cutoff)
+    return [d for d in devices if d.device_id not in alive]
+
+
+# Parent-side ESP32 buzzer (None unless ESP32_ENABLED=true)
+esp32_alerts = dispatcher_from_env()
+
+
+# ════════════════════════════════
+# USAGE ACCOUNTING
+# ════════════════════════════════
+
+# Today's usage per child and domain, for all of a child's devices; per
+# worker, merged with the other workers' persisted counters every
+# USAGE_RESYNC_SECONDS (see usage_accounting.py)
+usage_accounting = UsageAccountant(resync_seconds=USAGE_RESYNC_SECONDS)
+
+
+def site_limit_rule(limit: SiteTimeLimit) -> dict:
+    return {
+        "id": limit.id,
+        "domain": limit.domain,
+        "daily_limit_minutes": limit.daily_limit_minutes,
+        "cooldown_hours": limit.cooldown_hours,
+        "permanent_block": limit.permanent_block,
+        "blocked_until": limit.blocked_until
+    }
+
+
+def ensure_usage_loaded(db, child_id: str, utc_offset_minutes: Optional[int] = None):
+    """
+    Load a child's rules and today's counters into the accounting engine
+    Runs on the first access of the day, after the rules changed and every
+    USAGE_RESYNC_SECONDS, so limits count usage other workers persisted
+    """
+    if utc_offset_minutes is None and not usage_accounting.knows_offset(child_id):
+        # Offset recorded with the child's most recent counters, UTC if none
+        latest = db.query(UsageCounter.utc_offset_minutes).filter(
+            UsageCounter.child_id == child_id
+        ).order_by(UsageCounter.day.desc()).first()
+        utc_offset_minutes = latest[0] if latest else 0
+    
+    needs_counters = usage_accounting.needs_counters(child_id)
+    if not needs_counters and not usage_accounting.needs_rules(child_id):
+        return
+    
+    rules = [site_limit_rule(l) for l in db.query(SiteTimeLimit).filter(SiteTimeLimit.child_id == child_id)]
+    time_limit = db.query(TimeLimit.daily_limit_minutes).filter(TimeLimit.child_id == child_id).first()
+    daily_limit = time_limit[0] if time_limit else None
+    
+    if not needs_counters:
+        usage_accounting.set_rules(child_id, rules, daily_limit)
+        return
+    
+    day, _ = usage_accounting.current_day(child_id, utc_offset_minutes=utc_offset_minutes)
+    counters = dict(db.query(UsageCounter.domain, UsageCounter.seconds).filter(
+        UsageCounter.child_id == child_id,
+        UsageCounter.day == day
+    ).all())
+    usage_accounting.load(child_id, counters, rules, daily_limit, utc_offset_minutes)
+
+
+def flush_usage_counters():
+    """Persist counter deltas, limits reached and TimeLimit.remaining_minutes"""
+    drained = usage_accounting.drain()
+    rows, rule_blocks, remaining = drained
+    if not (rows or rule_blocks or remaining):
+        return 0
+    
+    db = SessionLocal()
+    try:
+        upsert_increment(db, UsageCounter.__table__, ["child_id", "day", "domain"], rows, "seconds")
+        for rule_id, blocked_until in rule_blocks.items():
+            db.query(SiteTimeLimit).filter(SiteTimeLimit.id == rule_id).update(
+                {SiteTimeLimit.blocked_until: blocked_until}, synchronize_session=False
+            )
+        if rule_blocks:
+            # blocked_until is part of GET /api/limits
+            blocked_children = db.query(SiteTimeLimit.child_id).filter(SiteTimeLimit.id.in_(list(rule_blocks))).distinct()
+            policy_revisions.bump_many(
+                db, PolicyRevision.__table__, [row.child_id for row in blocked_children], policy_revisions.LIMITS
+            )
+        for child_id, minutes in remaining.items():
+            db.query(TimeLimit).filter(TimeLimit.child_id == child_id).update(
+                {TimeLimit.remaining_minutes: minutes}, synchronize_session=False
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        usage_accounting.restore(drained)
+        raise
+    finally:
+        db.close()
+    # Today's usage on the dashboard is read from these counters
+    dashboard_cache.invalidate_children([row["child_id"] for row in rows] + list(remaining), child_parents)
+    return len(rows)
+
+
+def run_usage_resets():
+    """Reset the daily budget of every child whose local midnight passed"""
+    reset = usage_accounting.due_resets()
+    if not reset:
+        return 0
+    
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        for child_id in reset:
+            db.query(TimeLimit).filter(TimeLimit.child_id == child_id).update(
+                {TimeLimit.remaining_minutes: TimeLimit.daily_limit_minutes, TimeLimit.last_reset: now},
+                synchronize_session=False
+            )
+        db.commit()
+    finally:
+        db.close()
+    dashboard_cache.invalidate_children(reset, child_parents)
+    return len(reset)
+
+
+# ════════════════════════════════
+# METRICS
+# ════════════════════════════════
+
+# Prometheus metrics served at /metrics (per worker process)
+metrics = MetricsRegistry()
+
+metrics.histogram("groq_request_duration_seconds", "Groq chat completion latency", buckets=SLOW_BUCKETS)
+metrics.histogram("ytdlp_extract_duration_seconds", "yt-dlp video info extraction time", buckets=SLOW_BUCKETS)
+metrics.gauge("db_pool_connections", "Database pool connections by state", ("state",), callback=pool_gauge(engine))
+
+
+def ingest_queue_depths():
+    return {
+        ("heartbeats",): presence.pending_count,
+        ("usage_counters",): usage_accounting.pending_rows,
+        ("esp32_alerts",): esp32_alerts.queue_depth if esp32_alerts else 0
+    }
+
+
+metrics.gauge("ingest_queue_depth", "Items buffered in memory waiting to be written or sent", ("queue",), callback=ingest_queue_depths)
+metrics.counter("dashboard_cache_lookups_total", "GET /api/dashboard answered from the per-parent cache or computed", ("result",))
+metrics.counter(
+    "conditional_get_total",
+    "Polled per-child resources answered 304 Not Modified or in full; rate(not_modified) / rate(all) is the 304 ratio",
+    ("resource", "result")
+)
+
+# Identical concurrent usage / weekly report / behavior profile reads share one computation
+read_flights = SingleFlight(ttl=SINGLE_FLIGHT_TTL_SECONDS, metrics=metrics)
+
+# /health/stats: one count at a time, its result served for STATS_CACHE_TTL_SECONDS
+stats_flight = SingleFlight(ttl=STATS_CACHE_TTL_SECONDS, metrics=metrics)
+
+
+def in_session(fn, *args):
+    """Call fn(db, *args) with a session of its own: a shared computation outlives the request that started it"""
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+# Per-request query counts and the slow-query ring buffer
+slow_queries = SlowQueryLog(threshold_ms=SLOW_QUERY_MS, size=SLOW_QUERY_LOG_SIZE)
+query_monitor = QueryMonitor(slow_queries, metrics)
+query_monitor.instrument(engine)
+
+# Sampling profiler for picked requests (None unless PROFILE_ENABLED=true)
+profiler = profiler_from_env()
+
+
 # ════════════════════════════════
 # USER BEHAVIOR TRACKING FUNCTIONS
 # ════════════════════════════════
@@ -687,6 +1182,7 @@ def get_or_create_behavior_profile(db, child_id: str) -> UserBehaviorProfile:
         db.add(profile)
         db.commit()
         db.refresh(profile)
+        tracking_stats.record_profile_created()
     
     return profile
 
@@ -715,6 +1211,7 @@ def update_behavior_profile(db, child_id: str, video_info: dict, categories: Lis
     profile.last_updated = datetime.utcnow()
     
     # Calculate days tracked
+    was_ready = (profile.days_tracked or 0) >= 7
     days_tracked = (datetime.utcnow() - profile.start_date).days
     profile.days_tracked = days_tracked
     
@@ -731,6 +1228,11 @@ def update_behavior_profile(db, child_id: str, video_info: dict, categories: Lis
     
     db.commit()
     db.refresh(profile)
+    dashboard_cache.invalidate_child(child_id, lambda ids: child_parents(ids, db))
+    
+    tracking_stats.record_video_tracked()
+    if days_tracked >= 7 and not was_ready:
+        tracking_stats.record_profile_ready()
     
     # Generate profile if 7+ days
     if days_tracked >= 7 and not profile.profile_text:
@@ -828,22 +1330,18 @@ TOP CONTENT CATEGORIES
 bearer_scheme = HTTPBearer()
 
 
-# Startup and shutdown events
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+# Startup state reported by the /ready probe
+STARTUP_STATE = {
+    "ready": False,       # Accepting traffic
+    "warmed_up": False,   # Heavy modules loaded and pending profiles generated
+    "started_at": None
+}
+
+
+def generate_pending_profiles():
     """
-    Handle application startup and shutdown
-    Check for profiles that need generation
+    Generate profiles that reached 7+ days while the server was down
     """
-    print("🚀 Starting SafeGuard Family Backend...")
-    print(f"📁 Videos folder: {VIDEOS_FOLDER.absolute()}")
-    print(f"🎵 Using Groq Whisper for transcription")
-    print(f"🤖 Using Groq LLM for content analysis")
-    print(f"👨‍👩‍👧 Parent-Child authentication enabled")
-    print(f"🔒 Multi-device support enabled")
-    print(f"📊 User behavior tracking enabled")
-    
-    # Check for profiles that need generation (7+ days)
     try:
         db = SessionLocal()
         profiles_to_generate = db.query(UserBehaviorProfile).filter(
@@ -866,8 +1364,177 @@ async def lifespan(app: FastAPI):
         db.close()
     except Exception as e:
         print(f"⚠️  Error checking profiles: {e}")
+
+
+async def flush_heartbeats_periodically():
+    """Bulk-write buffered heartbeats every HEARTBEAT_FLUSH_SECONDS"""
+    loop = asyncio.get_event_loop()
+    while True:
+        await asyncio.sleep(HEARTBEAT_FLUSH_SECONDS)
+        try:
+            await loop.run_in_executor(None, flush_heartbeats)
+        except Exception as e:
+            print(f"⚠️  Heartbeat flush error: {e}")
+
+
+async def account_usage_periodically():
+    """Persist usage counters and run due daily resets every USAGE_FLUSH_SECONDS"""
+    loop = asyncio.get_event_loop()
+    while True:
+        await asyncio.sleep(USAGE_FLUSH_SECONDS)
+        try:
+            # Flush first so yesterday's last seconds land on yesterday's rows
+            await loop.run_in_executor(None, flush_usage_counters)
+            await loop.run_in_executor(None, run_usage_resets)
+        except Exception as e:
+            print(f"⚠️  Usage accounting error: {e}")
+
+
+async def maintain_partitions_periodically():
+    """Create upcoming log partitions and drop expired ones every PARTITION_MAINTENANCE_SECONDS"""
+    loop = asyncio.get_event_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, log_partitions.maintain)
+        except Exception as e:
+            print(f"⚠️  Partition maintenance error: {e}")
+        await asyncio.sleep(PARTITION_MAINTENANCE_SECONDS)
+
+
+def archive_logs():
+    """Move logs past ARCHIVE_AFTER_DAYS into segment files"""
+    for table, stats in cold_archive.run(partitions=log_partitions).items():
+        if stats["rows"]:
+            ratio = stats["raw_bytes"] / max(stats["stored_bytes"], 1)
+            print(f"🧊 Archived {stats['rows']} {table} rows into {stats['segments']} segments ({ratio:.1f}x smaller)")
+
+
+def sweep_comment_bodies():
+    """Delete the comment bodies no hidden comment points at any more (see interning.sweep)"""
+    with engine.begin() as conn:
+        swept = interned.sweep(conn, comment_bodies)
+    if swept:
+        print(f"🧹 Deleted {swept} unreferenced comment bodies")
+
+
+async def sweep_comment_bodies_periodically():
+    """
+    Sweep comment bodies every COMMENT_SWEEP_SECONDS: what retention, archiving
+    (segments keep their own text) and child deletion left unreferenced
+    """
+    loop = asyncio.get_event_loop()
+    while True:
+        await asyncio.sleep(COMMENT_SWEEP_SECONDS)
+        try:
+            await loop.run_in_executor(None, sweep_comment_bodies)
+        except Exception as e:
+            print(f"⚠️  Comment body sweep error: {e}")
+
+
+async def archive_logs_periodically():
+    """Run the log archiver every ARCHIVE_INTERVAL_SECONDS"""
+    loop = asyncio.get_event_loop()
+    while True:
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+        try:
+            await loop.run_in_executor(None, archive_logs)
+        except Exception as e:
+            print(f"⚠️  Log archiver error: {e}")
+
+
+async def reconcile_stats_periodically():
+    """Re-count tracking stats from the database every STATS_RECONCILE_SECONDS"""
+    loop = asyncio.get_event_loop()
+    while True:
+        await asyncio.sleep(STATS_RECONCILE_SECONDS)
+        await loop.run_in_executor(None, tracking_stats.reconcile_from_db)
+
+
+def warm_up():
+    """
+    Load heavy modules and catch up on pending work
+    Runs in a worker thread after the server is ready in "fast" mode
+    """
+    try:
+        load_yt_dlp()
+        if GROQ_API_KEY:
+            get_groq_client()
+    except Exception as e:
+        print(f"⚠️  Warm-up import error: {e}")
+    
+    generate_pending_profiles()
+    tracking_stats.reconcile_from_db()
+    STARTUP_STATE["warmed_up"] = True
+    print("🔥 Warm-up complete")
+
+
+async def delayed_warm_up():
+    """Give the first requests after a deploy a head start before warming up"""
+    await asyncio.sleep(WARMUP_DELAY_SECONDS)
+    await asyncio.get_event_loop().run_in_executor(None, warm_up)
+
+
+# Startup and shutdown events
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Handle application startup and shutdown
+    Check for profiles that need generation
+    """
+    print("🚀 Starting SafeGuard Family Backend...")
+    print(f"⚡ Startup mode: {STARTUP_MODE}")
+    print(f"🗄️  Database: {describe_engine(engine, DB_PROFILE)}")
+    print(f"📁 Videos folder: {VIDEOS_FOLDER.absolute()}")
+    print(f"🎵 Using Groq Whisper for transcription")
+    print(f"🤖 Using Groq LLM for content analysis")
+    print(f"👨‍👩‍👧 Parent-Child authentication enabled")
+    print(f"🔒 Multi-device support enabled")
+    print(f"📊 User behavior tracking enabled")
+    
+    VIDEOS_FOLDER.mkdir(exist_ok=True)
+    STARTUP_STATE["started_at"] = datetime.utcnow()
+    
+    warm_up_task = None
+    if STARTUP_MODE == "fast":
+        # Schema is managed by the migrate command, only warn if it is missing
+        if not inspect(engine).has_table(Parent.__tablename__):
+            print("⚠️  Database schema missing - run: python backend_final.py migrate")
+        STARTUP_STATE["ready"] = True
+        warm_up_task = asyncio.create_task(delayed_warm_up())
+    else:
+        # Check for profiles that need generation (7+ days)
+        generate_pending_profiles()
+        tracking_stats.reconcile_from_db()
+        STARTUP_STATE["warmed_up"] = True
+        STARTUP_STATE["ready"] = True
+    
+    reconcile_task = asyncio.create_task(reconcile_stats_periodically())
+    heartbeat_task = asyncio.create_task(flush_heartbeats_periodically())
+    usage_task = asyncio.create_task(account_usage_periodically())
+    partition_task = asyncio.create_task(maintain_partitions_periodically()) if log_partitions.enabled else None
+    archive_task = asyncio.create_task(archive_logs_periodically()) if cold_archive.enabled else None
+    sweep_task = asyncio.create_task(sweep_comment_bodies_periodically())
     
     yield
+    STARTUP_STATE["ready"] = False
+    reconcile_task.cancel()
+    heartbeat_task.cancel()
+    usage_task.cancel()
+    if partition_task is not None:
+        partition_task.cancel()
+    if archive_task is not None:
+        archive_task.cancel()
+    sweep_task.cancel()
+    try:
+        flush_heartbeats()
+    except Exception as e:
+        print(f"⚠️  Final heartbeat flush failed: {e}")
+    try:
+        flush_usage_counters()
+    except Exception as e:
+        print(f"⚠️  Final usage flush failed: {e}")
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
     print("🔌 Shutting down SafeGuard Family Backend...")
 
 
@@ -878,6 +1545,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Plain dict/list results encoded with orjson (no jsonable_encoder pass), large bodies compressed
+init_fastapi_responses(app, RESPONSE_COMPRESSION_MIN_BYTES, compression=RESPONSE_COMPRESSION)
+
 # Enable CORS (Cross-Origin Resource Sharing)
 # Allows extension to communicate with backend from any origin
 app.add_middleware(
@@ -888,6 +1558,16 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# Opt-in request profiling; nothing is installed when disabled
+if profiler:
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+# Per-request SQL query count and DB time (headers only when DEBUG=true)
+app.add_middleware(QueryStatsMiddleware, monitor=query_monitor, debug_headers=DEBUG)
+
+# Per-route request counts, status codes and latency for /metrics
+app.add_middleware(PrometheusMiddleware, registry=metrics)
+
 
 # ════════════════════════════════
 # AUTHENTICATION DEPENDENCY
@@ -919,23 +1599,43 @@ async def get_current_parent(
     return parent_id
 
 
+async def get_token_parent(credentials=Depends(bearer_scheme)) -> str:
+    """
+    Verify JWT token only, without looking the parent up in the database
+    
+    For high-frequency device endpoints (heartbeats) where a valid signed
+    token is enough; raises 401 if the token is invalid or expired
+    """
+    parent_id = verify_jwt_token(credentials.credentials)
+    if not parent_id:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    
+    return parent_id
+
+
+async def require_admin(request: Request) -> None:
+    """
+    Operator access to /api/admin/* through the X-Admin-Token header
+    Returns 404 while ADMIN_TOKEN is unset so the endpoints are not advertised
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    # As bytes: compare_digest raises TypeError for str holding non-ASCII characters
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
 # ════════════════════════════════
 # HEALTH CHECK ENDPOINT
 # ════════════════════════════════
 
 @app.get("/health")
-async def health_check(db=Depends(get_db)):
+async def health_check():
     """
     Health check endpoint
     Returns status and API info including behavior tracking stats
+    Stats come from in-memory counters, so this never touches the database
     """
-    # Get total tracking stats across all users
-    total_profiles = db.query(UserBehaviorProfile).count()
-    total_tracked_videos = db.query(TrackedVideo).count()
-    profiles_ready = db.query(UserBehaviorProfile).filter(
-        UserBehaviorProfile.days_tracked >= 7
-    ).count()
-    
     return {
         "status": "healthy",
         "service": "SafeGuard Family - Parental Control System with Behavior Tracking",
@@ -949,23 +1649,110 @@ async def health_check(db=Depends(get_db)):
             "behavior-tracking",
             "user-profiling"
         ],
-        "tracking_stats": {
-            "total_users_tracked": total_profiles,
-            "total_videos_tracked": total_tracked_videos,
-            "profiles_generated": profiles_ready
-        }
+        "tracking_stats": tracking_stats.snapshot()
+    }
+
+
+@app.get("/health/live")
+async def liveness_check():
+    """
+    Liveness probe
+    Cheapest possible response - no database, no counters
+    """
+    return {"status": "alive"}
+
+
+def count_tracking_stats(db):
+    """/health/stats body: counts from the database, which also reconcile the in-memory counters"""
+    counts = tracking_stats.count_from_db(db)
+    tracking_stats.reconcile(counts)
+    return {
+        "status": "success",
+        "tracking_stats": counts,
+        "computed_at": tracking_stats.reconciled_at.isoformat()
+    }
+
+
+@app.get("/health/stats")
+async def detailed_stats():
+    """
+    Detailed tracking stats counted from the database
+    Counted in a worker thread by one request at a time; the result is
+    cached for STATS_CACHE_TTL_SECONDS
+    """
+    return await stats_flight.run("health_stats", None, in_session, count_tracking_stats)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """
+    Prometheus scrape endpoint (text exposition format)
+    Request metrics plus DB pool, Groq, yt-dlp and ingest queue gauges
+    """
+    return Response(content=metrics.render(), media_type=METRICS_MEDIA_TYPE)
+
+
+@app.get("/api/admin/slow-queries", dependencies=[Depends(require_admin)])
+async def list_slow_queries():
+    """
+    Most recent statements slower than SLOW_QUERY_MS (newest first)
+    Normalized SQL with the method and route that issued it
+    """
+    return {
+        "status": "success",
+        "threshold_ms": slow_queries.threshold_ms,
+        "total": slow_queries.total,
+        "slow_queries": slow_queries.entries()
+    }
+
+
+@app.get("/api/admin/profiles", dependencies=[Depends(require_admin)])
+async def profile_summary():
+    """Profiled requests and samples per route since the last dump"""
+    if not profiler:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (PROFILE_ENABLED)")
+    return {"status": "success", **profiler.summary()}
+
+
+@app.post("/api/admin/profiles/dump", dependencies=[Depends(require_admin)])
+async def dump_profiles(reset: bool = True):
+    """
+    Write collapsed stacks per route to PROFILE_DIR
+    Render with flamegraph.pl, speedscope or inferno
+    """
+    if not profiler:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (PROFILE_ENABLED)")
+    loop = asyncio.get_event_loop()
+    files = await loop.run_in_executor(None, profiler.dump, reset)
+    return {"status": "success", "files": files}
+
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe for load balancers and orchestrators
+    Returns 503 until startup has finished; never touches the database
+    """
+    if not STARTUP_STATE["ready"]:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    
+    return {
+        "status": "ready",
+        "startup_mode": STARTUP_MODE,
+        "warmed_up": STARTUP_STATE["warmed_up"]
     }
 
 
 @app.get("/", response_class=HTMLResponse)
-async def serve_web_dashboard():
+async def serve_web_dashboard(request: Request):
     """
     Serve the web-based parent dashboard
     Accessible from any device on the network
+    From memory, revalidated with its ETag (304 when unchanged)
     """
-    dashboard_path = Path("web-dashboard.html")
-    if dashboard_path.exists():
-        return FileResponse(dashboard_path)
+    response = asgi_response(web_pages, os.path.basename(WEB_DASHBOARD_FILE), request)
+    if response is not None:
+        return response
     else:
         return HTMLResponse(content="""
             <!DOCTYPE html>
@@ -979,9 +1766,9 @@ async def serve_web_dashboard():
 
 
 @app.get("/dashboard", response_class=HTMLResponse)
-async def serve_dashboard_alias():
+async def serve_dashboard_alias(request: Request):
     """Alternative URL for the dashboard"""
-    return await serve_web_dashboard()
+    return await serve_web_dashboard(request)
 
 
 @app.get("/api")
@@ -1008,6 +1795,9 @@ async def api_info():
                 "GET /api/reports/weekly/{child_id}": "Get weekly report for child",
                 "GET /api/reports/all/{child_id}": "Get all reports for child"
             },
+            "dashboard": {
+                "GET /api/dashboard": "Usage, limits, lists, videos and hidden comments of every child"
+            },
             "settings": {
                 "GET /api/profile": "Get parent profile",
                 "PUT /api/profile": "Update parent profile"
@@ -1166,6 +1956,7 @@ async def add_child(
     )
     db.add(child)
     db.commit()
+    dashboard_cache.invalidate(parent_id)
     db.refresh(child)
     
     return {
@@ -1191,17 +1982,15 @@ async def list_children(
     
     Returns list of monitored children with activity info
     """
-    children = db.query(Child).filter(Child.parent_id == parent_id).all()
+    # Children with videos watched this week counted in the same query
+    week_ago = datetime.utcnow() - timedelta(days=7)
+    children = db.query(Child, func.count(VideoAnalysis.id)).outerjoin(
+        VideoAnalysis,
+        and_(VideoAnalysis.child_id == Child.id, VideoAnalysis.created_at >= week_ago)
+    ).filter(Child.parent_id == parent_id).group_by(Child.id).all()
     
     result = []
-    for child in children:
-        # Count videos watched this week
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        videos_count = db.query(VideoAnalysis).filter(
-            VideoAnalysis.child_id == child.id,
-            VideoAnalysis.created_at >= week_ago
-        ).count()
-        
+    for child, videos_count in children:
         result.append({
             "id": child.id,
             "name": child.name,
@@ -1241,9 +2030,20 @@ async def delete_child(
     if not child:
         raise HTTPException(status_code=404, detail="Child not found")
     
-    # Delete child and all related data (cascade)
+    # Log rows go first as Core deletes on their physical tables (see partitions.py),
+    # then the child and the rest of its data (cascade)
+    bodies = [body for (body,) in db.query(HiddenComment.body_id).filter(HiddenComment.child_id == child_id).distinct()]
+    for model in (ActivityLog, HiddenComment, TrackedVideo):
+        log_partitions.delete(db, model, child_id=child_id)
+    # Comment bodies only this child's comments used; ones written within the sweep's
+    # grace period go with the next periodic sweep
+    interned.sweep(db, comment_bodies, bodies)
+    # Archived rows are skipped from now on and cut out of the segments by the next archiver run
+    cold_archive.forget(db, child_id)
     db.delete(child)
+    db.query(PolicyRevision).filter(PolicyRevision.child_id == child_id).delete(synchronize_session=False)
     db.commit()
+    dashboard_cache.invalidate(parent_id)
     
     return {
         "status": "success",
@@ -1273,20 +2073,281 @@ async def get_profile(
     # Count total videos tracked
     videos_count = db.query(VideoAnalysis).join(Child).filter(
         Child.parent_id == parent_id
-    ).count()
+    ).count()
+    
+    return {
+        "status": "success",
+        "parent": {
+            "id": parent.id,
+            "email": parent.email,
+            "full_name": parent.full_name,
+            "children_count": children_count,
+            "videos_tracked": videos_count,
+            "created_at": parent.created_at.isoformat(),
+            "last_login": parent.last_login.isoformat() if parent.last_login else None
+        }
+    }
+
+
+# ════════════════════════════════
+# PARENT DASHBOARD ENDPOINT
+# ════════════════════════════════
+
+def group_by_child(rows, child_attribute="child_id"):
+    """Rows of a batched child_id IN (...) query as {child_id: [rows]}"""
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(getattr(row, child_attribute), []).append(row)
+    return grouped
+
+
+def usage_today(db, child_ids: List[str], now: datetime) -> dict:
+    """
+    Today's usage per child from the usage_counters rollup, in one query
+    Each child's local day comes from its known UTC offset (the accounting
+    engine's, else the one stored with its latest counters); counters not
+    yet flushed are left out (at most USAGE_FLUSH_SECONDS behind)
+    """
+    # Every local day in use right now is yesterday, today or tomorrow in UTC
+    days = [(now + timedelta(days=d)).date().isoformat() for d in (-1, 0, 1)]
+    counters = group_by_child(db.query(
+        UsageCounter.child_id, UsageCounter.day, UsageCounter.domain,
+        UsageCounter.seconds, UsageCounter.utc_offset_minutes
+    ).filter(UsageCounter.child_id.in_(child_ids), UsageCounter.day.in_(days)).all())
+
+    result = {}
+    for child_id in child_ids:
+        rows = counters.get(child_id, [])
+        if usage_accounting.knows_offset(child_id):
+            day, offset = usage_accounting.current_day(child_id, now)
+        else:
+            offset = max(rows, key=lambda r: r.day).utc_offset_minutes if rows else 0
+            day = local_day(now, offset or 0)[0]
+        domains = sorted(
+            ((r.domain, r.seconds or 0) for r in rows if r.day == day), key=lambda item: item[1], reverse=True
+        )
+        result[child_id] = {"day": day, "usage": [{"domain": d, "seconds": s} for d, s in domains]}
+    return result
+
+
+def build_dashboard(db, parent_id: str) -> dict:
+    """
+    Summary of every child of a parent for the dashboard
+    One query per section for all children (child_id IN (...)), so the
+    query count does not grow with the number of children
+    """
+    now = datetime.utcnow()
+    today = now.date()
+    week_start = datetime.combine(today - timedelta(days=today.weekday()), datetime.min.time())
+
+    parent = db.query(Parent).filter(Parent.id == parent_id).first()
+    children = db.query(Child).filter(Child.parent_id == parent_id).order_by(Child.created_at).all()
+    child_ids = [child.id for child in children]
+
+    if child_ids:
+        usage = usage_today(db, child_ids, now)
+        daily_limits = dict(db.query(TimeLimit.child_id, TimeLimit.daily_limit_minutes).filter(
+            TimeLimit.child_id.in_(child_ids)
+        ).all())
+        limits = group_by_child(db.query(SiteTimeLimit).filter(SiteTimeLimit.child_id.in_(child_ids)).all())
+        blocked = group_by_child(db.query(BlockedSite).filter(BlockedSite.child_id.in_(child_ids)).all())
+        allowed = group_by_child(db.query(AllowedSite).filter(AllowedSite.child_id.in_(child_ids)).all())
+        profiles = {p.child_id: p for p in db.query(UserBehaviorProfile).filter(UserBehaviorProfile.child_id.in_(child_ids))}
+
+        this_week = VideoAnalysis.created_at >= week_start
+        videos = {row.child_id: row for row in db.query(
+            VideoAnalysis.child_id,
+            func.count().label("total"),
+            func.count().filter(this_week).label("week"),
+            func.coalesce(func.sum(VideoAnalysis.duration).filter(this_week), 0).label("week_seconds"),
+            func.count().filter(this_week, VideoAnalysis.content_rating == "warning").label("week_flagged")
+        ).filter(VideoAnalysis.child_id.in_(child_ids)).group_by(VideoAnalysis.child_id)}
+
+        comments = {row.child_id: row for row in db.query(
+            HiddenComment.child_id,
+            func.count().label("total"),
+            func.count().filter(HiddenComment.hidden_at >= week_start).label("week")
+        ).filter(HiddenComment.child_id.in_(child_ids)).group_by(HiddenComment.child_id)}
+
+        recent_videos = group_by_child(newest_per_group(
+            db.query(TrackedVideo).filter(TrackedVideo.child_id.in_(child_ids)),
+            TrackedVideo.child_id, TrackedVideo.watched_at, TrackedVideo.id, DASHBOARD_RECENT_ITEMS
+        ))
+        recent_comments = group_by_child(newest_per_group(
+            db.query(HiddenComment).filter(HiddenComment.child_id.in_(child_ids)),
+            HiddenComment.child_id, HiddenComment.hidden_at, HiddenComment.id, DASHBOARD_RECENT_ITEMS
+        ))
+
+    summaries = []
+    for child in children:
+        today_usage = usage[child.id]
+        total_seconds = sum(item["seconds"] for item in today_usage["usage"])
+        daily_limit = daily_limits.get(child.id)
+        rollup = {}
+        for item in today_usage["usage"]:
+            for suffix in domain_suffixes(item["domain"]):
+                rollup[suffix] = rollup.get(suffix, 0) + item["seconds"]
+
+        profile = profiles.get(child.id)
+        behavior = None
+        if profile:
+            categories = json.loads(profile.categories_json or "{}")
+            behavior = {
+                "total_videos": profile.total_videos_watched,
+                "total_watch_time_minutes": round((profile.total_watch_time_seconds or 0) / 60, 1),
+                "days_tracked": profile.days_tracked,
+                "top_categories": dict(sorted(categories.items(), key=lambda x: x[1], reverse=True)[:3]),
+                "profile_available": (profile.days_tracked or 0) >= 7
+            }
+
+        video_counts = videos.get(child.id)
+        comment_counts = comments.get(child.id)
+        summaries.append({
+            "id": child.id,
+            "name": child.name,
+            "device_id": child.device_id,
+            "device_name": child.device_name,
+            "is_active": child.is_active,
+            "last_activity": child.last_activity.isoformat() if child.last_activity else None,
+            "created_at": child.created_at.isoformat(),
+            "today": {
+                "day": today_usage["day"],
+                "total_seconds": total_seconds,
+                "daily_limit_minutes": daily_limit,
+                "remaining_minutes": max(0, daily_limit - total_seconds // 60) if daily_limit else None,
+                "usage": today_usage["usage"]
+            },
+            "limits": [
+                {
+                    "id": rule.id,
+                    "domain": rule.domain,
+                    "daily_limit_minutes": rule.daily_limit_minutes,
+                    "cooldown_hours": rule.cooldown_hours,
+                    "permanent_block": rule.permanent_block,
+                    "blocked_until": rule.blocked_until.isoformat() if rule.blocked_until else None,
+                    "used_seconds": rollup.get(normalize_domain(rule.domain), 0)
+                }
+                for rule in limits.get(child.id, [])
+            ],
+            "blocklist": [{"domain": site.domain, "category": site.category} for site in blocked.get(child.id, [])],
+            "allowlist": [{"domain": site.domain} for site in allowed.get(child.id, [])],
+            "behavior": behavior,
+            "recent_videos": [
+                {
+                    "title": video.title,
+                    "uploader": video.uploader,
+                    "duration_seconds": video.duration_seconds,
+                    "categories": json.loads(video.categories_json) if video.categories_json else ["general"],
+                    "watched_at": video.watched_at.isoformat(),
+                    "url": video.url
+                }
+                for video in recent_videos.get(child.id, [])
+            ],
+            "hidden_comments": {
+                "total": (comment_counts.total if comment_counts else 0) + cold_archive.count(HiddenComment, child.id),
+                "recent": [
+                    {
+                        "id": comment.id,
+                        "post_url": comment.post_url or "unknown",
+                        "post_title": comment.post_title or "Facebook Post",
+                        "domain": comment.domain,
+                        "text": comment.comment_text,
+                        "reason": comment.reason,
+                        "severity": comment.severity,
+                        "hidden_at": comment.hidden_at.isoformat()
+                    }
+                    for comment in recent_comments.get(child.id, [])
+                ]
+            },
+            "week": {
+                "week_start": week_start.date().isoformat(),
+                "total_videos": video_counts.week if video_counts else 0,
+                "total_duration_minutes": int(video_counts.week_seconds) // 60 if video_counts else 0,
+                "flagged_videos": video_counts.week_flagged if video_counts else 0,
+                "comments_hidden": comment_counts.week if comment_counts else 0
+            },
+            "videos_tracked": video_counts.total if video_counts else 0
+        })
+
+    return {
+        "status": "success",
+        "parent": {
+            "id": parent.id,
+            "email": parent.email,
+            "full_name": parent.full_name,
+            "children_count": len(children),
+            "videos_tracked": sum(child["videos_tracked"] for child in summaries),
+            "created_at": parent.created_at.isoformat()
+        },
+        "children": summaries,
+        "generated_at": now.isoformat()
+    }
+
+
+@app.get("/api/dashboard")
+async def get_dashboard(
+    parent_id: str = Depends(get_current_parent),
+    db=Depends(get_db)
+):
+    """
+    Everything the parent dashboard shows, for all children, in one response
+
+    Per child: today's usage and limits, block/allow lists, behavior stats,
+    recent videos, hidden comments and this week's counts. Cached per parent
+    for DASHBOARD_CACHE_TTL_SECONDS; writes to the parent or a child drop it
+    """
+    cached = dashboard_cache.get(parent_id)
+    metrics.inc("dashboard_cache_lookups_total", ("hit" if cached is not None else "miss",))
+    if cached is not None:
+        return cached
+
+    token = dashboard_cache.begin(parent_id)
+    data = build_dashboard(db, parent_id)
+    dashboard_cache.put(parent_id, token, [child["id"] for child in data["children"]], data)
+    return data
+
+
+# ════════════════════════════════
+# CONDITIONAL GETS
+# ════════════════════════════════
+
+def check_revision(request: Request, db, child_id: str, parent_id: str, resource: str):
+    """
+    Ownership check and the resource's revision in one query
+    Returns (child name, ETag, 304 response or None); 404 for another parent's child
+    """
+    row = db.query(Child.name, PolicyRevision.revision).outerjoin(
+        PolicyRevision,
+        and_(PolicyRevision.child_id == Child.id, PolicyRevision.resource == resource)
+    ).filter(
+        Child.id == child_id,
+        Child.parent_id == parent_id
+    ).first()
     
-    return {
-        "status": "success",
-        "parent": {
-            "id": parent.id,
-            "email": parent.email,
-            "full_name": parent.full_name,
-            "children_count": children_count,
-            "videos_tracked": videos_count,
-            "created_at": parent.created_at.isoformat(),
-            "last_login": parent.last_login.isoformat() if parent.last_login else None
-        }
-    }
+    if not row:
+        raise HTTPException(status_code=404, detail="Child not found")
+    
+    tag = policy_revisions.etag(resource, row.revision)
+    if etag_matches(request.headers.get("if-none-match"), tag):
+        metrics.inc("conditional_get_total", (resource, "not_modified"))
+        return row.name, tag, Response(
+            status_code=304, headers={"ETag": tag, "Cache-Control": policy_revisions.CACHE_CONTROL}
+        )
+    metrics.inc("conditional_get_total", (resource, "full"))
+    return row.name, tag, None
+
+
+def revisioned_response(tag: str, content: dict) -> Response:
+    """JSON response carrying the ETag it was built under"""
+    return Response(
+        dumps(content), media_type=JSON_MEDIA_TYPE,
+        headers={"ETag": tag, "Cache-Control": policy_revisions.CACHE_CONTROL}
+    )
+
+
+def bump_revision(db, child_id: str, *resources: str):
+    """Version a write to a child's polled resources; call before its commit"""
+    policy_revisions.bump(db, PolicyRevision.__table__, child_id, *resources)
 
 
 # ════════════════════════════════
@@ -1296,25 +2357,21 @@ async def get_profile(
 @app.get("/api/blocklist/{child_id}")
 async def get_blocklist(
     child_id: str,
+    request: Request,
     parent_id: str = Depends(get_current_parent),
     db=Depends(get_db)
 ):
-    """Get blocked sites for a child"""
-    # Verify child belongs to parent
-    child = db.query(Child).filter(
-        Child.id == child_id,
-        Child.parent_id == parent_id
-    ).first()
-    
-    if not child:
-        raise HTTPException(status_code=404, detail="Child not found")
+    """Get blocked sites for a child (ETag; 304 when If-None-Match matches)"""
+    _, tag, not_modified = check_revision(request, db, child_id, parent_id, policy_revisions.BLOCKLIST)
+    if not_modified is not None:
+        return not_modified
     
     blocked = db.query(BlockedSite).filter(BlockedSite.child_id == child_id).all()
     
-    return {
+    return revisioned_response(tag, {
         "status": "success",
         "blocklist": [{"domain": site.domain, "category": site.category} for site in blocked]
-    }
+    })
 
 
 @app.post("/api/blocklist/{child_id}")
@@ -1341,7 +2398,9 @@ async def add_blocked_site(
         category=data.get("category", "Custom")
     )
     db.add(site)
+    bump_revision(db, child_id, policy_revisions.BLOCKLIST)
     db.commit()
+    dashboard_cache.invalidate(parent_id)
     
     return {"status": "success", "success": True, "message": "Site blocked"}
 
@@ -1349,25 +2408,21 @@ async def add_blocked_site(
 @app.get("/api/allowlist/{child_id}")
 async def get_allowlist(
     child_id: str,
+    request: Request,
     parent_id: str = Depends(get_current_parent),
     db=Depends(get_db)
 ):
-    """Get allowed sites for a child"""
-    # Verify child belongs to parent
-    child = db.query(Child).filter(
-        Child.id == child_id,
-        Child.parent_id == parent_id
-    ).first()
-    
-    if not child:
-        raise HTTPException(status_code=404, detail="Child not found")
+    """Get allowed sites for a child (ETag; 304 when If-None-Match matches)"""
+    _, tag, not_modified = check_revision(request, db, child_id, parent_id, policy_revisions.ALLOWLIST)
+    if not_modified is not None:
+        return not_modified
     
     allowed = db.query(AllowedSite).filter(AllowedSite.child_id == child_id).all()
     
-    return {
+    return revisioned_response(tag, {
         "status": "success",
         "allowlist": [{"domain": site.domain} for site in allowed]
-    }
+    })
 
 
 @app.post("/api/allowlist/{child_id}")
@@ -1393,7 +2448,9 @@ async def add_allowed_site(
         domain=data.get("domain", "")
     )
     db.add(site)
+    bump_revision(db, child_id, policy_revisions.ALLOWLIST)
     db.commit()
+    dashboard_cache.invalidate(parent_id)
     
     return {"status": "success", "message": "Site allowed"}
 
@@ -1462,19 +2519,20 @@ async def analyze_comment(data: dict):
     # Use Groq API for deeper analysis if API key available
     if GROQ_API_KEY:
         try:
-            groq_client = Groq(api_key=GROQ_API_KEY)
-            response = groq_client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[{
-                    "role": "system",
-                    "content": "You are a content moderation AI. Analyze if the comment is toxic, offensive, hateful, violent, or inappropriate for children. Respond with ONLY 'SAFE' or 'TOXIC: brief reason' (one line)."
-                }, {
-                    "role": "user",
-                    "content": f"Analyze this comment: {comment_text}"
-                }],
-                max_tokens=50,
-                temperature=0.1
-            )
+            groq_client = get_groq_client()
+            with metrics.timer("groq_request_duration_seconds"):
+                response = groq_client.chat.completions.create(
+                    model="llama-3.1-8b-instant",
+                    messages=[{
+                        "role": "system",
+                        "content": "You are a content moderation AI. Analyze if the comment is toxic, offensive, hateful, violent, or inappropriate for children. Respond with ONLY 'SAFE' or 'TOXIC: brief reason' (one line)."
+                    }, {
+                        "role": "user",
+                        "content": f"Analyze this comment: {comment_text}"
+                    }],
+                    max_tokens=50,
+                    temperature=0.1
+                )
             
             result = response.choices[0].message.content.strip()
             
@@ -1548,8 +2606,10 @@ async def track_video_url(request: Request, db=Depends(get_db)):
                     'skip_download': True  # Don't download, just extract info
                 }
                 
+                yt_dlp = load_yt_dlp()
                 with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    return ydl.extract_info(url, download=False)
+                    with metrics.timer("ytdlp_extract_duration_seconds"):
+                        return ydl.extract_info(url, download=False)
             
             info = await loop.run_in_executor(None, extract_info)
             
@@ -1616,25 +2676,8 @@ async def track_video_url(request: Request, db=Depends(get_db)):
         return {"status": "error", "message": str(e)}
 
 
-@app.get("/api/behavior-profile/{child_id}")
-async def get_behavior_profile(
-    child_id: str,
-    parent_id: str = Depends(get_current_parent),
-    db=Depends(get_db)
-):
-    """
-    Get detailed behavior profile for a child
-    Profile is available after 7 days of tracking
-    """
-    # Verify child belongs to parent
-    child = db.query(Child).filter(
-        Child.id == child_id,
-        Child.parent_id == parent_id
-    ).first()
-    
-    if not child:
-        raise HTTPException(status_code=404, detail="Child not found")
-    
+def build_behavior_profile(db, child_id: str) -> dict:
+    """Behavior profile of a child, generated on the first read after 7 days of tracking"""
     # Get behavior profile
     profile = db.query(UserBehaviorProfile).filter(
         UserBehaviorProfile.child_id == child_id
@@ -1675,6 +2718,30 @@ async def get_behavior_profile(
     }
 
 
+@app.get("/api/behavior-profile/{child_id}")
+async def get_behavior_profile(
+    child_id: str,
+    parent_id: str = Depends(get_current_parent),
+    db=Depends(get_db)
+):
+    """
+    Get detailed behavior profile for a child
+    Profile is available after 7 days of tracking
+    """
+    # Verify child belongs to parent
+    child = db.query(Child).filter(
+        Child.id == child_id,
+        Child.parent_id == parent_id
+    ).first()
+    
+    if not child:
+        raise HTTPException(status_code=404, detail="Child not found")
+    
+    return await read_flights.run(
+        "behavior_profile", (parent_id, child_id), in_session, build_behavior_profile, child_id
+    )
+
+
 @app.get("/api/behavior-stats/{child_id}")
 async def get_behavior_stats(
     child_id: str,
@@ -1776,30 +2843,8 @@ async def get_recent_videos(
 # WEEKLY REPORT ENDPOINTS
 # ════════════════════════════════
 
-@app.get("/api/reports/weekly/{child_id}")
-async def get_weekly_report(
-    child_id: str,
-    parent_id: str = Depends(get_current_parent),
-    db=Depends(get_db)
-):
-    """
-    Get weekly activity report for a specific child
-    
-    Shows:
-    - Videos watched
-    - Total watch time
-    - Safety metrics (flagged content, hidden comments)
-    - AI-generated summary and recommendations
-    """
-    # Verify child belongs to parent
-    child = db.query(Child).filter(
-        Child.id == child_id,
-        Child.parent_id == parent_id
-    ).first()
-    
-    if not child:
-        raise HTTPException(status_code=404, detail="Child not found")
-    
+def build_weekly_report(db, child_id: str, child_name: str) -> dict:
+    """This week's activity report for a child"""
     # Calculate current week (Monday to Sunday)
     today = datetime.utcnow().date()
     week_start = today - timedelta(days=today.weekday())
@@ -1821,10 +2866,12 @@ async def get_weekly_report(
     
     # Count safety metrics
     flagged_count = sum(1 for v in videos if v.content_rating == "warning")
-    blocked_comments = sum(1 for log in db.query(ActivityLog).filter(
-        ActivityLog.child_id == child_id,
-        ActivityLog.recorded_at >= week_start_dt
-    ).all() if log.comments_hidden > 0)
+    logs = log_partitions.source(ActivityLog, week_start_dt)
+    blocked_comments = db.query(func.count(logs.id)).filter(
+        logs.child_id == child_id,
+        logs.recorded_at >= week_start_dt,
+        logs.comments_hidden > 0
+    ).scalar()
     
     # Prepare video list for parent
     video_list = []
@@ -1845,7 +2892,7 @@ async def get_weekly_report(
     return {
         "status": "success",
         "report": {
-            "child_name": child.name,
+            "child_name": child_name,
             "week_start": week_start.isoformat(),
             "week_end": week_end.isoformat(),
             "total_videos": total_videos,
@@ -1859,16 +2906,20 @@ async def get_weekly_report(
     }
 
 
-@app.get("/api/reports/all/{child_id}")
-async def get_all_reports(
+@app.get("/api/reports/weekly/{child_id}")
+async def get_weekly_report(
     child_id: str,
     parent_id: str = Depends(get_current_parent),
     db=Depends(get_db)
 ):
     """
-    Get all historical reports for a child
+    Get weekly activity report for a specific child
     
-    Shows trends over time
+    Shows:
+    - Videos watched
+    - Total watch time
+    - Safety metrics (flagged content, hidden comments)
+    - AI-generated summary and recommendations
     """
     # Verify child belongs to parent
     child = db.query(Child).filter(
@@ -1879,6 +2930,27 @@ async def get_all_reports(
     if not child:
         raise HTTPException(status_code=404, detail="Child not found")
     
+    return await read_flights.run(
+        "weekly_report", (parent_id, child_id), in_session, build_weekly_report, child_id, child.name
+    )
+
+
+@app.get("/api/reports/all/{child_id}")
+async def get_all_reports(
+    child_id: str,
+    request: Request,
+    parent_id: str = Depends(get_current_parent),
+    db=Depends(get_db)
+):
+    """
+    Get all historical reports for a child
+    
+    Shows trends over time. ETag; 304 when If-None-Match matches
+    """
+    child_name, tag, not_modified = check_revision(request, db, child_id, parent_id, policy_revisions.REPORTS)
+    if not_modified is not None:
+        return not_modified
+    
     # Get all reports
     reports = db.query(WeeklyReport).filter(
         WeeklyReport.child_id == child_id
@@ -1899,12 +2971,12 @@ async def get_all_reports(
             "generated_at": report.generated_at.isoformat()
         })
     
-    return {
+    return revisioned_response(tag, {
         "status": "success",
-        "child_name": child.name,
+        "child_name": child_name,
         "total_reports": len(result),
         "reports": result
-    }
+    })
 
 
 # ════════════════════════════════
@@ -1937,6 +3009,7 @@ async def register_device(
         existing.last_heartbeat = datetime.utcnow()
         existing.is_active = True
         db.commit()
+        presence.mark_known(device_id)
         return {"status": "success", "message": "Device updated", "device_id": existing.id}
     
     # Create new device
@@ -1948,6 +3021,7 @@ async def register_device(
     )
     db.add(device)
     db.commit()
+    presence.mark_known(device_id)
     
     return {"status": "success", "message": "Device registered", "device_id": device.id}
 
@@ -1955,34 +3029,171 @@ async def register_device(
 @app.post("/api/devices/{device_id}/heartbeat")
 async def device_heartbeat(
     device_id: str,
-    parent_id: str = Depends(get_current_parent),
-    db=Depends(get_db)
+    parent_id: str = Depends(get_token_parent)
 ):
-    """Update device heartbeat"""
-    device = db.query(Device).filter(Device.device_id == device_id).first()
-    
-    if not device:
-        return {"status": "success", "message": "Device not found, ignored"}
+    """
+    Update device heartbeat
+    Recorded in memory and written to the database by the periodic bulk flush
+    """
+    if not presence.is_known(device_id):
+        # First heartbeat from this device in this worker: check it exists once
+        db = SessionLocal()
+        try:
+            exists = db.query(Device.id).filter(Device.device_id == device_id).first()
+        finally:
+            db.close()
+        
+        if not exists:
+            return {"status": "success", "message": "Device not found, ignored"}
+        presence.mark_known(device_id)
     
-    device.last_heartbeat = datetime.utcnow()
-    device.is_active = True
-    db.commit()
+    presence.touch(device_id)
     
     return {"status": "success", "message": "Heartbeat updated"}
 
 
+@app.get("/api/devices/offline")
+async def get_offline_devices(
+    minutes: int = 10,
+    parent_id: str = Depends(get_current_parent),
+    db=Depends(get_db)
+):
+    """List the parent's devices that have not sent a heartbeat for `minutes`"""
+    devices = find_offline_devices(db, minutes, parent_id)
+    
+    return {
+        "status": "success",
+        "minutes": minutes,
+        "total": len(devices),
+        "devices": [
+            {
+                "id": d.id,
+                "device_id": d.device_id,
+                "device_name": d.device_name,
+                "child_id": d.child_id,
+                "last_heartbeat": d.last_heartbeat.isoformat() if d.last_heartbeat else None
+            }
+            for d in devices
+        ]
+    }
+
+
 # ════════════════════════════════
 # USAGE & LIMITS ENDPOINTS
 # ════════════════════════════════
 
+def aggregate_usage(db, child_id: str, since_date: datetime, group_by: Optional[List[str]] = None) -> dict:
+    """
+    Aggregate a child's activity logs in the database
+    
+    Per-domain totals come back as plain tuples from one GROUP BY query;
+    an optional breakdown by hour/day/domain is computed the same way
+    (only the log partitions from since_date on are read)
+    """
+    logs = log_partitions.source(ActivityLog, since_date)
+    window = (
+        logs.child_id == child_id,
+        logs.recorded_at >= since_date
+    )
+    # Missing and empty domains both count as "unknown", like the archived rows below
+    domains = interned.domains.table
+    domain_expr = func.lower(func.coalesce(func.nullif(domains.c.value, ""), "unknown"))
+    
+    def usage_query(dimensions):
+        # Grouped on domain_id first and the domains table joined once per group (log.domain
+        # is a subquery per row); ids whose values lower alike are summed again outside
+        buckets = [
+            usage_dimension(d, logs.recorded_at, domain_expr, engine.dialect.name) for d in dimensions if d != "domain"
+        ]
+        grouped = db.query(
+            *buckets, logs.domain_id.label("domain_id"),
+            func.sum(logs.duration_seconds).label("seconds"),
+            func.count().filter(logs.is_flagged == True).label("flagged"),
+            func.count().label("activities")
+        ).filter(*window).group_by(*buckets, logs.domain_id).subquery()
+        dims = [domain_expr.label("domain") if d == "domain" else grouped.c[d] for d in dimensions]
+        query = db.query(
+            *dims,
+            func.coalesce(func.sum(grouped.c.seconds), 0).label("seconds"),
+            func.sum(grouped.c.flagged),
+            func.sum(grouped.c.activities)
+        ).select_from(grouped).outerjoin(domains, domains.c.id == grouped.c.domain_id).group_by(*dims)
+        return query, dims
+    
+    query, _ = usage_query(["domain"])
+    rows = query.order_by(desc("seconds")).all()
+    rows = [(domain, int(seconds), int(flagged), int(count)) for domain, seconds, flagged, count in rows]
+    
+    # Windows reaching past ARCHIVE_AFTER_DAYS also read the archived segments
+    archived = list(cold_archive.scan(
+        ActivityLog, child_id, since_date, columns=("domain", "duration_seconds", "is_flagged", "recorded_at")
+    ))
+    if archived:
+        totals = {domain: [seconds, flagged, count] for domain, seconds, flagged, count in rows}
+        for log in archived:
+            entry = totals.setdefault((log["domain"] or "unknown").lower(), [0, 0, 0])
+            entry[0] += log["duration_seconds"] or 0
+            entry[1] += 1 if log["is_flagged"] else 0
+            entry[2] += 1
+        rows = sorted(((d, *t) for d, t in totals.items()), key=lambda row: row[1], reverse=True)
+    
+    usage_map = {}
+    total_seconds = 0
+    flagged_count = 0
+    activities_count = 0
+    
+    for domain, seconds, flagged, count in rows:
+        usage_map[domain] = int(seconds)
+        total_seconds += int(seconds)
+        flagged_count += flagged
+        activities_count += count
+    
+    result = {
+        "total_seconds": total_seconds,
+        "usage": [{"domain": domain, "seconds": seconds} for domain, seconds in usage_map.items()],
+        "usage_map": usage_map,
+        "flagged_count": flagged_count,
+        "activities_count": activities_count
+    }
+    
+    if group_by:
+        query, dims = usage_query(group_by)
+        breakdown = query.order_by(*dims).all()
+        
+        if archived:
+            cells = {tuple(row[:-3]): [int(row[-3]), row[-2], row[-1]] for row in breakdown}
+            for log in archived:
+                key = tuple(
+                    (log["domain"] or "unknown").lower() if d == "domain" else bucket_label(log["recorded_at"], d)
+                    for d in group_by
+                )
+                cell = cells.setdefault(key, [0, 0, 0])
+                cell[0] += log["duration_seconds"] or 0
+                cell[1] += 1 if log["is_flagged"] else 0
+                cell[2] += 1
+            breakdown = [(*key, *cell) for key, cell in sorted(cells.items())]
+        
+        result["breakdown"] = {
+            "group_by": group_by,
+            "columns": group_by + ["seconds", "flagged", "activities"],
+            "rows": [[*row[:-3], int(row[-3]), int(row[-2]), int(row[-1])] for row in breakdown]
+        }
+    
+    return result
+
+
 @app.get("/api/usage/{child_id}")
 async def get_usage(
     child_id: str,
     days: int = 1,
+    group_by: Optional[str] = None,
     parent_id: str = Depends(get_current_parent),
     db=Depends(get_db)
 ):
-    """Get usage statistics for a child"""
+    """
+    Get usage statistics for a child
+    Optional group_by=hour|day|domain (comma separated) adds a chart-ready breakdown
+    """
     # Verify child belongs to parent
     child = db.query(Child).filter(
         Child.id == child_id,
@@ -1992,58 +3203,35 @@ async def get_usage(
     if not child:
         raise HTTPException(status_code=404, detail="Child not found")
     
-    # Aggregate activity logs from last N days
+    try:
+        dimensions = parse_group_by(group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Aggregate activity logs from last N days; identical concurrent requests share one scan
     since_date = datetime.utcnow() - timedelta(days=days)
-    logs = db.query(ActivityLog).filter(
-        ActivityLog.child_id == child_id,
-        ActivityLog.recorded_at >= since_date
-    ).all()
-
-    usage_map = {}
-    total_seconds = 0
-    flagged_count = 0
-
-    for log in logs:
-        total_seconds += int(log.duration_seconds or 0)
-        if log.is_flagged:
-            flagged_count += 1
-        domain = (log.domain or "unknown").lower()
-        usage_map[domain] = usage_map.get(domain, 0) + int(log.duration_seconds or 0)
-
-    usage_list = [
-        {"domain": domain, "seconds": seconds}
-        for domain, seconds in sorted(usage_map.items(), key=lambda item: item[1], reverse=True)
-    ]
-
-    return {
-        "status": "success",
-        "total_seconds": total_seconds,
-        "usage": usage_list,
-        "usage_map": usage_map,
-        "flagged_count": flagged_count,
-        "activities_count": len(logs)
-    }
+    usage = await read_flights.run(
+        "usage", (parent_id, child_id, days, tuple(dimensions)), in_session, aggregate_usage, child_id, since_date, dimensions
+    )
+    
+    return {"status": "success", **usage}
 
 
 @app.get("/api/limits/{child_id}")
 async def get_limits(
     child_id: str,
+    request: Request,
     parent_id: str = Depends(get_current_parent),
     db=Depends(get_db)
 ):
-    """Get time limits for a child"""
-    # Verify child belongs to parent
-    child = db.query(Child).filter(
-        Child.id == child_id,
-        Child.parent_id == parent_id
-    ).first()
-    
-    if not child:
-        raise HTTPException(status_code=404, detail="Child not found")
+    """Get time limits for a child (ETag; 304 when If-None-Match matches)"""
+    _, tag, not_modified = check_revision(request, db, child_id, parent_id, policy_revisions.LIMITS)
+    if not_modified is not None:
+        return not_modified
     
     limits = db.query(SiteTimeLimit).filter(SiteTimeLimit.child_id == child_id).all()
 
-    return {
+    return revisioned_response(tag, {
         "status": "success",
         "limits": [
             {
@@ -2056,7 +3244,32 @@ async def get_limits(
             }
             for rule in limits
         ]
-    }
+    })
+
+
+@app.get("/api/limits/{child_id}/status")
+async def get_limit_status(
+    child_id: str,
+    domain: Optional[str] = None,
+    parent_id: str = Depends(get_current_parent),
+    db=Depends(get_db)
+):
+    """
+    Today's time budget for a child across all of its devices
+    Minutes used/remaining and blocked-until per rule (or for ?domain= only),
+    resetting at the child's local midnight
+    """
+    child = db.query(Child).filter(
+        Child.id == child_id,
+        Child.parent_id == parent_id
+    ).first()
+    
+    if not child:
+        raise HTTPException(status_code=404, detail="Child not found")
+    
+    ensure_usage_loaded(db, child_id)
+    
+    return {"status": "success", "child_id": child_id, **usage_accounting.status(child_id, domain=domain)}
 
 
 @app.post("/api/limits")
@@ -2108,7 +3321,10 @@ async def set_limits(
         limit.permanent_block = permanent_block
         limit.blocked_until = parse_iso_datetime(blocked_until)
 
+    bump_revision(db, child_id, policy_revisions.LIMITS)
     db.commit()
+    usage_accounting.forget_rules(child_id)
+    dashboard_cache.invalidate(parent_id)
 
     return {"status": "success", "success": True, "message": "Limits updated"}
 
@@ -2135,7 +3351,10 @@ async def delete_limit(
         raise HTTPException(status_code=403, detail="Unauthorized")
 
     db.delete(limit)
+    bump_revision(db, child.id, policy_revisions.LIMITS)
     db.commit()
+    usage_accounting.forget_rules(child.id)
+    dashboard_cache.invalidate(parent_id)
 
     return {"status": "success", "success": True, "message": "Limit deleted"}
 
@@ -2157,7 +3376,7 @@ async def log_activity(
             return {"status": "success", "message": "No child_id provided"}
         
         log = ActivityLog(
-            id=str(uuid.uuid4()),
+            id=uuid7(),
             child_id=child_id,
             activity_type=data.get("type", "unknown"),
             domain=data.get("domain", "unknown"),
@@ -2169,6 +3388,14 @@ async def log_activity(
         db.add(log)
         db.commit()
         
+        # Count against today's shared budget (O(1) after the first event of the day)
+        seconds = int(log.duration_seconds or 0)
+        if seconds > 0:
+            offset = data.get("utc_offset_minutes")
+            offset = int(offset) if offset is not None else None
+            ensure_usage_loaded(db, child_id, offset)
+            usage_accounting.ingest(child_id, log.domain, seconds, utc_offset_minutes=offset)
+        
         return {"status": "success", "message": "Activity logged"}
     except Exception as e:
         print(f"Error logging activity: {e}")
@@ -2206,7 +3433,9 @@ async def add_to_blocklist(
         category=category
     )
     db.add(site)
+    bump_revision(db, child_id, policy_revisions.BLOCKLIST)
     db.commit()
+    dashboard_cache.invalidate(parent_id)
     
     return {"status": "success", "message": "Site blocked"}
 
@@ -2238,7 +3467,9 @@ async def remove_from_blocklist(
         return {"status": "success", "success": True, "message": "Site not found"}
 
     db.delete(site)
+    bump_revision(db, child_id, policy_revisions.BLOCKLIST)
     db.commit()
+    dashboard_cache.invalidate(parent_id)
 
     return {"status": "success", "success": True, "message": "Site removed"}
 
@@ -2268,7 +3499,9 @@ async def add_to_allowlist(
         domain=domain
     )
     db.add(site)
+    bump_revision(db, child_id, policy_revisions.ALLOWLIST)
     db.commit()
+    dashboard_cache.invalidate(parent_id)
     
     return {"status": "success", "success": True, "message": "Site allowed"}
 
@@ -2300,7 +3533,9 @@ async def remove_from_allowlist(
         return {"status": "success", "success": True, "message": "Site not found"}
 
     db.delete(site)
+    bump_revision(db, child_id, policy_revisions.ALLOWLIST)
     db.commit()
+    dashboard_cache.invalidate(parent_id)
 
     return {"status": "success", "success": True, "message": "Site removed"}
 
@@ -2322,7 +3557,7 @@ async def log_hidden_comment(
             return {"status": "success", "message": "No child_id provided"}
         
         comment = HiddenComment(
-            id=str(uuid.uuid4()),
+            id=uuid7(),
             child_id=child_id,
             post_url=data.get("post_url", ""),
             post_title=data.get("post_title", ""),
@@ -2333,6 +3568,15 @@ async def log_hidden_comment(
         )
         db.add(comment)
         db.commit()
+        dashboard_cache.invalidate_child(child_id, lambda ids: child_parents(ids, db))
+        
+        # Severe comments also buzz the parent's ESP32 (queued, never blocks)
+        if esp32_alerts and comment.severity >= 2:
+            child = db.get(Child, child_id)
+            esp32_alerts.submit(
+                "Hate", child.name if child else None,
+                alert_type="hidden_comment", domain=comment.domain
+            )
         
         return {"status": "success", "message": "Comment logged"}
     except Exception as e:
@@ -2340,13 +3584,46 @@ async def log_hidden_comment(
         return {"status": "success", "message": "Comment log ignored"}
 
 
+def serialize_hidden_comment(comment: HiddenComment) -> dict:
+    """Flat representation of a hidden comment for NDJSON exports"""
+    return {
+        "id": comment.id,
+        "post_url": comment.post_url or "unknown",
+        "post_title": comment.post_title or "Facebook Post",
+        "domain": comment.domain,
+        "text": comment.comment_text,
+        "reason": comment.reason,
+        "severity": comment.severity,
+        "hidden_at": comment.hidden_at.isoformat()
+    }
+
+
+def stream_hidden_comments(child_id: str):
+    """Yield every hidden comment of a child as NDJSON using its own DB session"""
+    db = SessionLocal()
+    try:
+        query = db.query(HiddenComment).filter(HiddenComment.child_id == child_id)
+        rows = iter_keyset(
+            query, HiddenComment.hidden_at, HiddenComment.id, older=cold_archive.older(HiddenComment, child_id)
+        )
+        yield from ndjson_lines(rows, serialize_hidden_comment)
+    finally:
+        db.close()
+
+
 @app.get("/api/comments/hidden/{child_id}")
 async def get_hidden_comments(
     child_id: str,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    format: Optional[str] = None,
     parent_id: str = Depends(get_current_parent),
     db=Depends(get_db)
 ):
-    """Get all hidden comments for a child, grouped by post"""
+    """
+    Get hidden comments for a child, grouped by post
+    Paginated newest first with a keyset cursor; format=ndjson streams all comments
+    """
     # Verify child belongs to parent
     child = db.query(Child).filter(
         Child.id == child_id,
@@ -2356,10 +3633,21 @@ async def get_hidden_comments(
     if not child:
         raise HTTPException(status_code=404, detail="Child not found")
     
-    # Get all hidden comments
-    comments = db.query(HiddenComment).filter(
-        HiddenComment.child_id == child_id
-    ).order_by(HiddenComment.hidden_at.desc()).all()
+    if format == "ndjson":
+        return StreamingResponse(stream_hidden_comments(child_id), media_type=NDJSON_MEDIA_TYPE)
+    
+    query = db.query(HiddenComment).filter(HiddenComment.child_id == child_id)
+    
+    # Get one page of hidden comments
+    try:
+        comments, next_cursor = paginate(
+            query, HiddenComment.hidden_at, HiddenComment.id,
+            cursor=cursor,
+            limit=clamp_page_size(limit),
+            older=cold_archive.older(HiddenComment, child_id)
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
     # Group by post_url
     posts_map = {}
@@ -2388,9 +3676,13 @@ async def get_hidden_comments(
     
     return {
         "status": "success",
-        "total_comments": len(comments),
+        # Counted on the first page only: later pages would rescan every comment
+        "total_comments": None if cursor else query.count() + cold_archive.count(HiddenComment, child_id),
         "total_posts": len(posts),
-        "posts": posts
+        "page_comments": len(comments),
+        "posts": posts,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None
     }
 
 
@@ -2416,6 +3708,32 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 # ════════════════════════════════
 
 if __name__ == "__main__":
+    # Explicit schema creation: python backend_final.py migrate
+    if len(sys.argv) > 1 and sys.argv[1] in ("migrate", "init-db"):
+        init_db()
+        print("✅ Database tables created")
+        sys.exit(0)
+    
+    # One-off conversion of existing log tables: LOG_PARTITIONING=monthly python backend_final.py partition
+    if len(sys.argv) > 1 and sys.argv[1] == "partition":
+        if not log_partitions.enabled:
+            print("⚠️  Set LOG_PARTITIONING=monthly to partition the log tables")
+            sys.exit(1)
+        init_db()
+        for table, months in log_partitions.convert().items():
+            print(f"✅ {table}: {months} monthly partitions" if months else f"✅ {table}: already partitioned")
+        log_partitions.maintain()
+        sys.exit(0)
+    
+    # Run the log archiver once: ARCHIVE_AFTER_DAYS=30 python backend_final.py archive
+    if len(sys.argv) > 1 and sys.argv[1] == "archive":
+        if not cold_archive.enabled:
+            print("⚠️  Set ARCHIVE_AFTER_DAYS to archive old logs")
+            sys.exit(1)
+        archive_logs()
+        print(f"✅ Archive: {json.dumps(cold_archive.stats(), default=str)}")
+        sys.exit(0)
+    
     import uvicorn
     print("🚀 Starting SafeGuard Family Backend Server...")
     print("📍 Listening on http://0.0.0.0:8000")
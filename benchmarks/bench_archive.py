@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+SafeGuard Family - Cold Archive Benchmark
+Archives a year of benchmarks/workload.py activity into segment files
+(archive.py) and compares read latency before and after:
+
+  • usage_7d      aggregate_usage() over 7 days, hot rows only
+  • usage_90d     aggregate_usage() over 90 days, spanning the cutoff
+  • usage_365d    aggregate_usage() over the whole year, mostly archived
+  • comments_page one 50-comment page of a child's hidden comments starting
+                  at the archive cutoff (first rows archived)
+
+and reports the archive's compression ratio (rows as JSON text vs segment
+bytes) and how much smaller the hot SQLite file gets.
+
+Usage:
+    python benchmarks/bench_archive.py [--parents 200] [--events 600000] [--after-days 30]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "benchmarks", "results", "archive.json")
+
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+import workload
+
+
+def percentile(sorted_values, q):
+    return round(sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))] * 1000, 3)
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def measure(bf, children, now, cutoff, repeat):
+    from db_utils import encode_cursor, paginate
+
+    def usage(days):
+        return lambda db, child_id: bf.aggregate_usage(db, child_id, now - timedelta(days=days), ["day"])
+
+    def comments_page(db, child_id):
+        query = db.query(bf.HiddenComment).filter(bf.HiddenComment.child_id == child_id)
+        return paginate(
+            query, bf.HiddenComment.hidden_at, bf.HiddenComment.id,
+            cursor=encode_cursor(cutoff + timedelta(days=1), "~"), limit=50,
+            older=bf.cold_archive.older(bf.HiddenComment, child_id)
+        )
+
+    scenarios = {
+        "usage_7d": usage(7), "usage_90d": usage(90), "usage_365d": usage(366), "comments_page": comments_page
+    }
+    report = {}
+    db = bf.SessionLocal()
+    try:
+        for name, operation in scenarios.items():
+            operation(db, children[0])  # warm up: segment footers, statement cache
+            durations = []
+            for _ in range(repeat):
+                for child_id in children:
+                    t0 = time.perf_counter()
+                    operation(db, child_id)
+                    durations.append(time.perf_counter() - t0)
+            durations.sort()
+            report[name] = {"ops": len(durations), "p50_ms": percentile(durations, 0.5), "p99_ms": percentile(durations, 0.99)}
+    finally:
+        db.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cold log archive: compression and read latency")
+    parser.add_argument("--parents", type=int, default=200)
+    parser.add_argument("--events", type=int, default=600000)
+    parser.add_argument("--after-days", type=int, default=30)
+    parser.add_argument("--children", type=int, default=50, help="children sampled per scenario")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="archive_bench_")
+    database = os.path.join(workdir, "archive_bench.db")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{database}", "ARCHIVE_AFTER_DAYS": str(args.after_days),
+        "ARCHIVE_DIR": os.path.join(workdir, "archive"), "ARCHIVE_RETENTION_DAYS": "0",
+        "GROQ_API_KEY": "", "ESP32_ENABLED": "false"
+    })
+    sys.path.insert(0, REPO_ROOT)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import backend_final as bf
+    from sqlalchemy import func, text
+
+    now = datetime.utcnow()
+    cutoff = now - timedelta(days=args.after_days)
+    seed_args = argparse.Namespace(parents=args.parents, events=args.events, seed=7, days=365, chunk=10000)
+    workload.load_fastapi(bf, seed_args, now)
+    rng = random.Random(3)
+    with bf.SessionLocal() as db:
+        # Children with archived comments, so the comments page really crosses into the archive
+        candidates = [c for (c,) in db.query(bf.HiddenComment.child_id).filter(
+            bf.HiddenComment.hidden_at < cutoff).group_by(bf.HiddenComment.child_id).having(func.count() >= 50)]
+    children = rng.sample(candidates, min(args.children, len(candidates)))
+    print(f"Seeded {args.events} events; {len(children)} children sampled")
+
+    hot = measure(bf, children, now, cutoff, args.repeat)
+    print(f"hot:      {json.dumps(hot)}")
+    with bf.engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+    size_before = os.path.getsize(database)
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        archived = bf.cold_archive.run(bf.engine)
+    archive_seconds = time.perf_counter() - started
+    with bf.engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+    size_after = os.path.getsize(database)
+
+    cold = measure(bf, children, now, cutoff, args.repeat)
+    print(f"archived: {json.dumps(cold)}")
+
+    rows = sum(t["rows"] for t in archived.values())
+    raw = sum(t["raw_bytes"] for t in archived.values())
+    stored = sum(t["stored_bytes"] for t in archived.values())
+    summary = {
+        "parents": args.parents, "events": args.events, "after_days": args.after_days,
+        "archived_rows": rows,
+        "archive_seconds": round(archive_seconds, 2),
+        "tables": archived,
+        "json_bytes": raw,
+        "segment_bytes": stored,
+        "compression_ratio": round(raw / max(stored, 1), 2),
+        "hot_db_bytes_before": size_before,
+        "hot_db_bytes_after": size_after,
+        "archive_dir_bytes": directory_size(os.path.join(workdir, "archive")),
+        "latency_all_hot": hot,
+        "latency_with_archive": cold
+    }
+    print(
+        f"Archived {rows} rows in {archive_seconds:.1f}s: {raw / 1e6:.1f} MB as JSON -> {stored / 1e6:.1f} MB "
+        f"({summary['compression_ratio']}x); hot database {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB"
+    )
+
+    report = {
+        "benchmark": "archive",
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {"sqlite": summary}
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+SafeGuard Family - Hidden Comment Body Benchmark
+A viral comment workload: a pool of spam and abusive comments shared across
+children with Zipf popularity (the top few are hidden thousands of times),
+plus a share of one-off comments. The same sightings are loaded into
+hidden_comments twice, once with text, reason and severity on every row (the
+layout before content-addressed bodies) and once through comment_bodies
+(interning.py ContentDictionary), and compared on:
+
+  • table + index bytes: hidden_comments, plus comment_bodies and the URL and
+    domain dictionaries on the new side
+  • bulk load rate, and ORM ingest rate with one sighting per transaction as
+    POST /api/comments/hidden writes them
+
+Usage:
+    python benchmarks/bench_comment_bodies.py [--sightings 500000] [--viral 300] [--one-off 0.2]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "benchmarks", "results", "comment_bodies.json")
+
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+import workload
+from bench_interning import bulk_load, legacy_tables, orm_ingest, table_bytes
+
+REASONS = ["Inappropriate content", "Harassment", "Spam", "Hate speech"]
+SPAM_TAILS = [
+    "Click the link in my bio for free followers!!",
+    "DM me to earn $500 a day from home 💸",
+    "Free robux here 👉 check my profile",
+    "sasto ma iPhone, inbox garnus"
+]
+
+
+def comment_pool(count, rng):
+    """Viral comments: abusive lines and spam, long enough to matter, each with its verdict"""
+    pool = []
+    for n in range(count):
+        parts = rng.sample(workload.ABUSIVE_COMMENTS, 2) + [rng.choice(SPAM_TAILS), f"#{n}"]
+        text = " ".join(parts)
+        digest = hashlib.sha256(text.encode()).digest()
+        pool.append((text, REASONS[digest[0] % len(REASONS)], 1 + digest[1] % 2))
+    return pool
+
+
+def sightings(args, now):
+    rng = random.Random(5)
+    pool = comment_pool(args.viral, rng)
+    ranks = workload.ZipfSampler(len(pool), 1.1)
+    children = [f"child-{c}" for c in range(args.children)]
+    posts = [f"https://www.facebook.com/{rng.randrange(10**9)}/posts/{rng.randrange(10**12)}" for _ in range(args.posts)]
+    start = now - timedelta(days=90)
+    step = timedelta(days=90) / args.sightings
+    for n in range(args.sightings):
+        at = start + step * n
+        if rng.random() < args.one_off:
+            text = " ".join(rng.choices(workload.ABUSIVE_COMMENTS + workload.COMMENTS, k=3)) + f" {rng.randrange(10**9)}"
+            text, reason, severity = text, rng.choice(REASONS), rng.choice((1, 2))
+        else:
+            text, reason, severity = pool[ranks.sample(rng)]
+        yield "hidden", {
+            "id": f"h{n}", "child_id": rng.choice(children), "post_url": rng.choice(posts), "post_title": None,
+            "comment_text": text, "reason": reason, "severity": severity, "domain": "facebook.com", "hidden_at": at
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark content-addressed hidden comment bodies")
+    parser.add_argument("--sightings", type=int, default=500000)
+    parser.add_argument("--viral", type=int, default=300, help="distinct comments in the shared pool")
+    parser.add_argument("--one-off", type=float, default=0.2, help="share of sightings with a never-repeated comment")
+    parser.add_argument("--children", type=int, default=2000)
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--ingest", type=int, default=5000, help="sightings written one transaction at a time")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="comment_bodies_bench_")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'server.db')}", "GROQ_API_KEY": "", "ESP32_ENABLED": "false"
+    })
+    sys.path.insert(0, REPO_ROOT)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import backend_final as bf
+    from sqlalchemy import MetaData, create_engine
+    from sqlalchemy.orm import declarative_base
+
+    now = datetime.utcnow().replace(microsecond=0)
+    rows = list(sightings(args, now))
+    samples = [("hidden", dict(row, id=f"ingest-{n}")) for n, (_, row) in enumerate(rows[-args.ingest:])]
+    name = bf.HiddenComment.__table__.name
+
+    # Text, reason and severity on every row
+    legacy_engine = create_engine(f"sqlite:///{os.path.join(workdir, 'rows.db')}")
+    metadata = MetaData()
+    legacy = legacy_tables([bf.HiddenComment], bf.interned, metadata)[bf.HiddenComment]
+    metadata.create_all(legacy_engine)
+    legacy_load = bulk_load(legacy_engine, {"hidden": legacy}, None, rows)
+    before = table_bytes(legacy_engine, {name})
+    LegacyBase = declarative_base(metadata=metadata)
+    LegacyHidden = type("LegacyHiddenComment", (LegacyBase,), {"__table__": legacy})
+    legacy_ingest = orm_ingest(legacy_engine, None, LegacyHidden, samples)
+
+    # Content-addressed bodies
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bodies.db')}")
+    dictionaries = {d.name: d.table for d in bf.interned.dictionaries}
+    bf.Base.metadata.create_all(engine, tables=[*dictionaries.values(), bf.HiddenComment.__table__])
+    bodies_load = bulk_load(engine, {"hidden": bf.HiddenComment.__table__}, bf.interned, rows)
+    after = table_bytes(engine, {name} | set(dictionaries))
+    with engine.connect() as conn:
+        distinct = conn.exec_driver_sql(f"SELECT COUNT(*) FROM {bf.comment_bodies.name}").scalar()
+    bodies_ingest = orm_ingest(engine, None, bf.HiddenComment, samples)
+
+    total_before = sum(before[name].values())
+    total_after = sum(sum(sizes.values()) for sizes in after.values())
+    summary = {
+        "sightings": args.sightings, "viral_pool": args.viral, "one_off_share": args.one_off,
+        "distinct_bodies": distinct,
+        "before": before, "after": after,
+        "total_bytes": {"before": total_before, "after": total_after, "ratio": round(total_before / total_after, 2)},
+        "bulk_load": {"before": legacy_load, "after": bodies_load},
+        "orm_ingest": {"before": legacy_ingest, "after": bodies_ingest}
+    }
+    print(f"{args.sightings:,} sightings, {distinct:,} distinct bodies")
+    for table, sizes in after.items():
+        was = f"{sum(before[table].values()) / 1e6:7.1f} MB" if table in before else f"{'':10s}"
+        print(f"{table:16s} {was} -> {sum(sizes.values()) / 1e6:7.1f} MB")
+    print(f"{'total':16s} {total_before / 1e6:7.1f} MB -> {total_after / 1e6:7.1f} MB ({summary['total_bytes']['ratio']}x)")
+    print(f"bulk load  {legacy_load['rows_per_s']:,} -> {bodies_load['rows_per_s']:,} rows/s")
+    print(f"ORM ingest {legacy_ingest['events_per_s']:,} -> {bodies_ingest['events_per_s']:,} sightings/s")
+
+    report = {
+        "benchmark": "comment_bodies",
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {"sqlite": summary}
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+SafeGuard Family - Extension-Removal Deadline Benchmark
+DeadlineWheel (alerts.py) at 1M devices on one node:
+
+  • arm          first heartbeat of every device, spread over a minute
+  • reschedule   heartbeats/second pushing deadlines back (1s ticks running)
+  • idle tick    cost of advance() when nothing is due
+  • expiry       1% of devices go silent; all of them, and only them, expire
+  • memory       tracemalloc size of a fully armed wheel
+
+Usage:
+    python benchmarks/bench_deadlines.py [--devices 1000000] [--timeout 600]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "benchmarks", "results", "deadlines.json")
+sys.path.insert(0, REPO_ROOT)
+
+from alerts import DeadlineWheel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the extension-removal deadline wheel")
+    parser.add_argument("--devices", type=int, default=1_000_000)
+    parser.add_argument("--timeout", type=int, default=600)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    device_ids = [f"device-{n:07d}" for n in range(args.devices)]
+    start = 1_000_000.0
+    results = {"devices": args.devices, "timeout_seconds": args.timeout}
+
+    # Memory of a fully armed wheel (measured on its own; tracemalloc slows everything)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    wheel = DeadlineWheel(timeout=args.timeout, resolution=1.0, max_entries=args.devices)
+    wheel._tick = int(start)
+    for device_id in device_ids:
+        wheel.schedule(device_id, start)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results["memory_mb"] = round((current - before) / 1e6, 1)
+    results["bytes_per_device"] = round((current - before) / args.devices)
+    del wheel
+
+    wheel = DeadlineWheel(timeout=args.timeout, resolution=1.0, max_entries=args.devices)
+    wheel._tick = int(start)
+
+    def heartbeat_minute(devices, minute_start):
+        """Deliver one heartbeat per device spread over a minute, ticking every second"""
+        per_second = -(-len(devices) // 60)
+        expired = []
+        for second in range(60):
+            expired.extend(wheel.advance(minute_start + second))
+            for device_id in devices[second * per_second:(second + 1) * per_second]:
+                wheel.schedule(device_id, minute_start + second)
+        return expired
+
+    began = time.perf_counter()
+    heartbeat_minute(device_ids, start)
+    results["arm_seconds"] = round(time.perf_counter() - began, 3)
+
+    # Every device heartbeats again the next minute, in random order
+    order = random.Random(0).sample(device_ids, len(device_ids))
+    began = time.perf_counter()
+    heartbeat_minute(order, start + 60)
+    results["reschedule_per_s"] = round(len(order) / (time.perf_counter() - began))
+
+    # A tick with nothing due
+    began = time.perf_counter()
+    wheel.advance(start + 120)
+    results["idle_tick_ms"] = round((time.perf_counter() - began) * 1000, 3)
+
+    # 1% of devices go silent; the rest keep heartbeating every minute
+    silent = set(device_ids[:args.devices // 100])
+    alive = [d for d in order if d not in silent]
+    expired = []
+    tick_times = []
+    minute = start + 120
+    while minute < start + 120 + args.timeout + 120:
+        began = time.perf_counter()
+        expired.extend(heartbeat_minute(alive, minute))
+        tick_times.append(time.perf_counter() - began)
+        minute += 60
+    results["expired"] = len(expired)
+    results["expired_all_silent"] = set(expired) == silent
+    results["heartbeats_plus_ticks_per_minute_seconds"] = round(sum(tick_times) / len(tick_times), 3)
+    results["remaining"] = len(wheel)
+
+    report = {
+        "benchmark": "deadlines",
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
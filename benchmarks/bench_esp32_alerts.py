@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+SafeGuard Family - ESP32 Alert Latency Benchmark
+A burst of blocked-site events (1,000/s by default) against the fake ESP32
+device (esp32/fake_esp32.py), which takes `--device-delay` to answer like
+the real buzzer sequence.
+
+  • naive        one blocking POST per event inside the request handler
+  • dispatcher   Esp32Dispatcher: queue, coalesce, rate limit, pooled client
+
+Reports how long a request handler is held per event, alert latency
+(event submitted -> ESP32 answered), POSTs sent and whether every event is
+accounted for in the alert counts.
+
+Usage:
+    python benchmarks/bench_esp32_alerts.py [--rate 1000] [--seconds 5]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "benchmarks", "results", "esp32_alerts.json")
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "esp32"))
+
+import requests
+
+from esp32_dispatcher import Esp32Dispatcher
+from fake_esp32 import FakeEsp32
+
+CATEGORIES = ("Adult", "Violence", "Gambling")
+
+
+def percentiles(samples, scale=1000.0):
+    """p50/p99/max of `samples` (seconds) in milliseconds"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(ordered) * scale, 3),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * scale, 3),
+        "max_ms": round(ordered[-1] * scale, 3)
+    }
+
+
+def naive(fake, events):
+    """What a handler pays for a synchronous per-event POST"""
+    held = []
+    with requests.Session() as session:
+        for category, child in events:
+            began = time.perf_counter()
+            session.post(fake.alert_url, json={"type": "blocked_site", "category": category, "childName": child}, timeout=10)
+            held.append(time.perf_counter() - began)
+    return {
+        "events": len(events),
+        "handler_held": percentiles(held),
+        "max_events_per_s": round(len(held) / sum(held))
+    }
+
+
+def dispatcher_burst(fake, rate, seconds, children, interval):
+    dispatcher = Esp32Dispatcher([fake.alert_url], interval=interval)
+    dispatcher.start()
+
+    total = int(rate * seconds)
+    held = []
+    began = time.perf_counter()
+    for n in range(total):
+        # Pace the burst at `rate` events per second
+        target = began + n / rate
+        while time.perf_counter() < target:
+            pass
+        category = CATEGORIES[n % len(CATEGORIES)]
+        child = f"Child {n % children}"
+        t0 = time.perf_counter()
+        dispatcher.submit(category, child)
+        held.append(time.perf_counter() - t0)
+    burst_seconds = time.perf_counter() - began
+
+    dispatcher.wait_idle(timeout=600)
+    drained_seconds = time.perf_counter() - began
+    dispatcher.close()
+
+    counted = sum(payload["count"] for _, payload in fake.alerts)
+    first_alert = min(at for at, _ in fake.alerts) - began if fake.alerts else None
+    return {
+        "events": total,
+        "burst_seconds": round(burst_seconds, 3),
+        "drained_seconds": round(drained_seconds, 3),
+        "handler_held": percentiles(held),
+        "alert_latency": percentiles(list(dispatcher.latencies)),
+        "first_alert_ms": round(first_alert * 1000, 3) if first_alert is not None else None,
+        "posts_sent": len(fake.alerts),
+        "events_counted": counted,
+        "no_events_lost": counted == total,
+        "connections": fake.connections,
+        "stats": dict(dispatcher.stats)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ESP32 alert dispatch under a burst")
+    parser.add_argument("--rate", type=int, default=1000, help="events per second")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--children", type=int, default=4)
+    parser.add_argument("--interval", type=float, default=0.5, help="per-device alert interval")
+    parser.add_argument("--device-delay", type=float, default=0.05, help="seconds the fake ESP32 takes per alert")
+    parser.add_argument("--naive-events", type=int, default=100)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    results = {
+        "rate": args.rate,
+        "seconds": args.seconds,
+        "children": args.children,
+        "categories": len(CATEGORIES),
+        "interval": args.interval,
+        "device_delay": args.device_delay
+    }
+
+    events = [(CATEGORIES[n % len(CATEGORIES)], f"Child {n % args.children}") for n in range(args.naive_events)]
+    with FakeEsp32(delay=args.device_delay) as fake:
+        results["naive"] = naive(fake, events)
+
+    with FakeEsp32(delay=args.device_delay) as fake:
+        results["dispatcher"] = dispatcher_burst(fake, args.rate, args.seconds, args.children, args.interval)
+
+    report = {
+        "benchmark": "esp32_alerts",
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+SafeGuard Family - Heartbeat Throughput Benchmark
+Sustained heartbeats/second for one worker:
+
+  • db_per_heartbeat   previous path: query Device, UPDATE, COMMIT per heartbeat
+  • presence_touch     in-memory PresenceTracker.touch()
+  • presence_flush     one bulk UPDATE of every device's pending heartbeat
+  • http_fastapi       POST /api/devices/{id}/heartbeat through backend_final.py
+  • http_flask         POST /api/devices/<id>/heartbeat through app.py
+
+Usage:
+    python benchmarks/bench_heartbeat.py [--devices 2000] [--seconds 3]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "benchmarks", "results", "heartbeat.json")
+
+
+def rate(fn, device_ids, seconds):
+    """Call fn(device_id) round-robin for `seconds`; returns calls per second"""
+    calls = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for device_id in device_ids[:100]:
+            fn(device_id)
+        calls += 100
+        device_ids = device_ids[100:] + device_ids[:100]
+    return round(calls / (time.perf_counter() - started))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark heartbeat handling per worker")
+    parser.add_argument("--devices", type=int, default=2000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="heartbeat-bench-")
+    os.chdir(workdir)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'fastapi.db')}"
+    os.environ["database_url"] = f"sqlite:///{os.path.join(workdir, 'flask.db')}"
+    sys.path.insert(0, REPO_ROOT)
+
+    import backend_final as bf
+    import app as fs
+    from fastapi.testclient import TestClient
+
+    device_ids = [f"device-{n}" for n in range(args.devices)]
+
+    db = bf.SessionLocal()
+    db.add(bf.Parent(id="p", email="p@example.com", password_hash="x", full_name="Parent"))
+    db.add(bf.Child(id="c", parent_id="p", name="Kid", device_id="d"))
+    db.execute(bf.Device.__table__.insert(), [
+        {"id": f"id-{d}", "child_id": "c", "device_id": d, "device_name": "Laptop", "is_active": True,
+         "last_heartbeat": datetime.utcnow()}
+        for d in device_ids
+    ])
+    db.commit()
+    db.close()
+
+    with fs.app.app_context():
+        fs.db.create_all()
+        fs.db.session.add(fs.Parent(id="p", email="p@example.com", password_hash="x"))
+        fs.db.session.add(fs.Child(id="c", parent_id="p", name="Kid"))
+        fs.db.session.execute(fs.Device.__table__.insert(), [
+            {"id": d, "child_id": "c", "device_name": "Laptop", "last_sync": datetime.utcnow()}
+            for d in device_ids
+        ])
+        fs.db.session.commit()
+
+    results = {"devices": args.devices}
+
+    def db_per_heartbeat(device_id):
+        session = bf.SessionLocal()
+        device = session.query(bf.Device).filter(bf.Device.device_id == device_id).first()
+        device.last_heartbeat = datetime.utcnow()
+        device.is_active = True
+        session.commit()
+        session.close()
+
+    results["db_per_heartbeat_per_s"] = rate(db_per_heartbeat, device_ids, args.seconds)
+    results["presence_touch_per_s"] = rate(bf.presence.touch, device_ids, args.seconds)
+
+    for device_id in device_ids:
+        bf.presence.touch(device_id)
+    started = time.perf_counter()
+    flushed = bf.flush_heartbeats()
+    results["presence_flush"] = {"rows": flushed, "seconds": round(time.perf_counter() - started, 4)}
+
+    token, _ = bf.create_jwt_token("p")
+    headers = {"Authorization": f"Bearer {token}"}
+    with TestClient(bf.app) as client:
+        results["http_fastapi_per_s"] = rate(
+            lambda d: client.post(f"/api/devices/{d}/heartbeat", headers=headers), device_ids, args.seconds
+        )
+
+    flask_client = fs.app.test_client()
+    results["http_flask_per_s"] = rate(
+        lambda d: flask_client.post(f"/api/devices/{d}/heartbeat"), device_ids, args.seconds
+    )
+
+    report = {
+        "benchmark": "heartbeat",
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+SafeGuard Family - Log Id Scheme Benchmark
+Appends the same time-ordered log rows to one SQLite table per id scheme:
+
+  • uuid4_text     str(uuid4()) in a text primary key (the log tables before
+                   compact_ids.py)
+  • uuid7_text     time-ordered ids, still as 36 characters
+  • uuid7_compact  time-ordered ids as 16 bytes (CompactId, the log tables now)
+  • integer        INTEGER PRIMARY KEY, the floor: no separate key index at all
+
+Each table has the (child_id, ts, id) listing index of the real log tables.
+Reports ingest rate for the first and last tenth of the load (random keys
+slow down as the index outgrows the page cache), table and index bytes
+(SQLite dbstat), and p50/p99 of point lookups by id and of one 50-row
+listing page.
+
+Usage:
+    python benchmarks/bench_ids.py [--rows 2000000] [--batch 1000] [--lookups 20000]
+
+--rows 100000000 is the 100M-row run; expect hours and ~30 GB of disk.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "benchmarks", "results", "ids.json")
+
+sys.path.insert(0, REPO_ROOT)
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, create_engine, literal_column, select
+
+from compact_ids import CompactId, uuid7
+
+CHILDREN = 1000
+SLICES = 10
+
+
+def percentile(sorted_values, q):
+    return round(sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))] * 1000, 4)
+
+
+SCHEMES = {
+    "uuid4_text": (String, lambda at: str(uuid.uuid4())),
+    "uuid7_text": (String, uuid7),
+    "uuid7_compact": (CompactId, uuid7),
+    "integer": (Integer, None)
+}
+
+
+def log_table(id_type):
+    metadata = MetaData()
+    table = Table(
+        "logs", metadata,
+        Column("id", id_type, primary_key=True),
+        Column("child_id", String, nullable=False),
+        Column("domain_id", Integer),
+        Column("duration", Integer),
+        Column("ts", DateTime, nullable=False)
+    )
+    Index("ix_logs_child_ts", table.c.child_id, table.c.ts, table.c.id)
+    return metadata, table
+
+
+def table_bytes(engine):
+    with engine.connect() as conn:
+        sizes = dict(conn.exec_driver_sql("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").all())
+    table = sizes.pop("logs")
+    return {"table_bytes": table, "index_bytes": sum(v for k, v in sizes.items() if k != "sqlite_master")}
+
+
+def run_scheme(path, id_type, make_id, args, children, start):
+    metadata, table = log_table(id_type)
+    engine = create_engine(f"sqlite:///{path}")
+    metadata.create_all(engine)
+    rng = random.Random(11)
+    step = timedelta(seconds=1)
+    slice_rows = max(args.rows // SLICES, 1)
+    rates = []
+    written, slice_started, started = 0, time.perf_counter(), time.perf_counter()
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        conn.commit()
+        while written < args.rows:
+            count = min(args.batch, args.rows - written)
+            rows = []
+            for n in range(written, written + count):
+                at = start + step * n
+                row = {"child_id": rng.choice(children), "domain_id": rng.randrange(500), "duration": 30, "ts": at}
+                if make_id is not None:
+                    row["id"] = make_id(at)
+                rows.append(row)
+            with conn.begin():
+                conn.execute(table.insert(), rows)
+            written += count
+            if written % slice_rows == 0 or written == args.rows:
+                now = time.perf_counter()
+                rates.append(round(slice_rows / (now - slice_started)))
+                slice_started = now
+        elapsed = time.perf_counter() - started
+        # Ids to look up, spread over the whole table
+        rowid = literal_column("rowid")
+        ids = [
+            conn.execute(select(table.c.id).where(rowid == n)).scalar()
+            for n in rng.sample(range(1, args.rows + 1), min(args.lookups, args.rows))
+        ]
+
+        def timed(operation, keys):
+            durations = []
+            for key in keys:
+                t0 = time.perf_counter()
+                operation(key)
+                durations.append(time.perf_counter() - t0)
+            durations.sort()
+            return {"ops": len(durations), "p50_ms": percentile(durations, 0.5), "p99_ms": percentile(durations, 0.99)}
+
+        point = timed(lambda key: conn.execute(select(table).where(table.c.id == key)).one(), ids)
+        newest = start + step * args.rows
+        page = timed(
+            lambda key: conn.execute(
+                select(table).where(table.c.child_id == key, table.c.ts < newest)
+                .order_by(table.c.ts.desc(), table.c.id.desc()).limit(50)
+            ).all(),
+            [rng.choice(children) for _ in range(min(args.lookups, 2000))]
+        )
+    sizes = table_bytes(engine)
+    engine.dispose()
+    return {
+        "rows": args.rows,
+        "ingest_rows_per_s": round(args.rows / elapsed),
+        "ingest_first_tenth_rows_per_s": rates[0],
+        "ingest_last_tenth_rows_per_s": rates[-1],
+        **sizes,
+        "bytes_per_row": round((sizes["table_bytes"] + sizes["index_bytes"]) / args.rows, 1),
+        "lookup_by_id": point,
+        "listing_page": page
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark log id schemes: ingest, size and lookups")
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--batch", type=int, default=1000, help="rows per INSERT transaction")
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--schemes", default=",".join(SCHEMES))
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ids_bench_")
+    children = [str(uuid.UUID(int=random.Random(c).getrandbits(128))) for c in range(CHILDREN)]
+    start = datetime(2026, 1, 1)
+    summary = {}
+    for name in args.schemes.split(","):
+        id_type, make_id = SCHEMES[name]
+        result = run_scheme(os.path.join(workdir, f"{name}.db"), id_type, make_id, args, children, start)
+        summary[name] = result
+        print(
+            f"{name:14s} ingest {result['ingest_rows_per_s']:>8,} rows/s "
+            f"(first tenth {result['ingest_first_tenth_rows_per_s']:,}, last {result['ingest_last_tenth_rows_per_s']:,}); "
+            f"{result['bytes_per_row']} B/row; by id p50 {result['lookup_by_id']['p50_ms']} ms; "
+            f"page p50 {result['listing_page']['p50_ms']} ms"
+        )
+
+    report = {
+        "benchmark": "ids",
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {"sqlite": summary}
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+SafeGuard Family - Interned Domain/URL Benchmark
+Loads the same benchmarks/workload.py events into the log tables of both
+servers twice, once with the strings stored on every row (the layout before
+interning.py) and once dictionary-encoded, and compares:
+
+  • table + index bytes per log table (SQLite dbstat), dictionary tables
+    counted on the interned side
+  • bulk load rate (multi-row INSERTs, as workload.py generate)
+  • ORM ingest rate: one ActivityLog / HiddenComment per transaction, as the
+    /api/logs/history and hidden-comment endpoints write them
+
+Usage:
+    python benchmarks/bench_interning.py [--parents 200] [--events 300000] [--ingest 5000]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "benchmarks", "results", "interning.json")
+
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+import workload
+
+CHUNK = 10000
+
+
+def legacy_tables(models, interned, metadata):
+    """Copies of the log tables with the interned ids swapped back for text columns"""
+    from sqlalchemy import Column, Index, String, Table
+
+    tables = {}
+    for model in models:
+        source = model.__table__
+        replaced = {
+            id_attribute: [
+                Column(attribute, String if field.name == "value" else field.type, nullable=field.nullable)
+                for attribute, field in zip(attributes, dictionary.fields)
+            ]
+            for attributes, id_attribute, dictionary in interned.columns[source.name]
+        }
+        columns = [
+            column
+            for c in source.columns
+            for column in replaced.get(c.name, [Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable)])
+        ]
+        table = Table(source.name, metadata, *columns)
+        for index in source.indexes:
+            Index(index.name, *[table.c[c.name] for c in index.columns])
+        tables[model] = table
+    return tables
+
+
+def event_rows(args, now):
+    """(server, table key, row) for every workload event, as workload.py loads them"""
+    for n, event in enumerate(workload.event_stream(args.parents, 7, args.events, 365, now)):
+        kind, child_id, at = event["kind"], event["child_id"], event["at"]
+        device = {"child_id": child_id, "device_id": event["device_id"]}
+        if kind in ("visit", "block"):
+            yield "fastapi", "activity", {
+                "id": f"e{n}", "child_id": child_id, "activity_type": "page_visit" if kind == "visit" else "page_blocked",
+                "domain": event["domain"], "duration_seconds": event.get("duration", 0) if kind == "visit" else 0,
+                "is_flagged": kind == "block", "flag_reason": event.get("category"), "comments_hidden": 0,
+                "recorded_at": at
+            }
+        if kind == "visit":
+            yield "flask", "history", {
+                "id": f"e{n}", **device, "url": event["url"], "domain": event["domain"], "page_title": None,
+                "visited_at": at, "duration": event["duration"]
+            }
+        elif kind == "reel":
+            yield "flask", "history", {
+                "id": f"e{n}", **device, "url": event["url"], "domain": "facebook.com",
+                "page_title": event["title"], "visited_at": at, "duration": event["duration"]
+            }
+        elif kind == "block":
+            yield "flask", "block", {
+                "id": f"e{n}", **device, "url": f"https://{event['domain']}/", "domain": event["domain"],
+                "category": event["category"], "blocked_at": at
+            }
+        elif kind == "comment" and event["abusive"]:
+            yield "fastapi", "hidden", {
+                "id": f"h{n}", "child_id": child_id, "post_url": event["post_url"], "comment_text": event["text"],
+                "reason": "Inappropriate content", "severity": event["severity"], "domain": "facebook.com",
+                "hidden_at": at
+            }
+
+
+def bulk_load(engine, tables, interned, rows):
+    buffers = {key: [] for key in tables}
+    started = time.perf_counter()
+    total = 0
+
+    def flush(key):
+        batch = buffers[key]
+        with engine.begin() as conn:
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            if interned is not None:
+                batch = interned.encode_rows(conn, tables[key], batch)
+            conn.execute(tables[key].insert(), batch)
+        buffers[key] = []
+
+    for key, row in rows:
+        buffers[key].append(dict(row))
+        total += 1
+        if len(buffers[key]) >= CHUNK:
+            flush(key)
+    for key in tables:
+        if buffers[key]:
+            flush(key)
+    elapsed = time.perf_counter() - started
+    return {"rows": total, "seconds": round(elapsed, 2), "rows_per_s": round(total / elapsed)}
+
+
+def table_bytes(engine, names):
+    """Bytes of each table plus its indexes"""
+    with engine.connect() as conn:
+        owner = dict(conn.exec_driver_sql("SELECT name, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')").all())
+        sizes = {}
+        for name, size in conn.exec_driver_sql("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").all():
+            table = owner.get(name, name)
+            if table in names:
+                kind = "index_bytes" if name != table else "table_bytes"
+                sizes.setdefault(table, {"table_bytes": 0, "index_bytes": 0})[kind] += size
+    return sizes
+
+
+def orm_ingest(engine, activity_model, hidden_model, samples):
+    """Per-event ORM insert + COMMIT"""
+    from sqlalchemy.orm import sessionmaker
+
+    session = sessionmaker(bind=engine)()
+    started = time.perf_counter()
+    for n, (key, row) in enumerate(samples):
+        row = dict(row, id=f"ingest-{n}")
+        session.add(activity_model(**row) if key == "activity" else hidden_model(**row))
+        session.commit()
+    elapsed = time.perf_counter() - started
+    session.close()
+    return {"events": len(samples), "seconds": round(elapsed, 2), "events_per_s": round(len(samples) / elapsed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dictionary-encoded domains and URLs in the log tables")
+    parser.add_argument("--parents", type=int, default=200)
+    parser.add_argument("--events", type=int, default=300000)
+    parser.add_argument("--ingest", type=int, default=5000, help="events written one transaction at a time")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="interning_bench_")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'servers.db')}",
+        "GROQ_API_KEY": "", "ESP32_ENABLED": "false"
+    })
+    os.environ["database_url"] = os.environ["DATABASE_URL"]
+    sys.path.insert(0, REPO_ROOT)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import backend_final as bf
+        import app as fs
+    from sqlalchemy import MetaData, create_engine
+    from sqlalchemy.orm import declarative_base
+
+    servers = {
+        "fastapi": (bf.interned, {"activity": bf.ActivityLog, "hidden": bf.HiddenComment}),
+        "flask": (fs.interned, {"history": fs.HistoryLog, "block": fs.BlockLog})
+    }
+    now = datetime.utcnow().replace(microsecond=0)
+    events = list(event_rows(args, now))
+    samples = [(key, row) for server, key, row in events if server == "fastapi"][-args.ingest:]
+
+    tables, before, after = {}, {}, {}
+    legacy_load, interned_load = {}, {}
+    for server, (interned, models) in servers.items():
+        rows = [(key, row) for owner, key, row in events if owner == server]
+        names = {model.__table__.name for model in models.values()}
+
+        # Strings on every row
+        legacy_engine = create_engine(f"sqlite:///{os.path.join(workdir, f'{server}_strings.db')}")
+        metadata = MetaData()
+        legacy = legacy_tables(list(models.values()), interned, metadata)
+        metadata.create_all(legacy_engine)
+        legacy_load[server] = bulk_load(legacy_engine, {key: legacy[m] for key, m in models.items()}, None, rows)
+        before.update(table_bytes(legacy_engine, names))
+
+        # Dictionary-encoded
+        interned_engine = create_engine(f"sqlite:///{os.path.join(workdir, f'{server}_interned.db')}")
+        current = {key: model.__table__ for key, model in models.items()}
+        dictionary_names = {d.name for d in interned.dictionaries}
+        interned.metadata.create_all(
+            interned_engine, tables=[*(d.table for d in interned.dictionaries), *current.values()]
+        )
+        interned_load[server] = bulk_load(interned_engine, current, interned, rows)
+        after.update(table_bytes(interned_engine, names | dictionary_names))
+        if server == "fastapi":
+            LegacyBase = declarative_base(metadata=metadata)
+            legacy_models = [
+                type(f"Legacy{model.__name__}", (LegacyBase,), {"__table__": legacy[model]})
+                for model in models.values()
+            ]
+            legacy_ingest = orm_ingest(legacy_engine, *legacy_models, samples)
+            interned_ingest = orm_ingest(interned_engine, bf.ActivityLog, bf.HiddenComment, samples)
+        dictionaries = {f"{server}.{name}": after.pop(name) for name in sorted(dictionary_names)}
+        for name in sorted(names):
+            tables[name] = {
+                "before": before[name], "after": after[name],
+                "ratio": round(sum(before[name].values()) / sum(after[name].values()), 2)
+            }
+        tables.update({name: {"after": size} for name, size in dictionaries.items()})
+
+    total_before = sum(sum(t["before"].values()) for t in tables.values() if "before" in t)
+    total_after = sum(sum(t["after"].values()) for t in tables.values())
+
+    summary = {
+        "parents": args.parents, "events": args.events,
+        "tables": tables,
+        "total_bytes": {"before": total_before, "after": total_after, "ratio": round(total_before / total_after, 2)},
+        "bulk_load": {"before": legacy_load, "after": interned_load},
+        "orm_ingest": {"before": legacy_ingest, "after": interned_ingest}
+    }
+    for name, entry in tables.items():
+        if "before" in entry:
+            print(f"{name:16s} {sum(entry['before'].values()) / 1e6:7.1f} MB -> {sum(entry['after'].values()) / 1e6:7.1f} MB ({entry['ratio']}x)")
+        else:
+            print(f"{name:16s} {'':10s} {sum(entry['after'].values()) / 1e6:7.1f} MB")
+    print(f"{'total':16s} {total_before / 1e6:7.1f} MB -> {total_after / 1e6:7.1f} MB including dictionaries")
+    for server in servers:
+        print(f"bulk load ({server}) {legacy_load[server]['rows_per_s']:,} -> {interned_load[server]['rows_per_s']:,} rows/s")
+    print(f"ORM ingest {legacy_ingest['events_per_s']:,} -> {interned_ingest['events_per_s']:,} events/s")
+
+    report = {
+        "benchmark": "interning",
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {"sqlite": summary}
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
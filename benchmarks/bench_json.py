@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+SafeGuard Family - Response Serialization Benchmark
+Serializes one history page of --rows rows (the shape of HistoryLog.row_to_dict)
+the ways the servers have encoded responses:
+
+  • stdlib_isoformat     .isoformat() per row + json.dumps (the row serializers
+                         before response_encoding.py)
+  • flask_jsonify        Flask's default JSON provider, jsonify()
+  • fastapi_default      FastAPI's path for a returned dict: jsonable_encoder
+                         walk, then JSONResponse rendering
+  • fastapi_fast         response_encoding: dumps() of the dict as returned,
+                         datetimes encoded natively (orjson when installed)
+  • flask_fast           jsonify() through the response_encoding provider
+
+Then compresses the body with every coding available (gzip, br) and reports
+compressed size and time. Times are the median of --repeat runs.
+
+Usage:
+    python benchmarks/bench_json.py [--rows 10000] [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "benchmarks", "results", "json.json")
+
+sys.path.insert(0, REPO_ROOT)
+
+import response_encoding
+from response_encoding import available_encodings, compress, dumps
+
+DOMAINS = ["youtube.com", "wikipedia.org", "facebook.com", "khanacademy.org", "google.com", "roblox.com"]
+
+
+def history_rows(count):
+    """Rows as the endpoints build them, timestamps still datetimes"""
+    start = datetime(2026, 2, 8, 14, 0, 0, 123456)
+    return [
+        {
+            "id": f"0190b4c6-{n:04x}-7000-8000-{n:012x}",
+            "child_id": "c-1",
+            "device_id": f"d-{n % 3}",
+            "device_name": "Laptop",
+            "url": f"https://{DOMAINS[n % len(DOMAINS)]}/watch?v={n:08d}",
+            "domain": DOMAINS[n % len(DOMAINS)],
+            "page_title": f"Page {n} - नमस्ते",
+            "visited_at": start - timedelta(seconds=7 * n),
+            "duration": n % 600,
+            "ip_address": "192.168.1.20"
+        }
+        for n in range(count)
+    ]
+
+
+def isoformatted(rows):
+    return [dict(row, visited_at=row["visited_at"].isoformat()) for row in rows]
+
+
+def timed(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 3), result
+
+
+def flask_encoders(payload):
+    from flask import Flask, jsonify
+
+    default_app = Flask("bench_default")
+    fast_app = Flask("bench_fast")
+    response_encoding.init_flask_responses(fast_app, compression=False)
+
+    def encode(app):
+        def run():
+            with app.app_context():
+                return jsonify(payload).get_data()
+        return run
+
+    return encode(default_app), encode(fast_app)
+
+
+def fastapi_default(payload):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    return lambda: JSONResponse(content=jsonable_encoder(payload)).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON response serialization and compression")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    rows = history_rows(args.rows)
+    payload = {"success": True, "history": rows, "count": len(rows), "next_cursor": None}
+    flask_default, flask_fast = flask_encoders(payload)
+
+    encoders = {
+        "stdlib_isoformat": lambda: json.dumps(dict(payload, history=isoformatted(rows))).encode(),
+        "flask_jsonify": flask_default,
+        "fastapi_default": fastapi_default(payload),
+        "fastapi_fast": lambda: dumps(payload),
+        "flask_fast": flask_fast
+    }
+
+    summary = {"rows": args.rows, "json_backend": response_encoding.backend(), "encode": {}, "compress": {}}
+    body = None
+    for name, fn in encoders.items():
+        ms, encoded = timed(fn, args.repeat)
+        summary["encode"][name] = {"median_ms": ms, "bytes": len(encoded)}
+        print(f"{name:18s} {ms:>9.3f} ms  {len(encoded):>10,} B")
+        if name == "fastapi_fast":
+            body = encoded
+
+    baseline = summary["encode"]["fastapi_default"]["median_ms"]
+    summary["fastapi_speedup"] = round(baseline / max(summary["encode"]["fastapi_fast"]["median_ms"], 1e-6), 2)
+
+    for encoding in available_encodings():
+        ms, compressed = timed(lambda: compress(body, encoding), args.repeat)
+        summary["compress"][encoding] = {
+            "median_ms": ms,
+            "bytes": len(compressed),
+            "ratio": round(len(body) / len(compressed), 2)
+        }
+        print(f"{encoding:18s} {ms:>9.3f} ms  {len(compressed):>10,} B  ({len(body) / len(compressed):.1f}x smaller)")
+
+    report = {
+        "benchmark": "json",
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {"history": summary}
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+SafeGuard Family - Metrics Overhead Benchmark
+Cost of the /metrics instrumentation per request (target: under 20 µs):
+
+  • observe_request      MetricsRegistry.observe_request() alone, 1 thread
+  • observe_request_mt   the same from 8 threads at once (sharded locks)
+  • asgi_middleware      PrometheusMiddleware around a minimal ASGI app vs the bare app
+  • flask_wsgi           init_flask_metrics() on a minimal Flask app vs without
+  • render               /metrics body for 50 routes x 5 status codes
+
+Usage:
+    python benchmarks/bench_metrics.py [--requests 200000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "benchmarks", "results", "metrics.json")
+
+sys.path.insert(0, REPO_ROOT)
+
+from metrics import MetricsRegistry, PrometheusMiddleware, init_flask_metrics, register_http_metrics
+
+
+def interleaved_min(timed, bare_app, instrumented_app, rounds=7):
+    """Alternate bare and instrumented runs so CPU frequency drift hits both"""
+    bare, instrumented = [], []
+    for _ in range(rounds):
+        bare.append(timed(bare_app))
+        instrumented.append(timed(instrumented_app))
+    return min(bare), min(instrumented)
+
+
+def per_call_us(fn, n):
+    started = time.perf_counter()
+    fn(n)
+    return (time.perf_counter() - started) / n * 1e6
+
+
+def bench_observe(n):
+    registry = MetricsRegistry()
+    register_http_metrics(registry)
+
+    def run(count):
+        for i in range(count):
+            registry.observe_request("GET", "/api/usage/{child_id}", 200, 0.0042)
+
+    return per_call_us(run, n)
+
+
+def bench_observe_threads(n, threads=8):
+    registry = MetricsRegistry()
+    register_http_metrics(registry)
+    per_thread = n // threads
+    barrier = threading.Barrier(threads + 1)
+
+    def run():
+        barrier.wait()
+        for i in range(per_thread):
+            registry.observe_request("GET", "/api/usage/{child_id}", 200, 0.0042)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    # Wall time per request across all threads (the GIL serializes them)
+    return elapsed / (per_thread * threads) * 1e6
+
+
+def bench_asgi(n):
+    class Route:
+        path = "/api/usage/{child_id}"
+
+    async def endpoint(scope, receive, send):
+        scope["route"] = Route
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    async def drive(app, count):
+        for i in range(count):
+            await app({"type": "http", "method": "GET", "path": "/api/usage/c"}, receive, send)
+
+    def timed(app):
+        started = time.perf_counter()
+        asyncio.run(drive(app, n))
+        return (time.perf_counter() - started) / n * 1e6
+
+    return interleaved_min(timed, endpoint, PrometheusMiddleware(endpoint, MetricsRegistry()))
+
+
+def bench_flask(n):
+    from flask import Flask
+    from werkzeug.test import EnvironBuilder
+
+    def make_app(instrument):
+        app = Flask(__name__)
+
+        @app.route("/api/usage/<child_id>")
+        def usage(child_id):
+            return "{}"
+
+        if instrument:
+            init_flask_metrics(app, MetricsRegistry())
+        return app
+
+    environ = EnvironBuilder(path="/api/usage/c").get_environ()
+
+    def timed(app):
+        def start_response(status, headers, exc_info=None):
+            pass
+
+        started = time.perf_counter()
+        for i in range(n):
+            for chunk in app.wsgi_app(dict(environ), start_response):
+                pass
+        return (time.perf_counter() - started) / n * 1e6
+
+    return interleaved_min(timed, make_app(False), make_app(True))
+
+
+def bench_render():
+    registry = MetricsRegistry()
+    register_http_metrics(registry)
+    for route in range(50):
+        for status in (200, 201, 400, 404, 500):
+            registry.observe_request("GET", f"/api/route{route}/{{id}}", status, 0.01)
+    started = time.perf_counter()
+    body = registry.render()
+    return (time.perf_counter() - started) * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-request metrics overhead")
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    results = {"requests": args.requests, "target_us": 20}
+    results["observe_request_us"] = round(bench_observe(args.requests), 3)
+    results["observe_request_8_threads_us"] = round(bench_observe_threads(args.requests), 3)
+
+    bare, instrumented = bench_asgi(args.requests // 10)
+    results["asgi_middleware"] = {
+        "bare_us": round(bare, 2), "instrumented_us": round(instrumented, 2),
+        "overhead_us": round(instrumented - bare, 2)
+    }
+
+    bare, instrumented = bench_flask(args.requests // 40)
+    results["flask_wsgi"] = {
+        "bare_us": round(bare, 2), "instrumented_us": round(instrumented, 2),
+        "overhead_us": round(instrumented - bare, 2)
+    }
+
+    render_ms, size = bench_render()
+    results["render"] = {"series": 250, "ms": round(render_ms, 2), "bytes": size}
+
+    report = {
+        "benchmark": "metrics",
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+SafeGuard Family - Startup Time Benchmark
+Measures cold start of backend_final.py in "full" and "fast" startup modes:
+  • import time of the module (fresh interpreter per run)
+  • time from process spawn to the first 200 from /ready and /health
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--output benchmarks/results/startup.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "benchmarks", "results", "startup.json")
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import backend_final; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def bench_env(workdir, mode):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    env["STARTUP_MODE"] = mode
+    env["PYTHONUNBUFFERED"] = "1"
+    return env
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(mode):
+    with tempfile.TemporaryDirectory() as workdir:
+        env = bench_env(workdir, mode)
+        if mode == "fast":
+            subprocess.run([sys.executable, os.path.join(REPO_ROOT, "backend_final.py"), "migrate"],
+                           cwd=workdir, env=env, check=True, capture_output=True)
+        out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET],
+                             cwd=workdir, env=env, check=True, capture_output=True, text=True)
+        return float(out.stdout.strip().splitlines()[-1])
+
+
+def wait_for_200(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except Exception:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(f"No 200 from {url}")
+
+
+def measure_first_200(mode, timeout=60):
+    with tempfile.TemporaryDirectory() as workdir:
+        env = bench_env(workdir, mode)
+        if mode == "fast":
+            subprocess.run([sys.executable, os.path.join(REPO_ROOT, "backend_final.py"), "migrate"],
+                           cwd=workdir, env=env, check=True, capture_output=True)
+        port = free_port()
+        base = f"http://127.0.0.1:{port}"
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend_final:app",
+             "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            ready_at = wait_for_200(f"{base}/ready", started + timeout)
+            health_at = wait_for_200(f"{base}/health", started + timeout)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+        return ready_at - started, health_at - started
+
+
+def summarize(values):
+    return {
+        "median_s": round(statistics.median(values), 4),
+        "min_s": round(min(values), 4),
+        "max_s": round(max(values), 4),
+        "runs": len(values)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend_final.py cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ("full", "fast"):
+        imports = [measure_import(mode) for _ in range(args.runs)]
+        first_200 = [measure_first_200(mode) for _ in range(args.runs)]
+        results[mode] = {
+            "import": summarize(imports),
+            "first_200_ready": summarize([r for r, _ in first_200]),
+            "first_200_health": summarize([h for _, h in first_200])
+        }
+        print(f"{mode:>5}: import {results[mode]['import']['median_s']:.3f}s, "
+              f"first /ready 200 {results[mode]['first_200_ready']['median_s']:.3f}s, "
+              f"first /health 200 {results[mode]['first_200_health']['median_s']:.3f}s")
+
+    report = {
+        "benchmark": "startup",
+        "generated_at": datetime.utcnow().isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
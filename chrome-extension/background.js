@@ -682,7 +682,9 @@ async function flushPendingUsage() {
                 domain: domain,
                 title: domain,
                 duration: durationSeconds,
-                flagged: false
+                flagged: false,
+                // Lets the server reset the shared daily budget at local midnight
+                utc_offset_minutes: -new Date().getTimezoneOffset()
             })
         });
         
@@ -23,6 +23,7 @@ const API_CONFIG = {
     addChild: '/api/children',
     deleteChild: '/api/children/:childId',
     getReport: '/api/reports/weekly/:childId',
+    dashboard: '/api/dashboard',
     health: '/health'
   },
   
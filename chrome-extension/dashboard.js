@@ -18,6 +18,9 @@ const STORAGE_KEYS = {
   session: 'dashboardSession'
 };
 
+// Last GET /api/dashboard response: every child's usage, limits, lists and comments
+let dashboardData = null;
+
 const DEFAULT_SETTINGS = {
   blockAdult: true,
   blockGambling: true,
@@ -101,14 +104,14 @@ async function ensureSession() {
     return;
   }
 
-  // Try to verify token with backend (with timeout)
+  // Verify the token with the dashboard request itself (with timeout); refreshAll() reuses the response
   try {
     const timeoutPromise = new Promise((_, reject) => 
       setTimeout(() => reject(new Error('Timeout')), 5000)
     );
-    const apiPromise = apiCall('GET', '/api/profile');
+    const apiPromise = apiCall('GET', API_CONFIG.endpoints.dashboard);
     
-    await Promise.race([apiPromise, timeoutPromise]);
+    dashboardData = await Promise.race([apiPromise, timeoutPromise]);
     console.log('Session verified with backend');
   } catch (error) {
     if (String(error.message || '').includes('401')) {
@@ -189,19 +192,13 @@ async function refreshAll() {
 
   document.getElementById('parentEmail').textContent = data[STORAGE_KEYS.parentEmail] || 'parent@example.com';
   
-  // Get child name from storage or fetch from API
+  // Everything from the backend comes in one dashboard request
+  const child = await loadDashboard();
+  
   let childName = data[STORAGE_KEYS.childName];
-  if (!childName && data[STORAGE_KEYS.childId]) {
-    // Try to fetch from backend
-    try {
-      const profile = await apiCall('GET', '/api/profile', {});
-      if (profile && profile.children && profile.children.length > 0) {
-        childName = profile.children[0].name;
-        await chrome.storage.local.set({ [STORAGE_KEYS.childName]: childName });
-      }
-    } catch (error) {
-      console.warn('Could not fetch child name from backend');
-    }
+  if (!childName && child) {
+    childName = child.name;
+    await chrome.storage.local.set({ [STORAGE_KEYS.childName]: childName });
   }
   document.getElementById('childNameDisplay').textContent = childName || 'My Child';
 
@@ -213,33 +210,69 @@ async function refreshAll() {
   renderHistoryTable();
   renderBlockedTable();
   
-  // Fetch blocked/allowed domains from backend API
+  // Backend lists when the dashboard loaded, local copies otherwise
   let blockedDomains = data[STORAGE_KEYS.blockedDomains] || [];
   let allowedDomains = data[STORAGE_KEYS.allowedDomains] || [];
+  if (child) {
+    blockedDomains = child.blocklist;
+    allowedDomains = child.allowlist;
+    await storeChildPolicy(child);
+    renderUsage(child);
+    renderHiddenComments(hiddenCommentsFromDashboard(child));
+  }
   
+  renderLists(blockedDomains, allowedDomains);
+  loadSettings(data[STORAGE_KEYS.settings] || DEFAULT_SETTINGS);
+}
+
+// ═══════════════════════════════════════════════════════════════
+// DASHBOARD DATA (one request for all children)
+// ═══════════════════════════════════════════════════════════════
+
+/**
+ * Fetch GET /api/dashboard (or use the response ensureSession() just got)
+ * Returns the summary of this extension's child, or null when offline
+ */
+async function loadDashboard() {
   try {
+    const response = dashboardData || await apiCall('GET', API_CONFIG.endpoints.dashboard);
+    dashboardData = null;
     const childId = await getStorageValue('childId');
-    if (childId) {
-      const blocklistResponse = await apiCall('GET', `/api/blocklist/${childId}`, {});
-      if (blocklistResponse && blocklistResponse.blocklist) {
-        blockedDomains = blocklistResponse.blocklist;
-        await chrome.storage.local.set({ [STORAGE_KEYS.blockedDomains]: blockedDomains });
-      }
-      
-      const allowlistResponse = await apiCall('GET', `/api/allowlist/${childId}`, {});
-      if (allowlistResponse && allowlistResponse.allowlist) {
-        allowedDomains = allowlistResponse.allowlist;
-        await chrome.storage.local.set({ [STORAGE_KEYS.allowedDomains]: allowedDomains });
-      }
-    }
+    const children = response.children || [];
+    return children.find(c => c.id === childId) || (childId ? null : children[0]) || null;
   } catch (error) {
-    console.warn('Could not fetch lists from backend, using local data:', error);
+    console.warn('Could not load dashboard from backend, using local data:', error);
+    dashboardData = null;
+    return null;
   }
-  
-  renderLists(blockedDomains, allowedDomains);
-  loadSettings(data[STORAGE_KEYS.settings] || DEFAULT_SETTINGS);
-  await loadUsageAndLimits();
-  await loadHiddenComments();
+}
+
+async function storeChildPolicy(child) {
+  await chrome.storage.local.set({
+    [STORAGE_KEYS.blockedDomains]: child.blocklist,
+    [STORAGE_KEYS.allowedDomains]: child.allowlist,
+    siteTimeRules: child.limits
+  });
+}
+
+// Recent hidden comments of the dashboard in the /api/comments/hidden shape
+function hiddenCommentsFromDashboard(child) {
+  const postsMap = {};
+  child.hidden_comments.recent.forEach(comment => {
+    if (!postsMap[comment.post_url]) {
+      postsMap[comment.post_url] = {
+        post_url: comment.post_url,
+        post_title: comment.post_title,
+        domain: comment.domain,
+        comments_count: 0,
+        comments: []
+      };
+    }
+    postsMap[comment.post_url].comments_count += 1;
+    postsMap[comment.post_url].comments.push(comment);
+  });
+  const posts = Object.values(postsMap);
+  return { total_comments: child.hidden_comments.total, total_posts: posts.length, posts };
 }
 
 // ═══════════════════════════════════════════════════════════════
@@ -575,26 +608,19 @@ async function clearHistory() {
 }
 
 async function loadUsageAndLimits() {
-  const childId = await getStorageValue('childId');
-  if (!childId) return;
-
-  try {
-    const [usageRes, limitsRes] = await Promise.all([
-      apiCall('GET', `/api/usage/${childId}?days=1`, {}),
-      apiCall('GET', `/api/limits/${childId}`, {})
-    ]);
-
-    const usage = usageRes.usage || [];
-    const limits = limitsRes.limits || [];
+  const child = await loadDashboard();
+  if (!child) return;
 
-    await chrome.storage.local.set({ siteTimeRules: limits });
+  await chrome.storage.local.set({ siteTimeRules: child.limits });
+  renderUsage(child);
+}
 
-    renderUsageSummary(usageRes, usage);
-    renderUsageTable(usage, limits);
-    renderLimitsList(limits);
-  } catch (error) {
-    console.warn('Usage/limits load failed:', error);
-  }
+// Today's usage (from the server's usage rollups) and the child's limit rules
+function renderUsage(child) {
+  const usage = child.today.usage || [];
+  renderUsageSummary(child.today, usage);
+  renderUsageTable(usage, child.limits);
+  renderLimitsList(child.limits);
 }
 
 function renderUsageSummary(usageRes, usage) {
@@ -823,30 +849,9 @@ async function syncListsFromBackend() {
     btn.textContent = '⏳ Syncing...';
     btn.disabled = true;
 
-    // Fetch blocklist
-    const blocklistResponse = await apiCall('GET', `/api/blocklist/${childId}`, {});
-    if (blocklistResponse && blocklistResponse.blocklist) {
-      const blockedDomains = blocklistResponse.blocklist;
-      await chrome.storage.local.set({ blockedDomains });
-    }
-
-    // Fetch allowlist
-    const allowlistResponse = await apiCall('GET', `/api/allowlist/${childId}`, {});
-    if (allowlistResponse && allowlistResponse.allowlist) {
-      const allowedDomains = allowlistResponse.allowlist;
-      await chrome.storage.local.set({ allowedDomains });
-    }
-
-    // Fetch time limits
-    const limitsResponse = await apiCall('GET', `/api/limits/${childId}`, {});
-    if (limitsResponse && limitsResponse.limits) {
-      const siteTimeRules = limitsResponse.limits;
-      await chrome.storage.local.set({ siteTimeRules });
-    }
-
-    // Refresh display
+    // Blocklist, allowlist and time limits come with the dashboard; refreshAll() stores them
+    dashboardData = await apiCall('GET', API_CONFIG.endpoints.dashboard);
     await refreshAll();
-    await loadUsageAndLimits();
 
     btn.textContent = originalText;
     btn.disabled = false;
@@ -0,0 +1,149 @@
+"""
+SafeGuard Family - Compact Log Ids
+The log tables (ActivityLog, HiddenComment in backend_final.py; HistoryLog,
+BlockLog in app.py) take a row per event and were keyed on str(uuid4()):
+36 characters stored in the row, again in the primary key index and again
+in the (child_id, ts, id) listing indexes, and random, so every insert lands
+on a random B-tree page.
+
+  • uuid7() makes time-ordered UUIDs (RFC 9562 version 7): 48 bits of Unix
+    milliseconds first, so new ids append at the right edge of the index
+  • CompactId stores them as 16 bytes (BLOB on SQLite, uuid on PostgreSQL)
+    and hands Python the usual UUID string, so the API, cursors and
+    the cold archive keep string ids
+  • Ids that are not UUIDs (rows written before, or test fixtures) pass
+    through as text on SQLite; PostgreSQL needs UUIDs
+
+Existing databases are converted by upgrade() from the servers' migrate
+step: SQLite rewrites text UUIDs in place as 16-byte blobs, PostgreSQL
+changes the column type to uuid.
+"""
+
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import LargeBinary, TypeDecorator, Uuid, inspect, text
+from sqlalchemy.dialects import postgresql
+
+# Rows rewritten per UPDATE batch by upgrade()
+UPGRADE_BATCH = 5000
+
+EPOCH = datetime(1970, 1, 1)
+
+_RANDOM_BITS = 74
+_last = 0
+_lock = threading.Lock()
+
+
+def uuid7(at=None):
+    """
+    Time-ordered UUID string
+    `at` (naive UTC datetime) backdates the id, for bulk loads of past events;
+    ids made for "now" are strictly increasing within the process
+    """
+    global _last
+    if at is None:
+        ms = time.time_ns() // 1_000_000
+    else:
+        delta = at - EPOCH
+        ms = (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000
+    value = (ms << _RANDOM_BITS) | int.from_bytes(os.urandom(10), "big") >> (80 - _RANDOM_BITS)
+    if at is None:
+        with _lock:
+            if value <= _last:
+                value = _last + 1
+            _last = value
+    ms, rand = value >> _RANDOM_BITS, value & ((1 << _RANDOM_BITS) - 1)
+    # 48 bits ms | version 7 | 12 random bits | variant 0b10 | 62 random bits
+    packed = (ms << 80) | (0x7 << 76) | ((rand >> 62) << 64) | (0b10 << 62) | (rand & ((1 << 62) - 1))
+    return str(uuid.UUID(int=packed))
+
+
+def _canonical_bytes(value):
+    """16 bytes of a canonical (lowercase, hyphenated) UUID string, None for anything else"""
+    if not isinstance(value, str) or len(value) != 36:
+        return None
+    try:
+        parsed = uuid.UUID(value)
+    except ValueError:
+        return None
+    return parsed.bytes if str(parsed) == value else None
+
+
+class _RawBinary(LargeBinary):
+    # bytes go to the driver as they are; text ids must not be wrapped as binary
+    def bind_processor(self, dialect):
+        return None
+
+    def result_processor(self, dialect, coltype):
+        return None
+
+
+class CompactId(TypeDecorator):
+    """UUID string in Python, 16 bytes in the database"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=False))
+        return dialect.type_descriptor(_RawBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        packed = _canonical_bytes(value)
+        return value if packed is None else packed
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, (bytes, memoryview)):
+            return str(uuid.UUID(bytes=bytes(value)))
+        return value
+
+
+def upgrade(bind, models, partitions=None):
+    """
+    Convert the id column of `models` tables written as text UUIDs
+    Safe to re-run; returns {table: rows converted} (PostgreSQL: {table: "uuid"})
+    """
+    converted = {}
+    for model in models:
+        tables = partitions.tables_for(model) if partitions else [model.__table__]
+        for table in tables:
+            if bind.dialect.name == "postgresql":
+                column = next(c for c in inspect(bind).get_columns(table.name) if c["name"] == "id")
+                if isinstance(column["type"], Uuid):
+                    continue
+                # Native partitions follow their parent's ALTER
+                with bind.begin() as conn:
+                    conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ALTER COLUMN id TYPE uuid USING id::uuid')
+                converted[table.name] = "uuid"
+                continue
+            if bind.dialect.name != "sqlite":
+                continue
+
+            rows, last = 0, 0
+            while True:
+                with bind.begin() as conn:
+                    batch = conn.execute(text(
+                        f'SELECT rowid, id FROM "{table.name}" WHERE typeof(id) = \'text\' AND length(id) = 36 '
+                        f'AND rowid > :after ORDER BY rowid LIMIT {UPGRADE_BATCH}'
+                    ), {"after": last}).all()
+                    if not batch:
+                        break
+                    updates = [
+                        {"packed": packed, "rowid": rowid}
+                        for rowid, row_id in batch
+                        for packed in [_canonical_bytes(row_id)] if packed is not None
+                    ]
+                    if updates:
+                        conn.execute(text(f'UPDATE "{table.name}" SET id = :packed WHERE rowid = :rowid'), updates)
+                last = batch[-1][0]
+                rows += len(updates)
+            if rows:
+                converted[table.name] = rows
+    return converted
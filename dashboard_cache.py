@@ -0,0 +1,121 @@
+"""
+SafeGuard Family - Parent Dashboard Cache
+Keeps the last GET /api/dashboard response of each parent in memory, so a
+dashboard left open and refreshing costs no queries until something changes.
+
+Writes drop the entry of the parent they touch:
+  • parent endpoints (lists, limits, children) know the parent_id
+  • device endpoints (hidden comments, tracked videos, usage flushes) only
+    know the child_id; children are mapped to their parent when a dashboard
+    containing them is cached, and the parent of any other child is asked of
+    the caller, since a dashboard being computed right now may contain it
+
+Entries also expire after a TTL, which bounds what invalidation cannot see:
+other worker processes, and the child's day rolling over at local midnight.
+
+A dashboard computed while a write lands must not be cached. begin() hands
+out a token, put() only stores when no invalidation that could concern the
+parent happened since. Versions come from one counter and never go back: an
+evicted parent's version, and the oldest versions once more parents than
+max_entries have one, are folded into a floor that parents without a version
+of their own start from, so a token taken before can never match again after
+a write (at worst an unrelated put is refused and cached on the next load).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds a cached dashboard is served for
+DEFAULT_TTL = 60
+
+# Parents kept; the least recently stored are dropped first
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class DashboardCache:
+    """Per-parent response cache with write invalidation"""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # parent_id -> (expires, data)
+        self._parents = {}              # child_id -> parent_id, for cached parents
+        self._clock = 0                 # invalidations so far, all parents
+        self._versions = OrderedDict()  # parent_id -> clock at its last invalidation, oldest first
+        self._floor = 0                 # highest version dropped from _versions
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    def get(self, parent_id, now=None):
+        """Cached dashboard of a parent, or None"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(parent_id)
+            if entry is not None and now < entry[0]:
+                return entry[1]
+            return None
+
+    def begin(self, parent_id):
+        """Token to pass to put() once the dashboard is computed"""
+        with self._lock:
+            return self._versions.get(parent_id, self._floor)
+
+    def put(self, parent_id, token, child_ids, data, now=None):
+        """Cache a dashboard unless it went stale while computed; True if stored"""
+        if not self.enabled:
+            return False
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if token != self._versions.get(parent_id, self._floor):
+                return False
+            self._entries.pop(parent_id, None)
+            self._entries[parent_id] = (now + self.ttl, data)
+            for child_id in child_ids:
+                self._parents[child_id] = parent_id
+            while len(self._entries) > self.max_entries:
+                self._forget(self._entries.popitem(last=False)[0])
+            return True
+
+    def _forget(self, parent_id):
+        for child_id in [c for c, p in self._parents.items() if p == parent_id]:
+            del self._parents[child_id]
+        self._floor = max(self._floor, self._versions.pop(parent_id, 0))
+
+    def invalidate(self, parent_id):
+        """Drop a parent's dashboard after a write"""
+        with self._lock:
+            self._clock += 1
+            self._versions.pop(parent_id, None)
+            self._versions[parent_id] = self._clock
+            self._entries.pop(parent_id, None)
+            while len(self._versions) > self.max_entries:
+                self._floor = max(self._floor, self._versions.popitem(last=False)[1])
+
+    def invalidate_child(self, child_id, parents_of=None):
+        """Drop the dashboard of the parent of a child after a write"""
+        self.invalidate_children([child_id], parents_of)
+
+    def invalidate_children(self, child_ids, parents_of=None):
+        """
+        Drop the dashboards of the parents of children after a write
+
+        parents_of(child_ids) -> {child_id: parent_id} is called for children
+        no cached dashboard contains, outside the lock (it may query)
+        """
+        child_ids = set(child_ids)
+        if not (self.enabled and child_ids):
+            return
+        with self._lock:
+            parents = {self._parents[c] for c in child_ids if c in self._parents}
+            unmapped = [c for c in child_ids if c not in self._parents]
+        if unmapped and parents_of is not None:
+            parents.update(parents_of(unmapped).values())
+        for parent_id in parents:
+            self.invalidate(parent_id)
+
+    def __len__(self):
+        return len(self._entries)
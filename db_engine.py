@@ -0,0 +1,144 @@
+"""
+SafeGuard Family - Database Engine Configuration
+Connection pool and SQLite settings for app.py (Flask) and backend_final.py
+(FastAPI), chosen by the DB_PROFILE environment variable:
+
+  • server (default)  long-running workers
+      SQLite    WAL journal (readers never wait for the writer),
+                synchronous=NORMAL (no fsync per commit; still crash-safe
+                in WAL), memory-mapped reads, a larger page cache and a
+                busy timeout instead of instant "database is locked"
+      Postgres  bounded pool with pre-ping, recycling and a per-statement
+                timeout so one runaway query cannot hold a connection forever
+  • serverless        one short-lived process per request (Vercel):
+                      no pool kept between requests, same timeouts
+  • library           SQLAlchemy defaults, as before this module existed
+
+Individual values can be overridden with the DB_* / SQLITE_* variables read
+in profile_settings().
+"""
+
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+PROFILES = ("server", "serverless", "library")
+DEFAULT_PROFILE = "server"
+
+
+def _env_int(env, name, default):
+    value = env.get(name, "")
+    return int(value) if value.strip() else default
+
+
+def profile_settings(profile=None, env=None):
+    """Settings of a profile with environment overrides applied"""
+    env = os.environ if env is None else env
+    profile = (profile or env.get("DB_PROFILE") or DEFAULT_PROFILE).strip().lower()
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}; expected one of {', '.join(PROFILES)}")
+    if profile == "library":
+        return {"profile": profile}
+    return {
+        "profile": profile,
+        # SQLite
+        "sqlite_journal_mode": env.get("SQLITE_JOURNAL_MODE", "WAL"),
+        "sqlite_synchronous": env.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "sqlite_mmap_mb": _env_int(env, "SQLITE_MMAP_MB", 256),
+        "sqlite_cache_mb": _env_int(env, "SQLITE_CACHE_MB", 64),
+        "sqlite_busy_timeout_ms": _env_int(env, "SQLITE_BUSY_TIMEOUT_MS", 5000),
+        # Server databases (Postgres, MySQL)
+        "pool_size": _env_int(env, "DB_POOL_SIZE", 10),
+        "max_overflow": _env_int(env, "DB_MAX_OVERFLOW", 20),
+        "pool_timeout": _env_int(env, "DB_POOL_TIMEOUT_SECONDS", 10),
+        "pool_recycle": _env_int(env, "DB_POOL_RECYCLE_SECONDS", 1800),
+        "statement_timeout_ms": _env_int(env, "DB_STATEMENT_TIMEOUT_MS", 30000),
+        "connect_timeout": _env_int(env, "DB_CONNECT_TIMEOUT_SECONDS", 10)
+    }
+
+
+def engine_options(url, profile=None, env=None):
+    """
+    Keyword arguments for create_engine() (or Flask-SQLAlchemy's
+    SQLALCHEMY_ENGINE_OPTIONS) for `url` under the selected profile
+    """
+    settings = profile_settings(profile, env)
+    backend = make_url(url).get_backend_name()
+
+    if backend == "sqlite":
+        # Sessions move between threadpool threads (FastAPI) and request threads (Flask);
+        # the busy timeout is set by configure_engine()
+        return {"connect_args": {"check_same_thread": False}}
+
+    if settings["profile"] == "library":
+        return {}
+
+    options = {"pool_pre_ping": True}
+    if settings["profile"] == "serverless":
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            pool_size=settings["pool_size"],
+            max_overflow=settings["max_overflow"],
+            pool_timeout=settings["pool_timeout"],
+            pool_recycle=settings["pool_recycle"]
+        )
+    if backend == "postgresql":
+        options["connect_args"] = {
+            "connect_timeout": settings["connect_timeout"],
+            "options": f"-c statement_timeout={settings['statement_timeout_ms']}"
+        }
+    return options
+
+
+def sqlite_pragmas(settings, in_memory=False):
+    """PRAGMA statements run on every new SQLite connection"""
+    if settings["profile"] == "library":
+        return []
+    pragmas = [
+        f"PRAGMA synchronous={settings['sqlite_synchronous']}",
+        f"PRAGMA cache_size=-{settings['sqlite_cache_mb'] * 1024}",
+        f"PRAGMA busy_timeout={settings['sqlite_busy_timeout_ms']}",
+        "PRAGMA temp_store=MEMORY"
+    ]
+    if not in_memory:
+        # WAL and mmap only apply to database files
+        pragmas.insert(0, f"PRAGMA journal_mode={settings['sqlite_journal_mode']}")
+        pragmas.append(f"PRAGMA mmap_size={settings['sqlite_mmap_mb'] * 1024 * 1024}")
+    return pragmas
+
+
+def configure_engine(engine, profile=None, env=None):
+    """Apply the profile's per-connection settings to an existing engine"""
+    if engine.dialect.name != "sqlite":
+        return engine
+    database = engine.url.database
+    pragmas = sqlite_pragmas(profile_settings(profile, env), in_memory=not database or database == ":memory:")
+    if not pragmas:
+        return engine
+
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return engine
+
+
+def describe(engine, profile=None, env=None):
+    """One line for the startup log"""
+    settings = profile_settings(profile, env)
+    if settings["profile"] == "library" or engine.dialect.name != "sqlite":
+        pool = type(engine.pool).__name__
+        return f"{engine.dialect.name}, profile {settings['profile']}, {pool}"
+    return (
+        f"sqlite, profile {settings['profile']}, journal {settings['sqlite_journal_mode']}, "
+        f"synchronous {settings['sqlite_synchronous']}, mmap {settings['sqlite_mmap_mb']} MB, "
+        f"cache {settings['sqlite_cache_mb']} MB"
+    )
@@ -0,0 +1,278 @@
+"""
+SafeGuard Family - Shared Database Helpers
+Small query helpers used by both app.py (Flask) and backend_final.py (FastAPI)
+
+  • Keyset (cursor) pagination on (timestamp, id), newest rows per group
+  • Batched iteration + NDJSON encoding for streamed exports
+  • Dialect-aware time buckets for SQL-side usage aggregation
+  • Counter upserts (INSERT ... ON CONFLICT DO UPDATE)
+  • Index and nullable-column creation for tables that already exist
+"""
+
+import base64
+import json
+import uuid
+from datetime import datetime
+
+from sqlalchemy import String, and_, cast, func, inspect, or_
+
+from compact_ids import CompactId
+
+# Page size used when the client does not ask for one
+DEFAULT_PAGE_SIZE = 200
+
+# Hard cap on rows per page, whatever the client asks for
+MAX_PAGE_SIZE = 1000
+
+# Rows fetched per round trip while streaming an export
+EXPORT_BATCH_SIZE = 1000
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+# ════════════════════════════════
+# KEYSET PAGINATION
+# ════════════════════════════════
+
+def clamp_page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Parse a requested page size and clamp it to 1..MAX_PAGE_SIZE"""
+    try:
+        size = int(value) if value not in (None, "") else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(timestamp, row_id):
+    """Encode the (timestamp, id) of the last row of a page as an opaque cursor"""
+    raw = f"{timestamp.isoformat() if timestamp else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+    Returns (timestamp, id), or None for an empty cursor
+    Raises ValueError for a malformed cursor
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        timestamp, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), row_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def keyset_filter(ts_column, id_column, position):
+    """Rows strictly after `position` in (ts DESC, id DESC) order"""
+    timestamp, row_id = position
+    return or_(
+        ts_column < timestamp,
+        and_(ts_column == timestamp, id_column < row_id)
+    )
+
+
+def paginate(query, ts_column, id_column, cursor=None, limit=DEFAULT_PAGE_SIZE, older=None):
+    """
+    Fetch one page of `query` newest first, keyed on (ts_column, id_column)
+
+    Returns (rows, next_cursor). next_cursor is None on the last page.
+    Works for ORM entity queries and column queries alike, as long as each
+    row exposes the timestamp and id under the column names.
+
+    `older(position, count)` continues the listing once `query` runs out
+    (archived rows, see archive.py): up to `count` rows past `position`,
+    newest first, all older than any row of `query`.
+
+    Raises ValueError for a malformed cursor, including one whose id is not
+    a UUID when id_column is a CompactId (PostgreSQL would reject it)
+    """
+    position = decode_cursor(cursor)
+    if position and isinstance(getattr(id_column, "type", None), CompactId):
+        try:
+            uuid.UUID(position[1])
+        except ValueError:
+            raise ValueError("Invalid cursor")
+    if position:
+        query = query.filter(keyset_filter(ts_column, id_column, position))
+
+    rows = query.order_by(ts_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if older is not None and len(rows) <= limit:
+        if rows:
+            position = (getattr(rows[-1], ts_column.key), getattr(rows[-1], id_column.key))
+        rows = rows + older(position, limit + 1 - len(rows))
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, ts_column.key), getattr(last, id_column.key))
+
+    return rows, next_cursor
+
+
+def iter_keyset(query, ts_column, id_column, batch_size=EXPORT_BATCH_SIZE, older=None):
+    """
+    Iterate over every row of `query` newest first in keyset batches
+    Only one batch is held in memory at a time
+    """
+    cursor = None
+    while True:
+        rows, cursor = paginate(query, ts_column, id_column, cursor, batch_size, older)
+        for row in rows:
+            yield row
+        if not cursor:
+            break
+
+
+def newest_per_group(query, group_column, ts_column, id_column, limit):
+    """
+    The `limit` newest rows of every group of `query` (e.g. per child) in
+    one statement, ranked with ROW_NUMBER() instead of one query per group
+    Rows come back grouped, newest first within each group
+    """
+    rank = func.row_number().over(
+        partition_by=group_column, order_by=(ts_column.desc(), id_column.desc())
+    ).label("rank")
+    ranked = query.with_entities(id_column.label("ranked_id"), rank).subquery()
+    return query.join(ranked, ranked.c.ranked_id == id_column).filter(
+        ranked.c.rank <= limit
+    ).order_by(group_column, ts_column.desc(), id_column.desc()).all()
+
+
+def ndjson_lines(rows, serialize):
+    """Encode each row as one line of newline-delimited JSON"""
+    for row in rows:
+        yield json.dumps(serialize(row), default=str) + "\n"
+
+
+# ════════════════════════════════
+# USAGE AGGREGATION
+# ════════════════════════════════
+
+# Dimensions accepted by ?group_by= on the usage endpoints
+USAGE_DIMENSIONS = ("hour", "day", "domain")
+
+
+def parse_group_by(value):
+    """
+    Parse ?group_by=day,domain into a list of dimensions
+    Raises ValueError for unknown or repeated dimensions
+    """
+    if not value:
+        return []
+    dimensions = [part.strip().lower() for part in value.split(",") if part.strip()]
+    for dimension in dimensions:
+        if dimension not in USAGE_DIMENSIONS:
+            raise ValueError(f"Unknown group_by dimension: {dimension}")
+    if len(set(dimensions)) != len(dimensions):
+        raise ValueError("Repeated group_by dimension")
+    return dimensions
+
+
+def time_bucket(column, unit, dialect_name):
+    """
+    SQL expression truncating a timestamp column to an hour or day string
+    "2026-02-08 14:00" for hours, "2026-02-08" for days
+    """
+    if dialect_name == "sqlite":
+        return func.strftime("%Y-%m-%d %H:00" if unit == "hour" else "%Y-%m-%d", column)
+    if dialect_name == "postgresql":
+        return func.to_char(
+            func.date_trunc(unit, column),
+            "YYYY-MM-DD HH24:00" if unit == "hour" else "YYYY-MM-DD"
+        )
+    # Generic fallback: ISO text prefix ("YYYY-MM-DD HH" / "YYYY-MM-DD")
+    return func.substr(cast(column, String), 1, 13 if unit == "hour" else 10)
+
+
+def bucket_label(timestamp, unit):
+    """time_bucket() for rows read outside the database (archived logs)"""
+    return timestamp.strftime("%Y-%m-%d %H:00" if unit == "hour" else "%Y-%m-%d")
+
+
+def usage_dimension(name, ts_column, domain_expr, dialect_name):
+    """Labelled GROUP BY expression for one usage dimension"""
+    if name == "domain":
+        return domain_expr.label("domain")
+    return time_bucket(ts_column, name, dialect_name).label(name)
+
+
+# ════════════════════════════════
+# COUNTERS
+# ════════════════════════════════
+
+def upsert_increment(session, table, key_columns, rows, increment_column):
+    """
+    Add rows[i][increment_column] to existing counter rows, inserting missing ones
+    Uses INSERT ... ON CONFLICT on SQLite and PostgreSQL (needs a unique
+    constraint on key_columns), UPDATE-then-INSERT elsewhere
+    """
+    if not rows:
+        return
+    dialect_name = session.get_bind().dialect.name
+    column = table.c[increment_column]
+
+    if dialect_name in ("sqlite", "postgresql"):
+        if dialect_name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={increment_column: column + stmt.excluded[increment_column]}
+        )
+        session.execute(stmt, rows)
+        return
+
+    for row in rows:
+        match = and_(*(table.c[key] == row[key] for key in key_columns))
+        updated = session.execute(
+            table.update().where(match).values({increment_column: column + row[increment_column]})
+        ).rowcount
+        if not updated:
+            session.execute(table.insert().values(**row))
+
+
+# ════════════════════════════════
+# SCHEMA HELPERS
+# ════════════════════════════════
+
+def ensure_indexes(metadata, bind, skip=()):
+    """
+    Create indexes declared on the models that are missing from the database
+    create_all() only creates indexes together with new tables; tables named
+    in `skip` (partitioned log tables, see partitions.py) manage their own
+    """
+    for table in metadata.sorted_tables:
+        if table.name in skip:
+            continue
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
+def ensure_columns(metadata, bind, skip=()):
+    """
+    Add nullable columns declared on the models that are missing from the database
+    create_all() never alters a table that already exists; columns that are
+    NOT NULL or part of the primary key need a real migration and are left out
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    added = {}
+    for table in metadata.sorted_tables:
+        if table.name in skip or table.name not in existing_tables:
+            continue
+        present = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present or not column.nullable or column.primary_key:
+                continue
+            kind = column.type.compile(dialect=bind.dialect)
+            with bind.begin() as conn:
+                conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {kind}')
+            added.setdefault(table.name, []).append(column.name)
+    return added
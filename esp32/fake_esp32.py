@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+SafeGuard Family - Fake ESP32 Alert Device
+Local stand-in for esp32_alert_system.ino, for tests, benchmarks and
+developing without the hardware. Serves the same routes (POST /alert,
+POST /message, GET /ping) over HTTP/1.1 keep-alive and records what it got.
+
+Usage:
+    python esp32/fake_esp32.py [--port 8081] [--delay 2.4]
+    ESP32_ENABLED=true ESP32_ALERT_URL=http://127.0.0.1:8081/alert python app.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeEsp32:
+    """
+    Threaded HTTP server recording received alerts
+
+    delay     seconds spent "buzzing" before answering (the real device
+              blocks ~2.4s in triggerAlert())
+    fail_next number of upcoming requests answered with 503
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0):
+        self.delay = delay
+        self.fail_next = 0
+        self.alerts = []          # (received_at perf_counter, payload)
+        self.messages = []
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def alert_url(self):
+        return self.url + "/alert"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-esp32", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler_class(self):
+        device = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with device._lock:
+                    device.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length) if length else b""
+
+            def do_GET(self):
+                if self.path == "/ping":
+                    self._reply(200, {"status": "online", "device": "esp32"})
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                body = self._body()
+                with device._lock:
+                    device.requests += 1
+                    failing = device.fail_next > 0
+                    if failing:
+                        device.fail_next -= 1
+                if failing:
+                    self._reply(503, {"error": "busy"})
+                    return
+
+                if not body:
+                    self._reply(400, {"error": "no payload"})
+                    return
+
+                if self.path == "/alert":
+                    if device.delay:
+                        time.sleep(device.delay)
+                    with device._lock:
+                        device.alerts.append((time.perf_counter(), json.loads(body)))
+                        alert_id = len(device.alerts)
+                    self._reply(200, {"status": "alert triggered", "alertId": alert_id})
+                elif self.path == "/message":
+                    with device._lock:
+                        device.messages.append(body.decode(errors="replace"))
+                    self._reply(200, {"status": "received"})
+                else:
+                    self._reply(404, {"error": "not found"})
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake ESP32 alert device")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeEsp32(args.host, args.port, args.delay)
+    print(f"🔔 Fake ESP32 listening on {fake.alert_url}")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for received_at, payload in fake.alerts:
+            print(json.dumps(payload))
@@ -0,0 +1,292 @@
+"""
+SafeGuard Family - ESP32 Alert Dispatcher
+Sends alerts to the parent's ESP32 alert device (esp32/esp32_alert_system.ino,
+POST /alert) without ever blocking a request handler.
+
+  • submit() is thread-safe and returns immediately (Flask threads and the
+    FastAPI event loop both call it); events go through an asyncio queue
+    running on the dispatcher's own thread
+  • Bursts are coalesced: the first event is sent at once, everything that
+    arrives during the next `interval` seconds is folded into one alert with
+    a total count and a per (child, type, category) summary
+  • Each ESP32 gets at most one alert per `interval` seconds
+  • Failed deliveries are retried with exponential backoff
+  • One pooled keep-alive HTTP client is shared by every delivery
+
+Configuration (environment):
+    ESP32_ENABLED=true
+    ESP32_ALERT_URL=http://192.168.1.105/alert   (comma-separated for several)
+    ESP32_ALERT_INTERVAL_SECONDS=10
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+# Same mapping as backend/services/esp32Service.js
+SEVERITY_BY_CATEGORY = {
+    'Adult': 'HIGH',
+    'Violence': 'HIGH',
+    'Drugs': 'HIGH',
+    'Gambling': 'MEDIUM',
+    'Hate': 'HIGH',
+    'Malware': 'CRITICAL',
+    'Phishing': 'CRITICAL',
+    'Other': 'LOW'
+}
+
+SEVERITY_RANK = {'LOW': 0, 'MEDIUM': 1, 'HIGH': 2, 'CRITICAL': 3}
+
+
+def get_severity(category):
+    return SEVERITY_BY_CATEGORY.get(category, 'MEDIUM')
+
+
+class _Bucket:
+    """Events for one (child, type, category) waiting for the next delivery"""
+
+    __slots__ = ("payload", "count", "first_submitted")
+
+    def __init__(self, payload, submitted):
+        self.payload = payload
+        self.count = 1
+        self.first_submitted = submitted
+
+
+class _DeviceState:
+    """Pending buckets and rate-limit clock of one ESP32"""
+
+    def __init__(self):
+        self.pending = OrderedDict()
+        self.wake = asyncio.Event()
+        self.next_allowed = 0.0
+        self.busy = False
+        self.task = None
+
+
+class Esp32Dispatcher:
+    """
+    Coalescing, rate-limited alert fan-out to one or more ESP32 devices
+
+    Runs an asyncio loop on a daemon thread, started on the first submit().
+    """
+
+    def __init__(self, alert_urls, interval=10.0, max_retries=3, backoff=0.5,
+                 timeout=5.0, queue_size=10000):
+        self.alert_urls = [url for url in alert_urls if url]
+        self.interval = interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.queue_size = queue_size
+
+        self._loop = None
+        self._queue = None
+        self._client = None
+        self._stopping = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+        self._devices = {}
+
+        self.stats = {
+            'submitted': 0, 'coalesced': 0, 'sent': 0, 'failed': 0,
+            'retries': 0, 'dropped': 0
+        }
+        # Submit-to-delivery seconds of recent deliveries (first event of each bucket)
+        self.latencies = deque(maxlen=10000)
+
+    # ════════════════════════════════
+    # PUBLIC API
+    # ════════════════════════════════
+
+    def submit(self, category, child_name, alert_type='blocked_site', **fields):
+        """Queue an alert; never waits on the network"""
+        if not self.alert_urls:
+            return False
+        self.start()
+        event = {
+            'type': alert_type,
+            'category': category or 'Other',
+            'childName': child_name or 'Unknown',
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'severity': get_severity(category),
+            **fields
+        }
+        self._loop.call_soon_threadsafe(self._enqueue, event, time.perf_counter())
+        return True
+
+    def start(self):
+        """Start the dispatcher thread (idempotent)"""
+        if self._ready.is_set():
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._thread_main, name="esp32-dispatcher", daemon=True)
+                self._thread.start()
+        self._ready.wait()
+
+    def wait_idle(self, timeout=10.0):
+        """Block until every queued alert is delivered or given up; True if idle"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._ready.is_set() and asyncio.run_coroutine_threadsafe(
+                self._is_idle(), self._loop
+            ).result(timeout):
+                return True
+            time.sleep(0.01)
+        return False
+
+    def close(self, timeout=5.0):
+        """Stop the loop and close pooled connections; pending alerts are dropped"""
+        if not self._ready.is_set():
+            return
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join(timeout)
+
+    @property
+    def queue_depth(self):
+        """Events queued plus buckets waiting for delivery (approximate, lock-free)"""
+        queued = self._queue.qsize() if self._queue is not None else 0
+        return queued + sum(len(d.pending) for d in list(self._devices.values()))
+
+    # ════════════════════════════════
+    # EVENT LOOP
+    # ════════════════════════════════
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._run())
+        finally:
+            self._loop.close()
+
+    async def _run(self):
+        import httpx
+
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._stopping = asyncio.Event()
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=2 * len(self.alert_urls), max_keepalive_connections=len(self.alert_urls))
+        )
+        router = asyncio.create_task(self._route())
+        self._ready.set()
+
+        await self._stopping.wait()
+
+        router.cancel()
+        for device in self._devices.values():
+            device.task.cancel()
+        await asyncio.gather(router, *(d.task for d in self._devices.values()), return_exceptions=True)
+        await self._client.aclose()
+
+    def _enqueue(self, event, submitted):
+        try:
+            self._queue.put_nowait((event, submitted))
+            self.stats['submitted'] += 1
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+
+    async def _route(self):
+        """Fold queued events into per-device buckets"""
+        while True:
+            event, submitted = await self._queue.get()
+            key = (event['childName'], event['type'], event['category'])
+            for url in self.alert_urls:
+                device = self._device(url)
+                bucket = device.pending.get(key)
+                if bucket:
+                    bucket.count += 1
+                    bucket.payload['timestamp'] = event['timestamp']
+                    self.stats['coalesced'] += 1
+                else:
+                    device.pending[key] = _Bucket(dict(event), submitted)
+                device.wake.set()
+            self._queue.task_done()
+
+    def _device(self, url):
+        device = self._devices.get(url)
+        if device is None:
+            device = self._devices[url] = _DeviceState()
+            device.task = asyncio.create_task(self._drain(url, device))
+        return device
+
+    async def _drain(self, url, device):
+        """Send everything pending as one alert, no faster than one per interval"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await device.wake.wait()
+            device.wake.clear()
+            while device.pending:
+                delay = device.next_allowed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                buckets = list(device.pending.values())
+                device.pending.clear()
+                device.next_allowed = loop.time() + self.interval
+                device.busy = True
+                try:
+                    await self._deliver(url, buckets)
+                finally:
+                    device.busy = False
+
+    def _payload(self, buckets):
+        """
+        One alert for every pending bucket
+        The most severe event leads (the ESP32 reads the first category and
+        childName); `count` is the total and `summary` lists each bucket
+        """
+        lead = max(buckets, key=lambda b: SEVERITY_RANK.get(b.payload['severity'], 0))
+        payload = dict(lead.payload, count=sum(b.count for b in buckets))
+        if len(buckets) > 1:
+            payload['summary'] = [
+                {'type': b.payload['type'], 'category': b.payload['category'],
+                 'childName': b.payload['childName'], 'count': b.count}
+                for b in buckets
+            ]
+        return payload
+
+    async def _deliver(self, url, buckets):
+        """POST one alert with retries; 4xx responses are not retried"""
+        payload = self._payload(buckets)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self._client.post(url, json=payload)
+                if response.status_code < 400:
+                    self.stats['sent'] += 1
+                    now = time.perf_counter()
+                    self.latencies.extend(now - b.first_submitted for b in buckets)
+                    return True
+                if response.status_code < 500:
+                    break
+                error = f"HTTP {response.status_code}"
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            if attempt < self.max_retries:
+                self.stats['retries'] += 1
+                await asyncio.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+        else:
+            print(f"⚠️  ESP32 alert to {url} failed: {error}")
+        self.stats['failed'] += 1
+        return False
+
+    async def _is_idle(self):
+        return self._queue.empty() and all(
+            not d.pending and not d.busy for d in self._devices.values()
+        )
+
+
+def dispatcher_from_env():
+    """Dispatcher configured from ESP32_* variables, or None when disabled"""
+    if os.environ.get('ESP32_ENABLED', 'false').lower() != 'true':
+        return None
+    urls = [u.strip() for u in os.environ.get('ESP32_ALERT_URL', '').split(',') if u.strip()]
+    if not urls:
+        return None
+    return Esp32Dispatcher(urls, interval=float(os.environ.get('ESP32_ALERT_INTERVAL_SECONDS', 10)))
@@ -0,0 +1,469 @@
+"""
+SafeGuard Family - Interned Log Strings
+Domains and URLs repeat on almost every log row (a few hundred domains make
+up most events), so the log tables of backend_final.py (ActivityLog,
+HiddenComment) and app.py (HistoryLog, BlockLog) store an integer id and the
+text lives once in a dictionary table
+
+  • domains(id, value) and urls(id, value), value unique
+  • The log table has <attribute>_id; the model keeps <attribute> as a
+    lookup of the dictionary (a correlated subquery on its primary key), so
+    queries, filters and API responses keep using log.domain / log.url
+  • Inserts and updates resolve strings to ids in the flushing transaction
+    through an in-process LRU of string -> id; ids a transaction creates
+    enter the LRU only once it commits
+  • Bulk loaders that write the tables directly go through encode_rows()
+
+Long values that repeat as a whole (hidden comment bodies, with the verdict
+they were hidden for) go to a content-addressed dictionary instead: the key
+is a hash of the normalized entry, so a writer computes it without a lookup
+and stores the entry with an upsert that also refreshes its seen_at. Entries
+no log row points at any more are deleted by sweep(), so the dictionary keeps
+no text its log rows no longer hold. A writer may have resolved a key whose
+log row has not committed yet; sweep() leaves entries seen in the last
+SWEEP_GRACE_SECONDS alone, and on PostgreSQL the upsert's row lock makes a
+concurrent sweep wait and recheck seen_at. The LRU is not trusted for these
+entries, since a sweep in another worker may have deleted one it remembers.
+
+Existing databases are converted by upgrade() from the servers' migrate
+step: the id column is added and filled, then the text column dropped.
+"""
+
+import hashlib
+import json
+import threading
+import unicodedata
+import weakref
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import (
+    Column, DateTime, ForeignKey, Integer, LargeBinary, String, Table, case, event, exists, inspect, literal_column, null,
+    or_, select, text
+)
+from sqlalchemy.orm import column_property
+
+# Strings kept per dictionary in the LRU
+CACHE_ENTRIES = 50000
+
+# Values per IN (...) lookup
+LOOKUP_CHUNK = 500
+
+# conn.info key: {dictionary: {value: id}} created by the open transaction
+PENDING_KEY = "interned_pending"
+
+# Bytes of SHA-256 kept as a content key
+CONTENT_KEY_BYTES = 16
+
+# Seconds a content entry survives sweep() after it was last written, referenced or
+# not: far longer than a writer's transaction between resolving a key and committing
+SWEEP_GRACE_SECONDS = 3600
+
+# Rows converted per batch when upgrade() fills a content dictionary
+UPGRADE_BATCH = 2000
+
+_watched = weakref.WeakSet()
+_watch_lock = threading.Lock()
+
+
+def _commit(conn):
+    for dictionary, entries in conn.info.pop(PENDING_KEY, {}).items():
+        dictionary._remember(conn.engine, entries)
+
+
+def _discard(conn):
+    conn.info.pop(PENDING_KEY, None)
+
+
+def _watch(engine):
+    # Ids created in a transaction become visible to other workers only after it commits
+    with _watch_lock:
+        if engine not in _watched:
+            event.listen(engine, "commit", _commit)
+            event.listen(engine, "rollback", _discard)
+            event.listen(engine, "begin", _discard)
+            _watched.add(engine)
+
+
+def column_keys(model):
+    """Mapped column attributes of `model`, the interned strings in place of their ids"""
+    return [
+        attr.key for attr in model.__mapper__.column_attrs
+        if not getattr(attr.expression, "info", {}).get("interned")
+    ]
+
+
+class _Dictionary:
+    """Dictionary table plus, per engine, an LRU of what it is known to hold"""
+
+    key = "id"          # primary key log rows reference
+    unique = "value"    # column an insert of an existing entry conflicts on
+
+    def __init__(self, name, capacity):
+        self.name = name
+        self.capacity = capacity
+        self._caches = weakref.WeakKeyDictionary()     # engine -> OrderedDict
+        self._lock = threading.Lock()
+
+    def _lookup(self, id_column, field):
+        # "<name>".<key> as literal SQL: aliases over partitions adapt columns by name
+        # (partitions.py) and would otherwise swap it for the log table's own column
+        value = select(self.table.c[field]).where(
+            literal_column(f'"{self.name}".{self.key}') == id_column
+        ).correlate_except(self.table).scalar_subquery()
+        # The CASE names id_column outside the subquery, so a query selecting only the
+        # string still reads FROM the log table (and the subquery correlates to it)
+        return column_property(case((id_column.is_(None), null()), else_=value), expire_on_flush=False)
+
+    def _cache(self, engine):
+        cache = self._caches.get(engine)
+        if cache is None:
+            _watch(engine)
+            with self._lock:
+                cache = self._caches.setdefault(engine, OrderedDict())
+        return cache
+
+    def _remember(self, engine, entries):
+        cache = self._cache(engine)
+        with self._lock:
+            for value, row_id in entries.items():
+                cache[value] = row_id
+                cache.move_to_end(value)
+            while len(cache) > self.capacity:
+                cache.popitem(last=False)
+
+    def _cached(self, engine, values):
+        cache = self._cache(engine)
+        found = {}
+        with self._lock:
+            for value in values:
+                row_id = cache.get(value)
+                if row_id is not None:
+                    cache.move_to_end(value)
+                    found[value] = row_id
+        return found
+
+    def _pending(self, conn):
+        _watch(conn.engine)
+        return conn.info.setdefault(PENDING_KEY, {}).setdefault(self, {})
+
+    def _insert_ignore(self, conn, rows):
+        if conn.dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        elif conn.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            conn.execute(self.table.insert(), rows)
+            return
+        conn.execute(insert(self.table).on_conflict_do_nothing(index_elements=[self.unique]), rows)
+
+
+class StringDictionary(_Dictionary):
+    """One dictionary table of strings: id -> value"""
+
+    def __init__(self, name, metadata, capacity=CACHE_ENTRIES):
+        super().__init__(name, capacity)
+        self.table = Table(
+            name, metadata,
+            Column("id", Integer, primary_key=True),
+            Column("value", String, nullable=False, unique=True)
+        )
+        self.fields = [self.table.c.value]
+
+    def id_column(self, nullable=False):
+        """Log table column holding an id of this dictionary"""
+        return Column(Integer, ForeignKey(self.table.c.id), nullable=nullable, info={"interned": self.name})
+
+    def lookup(self, id_column):
+        """Mapped string attribute read through `id_column`"""
+        return self._lookup(id_column, "value")
+
+    def _select(self, conn, values):
+        found = {}
+        values = list(values)
+        for start in range(0, len(values), LOOKUP_CHUNK):
+            found.update(conn.execute(
+                select(self.table.c.value, self.table.c.id).where(
+                    self.table.c.value.in_(values[start:start + LOOKUP_CHUNK])
+                )
+            ).all())
+        return found
+
+    def ids(self, conn, values):
+        """{value: id} for `values`, creating missing entries in conn's transaction"""
+        wanted = set(values)
+        wanted.discard(None)
+        found = self._cached(conn.engine, wanted)
+        if len(found) == len(wanted):
+            return found
+
+        pending = self._pending(conn)
+        found.update((v, pending[v]) for v in wanted if v not in found and v in pending)
+        missing = wanted - found.keys()
+        if not missing:
+            return found
+
+        existing = self._select(conn, missing)
+        self._remember(conn.engine, existing)
+        found.update(existing)
+        missing -= existing.keys()
+        if missing:
+            self._insert_ignore(conn, [{"value": value} for value in sorted(missing)])
+            created = self._select(conn, missing)
+            pending.update(created)
+            found.update(created)
+        return found
+
+    def convert(self, conn, table, attributes, id_attribute):
+        """Fill `id_attribute` of a table that still stores the strings"""
+        (attribute,), table = attributes, table.name
+        conn.exec_driver_sql(
+            f'INSERT INTO "{self.name}" (value) SELECT DISTINCT "{attribute}" FROM "{table}" '
+            f'WHERE "{attribute}" IS NOT NULL AND "{attribute}" NOT IN (SELECT value FROM "{self.name}")'
+        )
+        conn.exec_driver_sql(
+            f'UPDATE "{table}" SET "{id_attribute}" = (SELECT id FROM "{self.name}" '
+            f'WHERE "{self.name}".value = "{table}"."{attribute}")'
+        )
+
+
+def normalize_text(value):
+    """The form content keys hash and the dictionary stores: NFC, Unix line ends, no outer whitespace"""
+    return unicodedata.normalize("NFC", value.replace("\r\n", "\n").replace("\r", "\n")).strip()
+
+
+class ContentDictionary(_Dictionary):
+    """
+    Content-addressed entries: key (truncated SHA-256) -> one or more fields
+    The first field is text and is normalized; an entry's key covers every
+    field, so the same text with another verdict is another entry
+    """
+
+    key = unique = "key"
+
+    def __init__(self, name, metadata, *fields, capacity=CACHE_ENTRIES):
+        super().__init__(name, capacity)
+        self.table = Table(
+            name, metadata,
+            Column("key", LargeBinary(CONTENT_KEY_BYTES), primary_key=True),
+            *fields,
+            Column("seen_at", DateTime, nullable=True)     # last written, see sweep()
+        )
+        self.fields = [self.table.c[f.name] for f in fields]
+
+    def id_column(self, nullable=False):
+        """Log table column holding a key of this dictionary"""
+        return Column(
+            LargeBinary(CONTENT_KEY_BYTES), ForeignKey(self.table.c.key), nullable=nullable,
+            info={"interned": self.name}
+        )
+
+    def lookup(self, id_column, field):
+        """Mapped attribute reading `field` of the entry `id_column` points at"""
+        return self._lookup(id_column, field)
+
+    def _remember(self, engine, entries):
+        pass        # a sweep elsewhere can delete any entry, so none is cached
+
+    def entry(self, value):
+        """Normalized field values of `value` (a tuple in field order), defaults filled in"""
+        values = []
+        for field, item in zip(self.fields, value):
+            if item is None and field.default is not None and field.default.is_scalar:
+                item = field.default.arg
+            values.append(item)
+        values[0] = normalize_text(values[0])
+        return tuple(values)
+
+    def key_of(self, value):
+        encoded = json.dumps(self.entry(value), ensure_ascii=False, separators=(",", ":")).encode()
+        return hashlib.sha256(encoded).digest()[:CONTENT_KEY_BYTES]
+
+    def ids(self, conn, values):
+        """{value: key} for `values`, storing entries not yet stored by conn's transaction"""
+        keys = {value: self.key_of(value) for value in set(values) if value is not None and value[0] is not None}
+        pending = self._pending(conn)
+        new = {key: value for value, key in keys.items() if key not in pending}
+        if new:
+            now = datetime.utcnow()
+            # Key order, so two writers upserting the same entries lock them in the same order
+            rows = [
+                {"key": key, "seen_at": now, **{field.name: item for field, item in zip(self.fields, self.entry(value))}}
+                for key, value in sorted(new.items())
+            ]
+            self._upsert(conn, rows, now)
+            pending.update((key, key) for key in new)
+        return keys
+
+    def _upsert(self, conn, rows, now):
+        """Insert entries, refreshing seen_at of those already stored"""
+        if conn.dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        elif conn.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            stored = set(self._existing(conn, [row["key"] for row in rows]))
+            if stored:
+                conn.execute(self.table.update().where(self.table.c.key.in_(sorted(stored))).values(seen_at=now))
+            rows = [row for row in rows if row["key"] not in stored]
+            if rows:
+                conn.execute(self.table.insert(), rows)
+            return
+        statement = insert(self.table)
+        conn.execute(
+            statement.on_conflict_do_update(index_elements=[self.key], set_={"seen_at": statement.excluded.seen_at}),
+            rows
+        )
+
+    def _existing(self, conn, keys):
+        keys = list(keys)
+        found = []
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            found += conn.execute(
+                select(self.table.c.key).where(self.table.c.key.in_(keys[start:start + LOOKUP_CHUNK]))
+            ).scalars().all()
+        return found
+
+    def convert(self, conn, table, attributes, id_attribute):
+        """Fill `id_attribute` of a table that still stores the fields, a batch of rows at a time"""
+        names = ", ".join(f'"{a}"' for a in attributes)
+        pk = next(iter(table.primary_key)).name
+        while True:
+            batch = conn.execute(text(
+                f'SELECT "{pk}", {names} FROM "{table.name}" WHERE "{id_attribute}" IS NULL '
+                f'AND "{attributes[0]}" IS NOT NULL LIMIT {UPGRADE_BATCH}'
+            )).all()
+            if not batch:
+                break
+            keys = self.ids(conn, [tuple(row[1:]) for row in batch])
+            conn.execute(
+                text(f'UPDATE "{table.name}" SET "{id_attribute}" = :key WHERE "{pk}" = :pk'),
+                [{"key": keys[tuple(row[1:])], "pk": row[0]} for row in batch]
+            )
+
+
+class InternedStrings:
+    """The dictionaries of one server's schema and the log columns stored in them"""
+
+    def __init__(self, metadata, capacity=CACHE_ENTRIES):
+        self.metadata = metadata
+        self.capacity = capacity
+        self.domains = StringDictionary("domains", metadata, capacity)
+        self.urls = StringDictionary("urls", metadata, capacity)
+        self.dictionaries = [self.domains, self.urls]
+        self.models = {}            # table name -> model
+        self.columns = {}           # table name -> [(attributes, id attribute, dictionary)]
+
+    def content(self, name, *fields):
+        """A content-addressed dictionary of this schema, see ContentDictionary"""
+        dictionary = ContentDictionary(name, self.metadata, *fields, capacity=self.capacity)
+        self.dictionaries.append(dictionary)
+        return dictionary
+
+    def add(self, model, attribute, dictionary, id_attribute=None):
+        """
+        Intern `attribute` of `model`, declared as
+        <attribute>_id = dictionary.id_column(); <attribute> = dictionary.lookup(<attribute>_id)
+        For a ContentDictionary `attribute` is a tuple naming the model
+        attributes of its fields, in order
+        """
+        name = model.__table__.name
+        attributes = (attribute,) if isinstance(attribute, str) else tuple(attribute)
+        if name not in self.columns:
+            event.listen(model, "before_insert", self._before_insert)
+            event.listen(model, "before_update", self._before_update)
+        self.models[name] = model
+        self.columns.setdefault(name, []).append((attributes, id_attribute or attributes[0] + "_id", dictionary))
+
+    @staticmethod
+    def _value(attributes, values):
+        if len(attributes) == 1:
+            return values.get(attributes[0])
+        value = tuple(values.get(a) for a in attributes)
+        return None if value[0] is None else value
+
+    def _before_insert(self, mapper, connection, target):
+        for attributes, id_attribute, dictionary in self.columns[mapper.local_table.name]:
+            value = self._value(attributes, target.__dict__)
+            if value is not None:
+                setattr(target, id_attribute, dictionary.ids(connection, [value])[value])
+
+    def _before_update(self, mapper, connection, target):
+        state = inspect(target)
+        for attributes, id_attribute, dictionary in self.columns[mapper.local_table.name]:
+            if any(state.attrs[a].history.added for a in attributes):
+                value = self._value(attributes, {a: getattr(target, a) for a in attributes})
+                setattr(target, id_attribute, dictionary.ids(connection, [value]).get(value))
+
+    def encode_rows(self, conn, table, rows):
+        """Replace interned values in plain row dicts (bulk inserts) with their ids, in place"""
+        for attributes, id_attribute, dictionary in self.columns.get(table.name, ()):
+            values = [self._value(attributes, row) for row in rows]
+            ids = dictionary.ids(conn, values)
+            for row, value in zip(rows, values):
+                for attribute in attributes:
+                    row.pop(attribute, None)
+                row[id_attribute] = ids.get(value)
+        return rows
+
+    def sweep(self, conn, dictionary, keys=None, now=None):
+        """
+        Delete the entries of a content dictionary no log row points at and
+        not written in the last SWEEP_GRACE_SECONDS, all of them or only
+        `keys`; returns the number of entries deleted
+        """
+        references = [
+            self.models[name].__table__.c[id_attribute]
+            for name, columns in self.columns.items()
+            for _, id_attribute, used in columns if used is dictionary
+        ]
+        key, seen_at = dictionary.table.c[dictionary.key], dictionary.table.c.seen_at
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=SWEEP_GRACE_SECONDS)
+        statement = dictionary.table.delete().where(
+            or_(seen_at.is_(None), seen_at < cutoff),
+            *[~exists().where(column == key) for column in references]
+        )
+        if keys is None:
+            return conn.execute(statement).rowcount
+        keys, deleted = list(keys), 0
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            deleted += conn.execute(statement.where(key.in_(keys[start:start + LOOKUP_CHUNK]))).rowcount
+        return deleted
+
+    def upgrade(self, bind, partitions=None):
+        """
+        Convert log tables that still store the values themselves
+        Safe to re-run after an interruption; returns {table: [attributes converted]}
+        """
+        converted = {}
+        for name, columns in self.columns.items():
+            model = self.models[name]
+            tables = partitions.tables_for(model) if partitions else [model.__table__]
+            view = bind.dialect.name == "sqlite" and any(t is not model.__table__ for t in tables)
+            inspector = inspect(bind)
+            legacy = [
+                (t, attributes, id_attribute, dictionary)
+                for t in tables if inspector.has_table(t.name)
+                for existing in [{c["name"] for c in inspector.get_columns(t.name)}]
+                for attributes, id_attribute, dictionary in columns
+                if attributes[0] in existing
+            ]
+            if not legacy:
+                continue
+            with bind.begin() as conn:
+                if view:
+                    # The view and its triggers name every column; rebuilt below
+                    conn.exec_driver_sql(f'DROP VIEW IF EXISTS "{name}"')
+                for table, attributes, id_attribute, dictionary in legacy:
+                    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+                    if id_attribute not in existing:
+                        kind = dictionary.id_column().type.compile(dialect=bind.dialect)
+                        conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{id_attribute}" {kind}')
+                    dictionary.convert(conn, table, attributes, id_attribute)
+                    for attribute in attributes:
+                        if attribute in existing:
+                            conn.exec_driver_sql(f'ALTER TABLE "{table.name}" DROP COLUMN "{attribute}"')
+            if view:
+                partitions.tables[model].rebuild_view(bind)
+            converted[name] = sorted({a for _, attributes, _, _ in legacy for a in attributes})
+        return converted
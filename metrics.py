@@ -0,0 +1,354 @@
+"""
+SafeGuard Family - Metrics
+Prometheus text-format metrics for app.py (Flask) and backend_final.py (FastAPI)
+
+  • Counters, gauges and histograms in sharded storage: threads are dealt
+    the SHARD_COUNT shards round-robin on their first write and keep theirs,
+    so up to SHARD_COUNT threads never share a lock and a larger pool
+    shares each one between a few; /metrics merges shards
+  • Callback gauges read at scrape time (DB pool, queue depths)
+  • PrometheusMiddleware (ASGI) and WSGIMetricsMiddleware (Flask) record
+    per-route request counts, status codes, latency and in-flight requests
+
+Each worker process keeps its own registry; scrape every worker.
+"""
+
+import itertools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+SHARD_COUNT = 16
+
+# Seconds; the usual Prometheus client defaults
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Slow external calls (Groq, yt-dlp)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+MEDIA_TYPE = "text/plain; version=0.0.4"
+CONTENT_TYPE = MEDIA_TYPE + "; charset=utf-8"
+
+# Route label for requests that matched no route (keeps label cardinality bounded)
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Where the Flask hook leaves the matched URL rule for WSGIMetricsMiddleware
+ROUTE_ENVIRON_KEY = "safeguard.metrics_route"
+
+
+class _Shard:
+    __slots__ = ("lock", "values", "histograms")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}       # (name, label values) -> float (counters and gauges)
+        self.histograms = {}   # (name, label values) -> [bucket counts..., +Inf count, sum]
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """Holds every metric of one process"""
+
+    def __init__(self, shard_count=SHARD_COUNT):
+        self._shards = [_Shard() for _ in range(shard_count)]
+        self._dealt = itertools.count()   # shards handed out so far, see _shard()
+        self._local = threading.local()
+        self._metrics = {}     # name -> (type, help, label names, buckets)
+        self._callbacks = {}   # name -> callable returning {label values: value} or a number
+        self._register_lock = threading.Lock()
+
+    # ════════════════════════════════
+    # REGISTRATION
+    # ════════════════════════════════
+
+    def _register(self, name, kind, help_text, labelnames, buckets=None):
+        with self._register_lock:
+            if name not in self._metrics:
+                self._metrics[name] = (kind, help_text, tuple(labelnames), buckets)
+        return name
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(name, "counter", help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=(), callback=None):
+        """A gauge moved with add(), or read from callback() at scrape time"""
+        self._register(name, "gauge", help_text, labelnames)
+        if callback is not None:
+            self._callbacks[name] = callback
+        return name
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(name, "histogram", help_text, labelnames, tuple(buckets))
+
+    # ════════════════════════════════
+    # RECORDING
+    # ════════════════════════════════
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            # next() on a count is atomic under the GIL
+            shard = self._local.shard = self._shards[next(self._dealt) % len(self._shards)]
+            return shard
+
+    def inc(self, name, labels=(), value=1):
+        """Add to a counter (or a gauge, with a negative value to decrease it)"""
+        shard = self._shard()
+        key = (name, labels)
+        with shard.lock:
+            shard.values[key] = shard.values.get(key, 0) + value
+
+    add = inc
+
+    def observe(self, name, labels, value):
+        """Record one histogram sample"""
+        buckets = self._metrics[name][3]
+        shard = self._shard()
+        key = (name, labels)
+        with shard.lock:
+            histogram = shard.histograms.get(key)
+            if histogram is None:
+                histogram = shard.histograms[key] = [0] * (len(buckets) + 2)
+            histogram[bisect_left(buckets, value)] += 1
+            histogram[-1] += value
+
+    def observe_request(self, method, route, status, seconds):
+        """Request count and latency in one shard lock (the per-request hot path)"""
+        shard = self._shard()
+        count_key = ("http_requests_total", (method, route, str(status)))
+        latency_key = ("http_request_duration_seconds", (method, route))
+        with shard.lock:
+            shard.values[count_key] = shard.values.get(count_key, 0) + 1
+            histogram = shard.histograms.get(latency_key)
+            if histogram is None:
+                histogram = shard.histograms[latency_key] = [0] * (len(DEFAULT_BUCKETS) + 2)
+            histogram[bisect_left(DEFAULT_BUCKETS, seconds)] += 1
+            histogram[-1] += seconds
+
+    @contextmanager
+    def timer(self, name, *labels):
+        """Observe the duration of a block in a histogram"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, labels, time.perf_counter() - started)
+
+    # ════════════════════════════════
+    # EXPOSITION
+    # ════════════════════════════════
+
+    def _merged(self):
+        values, histograms = {}, {}
+        for shard in self._shards:
+            with shard.lock:
+                for key, value in shard.values.items():
+                    values[key] = values.get(key, 0) + value
+                for key, counts in shard.histograms.items():
+                    merged = histograms.get(key)
+                    histograms[key] = list(counts) if merged is None else [a + b for a, b in zip(merged, counts)]
+        return values, histograms
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        values, histograms = self._merged()
+        by_name = {}
+        for (name, labels), value in values.items():
+            by_name.setdefault(name, []).append((labels, value))
+        for (name, labels), counts in histograms.items():
+            by_name.setdefault(name, []).append((labels, counts))
+
+        for name, callback in list(self._callbacks.items()):
+            try:
+                result = callback()
+            except Exception:
+                continue
+            if isinstance(result, dict):
+                by_name[name] = [(tuple(str(v) for v in k), value) for k, value in result.items()]
+            elif result is not None:
+                by_name[name] = [((), result)]
+
+        lines = []
+        for name in sorted(self._metrics):
+            kind, help_text, labelnames, buckets = self._metrics[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(by_name.get(name, []), key=lambda item: item[0]):
+                pairs = [f'{label}="{_escape(v)}"' for label, v in zip(labelnames, labels)]
+                if kind != "histogram":
+                    label_text = "{" + ",".join(pairs) + "}" if pairs else ""
+                    lines.append(f"{name}{label_text} {_format_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float("inf"),), value[:-1]):
+                    cumulative += count
+                    le = pairs + [f'le="{_format_number(bound)}"']
+                    lines.append(f"{name}_bucket{{{','.join(le)}}} {cumulative}")
+                label_text = "{" + ",".join(pairs) + "}" if pairs else ""
+                lines.append(f"{name}_sum{label_text} {_format_number(value[-1])}")
+                lines.append(f"{name}_count{label_text} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def register_http_metrics(registry):
+    registry.counter("http_requests_total", "HTTP requests by method, route and status", ("method", "route", "status"))
+    registry.histogram("http_request_duration_seconds", "HTTP request latency by method and route", ("method", "route"))
+    registry.gauge("http_requests_in_flight", "HTTP requests being served")
+
+
+def pool_gauge(engine_or_callable):
+    """
+    Callback for a DB pool gauge: checked-out, idle and overflow connections
+    Pools without these counters (e.g. SQLite in-memory) report nothing
+    """
+    def read():
+        engine = engine_or_callable() if callable(engine_or_callable) else engine_or_callable
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            return None
+        return {
+            ("checked_out",): pool.checkedout(),
+            ("idle",): pool.checkedin(),
+            ("overflow",): max(0, pool.overflow()),
+            ("size",): pool.size()
+        }
+    return read
+
+
+# ════════════════════════════════
+# ASGI (FastAPI)
+# ════════════════════════════════
+
+class PrometheusMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware overhead)
+    The route label is the matched path template, e.g. /api/usage/{child_id}
+    """
+
+    def __init__(self, app, registry):
+        self.app = app
+        self.registry = registry
+        register_http_metrics(registry)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        registry.add("http_requests_in_flight", (), 1)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            registry.observe_request(
+                scope["method"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                status[0],
+                time.perf_counter() - started
+            )
+            registry.add("http_requests_in_flight", (), -1)
+
+
+# ════════════════════════════════
+# WSGI (Flask)
+# ════════════════════════════════
+
+class _ClosingBody:
+    """
+    Response iterable that reports the end of the request when the server
+    closes it, after the last chunk of a streamed body has been sent
+    """
+
+    __slots__ = ("_body", "_finish")
+
+    def __init__(self, body, finish):
+        self._body = body
+        self._finish = finish
+
+    def __iter__(self):
+        return iter(self._body)
+
+    def close(self):
+        try:
+            close = getattr(self._body, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._finish()
+
+
+class WSGIMetricsMiddleware:
+    """
+    Wraps app.wsgi_app; cheaper than a before/after/teardown hook trio
+    The route label is the matched URL rule, e.g. /api/usage/<child_id>,
+    left in the environ by the after_request hook of init_flask_metrics.
+    Latency runs until the server closes the response, so streamed bodies
+    (NDJSON exports, SSE) are timed to their last chunk.
+    """
+
+    def __init__(self, wsgi_app, registry):
+        self.wsgi_app = wsgi_app
+        self.registry = registry
+        register_http_metrics(registry)
+
+    def __call__(self, environ, start_response):
+        registry = self.registry
+        status = [500]
+
+        def start_response_wrapper(status_line, headers, exc_info=None):
+            status[0] = status_line[:3]
+            return start_response(status_line, headers, exc_info)
+
+        def finish():
+            registry.observe_request(
+                environ["REQUEST_METHOD"],
+                environ.get(ROUTE_ENVIRON_KEY, UNMATCHED_ROUTE),
+                status[0],
+                time.perf_counter() - started
+            )
+            registry.add("http_requests_in_flight", (), -1)
+
+        registry.add("http_requests_in_flight", (), 1)
+        started = time.perf_counter()
+        try:
+            body = self.wsgi_app(environ, start_response_wrapper)
+        except BaseException:
+            finish()
+            raise
+        return _ClosingBody(body, finish)
+
+
+def init_flask_metrics(app, registry):
+    """Record per-route request metrics for a Flask app"""
+    from flask import request
+
+    @app.after_request
+    def _metrics_route(response):
+        rule = request.url_rule
+        if rule is not None:
+            request.environ[ROUTE_ENVIRON_KEY] = rule.rule
+        return response
+
+    app.wsgi_app = WSGIMetricsMiddleware(app.wsgi_app, registry)
@@ -0,0 +1,539 @@
+"""
+SafeGuard Family - Time-Partitioned Log Tables
+Monthly partitions for the append-only log tables of backend_final.py
+(ActivityLog, HiddenComment, TrackedVideo) and app.py (HistoryLog, BlockLog),
+switched on with LOG_PARTITIONING=monthly
+
+  • Postgres: the table is PARTITION BY RANGE on its timestamp, one partition
+    per month plus a DEFAULT partition for stray rows; the planner prunes the
+    months outside a query's time window by itself
+  • SQLite: one table per month (<table>_pYYYYMM) plus <table>_pdefault, and
+    <table> becomes a UNION ALL view whose INSTEAD OF triggers route writes,
+    so ORM inserts are unchanged. Time-windowed reads go through source(),
+    which names only the months in the window (and the default partition)
+  • Retention drops whole months (DETACH + DROP TABLE on Postgres, DROP TABLE
+    on SQLite) instead of DELETE-ing rows
+  • maintain() creates the coming months' partitions ahead of time and moves
+    rows already parked in the default partition for those months into them
+  • Log rows are updated and deleted with Core statements on the physical
+    tables (PartitionedLogs.update/delete): on SQLite the view's INSTEAD OF
+    triggers report 0 rows changed, which the ORM would take for stale rows
+
+An existing database is converted once with the servers' `partition`
+command; rows are copied month by month inside one transaction.
+"""
+
+import re
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import Column, Index, MetaData, PrimaryKeyConstraint, Table, column, func, quoted_name, select, table, text
+from sqlalchemy.orm import aliased
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+DEFAULT_SUFFIX = "_pdefault"
+
+# Partitions kept ready after the current month
+MONTHS_AHEAD = 1
+
+# Seconds a worker trusts its list of partitions before reading it again
+STATE_TTL_SECONDS = 60
+
+UNPARTITIONED_SUFFIX = "_unpartitioned"
+
+
+def month_of(moment):
+    return moment.year, moment.month
+
+
+def add_months(month, count):
+    index = month[0] * 12 + month[1] - 1 + count
+    return index // 12, index % 12 + 1
+
+
+def months_between(first, last):
+    """Months first..last, inclusive"""
+    months = []
+    while first <= last:
+        months.append(first)
+        first = add_months(first, 1)
+    return months
+
+
+def month_start(month):
+    return datetime(month[0], month[1], 1)
+
+
+def _sqlite_bound(month):
+    # SQLAlchemy stores SQLite datetimes as 'YYYY-MM-DD HH:MM:SS.ffffff' text
+    return f"{month[0]:04d}-{month[1]:02d}-01 00:00:00"
+
+
+def _sqlite_script(bind, statements):
+    """Run statements in one write transaction (pysqlite would autocommit DDL one by one)"""
+    with bind.connect() as conn:
+        raw = conn.connection.driver_connection
+        try:
+            raw.executescript("BEGIN IMMEDIATE;\n" + ";\n".join(statements) + ";\nCOMMIT;")
+        except Exception:
+            if raw.in_transaction:
+                raw.execute("ROLLBACK")
+            raise
+
+
+class MonthlyPartitions:
+    """One model's table split by month on its `column` timestamp"""
+
+    def __init__(self, model, column, months_ahead=MONTHS_AHEAD):
+        self.model = model
+        self.table = model.__table__
+        self.name = self.table.name
+        self.column = column
+        self.months_ahead = months_ahead
+        self.default_name = self.name + DEFAULT_SUFFIX
+        self._pattern = re.compile(re.escape(self.name) + r"_p(\d{4})(\d{2})$")
+        self._tables = {}
+        self._sources = {}        # partition names -> aliased entity, so repeated windows reuse compiled SQL
+        self._lock = threading.Lock()
+        self._state = None        # (partitioned, [months]) as last read from the database
+        self._state_at = 0.0
+
+    def partition_name(self, month):
+        return f"{self.name}_p{month[0]:04d}{month[1]:02d}"
+
+    # ════════════════════════════════
+    # STATE
+    # ════════════════════════════════
+
+    def _layout(self, conn):
+        """'partitioned', 'plain', or None while the table does not exist"""
+        if conn.dialect.name == "sqlite":
+            kind = conn.execute(text("SELECT type FROM sqlite_master WHERE name = :name"), {"name": self.name}).scalar()
+            return {"view": "partitioned", "table": "plain"}.get(kind)
+        kind = conn.execute(text(
+            "SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relname = :name AND n.nspname = current_schema()"
+        ), {"name": self.name}).scalar()
+        return {"p": "partitioned", "r": "plain"}.get(kind)
+
+    def _list_months(self, conn):
+        if conn.dialect.name == "sqlite":
+            names = conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE :prefix"
+            ), {"prefix": self.name + "_p%"}).scalars()
+        else:
+            names = conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :name"
+            ), {"name": self.name}).scalars()
+        months = []
+        for name in names:
+            match = self._pattern.match(name)
+            if match:
+                months.append((int(match.group(1)), int(match.group(2))))
+        return sorted(months)
+
+    def state(self, bind, refresh=False):
+        """(partitioned, months with a partition oldest first), cached for STATE_TTL_SECONDS"""
+        with self._lock:
+            if refresh or self._state is None or time.monotonic() - self._state_at > STATE_TTL_SECONDS:
+                with bind.connect() as conn:
+                    partitioned = self._layout(conn) == "partitioned"
+                    state = (partitioned, self._list_months(conn) if partitioned else [])
+                if state != self._state:
+                    self._sources.clear()
+                self._state = state
+                self._state_at = time.monotonic()
+            return self._state
+
+    # ════════════════════════════════
+    # READS
+    # ════════════════════════════════
+
+    def _partition_table(self, name):
+        """The model's columns and indexes under another name, without foreign keys"""
+        table = self._tables.get(name)
+        if table is None:
+            table = Table(name, MetaData(), *[
+                Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable) for c in self.table.columns
+            ])
+            suffix = name[len(self.name):]
+            for index in self.table.indexes:
+                Index(index.name + suffix, *[table.c[c.name] for c in index.columns], unique=index.unique)
+            self._tables[name] = table
+        return table
+
+    def source(self, bind, since=None, until=None):
+        """
+        Entity to query rows with `column` in [since, until] from
+
+        The model itself unless this is a partitioned SQLite table; then an
+        alias of the model over the months in the window plus the default
+        partition (Postgres prunes on the model's own table)
+        """
+        partitioned, months = self.state(bind)
+        if not partitioned or bind.dialect.name != "sqlite":
+            return self.model
+        names = self._window_names(months, since, until)
+        key = tuple(names)
+        entity = self._sources.get(key)
+        if entity is None:
+            if len(names) == 1:
+                selectable = self._partition_table(names[0])
+            else:
+                # The UNION ALL as the "name" of a lightweight table: its cache key is the SQL
+                # string, far cheaper per execution than walking a structured union of every
+                # column, and unlike text() it can stand in for the model's table (column
+                # properties that refer to it are adapted too)
+                column_list = ", ".join(f'"{c.name}"' for c in self.table.columns)
+                union = " UNION ALL ".join(f'SELECT {column_list} FROM "{name}"' for name in names)
+                selectable = table(
+                    quoted_name(f"({union})", quote=False), *[column(c.name, c.type) for c in self.table.columns]
+                ).alias(f"{self.name}_window")
+            entity = self._sources[key] = aliased(self.model, selectable, adapt_on_names=True)
+        return entity
+
+    def tables_for(self, bind, since=None, until=None):
+        """Physical tables holding the rows of a window (the model's own table unless partitioned SQLite)"""
+        partitioned, months = self.state(bind)
+        if not partitioned or bind.dialect.name != "sqlite":
+            return [self.table]
+        return [self._partition_table(name) for name in self._window_names(months, since, until)]
+
+    def _window_names(self, months, since, until):
+        first = month_of(since) if since else None
+        last = month_of(until) if until else None
+        return [
+            self.partition_name(m) for m in months
+            if (first is None or m >= first) and (last is None or m <= last)
+        ] + [self.default_name]
+
+    # ════════════════════════════════
+    # SQLITE LAYOUT
+    # ════════════════════════════════
+
+    def _sqlite_create_tables(self, bind, names):
+        statements = []
+        for name in names:
+            table = self._partition_table(name)
+            statements.append(str(CreateTable(table, if_not_exists=True).compile(dialect=bind.dialect)).strip())
+            statements.extend(
+                str(CreateIndex(index, if_not_exists=True).compile(dialect=bind.dialect)).strip()
+                for index in table.indexes
+            )
+        return statements
+
+    def _sqlite_routing(self, months):
+        """Statements recreating the UNION ALL view and its INSTEAD OF triggers over `months`"""
+        columns = [c.name for c in self.table.columns]
+        column_list = ", ".join(f'"{c}"' for c in columns)
+        new_values = ", ".join(f'NEW."{c}"' for c in columns)
+        key_match = " AND ".join(f'"{c.name}" = OLD."{c.name}"' for c in self.table.primary_key.columns)
+        names = [self.partition_name(m) for m in months] + [self.default_name]
+        ts = f'NEW."{self.column}"'
+
+        inserts = [
+            f'INSERT INTO "{self.partition_name(m)}" ({column_list}) SELECT {new_values} '
+            f"WHERE {ts} >= '{_sqlite_bound(m)}' AND {ts} < '{_sqlite_bound(add_months(m, 1))}';"
+            for m in months
+        ]
+        outside = (
+            f"{ts} IS NULL OR {ts} < '{_sqlite_bound(months[0])}' OR {ts} >= '{_sqlite_bound(add_months(months[-1], 1))}'"
+            if months else "1"
+        )
+        inserts.append(f'INSERT INTO "{self.default_name}" ({column_list}) SELECT {new_values} WHERE {outside};')
+        deletes = [f'DELETE FROM "{name}" WHERE {key_match};' for name in names]
+        # Rows keep their partition on update, even if the timestamp moves to another month
+        assignments = ", ".join(f'"{c}" = NEW."{c}"' for c in columns)
+        updates = [f'UPDATE "{name}" SET {assignments} WHERE {key_match};' for name in names]
+
+        return [
+            f'CREATE VIEW "{self.name}" AS ' + " UNION ALL ".join(f'SELECT {column_list} FROM "{n}"' for n in names),
+            f'CREATE TRIGGER "{self.name}_insert" INSTEAD OF INSERT ON "{self.name}" BEGIN {" ".join(inserts)} END',
+            f'CREATE TRIGGER "{self.name}_delete" INSTEAD OF DELETE ON "{self.name}" BEGIN {" ".join(deletes)} END',
+            f'CREATE TRIGGER "{self.name}_update" INSTEAD OF UPDATE ON "{self.name}" BEGIN {" ".join(updates)} END'
+        ]
+
+    def rebuild_view(self, bind):
+        """Recreate the SQLite view and its triggers, after the partitions' columns changed"""
+        with bind.connect() as conn:
+            months = self._list_months(conn)
+        _sqlite_script(bind, [f'DROP VIEW IF EXISTS "{self.name}"'] + self._sqlite_routing(months))
+        self.state(bind, refresh=True)
+
+    # ════════════════════════════════
+    # POSTGRES LAYOUT
+    # ════════════════════════════════
+
+    def _postgres_parent_ddl(self, dialect):
+        """CREATE TABLE ... PARTITION BY RANGE; the primary key must include the partition column"""
+        metadata = MetaData()
+        for table in self.table.metadata.sorted_tables:
+            table.to_metadata(metadata)
+        parent = metadata.tables[self.name]
+        parent.c[self.column].primary_key = True
+        parent.append_constraint(PrimaryKeyConstraint(
+            *[parent.c[c.name] for c in self.table.primary_key.columns], parent.c[self.column]
+        ))
+        parent.dialect_kwargs["postgresql_partition_by"] = f'RANGE ("{self.column}")'
+        return str(CreateTable(parent).compile(dialect=dialect)).strip()
+
+    def _postgres_add_month(self, conn, month):
+        name = self.partition_name(month)
+        low, high = month_start(month).date(), month_start(add_months(month, 1)).date()
+        # Rows already parked in DEFAULT for this month would make CREATE ... PARTITION OF fail
+        conn.exec_driver_sql(f'ALTER TABLE "{self.name}" DETACH PARTITION "{self.default_name}"')
+        conn.exec_driver_sql(
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{self.name}" '
+            f"FOR VALUES FROM ('{low}') TO ('{high}')"
+        )
+        window = f"\"{self.column}\" >= '{low}' AND \"{self.column}\" < '{high}'"
+        conn.exec_driver_sql(f'INSERT INTO "{name}" SELECT * FROM "{self.default_name}" WHERE {window}')
+        conn.exec_driver_sql(f'DELETE FROM "{self.default_name}" WHERE {window}')
+        conn.exec_driver_sql(f'ALTER TABLE "{self.name}" ATTACH PARTITION "{self.default_name}" DEFAULT')
+
+    def _postgres_lock(self, conn):
+        # One worker at a time changes this table's partitions
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": self.name})
+
+    # ════════════════════════════════
+    # LIFECYCLE
+    # ════════════════════════════════
+
+    def _initial_months(self, now):
+        return months_between(month_of(now), add_months(month_of(now), self.months_ahead))
+
+    def create(self, bind, now=None, months=None):
+        """Create the partitioned layout for a table that does not exist yet"""
+        months = months or self._initial_months(now or datetime.utcnow())
+        if bind.dialect.name == "sqlite":
+            names = [self.partition_name(m) for m in months] + [self.default_name]
+            _sqlite_script(bind, self._sqlite_create_tables(bind, names) + self._sqlite_routing(months))
+        else:
+            with bind.begin() as conn:
+                self._postgres_lock(conn)
+                conn.exec_driver_sql(self._postgres_parent_ddl(bind.dialect))
+                conn.exec_driver_sql(f'CREATE TABLE "{self.default_name}" PARTITION OF "{self.name}" DEFAULT')
+                for month in months:
+                    self._postgres_add_month(conn, month)
+                for index in self.table.indexes:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+        self.state(bind, refresh=True)
+
+    def convert(self, bind, now=None):
+        """
+        Turn an existing plain table into monthly partitions
+        Returns the number of months created
+        """
+        now = now or datetime.utcnow()
+        old = self.name + UNPARTITIONED_SUFFIX
+        with bind.connect() as conn:
+            if self._layout(conn) != "plain":
+                return 0
+            column = self.table.c[self.column]
+            first, last = conn.execute(select(func.min(column), func.max(column))).one()
+        first = month_of(first) if first else month_of(now)
+        last = max(month_of(last) if last else month_of(now), add_months(month_of(now), self.months_ahead))
+        months = months_between(min(first, month_of(now)), last)
+        column_list = ", ".join(f'"{c.name}"' for c in self.table.columns)
+
+        if bind.dialect.name == "sqlite":
+            names = [self.partition_name(m) for m in months] + [self.default_name]
+            statements = [f'ALTER TABLE "{self.name}" RENAME TO "{old}"']
+            statements += self._sqlite_create_tables(bind, names)
+            statements += [
+                f'INSERT INTO "{self.partition_name(m)}" ({column_list}) SELECT {column_list} FROM "{old}" '
+                f"WHERE \"{self.column}\" >= '{_sqlite_bound(m)}' AND \"{self.column}\" < '{_sqlite_bound(add_months(m, 1))}'"
+                for m in months
+            ]
+            statements.append(
+                f'INSERT INTO "{self.default_name}" ({column_list}) SELECT {column_list} FROM "{old}" '
+                f'WHERE "{self.column}" IS NULL'
+            )
+            statements.append(f'DROP TABLE "{old}"')
+            statements += self._sqlite_routing(months)
+            _sqlite_script(bind, statements)
+        else:
+            with bind.begin() as conn:
+                self._postgres_lock(conn)
+                pkey = conn.execute(text(
+                    "SELECT conname FROM pg_constraint WHERE contype = 'p' AND conrelid = CAST(:name AS regclass)"
+                ), {"name": self.name}).scalar()
+                conn.exec_driver_sql(f'ALTER TABLE "{self.name}" RENAME TO "{old}"')
+                if pkey:
+                    conn.exec_driver_sql(f'ALTER TABLE "{old}" RENAME CONSTRAINT "{pkey}" TO "{old}_pkey"')
+                conn.exec_driver_sql(self._postgres_parent_ddl(bind.dialect))
+                conn.exec_driver_sql(f'CREATE TABLE "{self.default_name}" PARTITION OF "{self.name}" DEFAULT')
+                for month in months:
+                    self._postgres_add_month(conn, month)
+                # The partition column is part of the primary key now; rows without one get the epoch
+                values = ", ".join(
+                    f"COALESCE(\"{c.name}\", TIMESTAMP '1970-01-01')" if c.name == self.column else f'"{c.name}"'
+                    for c in self.table.columns
+                )
+                conn.exec_driver_sql(f'INSERT INTO "{self.name}" ({column_list}) SELECT {values} FROM "{old}"')
+                conn.exec_driver_sql(f'DROP TABLE "{old}"')
+                for index in self.table.indexes:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+        self.state(bind, refresh=True)
+        return len(months)
+
+    def maintain(self, bind, retention_months=0, now=None):
+        """
+        Create partitions up to MONTHS_AHEAD months from now and drop months
+        older than `retention_months` (0 keeps everything)
+        Returns (created months, dropped months)
+        """
+        partitioned, months = self.state(bind, refresh=True)
+        if not partitioned:
+            return [], []
+        now = now or datetime.utcnow()
+        target = add_months(month_of(now), self.months_ahead)
+        start = add_months(months[-1], 1) if months else month_of(now)
+        created = months_between(start, target)
+        cutoff = add_months(month_of(now), -retention_months) if retention_months > 0 else None
+        dropped = [m for m in months if cutoff and m < cutoff]
+        if not created and not dropped:
+            return [], []
+
+        remaining = [m for m in months if m not in dropped] + created
+        if bind.dialect.name == "sqlite":
+            statements = [f'DROP VIEW IF EXISTS "{self.name}"']
+            statements += [f'DROP TABLE IF EXISTS "{self.partition_name(m)}"' for m in dropped]
+            statements += self._sqlite_create_tables(bind, [self.partition_name(m) for m in created])
+            column_list = ", ".join(f'"{c.name}"' for c in self.table.columns)
+            for month in created:
+                # Rows parked in the default partition before their month existed
+                window = (
+                    f"\"{self.column}\" >= '{_sqlite_bound(month)}' AND "
+                    f"\"{self.column}\" < '{_sqlite_bound(add_months(month, 1))}'"
+                )
+                statements.append(
+                    f'INSERT INTO "{self.partition_name(month)}" ({column_list}) '
+                    f'SELECT {column_list} FROM "{self.default_name}" WHERE {window}'
+                )
+                statements.append(f'DELETE FROM "{self.default_name}" WHERE {window}')
+            if cutoff:
+                statements.append(
+                    f'DELETE FROM "{self.default_name}" WHERE "{self.column}" < \'{_sqlite_bound(cutoff)}\''
+                )
+            statements += self._sqlite_routing(remaining)
+            _sqlite_script(bind, statements)
+        else:
+            with bind.begin() as conn:
+                self._postgres_lock(conn)
+                for month in created:
+                    self._postgres_add_month(conn, month)
+                for month in dropped:
+                    name = self.partition_name(month)
+                    conn.exec_driver_sql(f'ALTER TABLE "{self.name}" DETACH PARTITION "{name}"')
+                    conn.exec_driver_sql(f'DROP TABLE "{name}"')
+                if cutoff:
+                    conn.exec_driver_sql(
+                        f'DELETE FROM "{self.default_name}" WHERE "{self.column}" < \'{month_start(cutoff).date()}\''
+                    )
+        self.state(bind, refresh=True)
+        return created, dropped
+
+
+class PartitionedLogs:
+    """
+    The log tables of one server and their partitioning settings
+    Disabled, every method is a no-op and source() returns the model itself
+    """
+
+    def __init__(self, enabled=False, retention_months=0, bind=None):
+        self.enabled = enabled
+        self.retention_months = retention_months
+        self._bind = bind           # engine, or a callable returning it
+        self.tables = {}            # model -> MonthlyPartitions
+
+    def add(self, model, column):
+        if self.enabled and self.bind().dialect.name == "sqlite":
+            # Cascaded ORM deletes through the view's INSTEAD OF triggers report 0 rows;
+            # only this model's mapper stops checking (updates go through update())
+            model.__mapper__.confirm_deleted_rows = False
+        self.tables[model] = MonthlyPartitions(model, column)
+        return self.tables[model]
+
+    def bind(self):
+        return self._bind() if callable(self._bind) else self._bind
+
+    def source(self, model, since=None, until=None):
+        """Entity to read `model` rows timestamped in [since, until] from"""
+        if not self.enabled:
+            return model
+        return self.tables[model].source(self.bind(), since, until)
+
+    def tables_for(self, model, since=None, until=None):
+        """Physical tables to write to for `model` rows timestamped in [since, until]"""
+        if not self.enabled or model not in self.tables:
+            return [model.__table__]
+        return self.tables[model].tables_for(self.bind(), since, until)
+
+    def update(self, conn, model, values, **match):
+        """
+        UPDATE the `model` rows whose columns equal `match`, table by table
+        Returns the number of rows changed
+        """
+        changed = 0
+        for target in self.tables_for(model):
+            statement = target.update().where(*[target.c[name] == value for name, value in match.items()])
+            changed += conn.execute(statement.values(values)).rowcount
+        return changed
+
+    def delete(self, conn, model, **match):
+        """
+        DELETE the `model` rows whose columns equal `match`, table by table
+        Returns the number of rows deleted
+        """
+        deleted = 0
+        for target in self.tables_for(model):
+            statement = target.delete().where(*[target.c[name] == value for name, value in match.items()])
+            deleted += conn.execute(statement).rowcount
+        return deleted
+
+    def partitioned_tables(self, bind=None):
+        """Names of the tables currently partitioned (their indexes are managed here)"""
+        if not self.enabled:
+            return set()
+        bind = bind or self.bind()
+        return {p.name for p in self.tables.values() if p.state(bind)[0]}
+
+    def prepare(self, bind=None):
+        """
+        Before create_all(): lay out missing tables as partitions
+        Existing plain tables are left alone with a warning
+        """
+        if not self.enabled:
+            return
+        bind = bind or self.bind()
+        if bind.dialect.name not in ("sqlite", "postgresql"):
+            print(f"⚠️  LOG_PARTITIONING is not supported on {bind.dialect.name}; log tables stay unpartitioned")
+            self.enabled = False
+            return
+        for partitions in self.tables.values():
+            with bind.connect() as conn:
+                layout = partitions._layout(conn)
+            if layout is None:
+                partitions.create(bind)
+            elif layout == "plain":
+                print(f"⚠️  {partitions.name} is not partitioned yet - run the server's `partition` command")
+
+    def convert(self, bind=None):
+        """Convert existing plain log tables; returns {table: months created}"""
+        bind = bind or self.bind()
+        return {p.name: p.convert(bind) for p in self.tables.values()}
+
+    def maintain(self, bind=None, now=None):
+        """Create upcoming months and apply retention on every partitioned table"""
+        if not self.enabled:
+            return
+        bind = bind or self.bind()
+        for partitions in self.tables.values():
+            created, dropped = partitions.maintain(bind, self.retention_months, now)
+            if created:
+                print(f"🗂️  {partitions.name}: created partitions {', '.join(partitions.partition_name(m) for m in created)}")
+            if dropped:
+                print(f"🗑️  {partitions.name}: dropped partitions {', '.join(partitions.partition_name(m) for m in dropped)}")
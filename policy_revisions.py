@@ -0,0 +1,57 @@
+"""
+SafeGuard Family - Policy Revisions
+Cheap versions for the per-child resources clients poll but that rarely
+change (blocklist, allowlist, limits, reports), for conditional GETs.
+
+  • Every write to a resource bumps a counter row keyed (child_id, resource)
+    in the same transaction as the write itself
+  • A GET reads that one counter together with the ownership check, builds
+    the ETag from it and answers If-None-Match with 304 before loading or
+    serializing any row of the list
+  • Readers read the counter before the rows: a write landing in between
+    pairs the new rows with the old ETag, which only costs the client one
+    more full response later, never a stale 304
+
+The counters live in the database, so all worker processes agree on them.
+"""
+
+from db_utils import upsert_increment
+
+BLOCKLIST = "blocklist"
+ALLOWLIST = "allowlist"
+LIMITS = "limits"
+REPORTS = "reports"
+
+RESOURCES = (BLOCKLIST, ALLOWLIST, LIMITS, REPORTS)
+
+# Sent with every ETag: the browser keeps the body but revalidates each
+# time, so clients get the 304s without handling If-None-Match themselves
+CACHE_CONTROL = "private, no-cache"
+
+
+def etag(resource, revision):
+    """
+    ETag of a resource at a revision
+    Weak: the same revision may be sent gzip- or brotli-encoded
+    """
+    return f'W/"{resource}-{revision or 0}"'
+
+
+def bump(session, table, child_id, *resources):
+    """
+    Increment the revision of resources of a child
+    Call before the commit of the write it versions
+    """
+    bump_many(session, table, [child_id], *resources)
+
+
+def bump_many(session, table, child_ids, *resources):
+    """bump() for several children at once"""
+    upsert_increment(
+        session, table, ["child_id", "resource"],
+        [
+            {"child_id": child_id, "resource": resource, "revision": 1}
+            for child_id in sorted(set(child_ids)) for resource in resources
+        ],
+        "revision"
+    )
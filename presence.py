@@ -0,0 +1,168 @@
+"""
+SafeGuard Family - Device Presence Tracker
+Keeps the last heartbeat of every device in memory and writes them to the
+database in one bulk UPDATE per flush interval, instead of one UPDATE +
+COMMIT per heartbeat.
+
+Used by both app.py (Device.last_sync) and backend_final.py
+(Device.last_heartbeat). Each worker process keeps its own map; flushes only
+move a timestamp forward, so several workers flushing the same device is safe.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, or_, update
+
+# How often pending heartbeats are written to the database (seconds)
+DEFAULT_FLUSH_INTERVAL = 60
+
+
+class PresenceTracker:
+    """
+    In-memory last-seen map for devices
+
+    touch() is O(1) and never touches the database. flush() hands every
+    heartbeat received since the previous flush to a writer in one batch.
+    """
+
+    def __init__(self, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._last_seen = {}   # device_id -> epoch seconds (float)
+        self._pending = {}     # device_id -> epoch seconds not yet flushed
+        self._known = set()    # device ids confirmed to exist in the database
+        self._flusher = None
+        self._stop = threading.Event()
+        self.heartbeats = 0
+        self.flushed_rows = 0
+        self.last_flush_at = None
+
+    # ════════════════════════════════
+    # HEARTBEATS
+    # ════════════════════════════════
+
+    def touch(self, device_id, when=None):
+        """Record a heartbeat; returns its timestamp as epoch seconds"""
+        when = time.time() if when is None else when
+        with self._lock:
+            if when > self._last_seen.get(device_id, 0.0):
+                self._last_seen[device_id] = when
+                self._pending[device_id] = when
+            self.heartbeats += 1
+        return when
+
+    def last_seen(self, device_id):
+        """Last heartbeat seen by this worker as a UTC datetime, or None"""
+        seen = self._last_seen.get(device_id)
+        return datetime.utcfromtimestamp(seen) if seen else None
+
+    def is_known(self, device_id):
+        return device_id in self._known
+
+    def mark_known(self, device_id):
+        self._known.add(device_id)
+
+    def forget(self, device_id):
+        """Drop a deleted device from every map"""
+        with self._lock:
+            self._known.discard(device_id)
+            self._last_seen.pop(device_id, None)
+            self._pending.pop(device_id, None)
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    # ════════════════════════════════
+    # OFFLINE DEVICES
+    # ════════════════════════════════
+
+    def recently_seen(self, device_ids, cutoff):
+        """Subset of device_ids this worker heard from at or after `cutoff` (datetime)"""
+        cutoff_ts = (cutoff - datetime(1970, 1, 1)).total_seconds()
+        return {d for d in device_ids if self._last_seen.get(d, 0.0) >= cutoff_ts}
+
+    def offline_in_memory(self, cutoff):
+        """Device ids whose last heartbeat in this worker is older than `cutoff`"""
+        cutoff_ts = (cutoff - datetime(1970, 1, 1)).total_seconds()
+        with self._lock:
+            return [d for d, seen in self._last_seen.items() if seen < cutoff_ts]
+
+    # ════════════════════════════════
+    # FLUSHING
+    # ════════════════════════════════
+
+    def drain(self):
+        """Take every pending heartbeat, leaving the pending map empty"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def flush(self, write_batch):
+        """
+        Write pending heartbeats with write_batch({device_id: datetime})
+        On failure the batch is put back so the next flush retries it
+        """
+        pending = self.drain()
+        if not pending:
+            return 0
+        batch = {device_id: datetime.utcfromtimestamp(ts) for device_id, ts in pending.items()}
+        try:
+            write_batch(batch)
+        except Exception:
+            with self._lock:
+                for device_id, ts in pending.items():
+                    if ts > self._pending.get(device_id, 0.0):
+                        self._pending[device_id] = ts
+            raise
+        self.flushed_rows += len(batch)
+        self.last_flush_at = datetime.utcnow()
+        return len(batch)
+
+    def start_background_flusher(self, flush_callable):
+        """
+        Call flush_callable() every flush_interval seconds from a daemon thread
+        Safe to call more than once; only one thread is started
+        """
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(
+                target=self._flush_loop, args=(flush_callable,),
+                name="presence-flusher", daemon=True
+            )
+            self._flusher.start()
+
+    def stop_background_flusher(self):
+        self._stop.set()
+
+    def _flush_loop(self, flush_callable):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                flush_callable()
+            except Exception as e:
+                print(f"⚠️  Presence flush error: {e}")
+
+
+def bulk_heartbeat_update(table, key_column, *timestamp_columns, extra_values=None):
+    """
+    Build an executemany UPDATE that moves timestamp columns forward
+
+    Execute it with [{"b_key": device_id, "b_seen": datetime}, ...]; a row
+    is only updated when the new timestamp is newer than the stored one.
+    """
+    guard = timestamp_columns[0]
+    values = {column.key: bindparam("b_seen") for column in timestamp_columns}
+    values.update(extra_values or {})
+    return update(table).where(
+        key_column == bindparam("b_key")
+    ).where(
+        or_(guard == None, guard < bindparam("b_seen"))
+    ).values(**values)
+
+
+def batch_params(batch):
+    """Parameters for bulk_heartbeat_update() from a {device_id: datetime} batch"""
+    return [{"b_key": device_id, "b_seen": seen} for device_id, seen in batch.items()]
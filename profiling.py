@@ -0,0 +1,291 @@
+"""
+SafeGuard Family - Request Profiling
+Opt-in sampling profiler for hot requests in app.py (Flask) and
+backend_final.py (FastAPI), off by default.
+
+  • Requests are picked 1-in-N, by path prefix, or by an X-Profile header
+    carrying PROFILE_HEADER_SECRET (ADMIN_TOKEN when unset); without either
+    secret the header is ignored, so clients cannot profile at will
+  • One sampler thread reads sys._current_frames() every few milliseconds
+    while a picked request is running; nothing is traced or hooked per call
+  • Stacks are aggregated per route and dumped on demand as collapsed stacks
+    (one "frame;frame;frame count" line each), the input format of
+    flamegraph.pl, speedscope and inferno
+
+Which stacks belong to a request:
+  • Flask serves a request on one thread, so that thread's whole stack is taken
+  • FastAPI runs async endpoints on the event loop and sync ones in a thread
+    pool, so a stack is taken from any thread while it runs the route's
+    endpoint function (time spent in middleware and dependencies is not seen)
+
+When PROFILE_ENABLED is false no middleware or hook is installed at all.
+"""
+
+import hmac
+import inspect
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+HEADER = "X-Profile"
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Frames kept per sample, innermost first
+MAX_DEPTH = 128
+
+_UNSAFE_FILENAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse(frame, depth=MAX_DEPTH):
+    """Stack of `frame` as root;...;leaf"""
+    labels = []
+    while frame is not None and len(labels) < depth:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def _on_stack(frame, code):
+    while frame is not None:
+        if frame.f_code is code:
+            return True
+        frame = frame.f_back
+    return False
+
+
+class _Sampled:
+    """A request being profiled"""
+
+    __slots__ = ("route", "thread_id", "code")
+
+    def __init__(self, route, thread_id=None, code=None):
+        self.route = route          # str, or a callable resolving the matched route late
+        self.thread_id = thread_id  # sample this thread...
+        self.code = code            # ...or any thread running this code (callable allowed)
+
+    def resolve(self):
+        if callable(self.route):
+            self.route = self.route()
+        if self.code is not None and not inspect.iscode(self.code):
+            self.code = self.code()
+
+
+class SamplingProfiler:
+    """
+    Picks requests to profile and aggregates their sampled stacks per route
+
+    sample_every  profile 1 request in N (0: only routes/header)
+    routes        path prefixes that are always profiled
+    interval      seconds between samples
+    header_secret X-Profile value that picks a request ("" ignores the header)
+    """
+
+    def __init__(self, sample_every=100, routes=(), interval=0.005, output_dir="profiles", header_secret=""):
+        self.sample_every = sample_every
+        self.routes = tuple(r for r in routes if r)
+        self.interval = interval
+        self.output_dir = output_dir
+        self.header_secret = header_secret
+
+        self._counter = itertools.count(1)
+        self._active = {}          # id(_Sampled) -> _Sampled
+        self._stacks = {}          # route -> {collapsed stack: samples}
+        self._requests = {}        # route -> profiled requests
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.samples = 0
+
+    # ════════════════════════════════
+    # REQUEST SELECTION
+    # ════════════════════════════════
+
+    def wants(self, path, header_value=None):
+        """Should this request be profiled?"""
+        # As bytes: compare_digest raises TypeError for str holding non-ASCII characters
+        if self.header_secret and header_value and hmac.compare_digest(
+            header_value.encode(), self.header_secret.encode()
+        ):
+            return True
+        if self.routes and path.startswith(self.routes):
+            return True
+        return self.sample_every > 0 and next(self._counter) % self.sample_every == 0
+
+    def begin(self, route, thread_id=None, code=None):
+        sampled = _Sampled(route, thread_id, code)
+        self._start()
+        with self._lock:
+            self._active[id(sampled)] = sampled
+            self._wake.set()
+        return sampled
+
+    def end(self, sampled):
+        try:
+            sampled.resolve()
+        except Exception:
+            # Never routed (404)
+            sampled.route, sampled.code = UNMATCHED_ROUTE, None
+        with self._lock:
+            self._active.pop(id(sampled), None)
+            self._requests[sampled.route] = self._requests.get(sampled.route, 0) + 1
+
+    # ════════════════════════════════
+    # SAMPLER
+    # ════════════════════════════════
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            self._wake.wait()
+            with self._lock:
+                active = list(self._active.values())
+                if not active:
+                    self._wake.clear()
+                    continue
+            frames = sys._current_frames()
+            frames.pop(me, None)
+            for sampled in active:
+                self._sample(sampled, frames)
+            time.sleep(self.interval)
+
+    def _sample(self, sampled, frames):
+        try:
+            sampled.resolve()
+        except Exception:
+            return   # route or endpoint not known yet (still routing)
+        if sampled.thread_id is not None:
+            stacks = [collapse(frames[sampled.thread_id])] if sampled.thread_id in frames else []
+        elif sampled.code is not None:
+            stacks = [collapse(frame) for frame in frames.values() if _on_stack(frame, sampled.code)]
+        else:
+            return
+        if not stacks:
+            return
+        with self._lock:
+            counts = self._stacks.setdefault(sampled.route, {})
+            for stack in stacks:
+                counts[stack] = counts.get(stack, 0) + 1
+            self.samples += len(stacks)
+
+    # ════════════════════════════════
+    # OUTPUT
+    # ════════════════════════════════
+
+    def summary(self):
+        with self._lock:
+            return {
+                "active": len(self._active),
+                "samples": self.samples,
+                "routes": {
+                    route: {"requests": self._requests.get(route, 0), "samples": sum(counts.values())}
+                    for route, counts in self._stacks.items()
+                }
+            }
+
+    def dump(self, reset=True):
+        """
+        Write one <route>.<timestamp>.collapsed file per route to output_dir
+        Returns the paths written
+        """
+        with self._lock:
+            if reset:
+                stacks = self._stacks
+                self._stacks, self._requests, self.samples = {}, {}, 0
+            else:
+                stacks = {route: dict(counts) for route, counts in self._stacks.items()}
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        paths = []
+        for route, counts in stacks.items():
+            name = _UNSAFE_FILENAME.sub("_", route).strip("_") or "root"
+            path = os.path.join(self.output_dir, f"{name}.{stamp}.collapsed")
+            with open(path, "w") as f:
+                for stack, count in sorted(counts.items(), key=lambda item: -item[1]):
+                    f.write(f"{stack} {count}\n")
+            paths.append(path)
+        return paths
+
+
+def profiler_from_env():
+    """Profiler configured from PROFILE_* variables, or None when disabled"""
+    if os.environ.get("PROFILE_ENABLED", "false").lower() != "true":
+        return None
+    return SamplingProfiler(
+        sample_every=int(os.environ.get("PROFILE_SAMPLE_EVERY", 100)),
+        routes=[r.strip() for r in os.environ.get("PROFILE_ROUTES", "").split(",")],
+        interval=float(os.environ.get("PROFILE_INTERVAL_MS", 5)) / 1000,
+        output_dir=os.environ.get("PROFILE_DIR", "profiles"),
+        header_secret=os.environ.get("PROFILE_HEADER_SECRET") or os.environ.get("ADMIN_TOKEN", "")
+    )
+
+
+# ════════════════════════════════
+# ASGI (FastAPI)
+# ════════════════════════════════
+
+class ProfilingMiddleware:
+    """Profiles the requests SamplingProfiler.wants(); others pass straight through"""
+
+    def __init__(self, app, profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile":
+                header = value.decode("latin-1")
+        if not self.profiler.wants(scope["path"], header):
+            await self.app(scope, receive, send)
+            return
+
+        sampled = self.profiler.begin(
+            lambda: scope["route"].path,
+            code=lambda: inspect.unwrap(scope["endpoint"]).__code__
+        )
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.end(sampled)
+
+
+# ════════════════════════════════
+# FLASK
+# ════════════════════════════════
+
+def init_flask_profiling(app, profiler):
+    """Profile picked Flask requests through request hooks"""
+    from flask import g, request
+
+    @app.before_request
+    def _profile_start():
+        if profiler.wants(request.path, request.headers.get(HEADER)):
+            rule = request.url_rule
+            g._profile = profiler.begin(rule.rule if rule is not None else UNMATCHED_ROUTE, thread_id=threading.get_ident())
+
+    @app.teardown_request
+    def _profile_finish(exc):
+        sampled = g.pop("_profile", None)
+        if sampled is not None:
+            profiler.end(sampled)
@@ -0,0 +1,233 @@
+"""
+SafeGuard Family - Query Statistics
+Per-request SQL query counts and DB time, plus a slow-query log, for
+app.py (Flask) and backend_final.py (FastAPI)
+
+  • QueryMonitor.instrument(engine) hooks before/after_cursor_execute
+  • Each request gets a RequestQueryStats in a ContextVar; FastAPI copies the
+    context into its threadpool, so sync endpoints and dependencies count too
+  • Statements slower than the threshold are printed with normalized SQL and
+    the route they ran under, and kept in a fixed-size ring buffer
+  • Per-route query counts and DB time go to the metrics registry
+
+Queries outside a request (background tasks, startup) are not attributed to
+a route but still reach the slow-query log as "<background>".
+"""
+
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+
+from sqlalchemy import event
+
+# Statement text kept per slow query
+MAX_STATEMENT_LENGTH = 2000
+
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+BACKGROUND_ROUTE = "<background>"
+UNMATCHED_ROUTE = "<unmatched>"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_NAMED_PARAM = re.compile(r"%\(\w+\)s|(?<![:\w]):[A-Za-z_]\w*")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_current = ContextVar("safeguard_query_stats", default=None)
+
+
+def normalize_sql(statement):
+    """SQL with literals and parameters replaced by ? and IN lists folded"""
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _NAMED_PARAM.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _VALUE_LIST.sub("(?...)", sql)
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    return sql[:MAX_STATEMENT_LENGTH]
+
+
+class RequestQueryStats:
+    """Queries run while serving one request"""
+
+    __slots__ = ("method", "route", "count", "seconds")
+
+    def __init__(self, method, route=None):
+        self.method = method
+        self.route = route    # str, or a callable resolving the matched route late
+        self.count = 0
+        self.seconds = 0.0
+
+    def route_label(self):
+        route = self.route() if callable(self.route) else self.route
+        return route or UNMATCHED_ROUTE
+
+    def headers(self):
+        return {
+            "X-DB-Query-Count": str(self.count),
+            "X-DB-Time-Ms": f"{self.seconds * 1000:.2f}"
+        }
+
+
+def begin_request(method, route=None):
+    """Start counting for the current request; returns a token for end_request()"""
+    stats = RequestQueryStats(method, route)
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_stats():
+    return _current.get()
+
+
+class SlowQueryLog:
+    """Last `size` statements slower than `threshold_ms`"""
+
+    def __init__(self, threshold_ms=200, size=100):
+        self.threshold = threshold_ms / 1000
+        self.threshold_ms = threshold_ms
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def record(self, statement, seconds, stats=None):
+        entry = {
+            "at": datetime.utcnow().isoformat(),
+            "duration_ms": round(seconds * 1000, 2),
+            "method": stats.method if stats else None,
+            "route": stats.route_label() if stats else BACKGROUND_ROUTE,
+            "statement": normalize_sql(statement)
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self.total += 1
+        print(f"🐢 Slow query ({entry['duration_ms']} ms) on {entry['method'] or ''} {entry['route']}: {entry['statement']}")
+        return entry
+
+    def entries(self):
+        """Newest first"""
+        with self._lock:
+            return list(reversed(self._entries))
+
+
+class QueryMonitor:
+    """Counts queries per request and feeds the slow-query log and metrics"""
+
+    def __init__(self, slow_log, metrics=None):
+        self.slow_log = slow_log
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.histogram("http_request_db_queries", "SQL statements per request", ("route",), buckets=QUERY_COUNT_BUCKETS)
+            metrics.histogram("http_request_db_seconds", "Database time per request", ("route",), buckets=DB_TIME_BUCKETS)
+            metrics.counter("db_slow_queries_total", "Statements slower than the slow-query threshold", ("route",))
+
+    def instrument(self, engine):
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+
+    # The start time rides on the statement's execution context, which is
+    # discarded with it: a statement that fails (no after_cursor_execute)
+    # leaves nothing behind on the connection
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_started
+        stats = _current.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+        if elapsed >= self.slow_log.threshold:
+            entry = self.slow_log.record(statement, elapsed, stats)
+            if self.metrics is not None:
+                self.metrics.inc("db_slow_queries_total", (entry["route"],))
+
+    def finish(self, stats):
+        """Record a finished request's totals in the metrics registry"""
+        if self.metrics is None:
+            return
+        route = (stats.route_label(),)
+        self.metrics.observe("http_request_db_queries", route, stats.count)
+        self.metrics.observe("http_request_db_seconds", route, stats.seconds)
+
+
+# ════════════════════════════════
+# ASGI (FastAPI)
+# ════════════════════════════════
+
+class QueryStatsMiddleware:
+    """
+    Pure ASGI middleware giving each request its RequestQueryStats
+    With debug_headers, responses carry X-DB-Query-Count and X-DB-Time-Ms
+    (counted up to the moment the headers are sent)
+    """
+
+    def __init__(self, app, monitor, debug_headers=False):
+        self.app = app
+        self.monitor = monitor
+        self.debug_headers = debug_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = begin_request(scope["method"], lambda: getattr(scope.get("route"), "path", None))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and self.debug_headers:
+                headers = list(message.get("headers", []))
+                headers.extend((k.lower().encode(), v.encode()) for k, v in stats.headers().items())
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end_request(token)
+            self.monitor.finish(stats)
+
+
+# ════════════════════════════════
+# FLASK
+# ════════════════════════════════
+
+def init_flask_query_stats(app, monitor, debug_headers=None):
+    """
+    Per-request query stats for a Flask app
+    debug_headers=None follows app.debug
+    """
+    from flask import g, request
+
+    def route():
+        rule = request.url_rule
+        return rule.rule if rule is not None else None
+
+    @app.before_request
+    def _query_stats_start():
+        g._query_stats, g._query_stats_token = begin_request(request.method, route)
+
+    @app.after_request
+    def _query_stats_headers(response):
+        stats = g.get("_query_stats")
+        if stats is not None and (app.debug if debug_headers is None else debug_headers):
+            response.headers.update(stats.headers())
+        return response
+
+    @app.teardown_request
+    def _query_stats_finish(exc):
+        stats = g.pop("_query_stats", None)
+        if stats is None:
+            return
+        # Resolve the route while the request context is still active
+        stats.route = stats.route_label()
+        end_request(g.pop("_query_stats_token"))
+        monitor.finish(stats)
@@ -0,0 +1,410 @@
+"""
+SafeGuard Family - Response Encoding
+JSON serialization and response compression for app.py (Flask) and
+backend_final.py (FastAPI)
+
+  • dumps()/loads() use orjson when it is installed (C-backed, encodes
+    datetimes natively in the same ISO format as .isoformat()), the
+    standard json module otherwise
+  • FastAPI: endpoints without a response_model that return a plain dict or
+    list are encoded directly, skipping the jsonable_encoder walk that
+    copies every value of the payload before it is serialized
+  • Flask: jsonify() and request.get_json() go through the same encoder
+  • Responses above a size threshold are compressed with brotli (when
+    installed) or gzip, if the client's Accept-Encoding allows it; streamed
+    NDJSON exports are compressed chunk by chunk
+
+Both orjson and brotli are optional; without them output is the same JSON
+from the standard library and gzip only.
+"""
+
+import gzip
+import json
+import zlib
+from datetime import date, datetime, time
+from decimal import Decimal
+from pathlib import PurePath
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+# Bodies smaller than this are sent as they are; compressing them saves
+# less than the Content-Encoding round trip costs
+COMPRESS_MIN_BYTES = 1024
+
+# Cheap levels: responses are compressed on every request, not once
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+# Never compressed even though they are text: event streams must reach the
+# client message by message
+_NEVER_COMPRESSED = ("text/event-stream",)
+
+_COMPRESSIBLE_SUFFIXES = ("+json", "+xml")
+_COMPRESSIBLE_TYPES = (
+    "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "image/svg+xml"
+)
+
+
+# ════════════════════════════════
+# JSON
+# ════════════════════════════════
+
+def _default(value):
+    """Types neither encoder handles on its own"""
+    if hasattr(value, "model_dump"):  # pydantic models
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):  # standard json only
+        return value.isoformat()
+    if isinstance(value, PurePath):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(value):
+        """Encode to JSON bytes"""
+        return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+
+    loads = orjson.loads
+else:
+    def dumps(value):
+        """Encode to JSON bytes"""
+        return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+    loads = json.loads
+
+
+def backend():
+    """Name of the JSON encoder in use"""
+    return "orjson" if orjson is not None else "json"
+
+
+# ════════════════════════════════
+# COMPRESSION
+# ════════════════════════════════
+
+def available_encodings():
+    """Content codings this process can produce, preferred first"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding):
+    """
+    Best content coding allowed by an Accept-Encoding header, or None
+    Honours q-values (q=0 refuses a coding) and the * wildcard
+    """
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+
+    best, best_q = None, 0.0
+    for coding in available_encodings():
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compressible(content_type):
+    """Whether a response of this Content-Type is worth compressing"""
+    if not content_type:
+        return False
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type in _NEVER_COMPRESSED:
+        return False
+    return (
+        media_type.startswith("text/")
+        or media_type in _COMPRESSIBLE_TYPES
+        or media_type.endswith(_COMPRESSIBLE_SUFFIXES)
+    )
+
+
+def compress(body, encoding):
+    """Compress a whole body with "br" or "gzip" """
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    """
+    Incremental compressor for streamed bodies
+    Every chunk is flushed, so the client can decode each one as it arrives
+    """
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def chunk(self, data):
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def iter_compressed(chunks, encoding):
+    """Compress an iterable of str/bytes chunks as one stream"""
+    compressor = StreamCompressor(encoding)
+    for data in chunks:
+        if isinstance(data, str):
+            data = data.encode()
+        if data:
+            yield compressor.chunk(data)
+    yield compressor.finish()
+
+
+# ════════════════════════════════
+# CONDITIONAL REQUESTS
+# ════════════════════════════════
+
+def etag_matches(if_none_match, tag):
+    """Whether an If-None-Match header lists `tag` (weak comparison) or is *"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = tag[2:] if tag.startswith("W/") else tag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def _add_vary(value):
+    """Vary header value with Accept-Encoding added"""
+    if not value:
+        return "Accept-Encoding"
+    if "accept-encoding" in value.lower() or value.strip() == "*":
+        return value
+    return f"{value}, Accept-Encoding"
+
+
+# ════════════════════════════════
+# FASTAPI (ASGI)
+# ════════════════════════════════
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing response bodies
+    A single-message body is compressed when it reaches min_size; a streamed
+    body (several messages) is compressed message by message
+    """
+
+    def __init__(self, app, min_size=COMPRESS_MIN_BYTES):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if compressor is not None:
+                data = compressor.chunk(body) if body else b""
+                if not more:
+                    data += compressor.finish()
+                await send({"type": "http.response.body", "body": data, "more_body": more})
+                return
+
+            headers = {k.lower(): v for k, v in start.get("headers", [])}
+            if (
+                b"content-encoding" in headers
+                or start["status"] < 200 or start["status"] in (204, 304)
+                or not compressible(headers.get(b"content-type", b"").decode("latin-1"))
+                or (not more and len(body) < self.min_size)
+            ):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            if more:
+                compressor = StreamCompressor(encoding)
+                data = compressor.chunk(body) if body else b""
+            else:
+                data = compress(body, encoding)
+
+            vary = headers.get(b"vary", b"").decode("latin-1")
+            raw = [
+                (k, v) for k, v in start.get("headers", [])
+                if k.lower() not in (b"content-length", b"vary")
+            ]
+            raw.append((b"content-encoding", encoding.encode()))
+            raw.append((b"vary", _add_vary(vary).encode("latin-1")))
+            if not more:
+                raw.append((b"content-length", str(len(data)).encode()))
+            await send(dict(start, headers=raw))
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _plain_json_endpoint(call, status_code):
+    """
+    Wrap an endpoint so plain dict/list results become a ready JSON response
+    Anything else (responses, pydantic models, None) is left to FastAPI
+    """
+    import asyncio
+
+    from starlette.responses import Response
+
+    def encode(result):
+        if type(result) in (dict, list):
+            return Response(dumps(result), status_code=status_code or 200, media_type=JSON_MEDIA_TYPE)
+        return result
+
+    if asyncio.iscoroutinefunction(call):
+        async def endpoint(*args, **kwargs):
+            return encode(await call(*args, **kwargs))
+    else:
+        # Stays sync so FastAPI keeps running it in the threadpool
+        def endpoint(*args, **kwargs):
+            return encode(call(*args, **kwargs))
+    return endpoint
+
+
+def fast_json_route_class():
+    """
+    APIRoute subclass encoding plain dict/list results with dumps()
+    Routes with a response_model, or that take a `response: Response`
+    parameter to set headers, keep FastAPI's own serialization
+    """
+    from fastapi.routing import APIRoute
+    from starlette.routing import request_response
+
+    class FastJSONRoute(APIRoute):
+        def __init__(self, path, endpoint, **kwargs):
+            super().__init__(path, endpoint, **kwargs)
+            if self.response_field is None and self.dependant.response_param_name is None:
+                self.dependant.call = _plain_json_endpoint(self.dependant.call, self.status_code)
+                self.app = request_response(self.get_route_handler())
+
+    return FastJSONRoute
+
+
+def init_fastapi_responses(app, compress_min_size=COMPRESS_MIN_BYTES, compression=True):
+    """
+    Fast JSON encoding and compression for a FastAPI app
+    Call right after creating the app: only routes declared afterwards use
+    the fast encoder
+    """
+    app.router.route_class = fast_json_route_class()
+    if compression:
+        app.add_middleware(CompressionMiddleware, min_size=compress_min_size)
+
+
+# ════════════════════════════════
+# FLASK
+# ════════════════════════════════
+
+def init_flask_responses(app, compress_min_size=COMPRESS_MIN_BYTES, compression=True):
+    """Fast JSON provider (jsonify, get_json) and response compression for a Flask app"""
+    from flask import request
+    from flask.json.provider import JSONProvider
+
+    class FastJSONProvider(JSONProvider):
+        def dumps(self, obj, **kwargs):
+            return dumps(obj).decode()
+
+        def loads(self, s, **kwargs):
+            return loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(dumps(obj), mimetype=JSON_MEDIA_TYPE)
+
+    app.json = FastJSONProvider(app)
+    if not compression:
+        return
+
+    @app.after_request
+    def _compress_response(response):
+        if (
+            response.direct_passthrough  # send_file / static files
+            or "Content-Encoding" in response.headers
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or request.method == "HEAD"
+            or not compressible(response.content_type)
+        ):
+            return response
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = iter_compressed(response.response, encoding)
+            response.headers.pop("Content-Length", None)
+        else:
+            body = response.get_data()
+            if len(body) < compress_min_size:
+                return response
+            response.set_data(compress(body, encoding))
+        response.headers["Content-Encoding"] = encoding
+        response.headers["Vary"] = _add_vary(response.headers.get("Vary"))
+        return response
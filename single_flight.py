@@ -0,0 +1,84 @@
+"""
+SafeGuard Family - Request Coalescing
+Single-flight for the expensive read endpoints of backend_final.py (FastAPI):
+identical requests arriving while one is being computed wait for that
+computation and get its result instead of running their own.
+
+  • Requests are identical when they share a key: the endpoint, the
+    authorization scope (the parent) and the parameters that shape the
+    result. Keys never span parents, so nobody is handed another parent's data
+  • The computation runs in a worker thread as its own task; a caller that
+    disconnects does not cancel it for the others still waiting
+  • Errors (404s included) reach every waiting caller and are not kept
+  • With a TTL, finished results are also served for that many seconds;
+    writes are not seen until the result expires, so keep it short
+
+Counts go to the metrics registry as single_flight_requests_total by
+result: computed, shared (joined an in-flight computation) or cached.
+Each worker process coalesces only its own requests.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+# Finished results kept for the TTL, least recently stored dropped first
+DEFAULT_MAX_RESULTS = 1000
+
+
+class SingleFlight:
+    """Share one in-flight computation per key between concurrent callers"""
+
+    def __init__(self, ttl=0, max_results=DEFAULT_MAX_RESULTS, metrics=None):
+        self.ttl = ttl
+        self.max_results = max_results
+        self.metrics = metrics
+        self._inflight = {}             # key -> task
+        self._results = OrderedDict()   # key -> (expires, result)
+        if metrics is not None:
+            metrics.counter(
+                "single_flight_requests_total",
+                "Expensive reads computed, shared with an identical in-flight request, or served from the short result cache",
+                ("endpoint", "result")
+            )
+
+    async def run(self, endpoint, key, fn, *args):
+        """
+        Result of fn(*args), computed once for all concurrent callers of
+        (endpoint, key); fn runs in a worker thread
+        Only touched from the event loop thread, so no lock is needed
+        """
+        key = (endpoint, key)
+        entry = self._results.get(key)
+        if entry is not None:
+            if time.monotonic() < entry[0]:
+                self._count(endpoint, "cached")
+                return entry[1]
+            del self._results[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+            self._count(endpoint, "computed")
+        else:
+            self._count(endpoint, "shared")
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled() or task.exception() is not None or self.ttl <= 0:
+            return
+        self._results.pop(key, None)
+        self._results[key] = (time.monotonic() + self.ttl, task.result())
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+
+    def _count(self, endpoint, result):
+        if self.metrics is not None:
+            self.metrics.inc("single_flight_requests_total", (endpoint, result))
+
+    def in_flight(self):
+        return len(self._inflight)
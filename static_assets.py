@@ -0,0 +1,274 @@
+"""
+SafeGuard Family - Static Assets
+Dashboard pages, scripts and styles served from memory for app.py (Flask)
+and backend_final.py (FastAPI)
+
+  • Files are read once, at startup, and again when one of them is added,
+    changed or removed: a daemon thread per process checks every
+    reload_seconds (0 never checks), so requests never walk or stat the
+    directory, and the FastAPI event loop never waits on the disk
+  • Text assets are precompressed with brotli (when installed) and gzip at
+    load time, so requests never compress or touch the disk
+  • Every file gets a strong ETag from its content hash, and a content-
+    hashed URL (/assets/dashboard.3f9a1c2b0d.css); references to
+    /assets/<file> in the HTML pages are rewritten to those URLs
+  • Hashed URLs are cached by browsers for a year without revalidation;
+    pages and plain URLs are revalidated every time (304 when unchanged)
+
+A hashed URL whose hash is no longer current (a page loaded just before a
+change) gets the current file with revalidation headers instead of a 404.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+
+from response_encoding import (
+    COMPRESS_MIN_BYTES, available_encodings, choose_encoding, compress, compressible, etag_matches
+)
+
+DEFAULT_RELOAD_SECONDS = 2
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Hex digits of the content hash in ETags and asset URLs
+HASH_LENGTH = 10
+
+_HASHED_NAME = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)$" % HASH_LENGTH)
+
+
+class Asset:
+    """One file as served: body, precompressed variants and validators"""
+
+    __slots__ = ("name", "content_type", "body", "encoded", "digest", "hashed_name")
+
+    def __init__(self, name, content_type, body, encodings, min_size):
+        self.name = name
+        self.content_type = content_type
+        self.body = body
+        self.digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+        stem, ext = os.path.splitext(name)
+        self.hashed_name = f"{stem}.{self.digest}{ext}" if ext else name
+        self.encoded = {}
+        if compressible(content_type) and len(body) >= min_size:
+            for encoding in encodings:
+                data = compress(body, encoding)
+                if len(data) < len(body):
+                    self.encoded[encoding] = data
+
+    def etag(self, encoding=None):
+        """Strong ETag of one representation (each encoding is different bytes)"""
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+
+class StaticAssets:
+    """In-memory, precompressed copy of a directory (or of some files in it)"""
+
+    def __init__(self, directory, files=None, url_prefix="/assets",
+                 reload_seconds=DEFAULT_RELOAD_SECONDS, min_size=COMPRESS_MIN_BYTES):
+        self.directory = os.path.abspath(directory)
+        self.files = files
+        self.url_prefix = url_prefix.rstrip("/")
+        self.reload_seconds = reload_seconds
+        self.min_size = min_size
+        self._lock = threading.Lock()
+        self._assets = {}       # name and hashed name -> Asset
+        self._stamps = {}       # name -> (mtime_ns, size) at load
+        self._checked = time.monotonic()
+        self._watcher_pid = None    # process the change-detection thread runs in
+        self.load()
+
+    # ════════════════════════════════
+    # LOADING
+    # ════════════════════════════════
+
+    def _names(self):
+        if self.files is not None:
+            return [name for name in self.files if os.path.isfile(os.path.join(self.directory, name))]
+        names = []
+        for root, dirs, files in os.walk(self.directory):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for filename in files:
+                if not filename.startswith("."):
+                    names.append(os.path.relpath(os.path.join(root, filename), self.directory).replace(os.sep, "/"))
+        return sorted(names)
+
+    def _stat(self, names):
+        stamps = {}
+        for name in names:
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            stamps[name] = (st.st_mtime_ns, st.st_size)
+        return stamps
+
+    def load(self):
+        """(Re)read every file; pages are loaded last so they link the new hashes"""
+        names = self._names()
+        stamps = self._stat(names)
+        encodings = available_encodings()
+        raw = {}
+        for name in stamps:
+            with open(os.path.join(self.directory, name), "rb") as f:
+                raw[name] = f.read()
+
+        assets = {}
+        pages = []
+        for name, body in raw.items():
+            content_type = self._content_type(name)
+            if content_type.startswith("text/html"):
+                pages.append((name, content_type, body))
+                continue
+            asset = Asset(name, content_type, body, encodings, self.min_size)
+            assets[name] = assets[asset.hashed_name] = asset
+
+        for name, content_type, body in pages:
+            asset = Asset(name, content_type, self._link(body, assets), encodings, self.min_size)
+            assets[name] = assets[asset.hashed_name] = asset
+
+        with self._lock:
+            self._assets = assets
+            self._stamps = stamps
+        return len(stamps)
+
+    def _content_type(self, name):
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+            content_type += "; charset=utf-8"
+        return content_type
+
+    def _link(self, body, assets):
+        """Point /assets/<file> references of a page at the content-hashed URLs"""
+        prefix = re.escape(self.url_prefix + "/")
+        pattern = re.compile(rb"(?P<quote>[\"'])" + prefix.encode() + rb"(?P<name>[^\"'?#]+)(?P=quote)")
+
+        def hashed(match):
+            asset = assets.get(match.group("name").decode())
+            if asset is None:
+                return match.group(0)
+            quote = match.group("quote")
+            return quote + self.url(asset.name, assets).encode() + quote
+
+        return pattern.sub(hashed, body)
+
+    def refresh(self, now=None):
+        """Reload when a file changed, at most once every reload_seconds"""
+        if self.reload_seconds <= 0:
+            return False
+        now = time.monotonic() if now is None else now
+        if now - self._checked < self.reload_seconds:
+            return False
+        self._checked = now
+        if self._stat(self._names()) == self._stamps:
+            return False
+        self.load()
+        return True
+
+    def _watch(self):
+        """Start this process's change-detection thread, once (a forked worker starts its own)"""
+        if self.reload_seconds <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+        threading.Thread(target=self._watch_forever, name="static-assets", daemon=True).start()
+
+    def _watch_forever(self):
+        while self.reload_seconds > 0:
+            time.sleep(self.reload_seconds)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️  Static asset reload failed: {e}")
+
+    # ════════════════════════════════
+    # SERVING
+    # ════════════════════════════════
+
+    def url(self, name, assets=None):
+        """Content-hashed URL of a file, or its plain URL if unknown"""
+        asset = (self._assets if assets is None else assets).get(name)
+        return f"{self.url_prefix}/{asset.hashed_name if asset else name}"
+
+    def lookup(self, name):
+        """(asset, immutable) for a plain or hashed name; (None, False) if unknown"""
+        self._watch()
+        asset = self._assets.get(name)
+        if asset is not None:
+            return asset, name == asset.hashed_name and name != asset.name
+        match = _HASHED_NAME.match(name)
+        if match:
+            asset = self._assets.get(match.group("stem") + match.group("ext"))
+        return asset, False
+
+    def respond(self, name, if_none_match=None, accept_encoding=None):
+        """
+        (status, headers, body) for a request of a file, or None if unknown
+        Headers are a plain dict; 304 when If-None-Match lists any representation
+        """
+        asset, immutable = self.lookup(name)
+        if asset is None:
+            return None
+
+        encoding = choose_encoding(accept_encoding) if asset.encoded else None
+        if encoding not in asset.encoded:
+            encoding = None
+        headers = {
+            "ETag": asset.etag(encoding),
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        }
+        if asset.encoded:
+            headers["Vary"] = "Accept-Encoding"
+
+        if if_none_match and any(
+            etag_matches(if_none_match, asset.etag(variant)) for variant in (None, *asset.encoded)
+        ):
+            return 304, headers, b""
+
+        headers["Content-Type"] = asset.content_type
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            return 200, headers, asset.encoded[encoding]
+        return 200, headers, asset.body
+
+    def __contains__(self, name):
+        return self.lookup(name)[0] is not None
+
+    def __len__(self):
+        return len(self._stamps)
+
+
+# ════════════════════════════════
+# FASTAPI (ASGI)
+# ════════════════════════════════
+
+def asgi_response(assets, name, request):
+    """Starlette response for a file of `assets`, or None if unknown"""
+    from starlette.responses import Response
+
+    result = assets.respond(name, request.headers.get("if-none-match"), request.headers.get("accept-encoding"))
+    if result is None:
+        return None
+    status, headers, body = result
+    return Response(body, status_code=status, headers=headers)
+
+
+# ════════════════════════════════
+# FLASK
+# ════════════════════════════════
+
+def flask_response(assets, name):
+    """Flask response for a file of `assets`; 404 if unknown"""
+    from flask import abort, current_app, request
+
+    result = assets.respond(name, request.headers.get("If-None-Match"), request.headers.get("Accept-Encoding"))
+    if result is None:
+        abort(404)
+    status, headers, body = result
+    return current_app.response_class(body, status=status, headers=headers)
@@ -0,0 +1,190 @@
+"""
+Extension Alert Tests
+alerts.DeadlineWheel scheduling and expiry, and the extension_removed
+alerts of app.py: one alert per silence across workers, re-arming devices
+another worker heard from, the serverless sweep and the SSE stream
+
+Runs the Flask server in-process against a temporary SQLite database:
+    python -m pytest test_alerts.py -q
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Point the server at a throwaway database before it is imported
+_tmp_dir = tempfile.mkdtemp(prefix="safeguard-test-")
+os.environ["database_url"] = f"sqlite:///{os.path.join(_tmp_dir, 'flask.db')}"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import app as flask_server
+from alerts import DeadlineWheel
+from db_utils import encode_cursor
+
+
+# ═══════════════════════════════════════════════════════════════
+# DEADLINE WHEEL
+# ═══════════════════════════════════════════════════════════════
+
+def test_scheduled_keys_expire_once_their_deadline_passes():
+    wheel = DeadlineWheel(timeout=10, resolution=1.0)
+    now = time.time()
+    wheel.schedule("laptop", now)
+    wheel.schedule("tablet", now + 5)
+    assert len(wheel) == 2 and wheel.deadline("laptop") == int(now + 10)
+
+    assert wheel.advance(now + 9) == []
+    assert wheel.advance(now + 11) == ["laptop"]
+    assert "laptop" not in wheel and "tablet" in wheel
+    assert wheel.advance(now + 16) == ["tablet"]
+    assert len(wheel) == 0 and wheel.expired == 2
+
+
+def test_rescheduling_pushes_the_deadline_back():
+    wheel = DeadlineWheel(timeout=10, resolution=1.0)
+    now = time.time()
+    wheel.schedule("laptop", now)
+    for beat in range(1, 30, 3):
+        # Each heartbeat moves the key to a later slot before it is due
+        assert wheel.advance(now + beat) == []
+        wheel.schedule("laptop", now + beat)
+    assert wheel.deadline("laptop") == int(now + 28 + 10)
+    assert wheel.advance(now + 39) == ["laptop"]
+
+
+def test_cancelled_keys_never_expire():
+    wheel = DeadlineWheel(timeout=10, resolution=1.0)
+    now = time.time()
+    wheel.schedule("laptop", now)
+    wheel.cancel("laptop")
+    wheel.cancel("unknown")
+    assert wheel.deadline("laptop") is None
+    assert wheel.advance(now + 60) == []
+
+
+def test_full_wheel_rejects_new_keys_and_long_pauses_catch_up():
+    wheel = DeadlineWheel(timeout=10, resolution=1.0, max_entries=2)
+    now = time.time()
+    assert wheel.schedule("a", now) and wheel.schedule("b", now + 3)
+    assert not wheel.schedule("c", now)
+    assert wheel.schedule("a", now + 1)  # known keys can still move
+    assert wheel.rejected == 1
+    # A pause much longer than the wheel's turn still expires everything due
+    assert sorted(wheel.advance(now + 3600)) == ["a", "b"]
+
+
+# ═══════════════════════════════════════════════════════════════
+# EXTENSION ALERTS (app.py)
+# ═══════════════════════════════════════════════════════════════
+
+@pytest.fixture(scope="module")
+def flask_client():
+    with flask_server.app.app_context():
+        flask_server.db.create_all()
+    return flask_server.app.test_client()
+
+
+def seed_device(suffix, last_sync):
+    fs = flask_server
+    with fs.app.app_context():
+        fs.db.session.add(fs.Parent(id=f"p-{suffix}", email=f"{suffix}@test", password_hash="x"))
+        fs.db.session.add(fs.Child(id=f"c-{suffix}", parent_id=f"p-{suffix}", name="Kid"))
+        fs.db.session.add(fs.ParentSession(
+            id=f"s-{suffix}", parent_id=f"p-{suffix}", token=f"t-{suffix}",
+            expires_at=datetime.utcnow() + timedelta(days=1)
+        ))
+        fs.db.session.add(fs.Device(
+            id=f"d-{suffix}", child_id=f"c-{suffix}", device_name="Laptop", last_sync=last_sync
+        ))
+        fs.db.session.commit()
+    return f"d-{suffix}"
+
+
+def stored_alerts(device_id):
+    with flask_server.app.app_context():
+        return flask_server.DeviceAlert.query.filter_by(device_id=device_id).all()
+
+
+def silent_since(minutes):
+    return datetime.utcnow() - timedelta(minutes=minutes)
+
+
+def test_device_another_worker_heard_from_is_rearmed_not_alerted(flask_client):
+    # This worker's wheel expired the device, but another worker flushed a newer last_sync
+    device_id = seed_device("rearm", last_sync=silent_since(1))
+    assert flask_server.raise_extension_alerts([device_id]) == 0
+    assert stored_alerts(device_id) == []
+    assert device_id in flask_server.device_deadlines
+    flask_server.device_deadlines.cancel(device_id)
+
+
+def test_expiry_seen_by_every_worker_is_alerted_once(flask_client):
+    fs = flask_server
+    device_id = seed_device("once", last_sync=silent_since(fs.EXTENSION_ALERT_MINUTES + 5))
+
+    # Every worker's wheel expires the same device
+    assert fs.raise_extension_alerts([device_id]) == 1
+    assert fs.raise_extension_alerts([device_id]) == 0
+    assert fs.sweep_extension_alerts() == 0
+    assert len(stored_alerts(device_id)) == 1
+
+    # The next heartbeat clears the claim; a later silence alerts again
+    fs.presence.touch(device_id)
+    fs.flush_heartbeats()
+    with fs.app.app_context():
+        device = fs.db.session.get(fs.Device, device_id)
+        assert device.alerted_at is None
+        device.last_sync = silent_since(fs.EXTENSION_ALERT_MINUTES + 1)
+        fs.db.session.commit()
+    fs.presence.forget(device_id)
+    assert fs.raise_extension_alerts([device_id]) == 1
+    assert len(stored_alerts(device_id)) == 2
+
+
+def test_sweep_alerts_recently_silent_devices_only(flask_client):
+    fs = flask_server
+    silent = seed_device("sweep-silent", last_sync=silent_since(fs.EXTENSION_ALERT_MINUTES + 5))
+    alive = seed_device("sweep-alive", last_sync=silent_since(1))
+    abandoned = seed_device("sweep-old", last_sync=silent_since(60 * (fs.EXTENSION_ALERT_SWEEP_HOURS + 1)))
+
+    assert fs.sweep_extension_alerts() >= 1
+    assert len(stored_alerts(silent)) == 1
+    assert stored_alerts(alive) == [] and stored_alerts(abandoned) == []
+
+
+def test_alert_stream_resumes_after_last_event_id(flask_client, monkeypatch):
+    fs = flask_server
+    monkeypatch.setattr(fs, "ALERT_STREAM_SECONDS", 0.3)
+    monkeypatch.setattr(fs, "ALERT_STREAM_POLL_SECONDS", 0.05)
+    started = datetime.utcnow()
+    device_id = seed_device("stream", last_sync=silent_since(fs.EXTENSION_ALERT_MINUTES + 5))
+    assert fs.raise_extension_alerts([device_id]) == 1
+    alert = stored_alerts(device_id)[0]
+
+    response = flask_client.get(
+        "/api/alerts/stream?token=t-stream", headers={"Last-Event-ID": encode_cursor(started, "")}
+    )
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200 and response.mimetype == "text/event-stream"
+    assert f'"id": "{alert.id}"' in body
+    assert f"id: {encode_cursor(alert.created_at, alert.id)}" in body
+
+    # Resuming after that alert replays nothing
+    response = flask_client.get(
+        "/api/alerts/stream?token=t-stream",
+        headers={"Last-Event-ID": encode_cursor(alert.created_at, alert.id)}
+    )
+    assert "event: alert" not in response.get_data(as_text=True)
+
+
+def test_alert_streams_are_capped_per_worker(flask_client, monkeypatch):
+    monkeypatch.setattr(flask_server, "ALERT_STREAM_MAX", 0)
+    seed_device("cap", last_sync=silent_since(1))
+    response = flask_client.get("/api/alerts/stream?token=t-cap")
+    assert response.status_code == 503
+    assert response.get_json()["code"] == "STREAMS_EXHAUSTED"
+    assert response.headers["Retry-After"]
@@ -0,0 +1,171 @@
+"""
+Cold Archive Tests
+Segment encoding, the archiver moving rows out of a hot table, and reads
+that continue from the hot table into the archive
+
+    python -m pytest test_archive.py -q
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import Boolean, Column, DateTime, Integer, String, create_engine, event, func
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import archive
+from archive import ColdArchive, Segment, SegmentWriter, decode_column, encode_column
+from db_utils import iter_keyset, paginate
+
+Base = declarative_base()
+
+
+class Visit(Base):
+    __tablename__ = "visits"
+    id = Column(String, primary_key=True)
+    child_id = Column(String, nullable=False)
+    domain = Column(String)
+    seconds = Column(Integer, default=0)
+    flagged = Column(Boolean, default=False)
+    at = Column(DateTime, nullable=False)
+
+
+NOW = datetime(2026, 10, 19, 12, 0)
+
+
+def test_columns_round_trip_with_nulls():
+    stamps = [datetime(2026, 1, 1, 8, 30, 0, 250), None, datetime(2025, 12, 31, 23, 59, 59)]
+    cases = [
+        ("datetime", stamps),
+        ("int", [3, None, -7]),
+        ("float", [0.5, 2.25, None]),
+        ("bool", [True, None, False]),
+        ("str", ["youtube.com", None, "ने"])
+    ]
+    for kind, values in cases:
+        assert decode_column(kind, encode_column(kind, values), len(values)) == values
+
+
+def test_child_reads_only_touch_its_row_groups(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ROW_GROUP_ROWS", 10)
+    path = str(tmp_path / "visits.seg")
+    writer = SegmentWriter(path, "visits", [("id", "str"), ("at", "datetime")], "at", "child_id")
+    for child in ("a", "b", "c"):
+        for i in range(25):
+            writer.append(child, (f"{child}{i:02d}", NOW - timedelta(days=60, minutes=25 - i)))
+    writer.close()
+
+    segment = Segment(path)
+    decoded = []
+    original = segment._decode
+    monkeypatch.setattr(segment, "_decode", lambda group, name: decoded.append(group) or original(group, name))
+    rows = segment.child_rows("b", ("id", "child_id"))
+    assert [r["id"] for r in rows] == [f"b{i:02d}" for i in range(25)]
+    assert all(r["child_id"] == "b" for r in rows)
+    assert set(decoded) == {2, 3, 4}    # rows 25..49 of 75, ten per group
+    segment.close()
+
+
+def seed(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'hot.db'}")
+    cold = ColdArchive(str(tmp_path / "archive"), after_days=30, metadata=Base.metadata, bind=engine)
+    cold.add(Visit, "at")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    for day in range(90):
+        for child in ("a", "b"):
+            session.add(Visit(
+                id=f"{child}-{day:03d}", child_id=child, domain="YouTube.com" if day % 2 else "wiki.org",
+                seconds=day, flagged=day % 10 == 0, at=NOW - timedelta(days=day, hours=1)
+            ))
+    session.commit()
+    return engine, session, cold
+
+
+def segment_files(tmp_path):
+    return sorted(os.listdir(tmp_path / "archive" / "visits"))
+
+
+def test_archiver_moves_old_rows_and_reads_continue_into_them(tmp_path):
+    engine, session, cold = seed(tmp_path)
+    report = cold.run(engine, now=NOW)["visits"]
+    assert report["rows"] == 2 * 60 and report["segments"] == 3
+    assert report["raw_bytes"] > report["stored_bytes"]
+    assert session.query(func.count(Visit.id)).scalar() == 2 * 30
+    assert cold.run(engine, now=NOW)["visits"]["rows"] == 0
+
+    # A window inside the hot days never opens the archive
+    assert not cold.spans(Visit, NOW - timedelta(days=7))
+    assert cold.count(Visit, "a", NOW - timedelta(days=45)) == 15
+
+    archived = list(cold.scan(Visit, "a", columns=("seconds", "flagged")))
+    assert sorted(r["seconds"] for r in archived) == list(range(30, 90))
+    assert sum(r["flagged"] for r in archived) == 6
+
+    query = session.query(Visit).filter(Visit.child_id == "a")
+    older = cold.older(Visit, "a")
+    page, cursor = paginate(query, Visit.at, Visit.id, limit=25, older=older)
+    assert [r.id for r in page] == [f"a-{d:03d}" for d in range(25)]
+    page, cursor = paginate(query, Visit.at, Visit.id, cursor=cursor, limit=25, older=older)
+    assert [r.id for r in page] == [f"a-{d:03d}" for d in range(25, 50)]
+    assert page[10].domain == "YouTube.com" and page[10].at == NOW - timedelta(days=35, hours=1)
+    everything = [r.id for r in iter_keyset(query, Visit.at, Visit.id, batch_size=7, older=older)]
+    assert everything == [f"a-{d:03d}" for d in range(90)]
+
+
+def test_expired_segments_are_deleted(tmp_path):
+    engine, session, cold = seed(tmp_path)
+    cold.retention_days = 60
+    cold.run(engine, now=NOW)
+    # Segments expire whole: July's is gone, August's still holds rows past the cutoff
+    stats = cold.stats()["visits"]
+    assert stats["segments"] == 2 and stats["oldest"] == datetime(2026, 8, 1, 11, 0)
+    assert cold.count(Visit, "b") == stats["rows"] // 2
+
+
+def test_failed_commit_leaves_rows_hot_and_the_segment_unread(tmp_path):
+    engine, session, cold = seed(tmp_path)
+
+    def mark(conn, cursor, statement, *args):
+        if statement.startswith("INSERT INTO archive_segments"):
+            conn.info["cataloged"] = True
+
+    def fail(conn):
+        if conn.info.pop("cataloged", False):
+            raise RuntimeError("database went away")
+
+    # The commit fails after the segment file was renamed into place
+    event.listen(engine, "after_cursor_execute", mark)
+    event.listen(engine, "commit", fail)
+    assert cold.run(engine, now=NOW)["visits"]["rows"] == 0
+    event.remove(engine, "commit", fail)
+
+    assert session.query(func.count(Visit.id)).scalar() == 2 * 90
+    assert cold.count(Visit, "a") == 0 and segment_files(tmp_path) == []
+    assert cold.run(engine, now=NOW)["visits"]["rows"] == 2 * 60
+    assert cold.count(Visit, "a") == 60
+
+
+def test_forgotten_children_disappear_from_the_archive(tmp_path):
+    engine, session, cold = seed(tmp_path)
+    cold.run(engine, now=NOW)
+    before = segment_files(tmp_path)
+
+    with engine.begin() as conn:
+        cold.forget(conn, "a")
+    # Reads skip the child at once...
+    assert cold.count(Visit, "a") == 0 and list(cold.scan(Visit, "a")) == []
+    assert cold.older(Visit, "a") is None
+
+    # ...and the next run rewrites the segments without its rows
+    cold.run(engine, now=NOW)
+    after = segment_files(tmp_path)
+    assert len(after) == 3 and not set(after) & set(before)
+    segments = [Segment(str(tmp_path / "archive" / "visits" / name)) for name in after]
+    assert all(list(segment.children) == ["b"] for segment in segments)
+    for segment in segments:
+        segment.close()
+    assert cold.count(Visit, "b") == 60
+    assert sorted(r["seconds"] for r in cold.scan(Visit, "b", columns=("seconds",))) == list(range(30, 90))
@@ -0,0 +1,126 @@
+"""
+Compact Log Id Tests
+Time-ordered ids from compact_ids.py, their 16-byte storage behind string
+ids, keyset pages and the cold archive over them, and the upgrade of tables
+keyed on text UUIDs
+
+    python -m pytest test_compact_ids.py -q
+"""
+
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, DateTime, String, create_engine, text
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from archive import ColdArchive
+from compact_ids import CompactId, upgrade, uuid7
+from db_utils import paginate
+from partitions import PartitionedLogs
+
+Base = declarative_base()
+
+
+class Event(Base):
+    __tablename__ = "events"
+    id = Column(CompactId, primary_key=True, default=uuid7)
+    kid_id = Column(String)
+    at = Column(DateTime, default=datetime.utcnow)
+
+
+LegacyBase = declarative_base()
+
+
+class LegacyEvent(LegacyBase):
+    __tablename__ = "events"
+    id = Column(String, primary_key=True)
+    kid_id = Column(String)
+    at = Column(DateTime)
+
+
+def test_uuid7_is_time_ordered():
+    ids = [uuid7() for _ in range(1000)]
+    assert ids == sorted(ids) and len(set(ids)) == 1000
+    assert all(uuid.UUID(i).version == 7 and uuid.UUID(i).variant == uuid.RFC_4122 for i in ids)
+
+    days = [datetime(2026, 1, 1) + timedelta(days=d, milliseconds=d) for d in range(30)]
+    backdated = [uuid7(day) for day in days]
+    assert backdated == sorted(backdated) and backdated[-1] < ids[0]
+    assert int(backdated[0].replace("-", "")[:12], 16) == int((days[0] - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+def test_ids_are_16_bytes_and_read_back_as_strings(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'logs.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    start = datetime(2026, 10, 1)
+    session.add_all(Event(kid_id="k", at=start + timedelta(minutes=n % 4)) for n in range(10))
+    session.add(Event(id="fixture-1", kid_id="k", at=start))
+    session.commit()
+
+    with engine.connect() as conn:
+        stored = conn.execute(text("SELECT typeof(id), length(id), COUNT(*) FROM events GROUP BY 1, 2")).all()
+    assert sorted(stored) == [("blob", 16, 10), ("text", 9, 1)]
+
+    some = session.query(Event).filter(Event.id != "fixture-1").first()
+    session.expire_all()
+    assert session.get(Event, some.id).id == some.id and isinstance(some.id, str)
+    assert session.get(Event, "fixture-1").kid_id == "k"
+
+    query = session.query(Event).filter(Event.kid_id == "k")
+    rows, cursor = paginate(query, Event.at, Event.id, limit=4)
+    seen = [r.id for r in rows]
+    while cursor:
+        rows, cursor = paginate(query, Event.at, Event.id, cursor=cursor, limit=4)
+        seen += [r.id for r in rows]
+    assert sorted(seen) == sorted(e.id for e in session.query(Event)) and len(seen) == 11
+
+
+def test_archive_keeps_string_ids(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'logs.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    ids = [uuid7(datetime(2026, 6, 1 + n)) for n in range(3)]
+    session.add_all(Event(id=i, kid_id="k", at=datetime(2026, 6, 1 + n)) for n, i in enumerate(ids))
+    session.commit()
+
+    cold = ColdArchive(str(tmp_path / "archive"), after_days=30, bind=engine)
+    cold.add(Event, "at", child_column="kid_id")
+    cold.run(engine, now=datetime(2026, 10, 19))
+    assert [r.id for r in cold.rows(Event, "k")] == ids[::-1]
+
+
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_upgrade_packs_text_uuids(tmp_path, partitioned):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    if partitioned:
+        PartitionedLogs(True, 0, engine).add(LegacyEvent, "at").create(engine, months=[(2026, 9), (2026, 10)])
+    LegacyBase.metadata.create_all(engine)
+    old = [str(uuid.uuid4()) for _ in range(3)]
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        LegacyEvent(id=old[0], kid_id="k", at=datetime(2026, 9, 2)),
+        LegacyEvent(id=old[1], kid_id="k", at=datetime(2026, 10, 2)),
+        LegacyEvent(id=old[2].upper(), kid_id="k", at=datetime(2026, 10, 3)),
+        LegacyEvent(id="e1", kid_id="k", at=datetime(2026, 10, 4))
+    ])
+    session.commit()
+    session.close()
+
+    logs = PartitionedLogs(partitioned, 0, engine)
+    logs.add(Event, "at")
+    assert sum(upgrade(engine, [Event], logs).values()) == 2
+    assert upgrade(engine, [Event], logs) == {}
+
+    session = sessionmaker(bind=engine)()
+    assert sorted(e.id for e in session.query(Event)) == sorted([old[0], old[1], old[2].upper(), "e1"])
+    assert session.get(Event, old[1]).at == datetime(2026, 10, 2)
+    session.add(Event(kid_id="k", at=datetime(2026, 10, 5)))
+    session.commit()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM events WHERE typeof(id) = 'blob'")).scalar() == 3
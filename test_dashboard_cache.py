@@ -0,0 +1,114 @@
+"""
+Parent Dashboard Cache Tests
+Per-parent entries, TTL, invalidation by parent or child and the stale-put
+guard in dashboard_cache.py (no database needed)
+
+    python -m pytest test_dashboard_cache.py -q
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dashboard_cache import DashboardCache
+
+
+def cached(cache, parent_id, children, data, now=0.0):
+    assert cache.put(parent_id, cache.begin(parent_id), children, data, now=now)
+
+
+def test_entries_expire_after_ttl():
+    cache = DashboardCache(ttl=30)
+    cached(cache, "p1", ["c1"], {"n": 1}, now=100.0)
+    assert cache.get("p1", now=129.9) == {"n": 1}
+    assert cache.get("p1", now=130.0) is None
+    assert cache.get("p2", now=100.0) is None
+
+
+def test_writes_drop_the_parent_by_parent_or_child():
+    cache = DashboardCache(ttl=30)
+    cached(cache, "p1", ["c1", "c2"], "one")
+    cached(cache, "p2", ["c3"], "two")
+
+    cache.invalidate_child("c2")
+    assert cache.get("p1", now=1.0) is None and cache.get("p2", now=1.0) == "two"
+
+    cache.invalidate("p2")
+    assert cache.get("p2", now=1.0) is None
+    # A child no cached dashboard contains has nothing to drop
+    cache.invalidate_children(["c9", "c9"])
+    assert len(cache) == 0
+
+
+def test_dashboard_computed_across_a_write_is_not_stored():
+    cache = DashboardCache(ttl=30)
+    token = cache.begin("p1")
+    cache.invalidate("p1")
+    assert not cache.put("p1", token, ["c1"], "stale", now=0.0)
+    assert cache.get("p1", now=0.0) is None
+
+    # The parent of a brand new child is not mapped yet: the caller is asked for it
+    asked = []
+
+    def parents_of(child_ids):
+        asked.extend(child_ids)
+        return {"c-new": "p1"}
+
+    token = cache.begin("p1")
+    other = cache.begin("p2")
+    cache.invalidate_child("c-new", parents_of)
+    assert asked == ["c-new"]
+    assert not cache.put("p1", token, ["c1", "c-new"], "stale", now=0.0)
+    # Only that parent: a dashboard of another parent computed meanwhile is stored
+    assert cache.put("p2", other, ["c2"], "two", now=0.0)
+
+    cached(cache, "p1", ["c1", "c-new"], "fresh")
+    asked.clear()
+    cache.invalidate_child("c-new", parents_of)
+    assert asked == [] and cache.get("p1", now=0.0) is None
+
+
+def test_oldest_parents_are_evicted_and_ttl_zero_disables():
+    cache = DashboardCache(ttl=30, max_entries=2)
+    for n in range(3):
+        cached(cache, f"p{n}", [f"c{n}"], n)
+    assert cache.get("p0", now=0.0) is None and cache.get("p2", now=0.0) == 2
+    assert len(cache) == 2
+
+    disabled = DashboardCache(ttl=0)
+    assert not disabled.put("p1", disabled.begin("p1"), ["c1"], "x")
+    assert disabled.get("p1") is None
+
+
+def test_eviction_between_begin_and_put_does_not_reset_the_version():
+    cache = DashboardCache(ttl=30, max_entries=1)
+    token = cache.begin("p1")
+
+    # A write lands, a newer dashboard is stored, then another parent's evicts it
+    cache.invalidate("p1")
+    cached(cache, "p1", ["c1"], "fresh")
+    cached(cache, "p2", ["c2"], "two")
+    assert cache.get("p1", now=0.0) is None
+    # The dashboard computed before the write must still be refused
+    assert not cache.put("p1", token, ["c1"], "stale", now=0.0)
+    assert cache.get("p1", now=0.0) is None
+
+    # Without a write in between, an evicted parent is stored again
+    token = cache.begin("p1")
+    cached(cache, "p2", ["c2"], "two again")
+    assert cache.put("p1", token, ["c1"], "fresh", now=0.0)
+    assert cache.get("p1", now=0.0) == "fresh"
+
+
+def test_versions_are_bounded_without_reaching_back():
+    cache = DashboardCache(ttl=30, max_entries=2)
+    token = cache.begin("p0")
+    cache.invalidate("p0")
+    for n in range(1, 10):
+        cache.invalidate(f"p{n}")
+    assert len(cache._versions) == 2
+    # p0's version went into the floor, which only moved forward
+    assert not cache.put("p0", token, ["c0"], "stale", now=0.0)
+    cached(cache, "p0", ["c0"], "fresh")
+    assert cache.get("p0", now=0.0) == "fresh"
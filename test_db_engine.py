@@ -0,0 +1,55 @@
+"""
+Database Engine Profile Tests
+SQLite pragmas and pool options selected by db_engine profiles
+
+    python -m pytest test_db_engine.py -q
+"""
+
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_engine import configure_engine, engine_options
+
+PRAGMAS = ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout")
+
+
+def sqlite_pragmas(tmp_path, profile, env=None):
+    url = f"sqlite:///{tmp_path / 'engine.db'}"
+    engine = configure_engine(create_engine(url, **engine_options(url, profile, env)), profile, env)
+    with engine.connect() as conn:
+        values = {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in PRAGMAS}
+    engine.dispose()
+    return values
+
+
+def test_server_profile_tunes_sqlite_connections(tmp_path):
+    assert sqlite_pragmas(tmp_path, "server", env={"SQLITE_CACHE_MB": "16"}) == {
+        "journal_mode": "wal",
+        "synchronous": 1,          # NORMAL
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -16 * 1024,  # KiB
+        "busy_timeout": 5000
+    }
+
+
+def test_library_profile_keeps_sqlite_defaults(tmp_path):
+    values = sqlite_pragmas(tmp_path, "library")
+    assert values["journal_mode"] == "delete"
+    assert values["synchronous"] == 2   # FULL
+
+
+def test_postgres_pool_options_per_profile():
+    url = "postgresql://safeguard@localhost/safeguard"
+    server = engine_options(url, "server", env={"DB_POOL_SIZE": "4"})
+    assert server["pool_size"] == 4 and server["pool_pre_ping"]
+    assert server["connect_args"]["options"] == "-c statement_timeout=30000"
+    assert engine_options(url, "serverless", env={})["poolclass"] is NullPool
+    assert engine_options(url, "library", env={}) == {}
+    with pytest.raises(ValueError):
+        engine_options(url, "turbo", env={})
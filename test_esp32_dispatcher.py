@@ -0,0 +1,121 @@
+"""
+ESP32 Alert Dispatcher Tests
+Coalescing, rate limiting, retries and connection reuse against the
+fake ESP32 device in esp32/fake_esp32.py
+
+    python -m pytest test_esp32_dispatcher.py -q
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "esp32"))
+
+import pytest
+
+from esp32_dispatcher import Esp32Dispatcher
+from fake_esp32 import FakeEsp32
+
+
+@pytest.fixture
+def fake_esp32():
+    with FakeEsp32() as fake:
+        yield fake
+
+
+def test_burst_is_coalesced_into_one_alert_with_count(fake_esp32):
+    dispatcher = Esp32Dispatcher([fake_esp32.alert_url], interval=0.5)
+    try:
+        for _ in range(40):
+            dispatcher.submit("Adult", "Sam")
+        assert dispatcher.wait_idle()
+    finally:
+        dispatcher.close()
+
+    payloads = [payload for _, payload in fake_esp32.alerts]
+    assert sum(p["count"] for p in payloads) == 40
+    # Leading alert, then everything that arrived during the interval in one
+    assert len(payloads) <= 2
+    assert payloads[0]["category"] == "Adult"
+    assert payloads[0]["childName"] == "Sam"
+    assert payloads[0]["severity"] == "HIGH"
+
+
+def test_device_rate_limit_spaces_alerts(fake_esp32):
+    dispatcher = Esp32Dispatcher([fake_esp32.alert_url], interval=0.3)
+    try:
+        for _ in range(3):
+            dispatcher.submit("Adult", "Sam")
+            time.sleep(0.05)
+        assert dispatcher.wait_idle()
+        dispatcher.submit("Gambling", "Sam")
+        assert dispatcher.wait_idle()
+    finally:
+        dispatcher.close()
+
+    received = [at for at, _ in fake_esp32.alerts]
+    assert len(received) == 3
+    gaps = [b - a for a, b in zip(received, received[1:])]
+    assert all(gap >= 0.25 for gap in gaps)
+
+
+def test_mixed_burst_leads_with_most_severe_event(fake_esp32):
+    dispatcher = Esp32Dispatcher([fake_esp32.alert_url], interval=0.3)
+    try:
+        dispatcher.submit("Gambling", "Sam")
+        time.sleep(0.1)
+        for category, child in [("Gambling", "Sam"), ("Malware", "Ana"), ("Adult", "Sam"), ("Adult", "Sam")]:
+            dispatcher.submit(category, child)
+        assert dispatcher.wait_idle()
+    finally:
+        dispatcher.close()
+
+    payloads = [payload for _, payload in fake_esp32.alerts]
+    assert len(payloads) == 2
+    merged = payloads[1]
+    assert merged["category"] == "Malware"
+    assert merged["childName"] == "Ana"
+    assert merged["count"] == 4
+    assert {(s["category"], s["count"]) for s in merged["summary"]} == {("Gambling", 1), ("Malware", 1), ("Adult", 2)}
+
+
+def test_failed_delivery_is_retried(fake_esp32):
+    fake_esp32.fail_next = 2
+    dispatcher = Esp32Dispatcher([fake_esp32.alert_url], interval=0.0, backoff=0.01)
+    try:
+        dispatcher.submit("Malware", "Sam")
+        assert dispatcher.wait_idle()
+    finally:
+        dispatcher.close()
+
+    assert len(fake_esp32.alerts) == 1
+    assert dispatcher.stats["retries"] == 2
+    assert dispatcher.stats["sent"] == 1
+
+
+def test_unreachable_device_gives_up_without_blocking_submit():
+    dispatcher = Esp32Dispatcher(["http://127.0.0.1:9/alert"], interval=0.0, max_retries=1, backoff=0.01, timeout=0.5)
+    try:
+        started = time.perf_counter()
+        dispatcher.submit("Adult", "Sam")
+        assert time.perf_counter() - started < 0.5
+        assert dispatcher.wait_idle()
+    finally:
+        dispatcher.close()
+
+    assert dispatcher.stats["failed"] == 1
+
+
+def test_connections_are_kept_alive(fake_esp32):
+    dispatcher = Esp32Dispatcher([fake_esp32.alert_url], interval=0.0)
+    try:
+        for n in range(20):
+            dispatcher.submit("Adult", f"Child {n}")
+            assert dispatcher.wait_idle()
+    finally:
+        dispatcher.close()
+
+    assert len(fake_esp32.alerts) == 20
+    assert fake_esp32.connections == 1
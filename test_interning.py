@@ -0,0 +1,323 @@
+"""
+Interned Log String Tests
+Dictionary-encoded domains and URLs from interning.py: ORM writes and reads,
+the LRU across rollbacks, bulk rows, partitioned tables and the upgrade of
+tables that still store the strings; content-addressed comment bodies
+
+    python -m pytest test_interning.py -q
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, String, Text, create_engine, func, inspect
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from archive import ColdArchive
+from interning import SWEEP_GRACE_SECONDS, InternedStrings, column_keys
+from partitions import PartitionedLogs
+
+Base = declarative_base()
+interned = InternedStrings(Base.metadata)
+bodies = interned.content(
+    "bodies", Column("text", Text, nullable=False), Column("reason", String), Column("severity", Integer, default=1)
+)
+
+
+class Visit(Base):
+    __tablename__ = "visits"
+    id = Column(String, primary_key=True)
+    kid_id = Column(String)
+    url_id = interned.urls.id_column()
+    url = interned.urls.lookup(url_id)
+    domain_id = interned.domains.id_column()
+    domain = interned.domains.lookup(domain_id)
+    seconds = Column(Integer, default=0)
+    at = Column(DateTime, default=datetime.utcnow)
+
+
+
+
+class Sighting(Base):
+    __tablename__ = "sightings"
+    id = Column(String, primary_key=True)
+    kid_id = Column(String)
+    body_id = bodies.id_column()
+    text = bodies.lookup(body_id, "text")
+    reason = bodies.lookup(body_id, "reason")
+    severity = bodies.lookup(body_id, "severity")
+
+
+interned.add(Visit, "url", interned.urls)
+interned.add(Visit, "domain", interned.domains)
+interned.add(Sighting, ("text", "reason", "severity"), bodies, id_attribute="body_id")
+
+LegacyBase = declarative_base()
+
+
+class LegacyVisit(LegacyBase):
+    __tablename__ = "visits"
+    id = Column(String, primary_key=True)
+    kid_id = Column(String)
+    url = Column(String, nullable=False)
+    domain = Column(String, nullable=False)
+    seconds = Column(Integer, default=0)
+    at = Column(DateTime, default=datetime.utcnow)
+
+
+class LegacySighting(LegacyBase):
+    __tablename__ = "sightings"
+    id = Column(String, primary_key=True)
+    kid_id = Column(String)
+    text = Column(Text, nullable=False)
+    reason = Column(String)
+    severity = Column(Integer, default=1)
+
+
+def visit(n, domain, at=datetime(2026, 10, 5)):
+    return Visit(id=f"v{n}", kid_id="k", url=f"https://{domain}/{n}", domain=domain, seconds=60, at=at)
+
+
+def setup(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'logs.db'}")
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine)()
+
+
+def test_strings_are_stored_once_and_read_back(tmp_path):
+    engine, session = setup(tmp_path)
+    session.add_all(visit(n, "youtube.com" if n % 3 else "wiki.org") for n in range(9))
+    session.commit()
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM domains").scalar() == 2
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM urls").scalar() == 9
+        assert "domain" not in {c["name"] for c in inspect(conn).get_columns("visits")}
+
+    session.expire_all()
+    assert session.get(Visit, "v4").domain == "youtube.com"
+    assert session.get(Visit, "v4").url == "https://youtube.com/4"
+    assert session.query(func.count(Visit.id)).filter(Visit.domain == "wiki.org").scalar() == 3
+    totals = dict(session.query(Visit.domain, func.sum(Visit.seconds)).group_by(Visit.domain).all())
+    assert totals == {"youtube.com": 360, "wiki.org": 180}
+
+    session.get(Visit, "v0").domain = "khanacademy.org"
+    session.commit()
+    session.expire_all()
+    assert session.get(Visit, "v0").domain == "khanacademy.org"
+    assert sorted(column_keys(Visit)) == ["at", "domain", "id", "kid_id", "seconds", "url"]
+
+
+def test_rolled_back_ids_never_reach_the_cache(tmp_path):
+    engine, session = setup(tmp_path)
+    session.add(visit(1, "roblox.com"))
+    session.flush()
+    session.rollback()
+
+    session.add(visit(2, "wiki.org"))
+    session.add(visit(3, "roblox.com"))
+    session.commit()
+    session.expire_all()
+    assert session.get(Visit, "v3").domain == "roblox.com"
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT value FROM domains ORDER BY value").scalars().all() == ["roblox.com", "wiki.org"]
+
+
+def test_bulk_rows_are_encoded(tmp_path):
+    engine, session = setup(tmp_path)
+    rows = [
+        {"id": f"b{n}", "kid_id": "k", "url": f"https://news.com/{n % 2}", "domain": "news.com", "seconds": 1}
+        for n in range(4)
+    ]
+    with engine.begin() as conn:
+        conn.execute(Visit.__table__.insert(), interned.encode_rows(conn, Visit.__table__, rows))
+    assert sorted(url for (url,) in session.query(Visit.url).distinct()) == ["https://news.com/0", "https://news.com/1"]
+
+
+def test_partitioned_reads_resolve_strings(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'logs.db'}")
+    logs = PartitionedLogs(True, 0, engine)
+    logs.add(Visit, "at").create(engine, months=[(2026, 9), (2026, 10)])
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([visit(1, "youtube.com", datetime(2026, 9, 3)), visit(2, "wiki.org", datetime(2026, 10, 3))])
+    session.commit()
+
+    source = logs.source(Visit, datetime(2026, 10, 1))
+    assert session.query(source.domain).filter(source.at >= datetime(2026, 10, 1)).all() == [("wiki.org",)]
+    assert [v.url for v in session.query(source)] == ["https://wiki.org/2"]
+
+
+def test_archive_keeps_the_strings(tmp_path):
+    engine, session = setup(tmp_path)
+    session.add_all(visit(n, "youtube.com", datetime(2026, 6, 1 + n)) for n in range(3))
+    session.commit()
+    cold = ColdArchive(str(tmp_path / "archive"), after_days=30, bind=engine)
+    cold.add(Visit, "at", child_column="kid_id")
+    assert cold.run(engine, now=datetime(2026, 10, 19))["visits"]["rows"] == 3
+
+    rows = cold.rows(Visit, "k")
+    assert [(r.id, r.url, r.domain) for r in rows] == [(f"v{n}", f"https://youtube.com/{n}", "youtube.com") for n in (2, 1, 0)]
+    assert not hasattr(rows[0], "domain_id")
+
+
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_upgrade_moves_existing_strings(tmp_path, partitioned):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    if partitioned:
+        PartitionedLogs(True, 0, engine).add(LegacyVisit, "at").create(engine, months=[(2026, 9), (2026, 10)])
+    LegacyBase.metadata.create_all(engine, tables=[LegacyVisit.__table__])
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        LegacyVisit(id="old1", url="https://a.com/1", domain="a.com", seconds=5, at=datetime(2026, 9, 2)),
+        LegacyVisit(id="old2", url="https://b.com/", domain="b.com", seconds=7, at=datetime(2026, 10, 2))
+    ])
+    session.commit()
+    session.close()
+
+    # The servers' migrate step: dictionary tables first, then the conversion
+    Base.metadata.create_all(engine, tables=[d.table for d in interned.dictionaries])
+    logs = PartitionedLogs(partitioned, 0, engine)
+    logs.add(Visit, "at")
+    assert interned.upgrade(engine, logs) == {"visits": ["domain", "url"]}
+    assert interned.upgrade(engine, logs) == {}
+
+    session = sessionmaker(bind=engine)()
+    assert {v.id: (v.url, v.domain) for v in session.query(Visit)} == {
+        "old1": ("https://a.com/1", "a.com"), "old2": ("https://b.com/", "b.com")
+    }
+    session.add(visit(3, "a.com"))
+    session.commit()
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM domains").scalar() == 2
+
+
+def test_repeated_comments_are_stored_once(tmp_path):
+    engine, session = setup(tmp_path)
+    spam = "Click here for free followers!!"
+    session.add_all(Sighting(id=f"s{n}", kid_id=f"k{n % 3}", text=spam, reason="Spam", severity=1) for n in range(6))
+    session.add(Sighting(id="s6", kid_id="k0", text=f"  {spam}\r\n", reason="Spam"))
+    session.add(Sighting(id="s7", kid_id="k1", text=spam, reason="Spam", severity=2))
+    session.commit()
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM bodies").scalar() == 2
+    session.expire_all()
+    assert {(s.text, s.reason, s.severity) for s in session.query(Sighting)} == {(spam, "Spam", 1), (spam, "Spam", 2)}
+    assert session.query(func.count(Sighting.id)).filter(Sighting.severity >= 2).scalar() == 1
+
+    # A rolled-back first sighting must not leave its key cached as stored
+    session.add(Sighting(id="s8", kid_id="k0", text="you are dumb", reason="Insult"))
+    session.flush()
+    session.rollback()
+    session.add(Sighting(id="s9", kid_id="k0", text="you are dumb", reason="Insult"))
+    session.commit()
+    session.expire_all()
+    assert session.get(Sighting, "s9").text == "you are dumb"
+
+    rows = [{"id": f"b{n}", "kid_id": "k", "text": spam, "reason": "Spam", "severity": 1} for n in range(3)]
+    with engine.begin() as conn:
+        conn.execute(Sighting.__table__.insert(), interned.encode_rows(conn, Sighting.__table__, rows))
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM bodies").scalar() == 3
+    assert session.query(Sighting).filter(Sighting.id.like("b%"), Sighting.text == spam).count() == 3
+
+
+def later():
+    """A moment past the sweep's grace period for everything written so far"""
+    return datetime.utcnow() + timedelta(seconds=SWEEP_GRACE_SECONDS + 1)
+
+
+def stored_bodies(engine):
+    with engine.connect() as conn:
+        return sorted(conn.exec_driver_sql("SELECT text FROM bodies").scalars())
+
+
+def test_unreferenced_comment_bodies_are_swept(tmp_path):
+    engine, session = setup(tmp_path)
+    session.add(Sighting(id="s1", kid_id="k1", text="only k1 saw this", reason="Insult"))
+    session.add(Sighting(id="s2", kid_id="k1", text="everyone saw this", reason="Spam"))
+    session.add(Sighting(id="s3", kid_id="k2", text="everyone saw this", reason="Spam"))
+    session.add(Sighting(id="s4", kid_id="k2", text="only k2 saw this", reason="Insult"))
+    session.commit()
+
+    # Deleting k1's sightings: only the keys they used are considered
+    keys = [key for (key,) in session.query(Sighting.body_id).filter(Sighting.kid_id == "k1")]
+    session.query(Sighting).filter(Sighting.kid_id == "k1").delete()
+    # Written moments ago: left for a later sweep
+    assert interned.sweep(session, bodies, keys) == 0
+    assert interned.sweep(session, bodies, keys, now=later()) == 1
+    session.commit()
+    assert stored_bodies(engine) == ["everyone saw this", "only k2 saw this"]
+
+    # Rows removed some other way (retention, archiving) are swept in one pass
+    session.query(Sighting).filter(Sighting.id == "s4").delete()
+    session.commit()
+    with engine.begin() as conn:
+        assert interned.sweep(conn, bodies, now=later()) == 1
+    assert stored_bodies(engine) == ["everyone saw this"]
+
+    # A swept body is written again when it comes back, whatever this worker saw before
+    session.add(Sighting(id="s5", kid_id="k2", text="only k1 saw this", reason="Insult"))
+    session.commit()
+    session.expire_all()
+    assert session.get(Sighting, "s5").text == "only k1 saw this"
+
+
+def test_sweep_spares_a_body_a_writer_is_about_to_reference(tmp_path):
+    engine, session = setup(tmp_path)
+    value = ("you are dumb", "Insult", 2)
+    old = datetime.utcnow() - timedelta(seconds=SWEEP_GRACE_SECONDS + 60)
+    key = bodies.key_of(value)
+    with engine.begin() as conn:
+        # Stored long ago; the sightings that used it are gone
+        conn.execute(bodies.table.insert().values(key=key, text=value[0], reason=value[1], severity=2, seen_at=old))
+
+    # A writer resolves the key (as a flush does before its hidden comment row)...
+    writer = engine.connect()
+    transaction = writer.begin()
+    assert bodies.ids(writer, [value]) == {value: key}
+    transaction.commit()
+    # ...a sweep runs before the writer's row commits...
+    with engine.begin() as conn:
+        assert interned.sweep(conn, bodies) == 0
+    # ...and the row still finds its body
+    with writer.begin():
+        writer.execute(Sighting.__table__.insert().values(id="late", kid_id="k", body_id=key))
+    writer.close()
+    assert session.get(Sighting, "late").text == "you are dumb"
+
+    # The entry only goes once it is both unreferenced and past the grace period
+    session.query(Sighting).filter(Sighting.id == "late").delete()
+    session.commit()
+    with engine.begin() as conn:
+        assert interned.sweep(conn, bodies, now=later()) == 1
+    assert stored_bodies(engine) == []
+
+
+def test_upgrade_moves_comment_bodies(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    LegacyBase.metadata.create_all(engine, tables=[LegacySighting.__table__])
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        LegacySighting(id="old1", kid_id="k", text="spam spam", reason="Spam", severity=1),
+        LegacySighting(id="old2", kid_id="j", text="spam spam", reason="Spam", severity=1),
+        LegacySighting(id="old3", kid_id="j", text="go away", reason="Insult", severity=2)
+    ])
+    session.commit()
+    session.close()
+
+    Base.metadata.create_all(engine, tables=[d.table for d in interned.dictionaries])
+    assert interned.upgrade(engine) == {"sightings": ["reason", "severity", "text"]}
+    assert interned.upgrade(engine) == {}
+
+    session = sessionmaker(bind=engine)()
+    assert {s.id: (s.text, s.reason, s.severity) for s in session.query(Sighting)} == {
+        "old1": ("spam spam", "Spam", 1), "old2": ("spam spam", "Spam", 1), "old3": ("go away", "Insult", 2)
+    }
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM bodies").scalar() == 2
@@ -0,0 +1,152 @@
+"""
+Metrics Tests
+Registry, histogram buckets, the Prometheus text format and request
+timing in metrics.py (no server needed)
+
+    python -m pytest test_metrics.py -q
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from metrics import UNMATCHED_ROUTE, MetricsRegistry, WSGIMetricsMiddleware
+
+
+def sample(rendered, line_start):
+    """Value of the one exposition line starting with `line_start`"""
+    matches = [line for line in rendered.splitlines() if line.startswith(line_start + " ")]
+    assert len(matches) == 1, (line_start, matches)
+    return float(matches[0].rsplit(" ", 1)[1])
+
+
+def test_counters_and_gauges_merge_across_threads():
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs by result", ("result",))
+    registry.counter("jobs_total", "Registered twice, kept once", ("result",))
+    registry.gauge("queue_depth", "Items queued")
+
+    def work():
+        for _ in range(1000):
+            registry.inc("jobs_total", ("ok",))
+        registry.add("queue_depth", (), 2)
+        registry.add("queue_depth", (), -1)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    registry.inc("jobs_total", ("failed",), 3)
+
+    rendered = registry.render()
+    assert sample(rendered, 'jobs_total{result="ok"}') == 8000
+    assert sample(rendered, 'jobs_total{result="failed"}') == 3
+    assert sample(rendered, "queue_depth") == 8
+    assert rendered.count("# HELP jobs_total Jobs by result") == 1
+
+
+def test_concurrent_threads_spread_across_shards():
+    registry = MetricsRegistry(shard_count=4)
+    registry.counter("jobs_total", "Jobs")
+    started = threading.Barrier(8)
+    shards = []
+
+    def work():
+        # All alive at once, so no thread id is reused
+        started.wait()
+        shard = registry._shard()
+        registry.inc("jobs_total")
+        # A thread keeps the shard it was dealt
+        shards.append(shard if registry._shard() is shard else None)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    counts = sorted(sum(1 for shard in shards if shard is one) for one in registry._shards)
+    assert counts == [2, 2, 2, 2]
+    assert sample(registry.render(), "jobs_total") == 8
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    registry = MetricsRegistry()
+    registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 0.5, 1.0))
+    for value in (0.05, 0.1, 0.3, 0.5, 0.7, 2.0):
+        registry.observe("latency_seconds", ("/a",), value)
+
+    rendered = registry.render()
+    # Upper bounds are inclusive (le): 0.1 and 0.5 land in their own buckets
+    assert sample(rendered, 'latency_seconds_bucket{route="/a",le="0.1"}') == 2
+    assert sample(rendered, 'latency_seconds_bucket{route="/a",le="0.5"}') == 4
+    assert sample(rendered, 'latency_seconds_bucket{route="/a",le="1"}') == 5
+    assert sample(rendered, 'latency_seconds_bucket{route="/a",le="+Inf"}') == 6
+    assert sample(rendered, 'latency_seconds_count{route="/a"}') == 6
+    assert abs(sample(rendered, 'latency_seconds_sum{route="/a"}') - 3.65) < 1e-9
+
+
+def test_exposition_format():
+    registry = MetricsRegistry()
+    registry.counter("b_total", "Second", ("path",))
+    registry.gauge("a_connections", "Pool connections", ("state",), callback=lambda: {("idle",): 4, ("checked_out",): 1})
+    registry.gauge("c_broken", "Failing callback", callback=lambda: 1 / 0)
+    registry.inc("b_total", ('say "hi"\\\n',), 1.5)
+
+    assert registry.render() == (
+        "# HELP a_connections Pool connections\n"
+        "# TYPE a_connections gauge\n"
+        'a_connections{state="checked_out"} 1\n'
+        'a_connections{state="idle"} 4\n'
+        "# HELP b_total Second\n"
+        "# TYPE b_total counter\n"
+        'b_total{path="say \\"hi\\"\\\\\\n"} 1.5\n'
+        "# HELP c_broken Failing callback\n"
+        "# TYPE c_broken gauge\n"
+    )
+
+
+def test_wsgi_latency_covers_streamed_bodies():
+    registry = MetricsRegistry()
+
+    def streaming_app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "application/x-ndjson")])
+
+        def rows():
+            for n in range(3):
+                time.sleep(0.05)
+                yield f'{{"row": {n}}}\n'.encode()
+        return rows()
+
+    middleware = WSGIMetricsMiddleware(streaming_app, registry)
+    body = middleware({"REQUEST_METHOD": "GET"}, lambda status, headers, exc_info=None: None)
+
+    # Returning the iterable is not the end of the request
+    assert sample(registry.render(), "http_requests_in_flight") == 1
+    assert b"".join(body).count(b"\n") == 3
+    body.close()
+
+    rendered = registry.render()
+    assert sample(rendered, "http_requests_in_flight") == 0
+    assert sample(rendered, f'http_requests_total{{method="GET",route="{UNMATCHED_ROUTE}",status="200"}}') == 1
+    assert sample(rendered, f'http_request_duration_seconds_sum{{method="GET",route="{UNMATCHED_ROUTE}"}}') >= 0.15
+
+
+def test_wsgi_app_errors_are_counted_as_500():
+    registry = MetricsRegistry()
+
+    def failing_app(environ, start_response):
+        raise RuntimeError("boom")
+
+    middleware = WSGIMetricsMiddleware(failing_app, registry)
+    try:
+        middleware({"REQUEST_METHOD": "POST"}, None)
+    except RuntimeError:
+        pass
+    rendered = registry.render()
+    assert sample(rendered, f'http_requests_total{{method="POST",route="{UNMATCHED_ROUTE}",status="500"}}') == 1
+    assert sample(rendered, "http_requests_in_flight") == 0
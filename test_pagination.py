@@ -0,0 +1,127 @@
+"""
+Pagination Tests
+Keyset cursors, page walks with timestamp ties, invalid cursors and the
+NDJSON export of the Flask history/blocked listings (app.py)
+
+Runs the server in-process against a temporary SQLite database:
+    python -m pytest test_pagination.py -q
+"""
+
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Point the server at a throwaway database before it is imported
+_tmp_dir = tempfile.mkdtemp(prefix="safeguard-test-")
+os.environ["database_url"] = f"sqlite:///{os.path.join(_tmp_dir, 'flask.db')}"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import app as flask_server
+from compact_ids import uuid7
+from db_utils import decode_cursor, encode_cursor
+
+
+@pytest.fixture(scope="module")
+def flask_client():
+    with flask_server.app.app_context():
+        flask_server.db.create_all()
+    return flask_server.app.test_client()
+
+
+def seed_history(suffix, timestamps):
+    """A parent with one child and a history row per timestamp; returns (headers, child_id, ids)"""
+    fs = flask_server
+    now = datetime.utcnow()
+    ids = []
+    with fs.app.app_context():
+        fs.db.session.add(fs.Parent(id=f"p-{suffix}", email=f"{suffix}@test", password_hash="x"))
+        fs.db.session.add(fs.Child(id=f"c-{suffix}", parent_id=f"p-{suffix}", name="Kid"))
+        fs.db.session.add(fs.ParentSession(
+            id=f"s-{suffix}", parent_id=f"p-{suffix}", token=f"t-{suffix}",
+            expires_at=now + timedelta(days=1)
+        ))
+        fs.db.session.add(fs.Device(id=f"d-{suffix}", child_id=f"c-{suffix}", device_name="Laptop"))
+        for n, visited_at in enumerate(timestamps):
+            row_id = uuid7(visited_at)
+            ids.append(row_id)
+            fs.db.session.add(fs.HistoryLog(
+                id=row_id, child_id=f"c-{suffix}", device_id=f"d-{suffix}", url=f"https://example.com/{n}",
+                domain="example.com", visited_at=visited_at
+            ))
+        fs.db.session.commit()
+    return {"Authorization": f"Bearer t-{suffix}"}, f"c-{suffix}", ids
+
+
+def test_cursor_round_trip():
+    at = datetime(2024, 5, 1, 12, 30, 15, 250000)
+    row_id = uuid7(at)
+    assert decode_cursor(encode_cursor(at, row_id)) == (at, row_id)
+    assert decode_cursor(None) is None and decode_cursor("") is None
+    for bad in ("not a cursor", "fA", encode_cursor(None, row_id)):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+
+def test_pages_break_timestamp_ties_by_id(flask_client):
+    now = datetime.utcnow().replace(microsecond=0)
+    # Five rows share one timestamp: only the id orders them across pages
+    timestamps = [now - timedelta(minutes=1)] * 5 + [now - timedelta(minutes=2)] * 2
+    headers, child_id, ids = seed_history("ties", timestamps)
+
+    seen, totals, cursor = [], [], None
+    while True:
+        path = f"/api/logs/history/{child_id}?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        page = flask_client.get(path, headers=headers).get_json()
+        seen += [row["id"] for row in page["history"]]
+        totals.append(page["total"])
+        cursor = page["next_cursor"]
+        if not page["has_more"]:
+            break
+
+    expected = [row_id for _, row_id in sorted(zip(timestamps, ids), reverse=True)]
+    assert seen == expected
+    # Only the first page pays for the count
+    assert totals[0] == 7 and all(total is None for total in totals[1:])
+
+
+def test_invalid_cursor_is_a_400(flask_client):
+    headers, child_id, _ = seed_history("badcursor", [datetime.utcnow()])
+    # The second cursor decodes, but its id could never match a uuid column
+    for cursor in ("%%%garbage", encode_cursor(datetime.utcnow(), "not-a-uuid")):
+        for path in ("/api/logs/history/{child}", "/api/logs/blocked/{child}"):
+            response = flask_client.get(path.format(child=child_id) + f"?cursor={cursor}", headers=headers)
+            assert response.status_code == 400
+            assert response.get_json()["code"] == "INVALID_CURSOR"
+
+
+def test_cursor_ids_must_be_uuids_for_compact_id_columns(flask_client):
+    from db_utils import paginate
+
+    fs = flask_server
+    with fs.app.app_context():
+        query = fs.HistoryLog.query
+        with pytest.raises(ValueError):
+            paginate(query, fs.HistoryLog.visited_at, fs.HistoryLog.id, encode_cursor(datetime.utcnow(), "not-a-uuid"))
+        rows, _ = paginate(query, fs.HistoryLog.visited_at, fs.HistoryLog.id, encode_cursor(datetime.utcnow(), uuid7()))
+        assert isinstance(rows, list)
+
+
+def test_ndjson_export_streams_every_row(flask_client, monkeypatch):
+    import db_utils
+
+    # Small batches so the export crosses several keyset pages
+    monkeypatch.setattr(db_utils.iter_keyset, "__defaults__", (3, None))
+    now = datetime.utcnow()
+    timestamps = [now - timedelta(seconds=n // 2) for n in range(11)]
+    headers, child_id, ids = seed_history("export", timestamps)
+
+    response = flask_client.get(f"/api/logs/history/{child_id}?format=ndjson", headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == db_utils.NDJSON_MEDIA_TYPE
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(line["id"] for line in lines) == sorted(ids)
+    assert [line["visited_at"] for line in lines] == sorted((line["visited_at"] for line in lines), reverse=True)
@@ -0,0 +1,143 @@
+"""
+Log Partitioning Tests
+Monthly SQLite partitions from partitions.py: write routing, window-only
+reads, retention and conversion of an existing table
+
+    python -m pytest test_partitions.py -q
+"""
+
+import os
+import sys
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, create_engine, func, inspect
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_utils import ensure_indexes, paginate
+from partitions import PartitionedLogs
+
+Base = declarative_base()
+
+
+class Kid(Base):
+    __tablename__ = "kids"
+    id = Column(String, primary_key=True)
+
+
+class Visit(Base):
+    __tablename__ = "visits"
+    __table_args__ = (Index("ix_visits_kid_at", "kid_id", "at", "id"),)
+    id = Column(String, primary_key=True)
+    kid_id = Column(String, ForeignKey("kids.id"))
+    seconds = Column(Integer, default=0)
+    at = Column(DateTime, default=datetime.utcnow)
+
+
+NOW = datetime(2026, 11, 19, 12, 0)
+VISITS = {
+    "old": datetime(2026, 6, 3),      # before the partitions: default partition
+    "sep": datetime(2026, 9, 30, 23, 59),
+    "oct": datetime(2026, 10, 1),
+    "nov": datetime(2026, 11, 2)
+}
+
+
+def setup(tmp_path, retention_months=0, convert=False):
+    engine = create_engine(f"sqlite:///{tmp_path / 'logs.db'}")
+    logs = PartitionedLogs(True, retention_months, engine)
+    partitions = logs.add(Visit, "at")
+    if convert:
+        Base.metadata.create_all(engine)
+    else:
+        partitions.create(engine, months=[(2026, 9), (2026, 10), (2026, 11)])
+        Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(Kid(id="k"))
+    session.add_all(Visit(id=name, kid_id="k", seconds=60, at=at) for name, at in VISITS.items())
+    session.commit()
+    return engine, logs, session
+
+
+def rows_in(engine, table):
+    with engine.connect() as conn:
+        return sorted(conn.exec_driver_sql(f'SELECT id FROM "{table}"').scalars())
+
+
+def test_inserts_are_routed_to_their_month(tmp_path):
+    engine, logs, session = setup(tmp_path)
+    assert rows_in(engine, "visits_p202609") == ["sep"]
+    assert rows_in(engine, "visits_p202610") == ["oct"]
+    assert rows_in(engine, "visits_p202611") == ["nov"]
+    assert rows_in(engine, "visits_pdefault") == ["old"]
+
+    # Updates and deletes run on the partitions themselves and report real row counts
+    assert logs.update(session, Visit, {"seconds": 90}, id="oct") == 1
+    assert logs.delete(session, Visit, id="sep") == 1
+    assert logs.delete(session, Visit, kid_id="nobody") == 0
+    session.commit()
+    assert session.query(func.sum(Visit.seconds)).scalar() == 60 * 2 + 90
+    assert rows_in(engine, "visits_p202609") == []
+    # ...without switching off stale-row checks for every other table on the engine
+    assert engine.dialect.supports_sane_rowcount and engine.dialect.supports_sane_multi_rowcount
+
+    ensure_indexes(Base.metadata, engine, skip=logs.partitioned_tables())
+    assert inspect(engine).get_indexes("visits_p202610")[0]["name"] == "ix_visits_kid_at_p202610"
+
+
+def test_window_reads_only_touch_its_months(tmp_path):
+    engine, logs, session = setup(tmp_path)
+    since = datetime(2026, 10, 1)
+    source = logs.source(Visit, since)
+    sql = str(session.query(source.id).statement.compile(engine))
+    assert "visits_p202610" in sql and "visits_p202611" in sql and "visits_pdefault" in sql
+    assert "visits_p202609" not in sql
+
+    page, cursor = paginate(
+        session.query(source.id, source.at).filter(source.kid_id == "k", source.at >= since),
+        source.at, source.id, limit=1
+    )
+    assert [row.id for row in page] == ["nov"]
+    page, cursor = paginate(
+        session.query(source.id, source.at).filter(source.kid_id == "k", source.at >= since),
+        source.at, source.id, cursor=cursor, limit=1
+    )
+    assert [row.id for row in page] == ["oct"]
+
+
+def test_retention_drops_whole_months(tmp_path):
+    engine, logs, session = setup(tmp_path, retention_months=1)
+    session.close()
+    logs.maintain(now=NOW)
+
+    tables = set(inspect(engine).get_table_names())
+    assert "visits_p202609" not in tables
+    assert {"visits_p202610", "visits_p202611", "visits_p202612", "visits_pdefault"} <= tables
+    assert rows_in(engine, "visits") == ["nov", "oct"]
+
+
+def test_new_months_take_over_their_default_rows(tmp_path):
+    engine, logs, session = setup(tmp_path)
+    # Written before December had a partition: parked in the default one
+    session.add(Visit(id="dec", kid_id="k", seconds=60, at=datetime(2026, 12, 24)))
+    session.commit()
+    session.close()
+    assert rows_in(engine, "visits_pdefault") == ["dec", "old"]
+
+    logs.maintain(now=NOW)
+    assert rows_in(engine, "visits_p202612") == ["dec"]
+    assert rows_in(engine, "visits_pdefault") == ["old"]
+    assert rows_in(engine, "visits") == ["dec", "nov", "oct", "old", "sep"]
+
+
+def test_convert_existing_table(tmp_path):
+    engine, logs, session = setup(tmp_path, convert=True)
+    session.close()
+    assert logs.partitioned_tables() == set()
+
+    logs.convert()
+    assert logs.partitioned_tables() == {"visits"}
+    assert rows_in(engine, "visits_p202606") == ["old"]
+    assert rows_in(engine, "visits_p202609") == ["sep"]
+    assert rows_in(engine, "visits") == ["nov", "oct", "old", "sep"]
@@ -0,0 +1,113 @@
+"""
+Device Presence Tests
+Heartbeat coalescing, bulk flushes and failed-flush retries in
+presence.PresenceTracker (in-memory SQLite, no server needed)
+
+    python -m pytest test_presence.py -q
+"""
+
+import os
+import sys
+from datetime import datetime
+
+import pytest
+from sqlalchemy import Column, DateTime, MetaData, String, Table, create_engine, insert, select
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from presence import PresenceTracker, batch_params, bulk_heartbeat_update
+
+T0 = 1_700_000_000.0
+
+
+def make_devices(*device_ids, seen=None):
+    engine = create_engine("sqlite://")
+    devices = Table(
+        "devices", MetaData(),
+        Column("id", String, primary_key=True),
+        Column("last_heartbeat", DateTime, nullable=True),
+        Column("status", String, nullable=True)
+    )
+    devices.create(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(devices), [{"id": d, "last_heartbeat": seen} for d in device_ids])
+    return engine, devices
+
+
+def stored(engine, devices):
+    with engine.connect() as conn:
+        return dict(conn.execute(select(devices.c.id, devices.c.last_heartbeat)).all())
+
+
+def test_repeated_heartbeats_coalesce_to_the_newest():
+    presence = PresenceTracker()
+    for n in range(100):
+        presence.touch("laptop", T0 + n)
+    # A late, out-of-order heartbeat never moves the device back
+    presence.touch("laptop", T0 + 10)
+    presence.touch("tablet", T0 + 5)
+
+    assert presence.heartbeats == 102
+    assert presence.pending_count == 2
+    assert presence.last_seen("laptop") == datetime.utcfromtimestamp(T0 + 99)
+    assert presence.drain() == {"laptop": T0 + 99, "tablet": T0 + 5}
+    assert presence.pending_count == 0
+
+
+def test_flush_writes_every_pending_heartbeat_in_one_batch():
+    newer = datetime.utcfromtimestamp(T0 + 3600)
+    engine, devices = make_devices("laptop", "tablet", "phone", seen=datetime.utcfromtimestamp(T0 - 60))
+    with engine.begin() as conn:
+        # Another worker already flushed a newer heartbeat for the phone
+        conn.execute(devices.update().where(devices.c.id == "phone").values(last_heartbeat=newer))
+
+    statement = bulk_heartbeat_update(devices, devices.c.id, devices.c.last_heartbeat, extra_values={"status": "online"})
+    batches = []
+
+    def write_batch(batch):
+        batches.append(batch)
+        with engine.begin() as conn:
+            conn.execute(statement, batch_params(batch))
+
+    presence = PresenceTracker()
+    for n in range(20):
+        presence.touch("laptop", T0 + n)
+    presence.touch("phone", T0)
+
+    assert presence.flush(write_batch) == 2
+    assert len(batches) == 1
+    assert stored(engine, devices) == {
+        "laptop": datetime.utcfromtimestamp(T0 + 19),
+        "tablet": datetime.utcfromtimestamp(T0 - 60),
+        "phone": newer
+    }
+    assert presence.flushed_rows == 2 and presence.last_flush_at is not None
+    # Nothing left to write
+    assert presence.flush(write_batch) == 0 and len(batches) == 1
+
+
+def test_failed_flush_puts_heartbeats_back():
+    presence = PresenceTracker()
+    presence.touch("laptop", T0)
+    presence.touch("tablet", T0)
+
+    def failing(batch):
+        # A heartbeat arriving while the write is in progress
+        presence.touch("tablet", T0 + 30)
+        raise ConnectionError("database unavailable")
+
+    with pytest.raises(ConnectionError):
+        presence.flush(failing)
+    assert presence.flushed_rows == 0
+    # The failed batch is back, without overwriting the newer heartbeat
+    assert presence.drain() == {"laptop": T0, "tablet": T0 + 30}
+
+
+def test_forgotten_devices_are_not_flushed():
+    presence = PresenceTracker()
+    presence.touch("laptop", T0)
+    presence.mark_known("laptop")
+    presence.forget("laptop")
+    assert not presence.is_known("laptop")
+    assert presence.last_seen("laptop") is None
+    assert presence.flush(lambda batch: pytest.fail("nothing to write")) == 0
@@ -0,0 +1,79 @@
+"""
+Request Profiler Tests
+Request selection and collapsed-stack output of profiling.SamplingProfiler
+
+    python -m pytest test_profiling.py -q
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from profiling import SamplingProfiler
+
+
+def busy_handler(seconds):
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        pass
+
+
+def test_requests_are_picked_by_rate_route_and_header():
+    profiler = SamplingProfiler(sample_every=4, routes=["/api/usage"], header_secret="s3cret")
+    picked = [profiler.wants("/api/children") for _ in range(8)]
+    assert picked.count(True) == 2
+    assert profiler.wants("/api/usage/c-1")
+    assert profiler.wants("/api/children", header_value="s3cret")
+
+    disabled = SamplingProfiler(sample_every=0)
+    assert not any(disabled.wants("/api/children") for _ in range(100))
+
+
+def test_profile_header_needs_the_secret(monkeypatch):
+    profiler = SamplingProfiler(sample_every=0, header_secret="s3cret")
+    for value in ("1", "", "s3cre", "s3cret ", "s3crét"):
+        assert not profiler.wants("/api/children", header_value=value)
+
+    # Without a configured secret nobody picks requests by header
+    unsecured = SamplingProfiler(sample_every=0)
+    assert not unsecured.wants("/api/children", header_value="1")
+
+    from profiling import profiler_from_env
+
+    monkeypatch.setenv("PROFILE_ENABLED", "true")
+    monkeypatch.delenv("PROFILE_HEADER_SECRET", raising=False)
+    monkeypatch.setenv("ADMIN_TOKEN", "admin-token")
+    assert profiler_from_env().header_secret == "admin-token"
+    monkeypatch.setenv("PROFILE_HEADER_SECRET", "profile-only")
+    assert profiler_from_env().header_secret == "profile-only"
+
+
+def test_thread_samples_are_dumped_as_collapsed_stacks(tmp_path):
+    profiler = SamplingProfiler(interval=0.001, output_dir=str(tmp_path))
+    sampled = profiler.begin("/api/usage/<child_id>", thread_id=threading.get_ident())
+    busy_handler(0.1)
+    profiler.end(sampled)
+
+    assert profiler.summary()["routes"]["/api/usage/<child_id>"]["requests"] == 1
+    paths = profiler.dump()
+    assert [os.path.basename(p).split(".")[0] for p in paths] == ["api_usage_child_id"]
+
+    lines = open(paths[0]).read().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 5
+    assert stack.split(";")[-1].startswith("busy_handler (test_profiling.py:")
+    assert profiler.summary()["samples"] == 0
+
+
+def test_code_samples_follow_the_endpoint_on_any_thread():
+    profiler = SamplingProfiler(interval=0.001)
+    worker = threading.Thread(target=busy_handler, args=(0.1,))
+    sampled = profiler.begin("/api/analyze-comment", code=busy_handler.__code__)
+    worker.start()
+    worker.join()
+    profiler.end(sampled)
+
+    assert profiler.summary()["routes"]["/api/analyze-comment"]["samples"] > 5
@@ -0,0 +1,336 @@
+"""
+Query Count Regression Tests
+Listing endpoints must issue a constant number of SQL queries
+no matter how many rows they return (no N+1 lazy loads)
+
+Runs both servers in-process against temporary SQLite databases:
+    python -m pytest test_query_counts.py -q
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Point both servers at throwaway databases before they are imported
+_tmp_dir = tempfile.mkdtemp(prefix="safeguard-test-")
+os.environ["database_url"] = f"sqlite:///{os.path.join(_tmp_dir, 'flask.db')}"
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'fastapi.db')}"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from sqlalchemy import event
+
+import app as flask_server
+import backend_final
+
+
+class QueryCounter:
+    """Count statements executed on an engine while active"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+# ═══════════════════════════════════════════════════════════════
+# FLASK SERVER (app.py)
+# ═══════════════════════════════════════════════════════════════
+
+@pytest.fixture(scope="module")
+def flask_client():
+    with flask_server.app.app_context():
+        flask_server.db.create_all()
+    return flask_server.app.test_client()
+
+
+def seed_flask_child(suffix, devices, rows):
+    """Create a parent with one child, `devices` devices and `rows` history + block logs"""
+    fs = flask_server
+    now = datetime.utcnow()
+    with fs.app.app_context():
+        fs.db.session.add(fs.Parent(id=f"p-{suffix}", email=f"{suffix}@test", password_hash="x"))
+        fs.db.session.add(fs.Child(id=f"c-{suffix}", parent_id=f"p-{suffix}", name="Kid"))
+        fs.db.session.add(fs.ParentSession(
+            id=f"s-{suffix}", parent_id=f"p-{suffix}", token=f"t-{suffix}",
+            expires_at=now + timedelta(days=1)
+        ))
+        for d in range(devices):
+            fs.db.session.add(fs.Device(id=f"d-{suffix}-{d}", child_id=f"c-{suffix}", device_name=f"Laptop {d}"))
+        for i in range(rows):
+            device_id = f"d-{suffix}-{i % devices}"
+            fs.db.session.add(fs.HistoryLog(
+                id=f"h-{suffix}-{i}", child_id=f"c-{suffix}", device_id=device_id,
+                url="https://example.com", domain="example.com", visited_at=now - timedelta(seconds=i)
+            ))
+            fs.db.session.add(fs.BlockLog(
+                id=f"b-{suffix}-{i}", child_id=f"c-{suffix}", device_id=device_id,
+                url="https://bad.example", domain="bad.example", category="Adult",
+                blocked_at=now - timedelta(seconds=i)
+            ))
+        fs.db.session.commit()
+    return {"Authorization": f"Bearer t-{suffix}"}, f"c-{suffix}"
+
+
+def flask_query_count(client, path, headers):
+    with flask_server.app.app_context():
+        engine = flask_server.db.engine
+    with QueryCounter(engine) as counter:
+        response = client.get(path, headers=headers)
+    assert response.status_code == 200
+    return counter.count
+
+
+@pytest.mark.parametrize("path", ["/api/logs/history/{child}", "/api/logs/blocked/{child}", "/api/children/{child}"])
+def test_flask_listing_query_count_is_constant(flask_client, path):
+    small_headers, small_child = seed_flask_child(f"small{abs(hash(path))}", devices=1, rows=3)
+    large_headers, large_child = seed_flask_child(f"large{abs(hash(path))}", devices=4, rows=120)
+
+    small = flask_query_count(flask_client, path.format(child=small_child), small_headers)
+    large = flask_query_count(flask_client, path.format(child=large_child), large_headers)
+    assert small == large
+
+
+def test_flask_children_query_count_is_constant(flask_client):
+    fs = flask_server
+    headers, _ = seed_flask_child("kids", devices=2, rows=0)
+    before = flask_query_count(flask_client, "/api/children", headers)
+
+    with fs.app.app_context():
+        for n in range(10):
+            fs.db.session.add(fs.Child(id=f"c-kids-extra-{n}", parent_id="p-kids", name=f"Kid {n}"))
+            fs.db.session.add(fs.Device(id=f"d-kids-extra-{n}", child_id=f"c-kids-extra-{n}", device_name="Tablet"))
+        fs.db.session.commit()
+
+    after = flask_query_count(flask_client, "/api/children", headers)
+    assert before == after
+
+
+# ═══════════════════════════════════════════════════════════════
+# FASTAPI SERVER (backend_final.py)
+# ═══════════════════════════════════════════════════════════════
+
+def test_fastapi_list_children_query_count_is_constant():
+    from fastapi.testclient import TestClient
+
+    bf = backend_final
+    db = bf.SessionLocal()
+    db.add(bf.Parent(id="fp", email="fp@test", password_hash="x", full_name="Parent"))
+    db.add(bf.Child(id="fc-0", parent_id="fp", name="Kid", device_id="dev-0"))
+    db.commit()
+
+    token, _ = bf.create_jwt_token("fp")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with TestClient(bf.app) as client:
+        with QueryCounter(bf.engine) as counter:
+            assert client.get("/api/children", headers=headers).status_code == 200
+        before = counter.count
+
+        for n in range(1, 8):
+            db.add(bf.Child(id=f"fc-{n}", parent_id="fp", name=f"Kid {n}", device_id=f"dev-{n}"))
+            db.add(bf.VideoAnalysis(child_id=f"fc-{n}", url="https://fb.watch/x", title="Video"))
+        db.commit()
+
+        with QueryCounter(bf.engine) as counter:
+            response = client.get("/api/children", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["total"] == 8
+
+    db.close()
+    assert counter.count == before
+
+
+def seed_fastapi_child(db, parent_id, child_id, now):
+    bf = backend_final
+    db.add(bf.Child(id=child_id, parent_id=parent_id, name=f"Kid {child_id}", device_id=f"dev-{child_id}"))
+    db.add(bf.UsageCounter(child_id=child_id, day=now.date().isoformat(), domain="m.youtube.com", seconds=600))
+    db.add(bf.SiteTimeLimit(child_id=child_id, domain="youtube.com", daily_limit_minutes=30))
+    db.add(bf.BlockedSite(child_id=child_id, domain="bad.example", category="Adult"))
+    db.add(bf.AllowedSite(child_id=child_id, domain="wikipedia.org"))
+    db.add(bf.UserBehaviorProfile(child_id=child_id, categories_json='{"music": 2}'))
+    db.add(bf.VideoAnalysis(child_id=child_id, url="https://fb.watch/x", title="Video", duration=120))
+    for n in range(7):
+        db.add(bf.TrackedVideo(child_id=child_id, url=f"https://fb.watch/{n}", title=f"Clip {n}",
+                               watched_at=now - timedelta(minutes=n)))
+        db.add(bf.HiddenComment(child_id=child_id, post_url="https://facebook.com/p/1", comment_text=f"bad {n}",
+                                hidden_at=now - timedelta(minutes=n)))
+
+
+def test_fastapi_dashboard_query_count_is_constant_and_cached():
+    from fastapi.testclient import TestClient
+
+    bf = backend_final
+    now = datetime.utcnow()
+    db = bf.SessionLocal()
+    db.add(bf.Parent(id="dp", email="dp@test", password_hash="x", full_name="Parent"))
+    seed_fastapi_child(db, "dp", "dc-0", now)
+    db.commit()
+
+    token, _ = bf.create_jwt_token("dp")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with TestClient(bf.app) as client:
+        with QueryCounter(bf.engine) as counter:
+            assert client.get("/api/dashboard", headers=headers).status_code == 200
+        before = counter.count
+
+        for n in range(1, 8):
+            seed_fastapi_child(db, "dp", f"dc-{n}", now)
+        db.commit()
+        # Written behind the server's back: drop the cached dashboard by hand
+        bf.dashboard_cache.invalidate("dp")
+
+        with QueryCounter(bf.engine) as counter:
+            response = client.get("/api/dashboard", headers=headers)
+        assert response.status_code == 200
+        assert counter.count == before
+
+        data = response.json()
+        assert data["parent"]["children_count"] == 8 and data["parent"]["videos_tracked"] == 8
+        child = data["children"][0]
+        assert child["today"]["total_seconds"] == 600
+        assert child["limits"][0]["used_seconds"] == 600
+        assert child["blocklist"] == [{"domain": "bad.example", "category": "Adult"}]
+        assert [v["title"] for v in child["recent_videos"]] == [f"Clip {n}" for n in range(bf.DASHBOARD_RECENT_ITEMS)]
+        assert child["hidden_comments"]["total"] == 7
+        assert len(child["hidden_comments"]["recent"]) == bf.DASHBOARD_RECENT_ITEMS
+        assert child["week"]["total_videos"] == 1 and child["behavior"]["top_categories"] == {"music": 2}
+
+        # Served from the cache: only the token's parent lookup runs
+        with QueryCounter(bf.engine) as counter:
+            assert client.get("/api/dashboard", headers=headers).json() == data
+        assert counter.count == 1
+
+        # Parent and device writes both drop it
+        client.post("/api/blocklist", json={"child_id": "dc-3", "domain": "new.example"}, headers=headers)
+        blocklist = client.get("/api/dashboard", headers=headers).json()["children"][3]["blocklist"]
+        assert {"domain": "new.example", "category": "Custom"} in blocklist
+
+        client.post("/api/comments/hidden", json={"child_id": "dc-5", "comment_text": "worse"})
+        comments = client.get("/api/dashboard", headers=headers).json()["children"][5]["hidden_comments"]
+        assert comments["total"] == 8 and comments["recent"][0]["text"] == "worse"
+
+    db.close()
+
+
+def test_fastapi_policy_lists_answer_if_none_match_without_loading_rows():
+    from fastapi.testclient import TestClient
+
+    bf = backend_final
+    now = datetime.utcnow()
+    db = bf.SessionLocal()
+    db.add(bf.Parent(id="ep", email="ep@test", password_hash="x", full_name="Parent"))
+    seed_fastapi_child(db, "ep", "ec-0", now)
+    db.commit()
+
+    token, _ = bf.create_jwt_token("ep")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with TestClient(bf.app) as client:
+        etags = {}
+        for path in ("/api/blocklist/ec-0", "/api/allowlist/ec-0", "/api/limits/ec-0", "/api/reports/all/ec-0"):
+            response = client.get(path, headers=headers)
+            assert response.status_code == 200 and response.json()["status"] == "success"
+            etags[path] = response.headers["etag"]
+
+            # Token lookup plus the ownership check that also reads the revision
+            with QueryCounter(bf.engine) as counter:
+                response = client.get(path, headers={**headers, "If-None-Match": etags[path]})
+            assert response.status_code == 304 and response.content == b""
+            assert counter.count == 2
+
+        client.post("/api/blocklist", json={"child_id": "ec-0", "domain": "new.example"}, headers=headers)
+        response = client.get("/api/blocklist/ec-0", headers={**headers, "If-None-Match": etags["/api/blocklist/ec-0"]})
+        assert response.status_code == 200 and response.headers["etag"] != etags["/api/blocklist/ec-0"]
+        assert {"domain": "new.example", "category": "Custom"} in response.json()["blocklist"]
+        # Other resources of the child keep their version
+        response = client.get("/api/limits/ec-0", headers={**headers, "If-None-Match": etags["/api/limits/ec-0"]})
+        assert response.status_code == 304
+
+        other_token, _ = bf.create_jwt_token("fp")
+        response = client.get("/api/blocklist/ec-0", headers={
+            "Authorization": f"Bearer {other_token}", "If-None-Match": "*"
+        })
+        assert response.status_code == 404
+
+    db.close()
+    assert 'conditional_get_total{resource="limits",result="not_modified"} 2' in bf.metrics.render()
+
+
+# ═══════════════════════════════════════════════════════════════
+# PER-REQUEST QUERY STATS (query_stats.py)
+# ═══════════════════════════════════════════════════════════════
+
+def test_flask_debug_headers_match_executed_queries(flask_client):
+    headers, child = seed_flask_child("hdr", devices=1, rows=2)
+    with flask_server.app.app_context():
+        engine = flask_server.db.engine
+
+    flask_server.app.debug = True
+    try:
+        with QueryCounter(engine) as counter:
+            response = flask_client.get(f"/api/children/{child}", headers=headers)
+    finally:
+        flask_server.app.debug = False
+
+    assert response.status_code == 200
+    assert int(response.headers["X-DB-Query-Count"]) == counter.count
+    assert float(response.headers["X-DB-Time-Ms"]) >= 0
+    assert "X-DB-Query-Count" not in flask_client.get(f"/api/children/{child}", headers=headers).headers
+
+
+def test_fastapi_slow_queries_are_logged_with_route():
+    from fastapi.testclient import TestClient
+
+    bf = backend_final
+    token, _ = bf.create_jwt_token("fp-slow")
+    threshold = bf.slow_queries.threshold
+    bf.slow_queries.threshold = 0
+    try:
+        with TestClient(bf.app) as client:
+            client.get("/api/children", headers={"Authorization": f"Bearer {token}"})
+    finally:
+        bf.slow_queries.threshold = threshold
+
+    entries = [e for e in bf.slow_queries.entries() if e["route"] == "/api/children"]
+    assert entries
+    assert entries[0]["method"] == "GET"
+    assert "fp-slow" not in entries[0]["statement"]
+
+
+def test_normalize_sql_strips_literals_and_folds_in_lists():
+    from query_stats import normalize_sql
+
+    sql = "SELECT * FROM logs WHERE child_id = 'c-1' AND n > 42 AND id IN (?, ?, ?)\n  LIMIT %(param_1)s"
+    assert normalize_sql(sql) == "SELECT * FROM logs WHERE child_id = ? AND n > ? AND id IN (?...) LIMIT ?"
+
+
+def test_failed_statements_leave_no_timing_state_behind():
+    from sqlalchemy import create_engine, exc, text
+
+    from query_stats import QueryMonitor, SlowQueryLog
+
+    slow_log = SlowQueryLog(threshold_ms=0)
+    engine = create_engine("sqlite://")
+    QueryMonitor(slow_log).instrument(engine)
+
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(exc.OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+        assert not any(key.startswith("query") for key in conn.info)
+
+    # Only the statement that completed was timed
+    assert [entry["statement"] for entry in slow_log.entries()] == ["SELECT ?"]
@@ -0,0 +1,115 @@
+"""
+Response Encoding Tests
+JSON encoding, Accept-Encoding negotiation and compression in
+response_encoding.py, on small FastAPI and Flask apps
+
+    python -m pytest test_response_encoding.py -q
+"""
+
+import gzip
+import os
+import sys
+import zlib
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import response_encoding
+from response_encoding import choose_encoding, compressible, dumps, iter_compressed, loads
+
+ROWS = [{"id": n, "domain": "example.com", "visited_at": datetime(2026, 2, 8, 14, 0, n % 60)} for n in range(200)]
+
+
+def test_dumps_matches_isoformat_and_plain_json():
+    moment = datetime(2026, 2, 8, 14, 30, 5, 120)
+    assert loads(dumps({"at": moment, "tags": {"a"}, 3: None})) == {
+        "at": moment.isoformat(), "tags": ["a"], "3": None
+    }
+
+
+def test_accept_encoding_negotiation(monkeypatch):
+    monkeypatch.setattr(response_encoding, "brotli", object())
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("br;q=0.5, gzip") == "gzip"
+    assert choose_encoding("*;q=0.1, br;q=0") == "gzip"
+    assert choose_encoding("identity") is None and choose_encoding("") is None
+
+    monkeypatch.setattr(response_encoding, "brotli", None)
+    assert choose_encoding("br") is None
+    assert choose_encoding("br, gzip") == "gzip"
+
+    assert compressible("application/json") and compressible("text/html; charset=utf-8")
+    assert not compressible("text/event-stream") and not compressible("image/png")
+
+
+def test_streamed_chunks_decode_as_they_arrive():
+    chunks = list(iter_compressed([b'{"n": 1}\n', '{"n": 2}\n'], "gzip"))
+    decoder = zlib.decompressobj(31)
+    assert decoder.decompress(chunks[0]) == b'{"n": 1}\n'
+    assert gzip.decompress(b"".join(chunks)) == b'{"n": 1}\n{"n": 2}\n'
+
+
+def test_fastapi_plain_results_skip_jsonable_encoder_and_compress():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from pydantic import BaseModel
+    from starlette.responses import Response
+
+    class Item(BaseModel):
+        name: str
+
+    app = FastAPI()
+    response_encoding.init_fastapi_responses(app)
+
+    @app.get("/rows", status_code=201)
+    async def rows():
+        return {"rows": ROWS}
+
+    @app.get("/small")
+    def small():
+        return [1, 2]
+
+    @app.get("/model", response_model=Item)
+    def model():
+        return {"name": "kept", "extra": "dropped"}
+
+    @app.get("/header")
+    def header(response: Response):
+        response.headers["X-Kept"] = "1"
+        return {"ok": True}
+
+    with TestClient(app) as client:
+        response = client.get("/rows", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 201
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.json()["rows"][1]["visited_at"] == "2026-02-08T14:00:01"
+
+        response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert response.json() == [1, 2] and "content-encoding" not in response.headers
+        assert client.get("/model").json() == {"name": "kept"}
+        assert client.get("/header").headers["x-kept"] == "1"
+
+
+def test_flask_jsonify_uses_encoder_and_compresses_streams():
+    from flask import Flask, Response, jsonify
+
+    app = Flask(__name__)
+    response_encoding.init_flask_responses(app)
+
+    @app.route("/rows")
+    def rows():
+        return jsonify({"rows": ROWS})
+
+    @app.route("/export")
+    def export():
+        return Response((f'{{"n": {n}}}\n' for n in range(3)), mimetype="application/x-ndjson")
+
+    client = app.test_client()
+    response = client.get("/rows", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert loads(gzip.decompress(response.data))["rows"][0]["visited_at"] == "2026-02-08T14:00:00"
+    assert "Content-Encoding" not in client.get("/rows").headers
+
+    response = client.get("/export", headers={"Accept-Encoding": "gzip"})
+    assert gzip.decompress(response.data).decode().splitlines() == ['{"n": 0}', '{"n": 1}', '{"n": 2}']
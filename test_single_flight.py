@@ -0,0 +1,118 @@
+"""
+Request Coalescing Tests
+Sharing, errors, TTL and cancellation in single_flight.SingleFlight
+(no database needed)
+
+    python -m pytest test_single_flight.py -q
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from metrics import MetricsRegistry
+from single_flight import SingleFlight
+
+
+class SlowScan:
+    """Stands in for an expensive read: blocks until released, counts calls"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self, child_id, fail=False):
+        self.calls += 1
+        self.release.wait(5)
+        if fail:
+            raise LookupError(child_id)
+        return {"child_id": child_id, "call": self.calls}
+
+
+async def gather_released(scan, *calls):
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    await asyncio.sleep(0.05)
+    scan.release.set()
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_concurrent_identical_reads_share_one_computation():
+    metrics = MetricsRegistry()
+    flights = SingleFlight(metrics=metrics)
+    scan = SlowScan()
+
+    async def scenario():
+        return await gather_released(
+            scan,
+            flights.run("usage", ("p1", "c1", 7), scan, "c1"),
+            flights.run("usage", ("p1", "c1", 7), scan, "c1"),
+            flights.run("usage", ("p1", "c1", 7), scan, "c1"),
+            # Another parent, or other parameters, never share
+            flights.run("usage", ("p2", "c1", 7), scan, "c1"),
+            flights.run("usage", ("p1", "c1", 1), scan, "c1")
+        )
+
+    results = asyncio.run(scenario())
+    assert scan.calls == 3
+    assert results[0] is results[1] is results[2]
+    assert flights.in_flight() == 0
+
+    rendered = metrics.render()
+    assert 'single_flight_requests_total{endpoint="usage",result="computed"} 3' in rendered
+    assert 'single_flight_requests_total{endpoint="usage",result="shared"} 2' in rendered
+
+
+def test_errors_reach_every_caller_and_are_not_kept():
+    flights = SingleFlight(ttl=60)
+    scan = SlowScan()
+
+    async def scenario():
+        failed = await gather_released(
+            scan,
+            flights.run("weekly_report", ("p1", "c1"), scan, "c1", True),
+            flights.run("weekly_report", ("p1", "c1"), scan, "c1", True)
+        )
+        retried = await flights.run("weekly_report", ("p1", "c1"), scan, "c1")
+        return failed, retried
+
+    failed, retried = asyncio.run(scenario())
+    assert all(isinstance(error, LookupError) for error in failed)
+    assert retried == {"child_id": "c1", "call": 2}
+
+
+def test_results_are_served_for_the_ttl_only():
+    scan = SlowScan()
+    scan.release.set()
+
+    async def scenario(flights):
+        first = await flights.run("behavior_profile", ("p1", "c1"), scan, "c1")
+        second = await flights.run("behavior_profile", ("p1", "c1"), scan, "c1")
+        return first, second
+
+    first, second = asyncio.run(scenario(SingleFlight(ttl=60)))
+    assert first is second and scan.calls == 1
+
+    first, second = asyncio.run(scenario(SingleFlight(ttl=0)))
+    assert first is not second and scan.calls == 3
+
+
+def test_a_cancelled_caller_does_not_cancel_the_others():
+    flights = SingleFlight()
+    scan = SlowScan()
+
+    async def scenario():
+        leader = asyncio.ensure_future(flights.run("usage", ("p1", "c1"), scan, "c1"))
+        follower = asyncio.ensure_future(flights.run("usage", ("p1", "c1"), scan, "c1"))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        scan.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == {"child_id": "c1", "call": 1}
@@ -0,0 +1,103 @@
+"""
+Static Asset Tests
+Hashed URLs, precompressed variants, ETags and reloading in
+static_assets.StaticAssets (temporary directories, no server needed)
+
+    python -m pytest test_static_assets.py -q
+"""
+
+import gzip
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from static_assets import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, StaticAssets
+
+STYLE = b"body { color: #333; }\n" * 200
+PAGE = b'<html><link rel="stylesheet" href="/assets/site.css"><script src="/assets/missing.js"></script></html>'
+
+
+def make_site(tmp_path):
+    (tmp_path / "site.css").write_bytes(STYLE)
+    (tmp_path / "index.html").write_bytes(PAGE)
+    (tmp_path / "icons").mkdir()
+    (tmp_path / "icons" / "icon16.png").write_bytes(b"\x89PNG" + bytes(2000))
+    return StaticAssets(str(tmp_path), reload_seconds=0)
+
+
+def test_pages_link_content_hashed_urls_cached_for_a_year(tmp_path):
+    assets = make_site(tmp_path)
+    assert len(assets) == 3 and "icons/icon16.png" in assets
+
+    hashed = assets.url("site.css")
+    assert hashed.startswith("/assets/site.") and hashed.endswith(".css") and hashed != "/assets/site.css"
+
+    status, headers, body = assets.respond("index.html")
+    assert status == 200 and headers["Cache-Control"] == REVALIDATE_CACHE_CONTROL
+    assert f'href="{hashed}"'.encode() in body
+    assert b'src="/assets/missing.js"' in body
+
+    status, headers, body = assets.respond(hashed[len("/assets/"):])
+    assert headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL and body == STYLE
+    assert assets.respond("site.css")[1]["Cache-Control"] == REVALIDATE_CACHE_CONTROL
+    assert assets.respond("nothing.css") is None
+
+
+def test_precompressed_variants_and_etags(tmp_path):
+    assets = make_site(tmp_path)
+
+    status, headers, body = assets.respond("site.css", accept_encoding="gzip")
+    assert headers["Content-Encoding"] == "gzip" and headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(body) == STYLE
+    identity = assets.respond("site.css")[1]["ETag"]
+    assert headers["ETag"] != identity
+
+    # Either representation's ETag revalidates
+    for tag in (identity, headers["ETag"]):
+        status, not_modified, body = assets.respond("site.css", if_none_match=tag, accept_encoding="gzip")
+        assert status == 304 and body == b"" and "Content-Type" not in not_modified
+
+    # Binary files are sent as they are
+    status, headers, body = assets.respond("icons/icon16.png", accept_encoding="gzip, br")
+    assert "Content-Encoding" not in headers and headers["Content-Type"] == "image/png"
+
+
+def test_changed_files_are_reloaded_and_old_hashes_still_answer(tmp_path):
+    assets = make_site(tmp_path)
+    old_hashed = assets.url("site.css")[len("/assets/"):]
+    assets.reload_seconds = 1
+
+    (tmp_path / "site.css").write_bytes(b"body { color: red; }")
+    os.utime(tmp_path / "site.css", ns=(1, 1))
+    assert not assets.refresh(now=assets._checked + 0.5)
+    assert assets.refresh(now=assets._checked + 1)
+
+    new_hashed = assets.url("site.css")[len("/assets/"):]
+    assert new_hashed != old_hashed
+    assert new_hashed.encode() in assets.respond("index.html")[2]
+
+    # A page loaded before the change still gets the stylesheet, revalidated
+    status, headers, body = assets.respond(old_hashed)
+    assert body == b"body { color: red; }" and headers["Cache-Control"] == REVALIDATE_CACHE_CONTROL
+
+
+def test_changes_are_detected_off_the_request_path(tmp_path, monkeypatch):
+    assets = make_site(tmp_path)
+    assets.reload_seconds = 0.05
+    walks = []
+    names = assets._names
+    monkeypatch.setattr(assets, "_names", lambda: walks.append(threading.current_thread().name) or names())
+
+    assert assets.respond("site.css")[0] == 200
+    # Files added after startup are served once the watcher has seen them
+    (tmp_path / "new.js").write_bytes(b"console.log(1);")
+    deadline = time.monotonic() + 5
+    while "new.js" not in assets and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assets.reload_seconds = 0       # stops the watcher
+
+    assert "new.js" in assets
+    assert walks and set(walks) == {"static-assets"}
@@ -0,0 +1,146 @@
+"""
+Usage Accounting Engine Tests
+Shared daily budgets, parent-domain rules and local-midnight resets
+in usage_accounting.py (no database needed)
+
+    python -m pytest test_usage_accounting.py -q
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from usage_accounting import UsageAccountant, domain_suffixes, local_day
+
+NOON_UTC = datetime(2026, 2, 8, 12, 0)
+YOUTUBE_RULE = {"id": "r1", "domain": "www.youtube.com", "daily_limit_minutes": 10,
+                "cooldown_hours": 2, "permanent_block": False, "blocked_until": None}
+
+
+def loaded(offset=0, counters=None, rules=(YOUTUBE_RULE,), daily_limit=None):
+    accountant = UsageAccountant()
+    accountant.load("kid", counters or {}, list(rules), daily_limit, offset, now=NOON_UTC)
+    return accountant
+
+
+def test_domain_suffixes_skip_bare_tld():
+    assert domain_suffixes("m.youtube.com") == ["m.youtube.com", "youtube.com"]
+    assert domain_suffixes("localhost") == ["localhost"]
+
+
+def test_local_day_and_midnight_follow_offset():
+    # Nepal (UTC+5:45): 12:00 UTC is 17:45 local, midnight is 18:15 UTC
+    assert local_day(NOON_UTC, 345) == ("2026-02-08", datetime(2026, 2, 8, 18, 15))
+    # UTC-8: still the 8th, midnight at 08:00 UTC on the 9th
+    assert local_day(NOON_UTC, -480) == ("2026-02-08", datetime(2026, 2, 9, 8, 0))
+
+
+def test_devices_share_one_budget_across_subdomains():
+    accountant = loaded(counters={"youtube.com": 120}, daily_limit=60)
+    accountant.ingest("kid", "m.youtube.com", 180, now=NOON_UTC)
+    accountant.ingest("kid", "www.youtube.com", 60, now=NOON_UTC)
+    accountant.ingest("kid", "example.org", 300, now=NOON_UTC)
+
+    status = accountant.status("kid", now=NOON_UTC)
+    assert status["total_seconds"] == 660
+    assert status["remaining_minutes"] == 49.0
+    youtube = status["limits"][0]
+    assert youtube["used_seconds"] == 360
+    assert youtube["remaining_minutes"] == 4.0
+    assert not youtube["blocked"]
+
+
+def test_reaching_limit_blocks_until_cooldown_or_reset():
+    accountant = loaded()
+    reached = accountant.ingest("kid", "youtube.com", 600, now=NOON_UTC)
+    assert [rule["id"] for rule in reached] == ["r1"]
+
+    rule = accountant.status("kid", now=NOON_UTC, domain="music.youtube.com")["limits"][0]
+    assert rule["blocked"] and rule["reason"] == "limit-reached"
+    # Cooldown ends at 14:00, but usage only resets at midnight
+    assert rule["blocked_until"] == "2026-02-09T00:00:00"
+
+    _, rule_blocks, _ = accountant.drain()
+    assert rule_blocks == {"r1": NOON_UTC + timedelta(hours=2)}
+
+
+def test_midnight_reset_comes_from_the_scheduler():
+    accountant = loaded(offset=345)
+    accountant.ingest("kid", "youtube.com", 300, now=NOON_UTC)
+
+    assert accountant.due_resets(now=datetime(2026, 2, 8, 18, 14)) == {}
+    assert "kid" in accountant.due_resets(now=datetime(2026, 2, 8, 18, 15))
+
+    after = datetime(2026, 2, 8, 18, 16)
+    assert accountant.status("kid", now=after)["day"] == "2026-02-09"
+    assert accountant.used_seconds("kid", "youtube.com", now=after) == 0
+
+
+def test_idle_child_is_dropped_at_midnight():
+    accountant = loaded()
+    accountant.due_resets(now=datetime(2026, 2, 9, 0, 0))
+    assert accountant.children_in_memory == 0
+    assert accountant.needs_counters("kid") and accountant.needs_rules("kid")
+
+
+def test_drain_returns_deltas_and_restore_puts_them_back():
+    accountant = loaded(daily_limit=30)
+    accountant.ingest("kid", "youtube.com", 90, now=NOON_UTC)
+    drained = accountant.drain()
+    rows, _, remaining = drained
+    assert rows == [{"child_id": "kid", "domain": "youtube.com", "day": "2026-02-08",
+                     "seconds": 90, "utc_offset_minutes": 0}]
+    assert remaining == {"kid": 29}
+    assert accountant.drain()[0] == []
+
+    accountant.restore(drained)
+    accountant.ingest("kid", "youtube.com", 10, now=NOON_UTC)
+    assert accountant.drain()[0][0]["seconds"] == 100
+
+
+def test_workers_merge_persisted_counters_on_resync():
+    # Two workers, one child: each counts its own device, the database has both
+    first, second = UsageAccountant(resync_seconds=30), UsageAccountant(resync_seconds=30)
+    for worker in (first, second):
+        worker.load("kid", {}, [YOUTUBE_RULE], None, 0, now=NOON_UTC)
+
+    assert first.ingest("kid", "youtube.com", 300, now=NOON_UTC) == []
+    assert second.ingest("kid", "m.youtube.com", 240, now=NOON_UTC) == []
+    persisted = {}
+    for worker in (first, second):
+        for row in worker.drain()[0]:
+            persisted[row["domain"]] = persisted.get(row["domain"], 0) + row["seconds"]
+    second.ingest("kid", "youtube.com", 30, now=NOON_UTC)   # not flushed yet
+
+    later = NOON_UTC + timedelta(seconds=10)
+    assert not second.needs_counters("kid", now=later)
+    later = NOON_UTC + timedelta(seconds=30)
+    assert second.needs_counters("kid", now=later)
+    second.load("kid", persisted, [YOUTUBE_RULE], None, now=later)
+    assert second.used_seconds("kid", "youtube.com", now=later) == 570
+
+    # The limit is reached on the next event, by whichever worker sees it first, once
+    reached = second.ingest("kid", "youtube.com", 60, now=later)
+    assert [rule["id"] for rule in reached] == ["r1"]
+    assert second.ingest("kid", "youtube.com", 60, now=later) == []
+
+
+def test_reload_keeps_unpersisted_blocks():
+    accountant = UsageAccountant(resync_seconds=30)
+    accountant.load("kid", {}, [YOUTUBE_RULE], None, 0, now=NOON_UTC)
+    accountant.ingest("kid", "youtube.com", 600, now=NOON_UTC)
+
+    # Reloaded before the flush: the stored rule has no blocked_until yet
+    later = NOON_UTC + timedelta(minutes=1)
+    accountant.load("kid", {}, [YOUTUBE_RULE], None, now=later)
+    rule = accountant.status("kid", now=later)["limits"][0]
+    assert rule["blocked"] and rule["used_seconds"] == 600
+    assert accountant.ingest("kid", "youtube.com", 60, now=later) == []
+    assert accountant.drain()[1] == {"r1": NOON_UTC + timedelta(hours=2)}
+
+
+def test_single_worker_never_resyncs():
+    accountant = loaded()
+    assert not accountant.needs_counters("kid", now=NOON_UTC + timedelta(hours=6))
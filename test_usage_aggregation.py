@@ -0,0 +1,154 @@
+"""
+Usage Aggregation Tests
+The SQL GROUP BY usage of both servers (app.aggregate_history_usage,
+backend_final.aggregate_usage) against the row-by-row Python loop it
+replaced, for the totals and for every hour/day/domain breakdown
+
+Runs both servers in-process against temporary SQLite databases:
+    python -m pytest test_usage_aggregation.py -q
+"""
+
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Point both servers at throwaway databases before they are imported
+_tmp_dir = tempfile.mkdtemp(prefix="safeguard-test-")
+os.environ["database_url"] = f"sqlite:///{os.path.join(_tmp_dir, 'flask.db')}"
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'fastapi.db')}"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import app as flask_server
+import backend_final
+from db_utils import bucket_label
+
+# Mixed case on purpose: the servers group on lower(domain)
+DOMAINS = ["YouTube.com", "youtube.com", "WIKIPEDIA.org", "news.example", "News.Example"]
+
+GROUPINGS = [[], ["domain"], ["hour"], ["day"], ["day", "domain"], ["domain", "hour"]]
+
+
+def random_logs(seed, count, now):
+    """(timestamp, domain, seconds, flagged) tuples spread over three days"""
+    rng = random.Random(seed)
+    return [
+        (
+            now - timedelta(minutes=rng.randrange(3 * 24 * 60)),
+            rng.choice(DOMAINS + ["", None]),
+            rng.choice([0, 0, rng.randrange(1, 900)]),
+            rng.random() < 0.2
+        )
+        for _ in range(count)
+    ]
+
+
+def loop_usage(logs, group_by, skip, domain_of, measures):
+    """The previous implementation: one pass over the rows in Python"""
+    totals, cells = {}, {}
+    for log in logs:
+        if skip(log):
+            continue
+        domain = domain_of(log)
+        totals[domain] = totals.get(domain, 0) + log[2]
+        key = tuple(domain if d == "domain" else bucket_label(log[0], d) for d in group_by)
+        cell = cells.setdefault(key, [0] * len(measures))
+        for n, measure in enumerate(measures):
+            cell[n] += measure(log)
+    return totals, sorted([*key, *cell] for key, cell in cells.items())
+
+
+def assert_sorted_by_seconds(usage):
+    seconds = [entry["seconds"] for entry in usage]
+    assert seconds == sorted(seconds, reverse=True)
+
+
+def test_flask_history_usage_matches_python_loop():
+    fs = flask_server
+    now = datetime.utcnow().replace(microsecond=0)
+    logs = random_logs(1, 400, now)
+    # Rows outside the window must not count
+    logs_outside = random_logs(2, 40, now - timedelta(days=10))
+
+    with fs.app.app_context():
+        fs.db.create_all()
+        fs.db.session.add(fs.Parent(id="p-usage", email="usage@test", password_hash="x"))
+        fs.db.session.add(fs.Child(id="c-usage", parent_id="p-usage", name="Kid"))
+        fs.db.session.add(fs.Device(id="d-usage", child_id="c-usage", device_name="Laptop"))
+        for n, (visited_at, domain, seconds, _) in enumerate(logs + logs_outside):
+            fs.db.session.add(fs.HistoryLog(
+                child_id="c-usage", device_id="d-usage", url=f"https://{domain or 'x'}/{n}",
+                domain=domain or "", visited_at=visited_at, duration=seconds
+            ))
+        fs.db.session.commit()
+
+        cutoff = now - timedelta(days=3, minutes=1)
+        for group_by in GROUPINGS:
+            result = fs.aggregate_history_usage("c-usage", cutoff, list(group_by) or None)
+            totals, cells = loop_usage(
+                logs, group_by,
+                skip=lambda log: log[2] <= 0 or not log[1],
+                domain_of=lambda log: log[1].lower(),
+                measures=(lambda log: log[2], lambda log: 1)
+            )
+            assert result["usage_map"] == totals
+            assert result["total_seconds"] == sum(totals.values())
+            assert result["total_minutes"] == round(sum(totals.values()) / 60, 2)
+            assert_sorted_by_seconds(result["usage"])
+            assert all(domain == domain.lower() for domain in result["usage_map"])
+            if group_by:
+                assert result["breakdown"]["columns"] == group_by + ["seconds", "visits"]
+                assert sorted(result["breakdown"]["rows"]) == cells
+            else:
+                assert "breakdown" not in result
+
+
+def test_fastapi_activity_usage_matches_python_loop():
+    bf = backend_final
+    now = datetime.utcnow().replace(microsecond=0)
+    logs = random_logs(3, 400, now)
+    logs_outside = random_logs(4, 40, now - timedelta(days=10))
+
+    db = bf.SessionLocal()
+    try:
+        db.add(bf.Parent(id="fp-usage", email="fp-usage@test", password_hash="x", full_name="Parent"))
+        db.add(bf.Child(id="fc-usage", parent_id="fp-usage", name="Kid", device_id="dev-usage"))
+        for visited_at, domain, seconds, flagged in logs + logs_outside:
+            db.add(bf.ActivityLog(
+                child_id="fc-usage", activity_type="page_view", domain=domain or "",
+                duration_seconds=seconds, is_flagged=flagged, recorded_at=visited_at
+            ))
+        db.commit()
+
+        since = now - timedelta(days=3, minutes=1)
+        for group_by in GROUPINGS:
+            result = bf.aggregate_usage(db, "fc-usage", since, list(group_by) or None)
+            totals, cells = loop_usage(
+                logs, group_by,
+                skip=lambda log: False,
+                domain_of=lambda log: (log[1] or "unknown").lower(),
+                measures=(lambda log: log[2], lambda log: 1 if log[3] else 0, lambda log: 1)
+            )
+            assert result["usage_map"] == totals
+            assert result["total_seconds"] == sum(log[2] for log in logs)
+            assert result["flagged_count"] == sum(1 for log in logs if log[3])
+            assert result["activities_count"] == len(logs)
+            assert_sorted_by_seconds(result["usage"])
+            if group_by:
+                assert result["breakdown"]["columns"] == group_by + ["seconds", "flagged", "activities"]
+                assert sorted(result["breakdown"]["rows"]) == cells
+            else:
+                assert "breakdown" not in result
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("value", ["week", "day,day", "hour,,minute"])
+def test_unknown_group_by_is_rejected(value):
+    from db_utils import parse_group_by
+
+    with pytest.raises(ValueError):
+        parse_group_by(value)
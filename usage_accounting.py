@@ -0,0 +1,365 @@
+"""
+SafeGuard Family - Usage Accounting Engine
+Server-side daily time-limit accounting: one budget for all of a child's
+devices.
+
+Keeps per-(child, domain, local day) seconds in memory, fed by ingested usage
+events, so "minutes remaining" and "blocked until" are O(1) lookups instead of
+a rescan of the activity log. Every domain is also counted under its parent
+domains (m.youtube.com -> youtube.com), so a rule on any of them is one dict
+lookup, matching isDomainMatched() in the extension.
+
+Each child's day ends at its local midnight; resets are popped from a heap
+(scheduler) instead of scanning children. Children idle for a whole day are
+dropped from memory, so memory follows the number of children active today.
+
+The engine does no I/O: backend_final.py loads state into it and persists
+what drain() returns.
+
+State is per process. With several workers, a child's devices may report to
+different ones, so each worker reloads a child's counters (and rules) from
+the database every resync_seconds: the persisted total of every worker plus
+its own unflushed seconds. A limit is reached on the first event that finds
+the merged count at or past it, so usage seen only by other workers delays a
+block by at most their flush interval plus resync_seconds. resync_seconds=0
+never reloads, for a single worker.
+"""
+
+import heapq
+import threading
+from datetime import datetime, time, timedelta
+
+
+def normalize_domain(domain):
+    """Lowercase a domain and drop a leading www."""
+    domain = (domain or "").strip().lower()
+    return domain[4:] if domain.startswith("www.") else domain
+
+
+def domain_suffixes(domain):
+    """The domain and its parent domains, without the bare TLD"""
+    labels = domain.split(".")
+    return [".".join(labels[i:]) for i in range(max(1, len(labels) - 1))]
+
+
+def local_day(now, utc_offset_minutes):
+    """(day "YYYY-MM-DD", next local midnight as a UTC datetime) for an offset"""
+    local = now + timedelta(minutes=utc_offset_minutes)
+    midnight = datetime.combine(local.date() + timedelta(days=1), time())
+    return local.date().isoformat(), midnight - timedelta(minutes=utc_offset_minutes)
+
+
+class _ChildDay:
+    """One child's counters for one local day"""
+
+    __slots__ = ("day", "offset", "resets_at", "rollup", "total", "active", "reached", "loaded_at")
+
+    def __init__(self, day, offset, resets_at, loaded_at=None):
+        self.day = day
+        self.offset = offset
+        self.resets_at = resets_at
+        self.rollup = {}    # domain and parent domains -> seconds
+        self.total = 0
+        self.active = False
+        self.reached = set()         # rule ids whose limit this worker reached today
+        self.loaded_at = loaded_at   # when the counters were read from the database
+
+    def add(self, domain, seconds):
+        for suffix in domain_suffixes(domain):
+            self.rollup[suffix] = self.rollup.get(suffix, 0) + seconds
+        self.total += seconds
+
+
+class UsageAccountant:
+    """
+    In-memory daily usage counters and limit evaluation
+
+    Rules are dicts with id, domain, daily_limit_minutes, cooldown_hours,
+    permanent_block and blocked_until (UTC datetime or None).
+    """
+
+    def __init__(self, resync_seconds=0):
+        self.resync_seconds = resync_seconds
+        self._lock = threading.RLock()
+        self._days = {}           # child_id -> _ChildDay
+        self._rules = {}          # child_id -> {domain: rule}
+        self._daily_limits = {}   # child_id -> overall daily minutes (TimeLimit) or None
+        self._offsets = {}        # child_id -> UTC offset in minutes (local - UTC)
+        self._resets = []         # heap of (resets_at, child_id, day)
+        self._dirty = {}          # (child_id, domain, day) -> [seconds, offset]
+        self._dirty_rules = {}    # rule id -> blocked_until
+        self._dirty_children = set()
+        self.events = 0
+
+    # ════════════════════════════════
+    # LOADING
+    # ════════════════════════════════
+
+    def current_day(self, child_id, now=None, utc_offset_minutes=None):
+        """Local day and offset for a child, using the last known offset"""
+        now = now or datetime.utcnow()
+        offset = utc_offset_minutes if utc_offset_minutes is not None else self._offsets.get(child_id, 0)
+        return local_day(now, offset)[0], offset
+
+    def knows_offset(self, child_id):
+        return child_id in self._offsets
+
+    def needs_counters(self, child_id, now=None):
+        """True when the child's counters are not in memory or older than resync_seconds"""
+        state = self._days.get(child_id)
+        if state is None:
+            return True
+        if not self.resync_seconds:
+            return False
+        if state.loaded_at is None:
+            return True   # a day rolled over in memory, other workers may have counted already
+        now = now or datetime.utcnow()
+        return (now - state.loaded_at).total_seconds() >= self.resync_seconds
+
+    def needs_rules(self, child_id):
+        """True when the child's rules are not in memory"""
+        return child_id not in self._rules
+
+    def load(self, child_id, counters, rules, daily_limit_minutes=None,
+             utc_offset_minutes=None, now=None):
+        """
+        Install today's persisted counters ({domain: seconds}) and the rules
+        Usage ingested but not yet persisted is kept on top; reloading the
+        same day keeps which limits were already reached
+        """
+        now = now or datetime.utcnow()
+        with self._lock:
+            if utc_offset_minutes is not None:
+                self._offsets[child_id] = utc_offset_minutes
+            offset = self._offsets.get(child_id, 0)
+            day, resets_at = local_day(now, offset)
+
+            state = _ChildDay(day, offset, resets_at, loaded_at=now)
+            for domain, seconds in counters.items():
+                state.add(domain, seconds)
+            for (dirty_child, domain, dirty_day), (seconds, _) in self._dirty.items():
+                if dirty_child == child_id and dirty_day == day:
+                    state.add(domain, seconds)
+
+            previous = self._days.get(child_id)
+            if previous is not None and previous.day == day:
+                state.active = previous.active
+                state.reached = previous.reached
+            else:
+                heapq.heappush(self._resets, (resets_at, child_id, day))
+            self._days[child_id] = state
+            self.set_rules(child_id, rules, daily_limit_minutes)
+
+    def set_rules(self, child_id, rules, daily_limit_minutes=None):
+        with self._lock:
+            rules = {normalize_domain(r["domain"]): dict(r) for r in rules}
+            # Blocks reached here but not persisted yet win over the stored value
+            for rule in rules.values():
+                if rule.get("id") in self._dirty_rules:
+                    rule["blocked_until"] = self._dirty_rules[rule["id"]]
+            self._rules[child_id] = rules
+            self._daily_limits[child_id] = daily_limit_minutes
+
+    def forget_rules(self, child_id):
+        """Drop cached rules after they change; the next access reloads them"""
+        with self._lock:
+            self._rules.pop(child_id, None)
+
+    # ════════════════════════════════
+    # INGEST
+    # ════════════════════════════════
+
+    def ingest(self, child_id, domain, seconds, now=None, utc_offset_minutes=None):
+        """
+        Add `seconds` of usage on `domain`; the child must be loaded
+        Returns the rules whose limit was reached by this event
+        """
+        domain = normalize_domain(domain)
+        if not domain or seconds <= 0:
+            return []
+        now = now or datetime.utcnow()
+        with self._lock:
+            if utc_offset_minutes is not None:
+                self._offsets[child_id] = utc_offset_minutes
+            state = self._today(child_id, now)
+            rules = self._rules.get(child_id, {})
+
+            matched = [s for s in domain_suffixes(domain) if s in rules]
+            state.add(domain, seconds)
+            state.active = True
+            self.events += 1
+
+            key = (child_id, domain, state.day)
+            entry = self._dirty.setdefault(key, [0, state.offset])
+            entry[0] += seconds
+            self._dirty_children.add(child_id)
+
+            # At or past the limit, counting what other workers persisted
+            # (reloaded counters), and not reached by this worker yet today
+            reached = []
+            for suffix in matched:
+                rule = rules[suffix]
+                limit = (rule.get("daily_limit_minutes") or 0) * 60
+                if limit and limit <= state.rollup[suffix] and rule["id"] not in state.reached:
+                    state.reached.add(rule["id"])
+                    rule["blocked_until"] = now + timedelta(hours=rule.get("cooldown_hours") or 24)
+                    self._dirty_rules[rule["id"]] = rule["blocked_until"]
+                    reached.append(rule)
+            return reached
+
+    def _today(self, child_id, now):
+        """Counters for the child's current local day, rolling over lazily"""
+        state = self._days.get(child_id)
+        offset = self._offsets.get(child_id, 0)
+        day, resets_at = local_day(now, offset)
+        if state is None or state.day != day:
+            state = self._days[child_id] = _ChildDay(day, offset, resets_at)
+            heapq.heappush(self._resets, (resets_at, child_id, day))
+        return state
+
+    # ════════════════════════════════
+    # STATUS
+    # ════════════════════════════════
+
+    def used_seconds(self, child_id, domain, now=None):
+        """Seconds used today on a domain and its subdomains"""
+        state = self._days.get(child_id)
+        if state is None or state.day != self.current_day(child_id, now)[0]:
+            return 0
+        return state.rollup.get(normalize_domain(domain), 0)
+
+    def rule_status(self, child_id, rule, now=None):
+        """Limit evaluation for one rule, O(1)"""
+        now = now or datetime.utcnow()
+        used = self.used_seconds(child_id, rule["domain"], now)
+        limit = (rule.get("daily_limit_minutes") or 0) * 60
+        blocked_until = rule.get("blocked_until")
+
+        if rule.get("permanent_block"):
+            blocked, reason = True, "permanent"
+        elif limit and used >= limit:
+            # Blocked at least until today's usage resets
+            resets_at = local_day(now, self.current_day(child_id, now)[1])[1]
+            blocked, reason = True, "limit-reached"
+            blocked_until = max(blocked_until, resets_at) if blocked_until else resets_at
+        elif blocked_until and blocked_until > now:
+            blocked, reason = True, "cooldown"
+        else:
+            blocked, reason, blocked_until = False, None, None
+
+        return {
+            "id": rule.get("id"),
+            "domain": rule["domain"],
+            "daily_limit_minutes": rule.get("daily_limit_minutes") or 0,
+            "cooldown_hours": rule.get("cooldown_hours"),
+            "used_seconds": used,
+            "used_minutes": round(used / 60, 2),
+            "remaining_minutes": round(max(0, limit - used) / 60, 2) if limit else None,
+            "blocked": blocked,
+            "reason": reason,
+            "blocked_until": blocked_until.isoformat() if blocked and blocked_until else None
+        }
+
+    def status(self, child_id, now=None, domain=None):
+        """Today's budget for a child: overall limit plus every (or one) domain rule"""
+        now = now or datetime.utcnow()
+        day, offset = self.current_day(child_id, now)
+        state = self._days.get(child_id)
+        total = state.total if state is not None and state.day == day else 0
+        daily_limit = self._daily_limits.get(child_id)
+        rules = self._rules.get(child_id, {})
+
+        if domain is not None:
+            domain = normalize_domain(domain)
+            # Most specific rule covering the domain
+            matches = [rules[s] for s in domain_suffixes(domain) if s in rules]
+            selected = matches[:1] or [{"domain": domain}]
+        else:
+            selected = list(rules.values())
+
+        return {
+            "day": day,
+            "utc_offset_minutes": offset,
+            "resets_at": local_day(now, offset)[1].isoformat(),
+            "total_seconds": total,
+            "total_minutes": round(total / 60, 2),
+            "daily_limit_minutes": daily_limit,
+            "remaining_minutes": round(max(0, daily_limit * 60 - total) / 60, 2) if daily_limit else None,
+            "limits": [self.rule_status(child_id, rule, now) for rule in selected]
+        }
+
+    # ════════════════════════════════
+    # PERSISTENCE AND RESETS
+    # ════════════════════════════════
+
+    def drain(self):
+        """
+        Take everything to persist since the last drain
+        Returns (counter_rows, rule_blocks, remaining_minutes)
+          counter_rows       [{child_id, domain, day, seconds, utc_offset_minutes}] (deltas)
+          rule_blocks        {rule_id: blocked_until}
+          remaining_minutes  {child_id: minutes left of the overall daily limit}
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            rule_blocks, self._dirty_rules = self._dirty_rules, {}
+            children, self._dirty_children = self._dirty_children, set()
+
+            rows = [
+                {"child_id": child_id, "domain": domain, "day": day,
+                 "seconds": seconds, "utc_offset_minutes": offset}
+                for (child_id, domain, day), (seconds, offset) in dirty.items()
+            ]
+            remaining = {}
+            for child_id in children:
+                daily_limit = self._daily_limits.get(child_id)
+                state = self._days.get(child_id)
+                if daily_limit and state is not None:
+                    remaining[child_id] = max(0, daily_limit - state.total // 60)
+        return rows, rule_blocks, remaining
+
+    def restore(self, drained):
+        """Put back what drain() returned after a failed write"""
+        rows, rule_blocks, remaining = drained
+        with self._lock:
+            for row in rows:
+                key = (row["child_id"], row["domain"], row["day"])
+                entry = self._dirty.setdefault(key, [0, row["utc_offset_minutes"]])
+                entry[0] += row["seconds"]
+            for rule_id, blocked_until in rule_blocks.items():
+                self._dirty_rules.setdefault(rule_id, blocked_until)
+            self._dirty_children.update(remaining)
+
+    def due_resets(self, now=None):
+        """
+        Roll over every child whose local midnight has passed
+        Returns {child_id: daily_limit_minutes} for the children reset
+        """
+        now = now or datetime.utcnow()
+        reset = {}
+        with self._lock:
+            while self._resets and self._resets[0][0] <= now:
+                _, child_id, day = heapq.heappop(self._resets)
+                state = self._days.get(child_id)
+                if state is None or state.day != day:
+                    continue   # stale entry, the child already rolled over
+                reset[child_id] = self._daily_limits.get(child_id)
+                if state.active:
+                    day, resets_at = local_day(now, state.offset)
+                    self._days[child_id] = _ChildDay(day, state.offset, resets_at)
+                    heapq.heappush(self._resets, (resets_at, child_id, day))
+                else:
+                    # Idle for a whole day: free the memory, reload on next access
+                    del self._days[child_id]
+                    self._rules.pop(child_id, None)
+                    self._daily_limits.pop(child_id, None)
+        return reset
+
+    @property
+    def children_in_memory(self):
+        return len(self._days)
+
+    @property
+    def pending_rows(self):
+        """Counter rows waiting for the next drain()"""
+        return len(self._dirty)